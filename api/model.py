@@ -7,6 +7,8 @@ from enum import Enum, IntEnum
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None  # 刷新令牌，访问令牌过期或失效后换取新令牌
+    expires_in: Optional[int] = None  # 访问令牌有效期（秒）
     redirect_to: Optional[str] = None  # 前端重定向路径
     message: Optional[str] = None  # 提示信息
 
@@ -63,6 +65,11 @@ class User(BaseModel):
     contractor_user: Optional["ContractorUser"] = None
 
 
+class TokenUser(User):
+    """由访问令牌声明构建的当前用户（不查询 users 表），没有 phone、email、enterprise_user 等资料字段"""
+    role_type: Optional[str] = None
+
+
 class EnterpriseUser(BaseModel):
     user_id: Optional[int] = None
     enterprise_id: int
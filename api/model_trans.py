@@ -1,74 +1,168 @@
+from copy import deepcopy
+from functools import partial
+from operator import attrgetter, itemgetter
+
 from db import models as db_models
-from api.model import User, UserType, EnterpriseUser, ContractorUser, ContractorListItem
+from api.model import User, UserType, EnterpriseUser, ContractorUser, ContractorListItem, ApprovalLevel
 from db import crud
 from typing import List
 
 
-def convert_user_db_to_response(user_db: db_models.User) -> User:
-    # 处理企业用户（从users表的新字段构建）
-    enterprise_user = None
-    if user_db.user_type == "enterprise":
-        # 从users表的新字段构建EnterpriseUser对象
-        # enterprise_staff_id 直接存储了 enterprise_id（根据之前的修改）
-        enterprise_id = user_db.enterprise_staff_id if hasattr(user_db, 'enterprise_staff_id') and user_db.enterprise_staff_id is not None else 0
-        name = user_db.name_str if hasattr(user_db, 'name_str') and user_db.name_str else (user_db.relay_name if hasattr(user_db, 'relay_name') and user_db.relay_name else user_db.username)
-        
-        # 只有在有足够数据时才创建 EnterpriseUser 对象
-        # 如果 enterprise_id 为 0 或 None，说明用户还没有绑定企业，不创建 enterprise_user
-        if enterprise_id and enterprise_id > 0:
-            from api.model import ApprovalLevel
-            enterprise_user = EnterpriseUser(
-                user_id=user_db.user_id,
-                enterprise_id=enterprise_id,  # enterprise_staff_id 就是 enterprise_id
-                department_id=None,  # 需要从其他地方获取
-                name=name or user_db.username,  # 确保 name 不为空
-                phone=user_db.phone if hasattr(user_db, 'phone') and user_db.phone else None,
-                email=user_db.email if hasattr(user_db, 'email') and user_db.email else None,
-                position=None,  # users表中没有position字段
-                role_type=user_db.role_type if hasattr(user_db, 'role_type') and user_db.role_type else "normal",
-                approval_level=user_db.role_level if hasattr(user_db, 'role_level') and user_db.role_level is not None else ApprovalLevel.level_1,
-                status=user_db.user_status if hasattr(user_db, 'user_status') and user_db.user_status is not None else 1
-            )
-
-    # 处理承包商用户（从users表的新字段构建）
-    contractor_user = None
-    if user_db.user_type == "contractor":
-        # 从users表的新字段构建ContractorUser对象
-        # contractor_staff_id 可能存储了 contractor_id，但需要确认
-        contractor_id = user_db.contractor_staff_id if hasattr(user_db, 'contractor_staff_id') and user_db.contractor_staff_id is not None else 0
-        name = user_db.name_str if hasattr(user_db, 'name_str') and user_db.name_str else (user_db.relay_name if hasattr(user_db, 'relay_name') and user_db.relay_name else user_db.username)
-        
-        # 只有在有足够数据时才创建 ContractorUser 对象
-        # 如果 contractor_id 为 0 或 None，说明用户还没有绑定承包商，不创建 contractor_user
-        if contractor_id and contractor_id > 0:
-            contractor_user = ContractorUser(
-                user_id=user_db.user_id,
-                contractor_id=contractor_id,
-                name=name or user_db.username,  # 确保 name 不为空
-                phone=user_db.phone if hasattr(user_db, 'phone') and user_db.phone else "",
-                id_number="",  # users表中没有id_number字段，使用空字符串
-                work_type=user_db.work_type if hasattr(user_db, 'work_type') and user_db.work_type else "",
-                personal_photo="",  # users表中没有personal_photo字段，使用空字符串
-                role_type=user_db.role_type if hasattr(user_db, 'role_type') and user_db.role_type else "normal",
-                status=user_db.user_status if hasattr(user_db, 'user_status') and user_db.user_status is not None else 1
-            )
-
-    return User(
-        user_id=user_db.user_id,
-        user_type=UserType(user_db.user_type),
-        username=user_db.username,
-        enterprise_staff_id=user_db.enterprise_staff_id if hasattr(user_db, 'enterprise_staff_id') and user_db.enterprise_staff_id is not None else None,
-        contractor_staff_id=user_db.contractor_staff_id if hasattr(user_db, 'contractor_staff_id') and user_db.contractor_staff_id is not None else None,
-        phone=user_db.phone if hasattr(user_db, 'phone') else None,
-        email=user_db.email if hasattr(user_db, 'email') else None,
-        user_level=user_db.user_level if hasattr(user_db, 'user_level') else None,
-        audit_status=user_db.audit_status if hasattr(user_db, 'audit_status') else None,
-        user_status=user_db.user_status if hasattr(user_db, 'user_status') and user_db.user_status is not None else None,
-        role_level=user_db.role_level if hasattr(user_db, 'role_level') and user_db.role_level is not None else None,
-        is_deleted=user_db.is_deleted if hasattr(user_db, 'is_deleted') else False,
-        enterprise_user=enterprise_user,
-        contractor_user=contractor_user
+def trusted_constructor(model):
+    """
+    返回 model 的快速构造函数 build(values: dict) -> model，用于已知可信的数据库数据
+
+    与 model_construct 一样跳过校验，但字段默认值在构建时就确定，调用时不再逐字段
+    处理别名和默认值；values 中未给出的字段取默认值，且不计入 model_fields_set。
+    模型有别名、私有属性、model_post_init 或 extra='allow' 时退回 model_construct
+    """
+    fields = model.model_fields
+    if (
+        model.__pydantic_post_init__
+        or model.__private_attributes__
+        or model.model_config.get("extra") == "allow"
+        or any(f.alias or f.validation_alias for f in fields.values())
+    ):
+        return lambda values: model.model_construct(**values)
+
+    # 按字段声明顺序排列的模板，update 后字段顺序不变（影响 model_dump/JSON 的键顺序）
+    template = {}
+    factories = []
+    for name, field in fields.items():
+        template[name] = None if field.is_required() or field.default_factory is not None else field.default
+        if field.default_factory is not None:
+            factories.append((name, field.default_factory))
+        elif isinstance(field.default, (list, dict, set)):
+            # 可变默认值每个实例复制一份
+            factories.append((name, partial(deepcopy, field.default)))
+    new = model.__new__
+    setattr_ = object.__setattr__
+
+    def build(values: dict):
+        instance = new(model)
+        fields_values = template.copy()
+        fields_values.update(values)
+        for name, factory in factories:
+            if name not in values:
+                fields_values[name] = factory()
+        setattr_(instance, "__dict__", fields_values)
+        setattr_(instance, "__pydantic_fields_set__", set(values))
+        setattr_(instance, "__pydantic_extra__", None)
+        setattr_(instance, "__pydantic_private__", None)
+        return instance
+
+    return build
+
+
+def _snapshot_reader(source_model):
+    """
+    一次读出 source_model 实例的全部字段，返回 {字段名: 值}
+
+    已加载的 ORM 实例字段值都在实例 __dict__ 中，直接按键读取，
+    避免逐个经过 SQLAlchemy 的属性描述符；有未加载/已过期的字段时退回 getattr
+    """
+    names = tuple(source_model.model_fields)
+    read_state = itemgetter(*names)
+    read_attrs = attrgetter(*names)
+
+    def snapshot(source) -> dict:
+        try:
+            return dict(zip(names, read_state(source.__dict__)))
+        except KeyError:
+            return dict(zip(names, read_attrs(source)))
+
+    return snapshot
+
+
+def compile_converter(source_model, target_model, exclude=(), **computed):
+    """
+    生成 source_model 实例 -> target_model 实例的转换函数，每对模型只构建一次
+
+    - 两边同名的字段直接复制（构建时确定字段列表，调用时不再逐个 hasattr）
+    - computed 中的字段由 fn(row) 计算，row 为源实例全部字段的字典
+    - exclude 中的字段不复制，取 target_model 的默认值
+    - 数据来自数据库，不经过 Pydantic 校验（见 trusted_constructor）
+    """
+    copied = tuple(
+        name for name in target_model.model_fields
+        if name in source_model.model_fields and name not in computed and name not in exclude
     )
+    snapshot = _snapshot_reader(source_model)
+    computed_items = tuple(computed.items())
+    build = trusted_constructor(target_model)
+
+    def convert(source):
+        row = snapshot(source)
+        values = {name: row[name] for name in copied}
+        for name, fn in computed_items:
+            values[name] = fn(row)
+        return build(values)
+
+    convert.__name__ = f"convert_{source_model.__name__}_to_{target_model.__name__}"
+    return convert
+
+
+_build_enterprise_user_model = trusted_constructor(EnterpriseUser)
+_build_contractor_user_model = trusted_constructor(ContractorUser)
+
+
+def _display_name(row: dict) -> str:
+    return row["name_str"] or row["relay_name"] or row["username"]
+
+
+def _build_enterprise_user(row: dict):
+    """从 users 表的字段构建 EnterpriseUser 对象"""
+    # enterprise_staff_id 直接存储了 enterprise_id
+    # 如果 enterprise_id 为 0 或 None，说明用户还没有绑定企业，不创建 enterprise_user
+    enterprise_id = row["enterprise_staff_id"]
+    if row["user_type"] != "enterprise" or not enterprise_id or enterprise_id < 0:
+        return None
+    role_level = row["role_level"]
+    user_status = row["user_status"]
+    return _build_enterprise_user_model({
+        "user_id": row["user_id"],
+        "enterprise_id": enterprise_id,
+        "department_id": None,  # 需要从其他地方获取
+        "name": _display_name(row),
+        "phone": row["phone"] or None,
+        "email": row["email"] or None,
+        "position": None,  # users表中没有position字段
+        "role_type": row["role_type"] or "normal",
+        "approval_level": role_level if role_level is not None else ApprovalLevel.level_1,
+        "status": user_status if user_status is not None else 1,
+    })
+
+
+def _build_contractor_user(row: dict):
+    """从 users 表的字段构建 ContractorUser 对象"""
+    # 如果 contractor_id 为 0 或 None，说明用户还没有绑定承包商，不创建 contractor_user
+    contractor_id = row["contractor_staff_id"]
+    if row["user_type"] != "contractor" or not contractor_id or contractor_id < 0:
+        return None
+    user_status = row["user_status"]
+    return _build_contractor_user_model({
+        "user_id": row["user_id"],
+        "contractor_id": contractor_id,
+        "name": _display_name(row),
+        "phone": row["phone"] or "",
+        "id_number": "",  # users表中没有id_number字段，使用空字符串
+        "work_type": row["work_type"] or "",
+        "personal_photo": "",  # users表中没有personal_photo字段，使用空字符串
+        "role_type": row["role_type"] or "normal",
+        "status": user_status if user_status is not None else 1,
+    })
+
+
+# 每个认证请求（get_current_user）都会调用，转换函数在导入时构建一次
+convert_user_db_to_response = compile_converter(
+    db_models.User, User,
+    # 密码哈希、临时 token 等不返回给接口
+    exclude=("password_hash", "temp_token", "relay_name", "sys_only_id"),
+    user_type=lambda row: UserType(row["user_type"]),
+    enterprise_user=_build_enterprise_user,
+    contractor_user=_build_contractor_user,
+)
+
 
 def convert_enterprise_user_to_response(user_db: db_models.EnterpriseUser) -> EnterpriseUser:
     return EnterpriseUser(
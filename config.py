@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from datetime import timedelta
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -9,7 +10,74 @@ class Settings(BaseSettings):
     secret_key: str
     debug: bool = False
     algorithm: str
-    access_token_expire_min: int
+    access_token_expire_min: int  # 访问令牌有效期（分钟），令牌携带权限声明，建议 15 分钟以内
+    refresh_token_expire_days: int = 7  # 刷新令牌有效期（天）
+    refresh_token_reuse_grace_seconds: float = 60  # 刷新令牌换新后仍可再次使用的秒数（多个标签页同时刷新、响应丢失后重试）
+    token_version_listen: bool = True  # 是否通过 LISTEN/NOTIFY 同步令牌计数和登出撤销（权限变更、撤销、登出后旧令牌立即失效）
+    revoked_token_gc_interval: float = 600  # 清理过期令牌撤销记录的间隔（秒），0 表示不运行（需已执行 migrate_revoked_tokens.sql）
+    metrics_enabled: bool = True  # 是否开放 /metrics 监控指标
+    slow_query_threshold_ms: int = 200  # 慢查询日志阈值（毫秒）
+    request_query_warn_count: int = 50  # 单个请求查询次数超过该值时打印告警
+    server_timing_enabled: bool = True  # 是否在响应头中返回 Server-Timing
+
+    # 数据库连接池
+    db_pool_size: int = 10  # 常驻连接数
+    db_max_overflow: int = 20  # 允许的溢出连接数
+    db_pool_timeout: int = 30  # 取连接超时（秒）
+    db_pool_recycle: int = 1800  # 连接回收周期（秒）
+    db_pool_pre_ping: bool = False  # 取连接前是否先 ping（多一次往返，数据库会主动断连时再开启）
+    db_pool_warmup_size: int = 2  # 启动时预先建立的连接数，0 表示不预热
+    # asyncpg 连接参数
+    db_statement_cache_size: int = 100  # 预编译语句缓存大小，经过 pgbouncer 事务池时需设为 0
+    db_command_timeout: Optional[float] = 60  # 单条语句的客户端超时（秒）
+    db_connect_timeout: float = 10  # 建立连接超时（秒）
+    db_application_name: str = "ehs_sys"  # pg_stat_activity 中显示的应用名
+    db_statement_timeout_ms: int = 30000  # 服务端语句超时（毫秒），0 表示不限制
+    db_jit: bool = False  # 是否开启 PostgreSQL JIT（OLTP 短查询开启反而更慢）
+
+    # 只读副本（读写分离），未配置时所有请求走主库
+    database_replica_url: Optional[str] = None  # 只读副本连接地址
+    replica_max_lag_seconds: float = 5  # 副本延迟超过该值时只读请求回退到主库
+    replica_lag_check_interval: float = 2  # 副本延迟检测间隔（秒）
+    replica_sticky_seconds: float = 10  # 写请求后该会话的只读请求继续走主库的时长（读己之写）
+
+    # 进程内缓存
+    scope_cache_ttl_seconds: float = 30  # 企业/承包商可访问范围（id 数组）缓存时长，0 表示不缓存
+    reference_cache_ttl_seconds: float = 300  # 企业/承包商名称等基础信息缓存时长，0 表示不缓存
+    reference_cache_max_size: int = 5000  # 基础信息缓存的最大条目数（企业、承包商各一份）
+    cache_invalidation_listen: bool = True  # 是否通过 LISTEN/NOTIFY 在多个 worker 间同步缓存失效
+
+    # 实时事件（SSE）
+    events_enabled: bool = True  # 是否开启 /events/stream（通过 LISTEN/NOTIFY 接收事件）
+    events_max_connections: int = 5000  # 每个 worker 进程最多保持的 SSE 连接数
+    events_queue_size: int = 100  # 每个连接最多缓存的未发送事件数，超出后提示客户端重新拉取
+    events_heartbeat_seconds: float = 25  # 没有事件时发送心跳的间隔，避免代理断开空闲连接
+
+    # 响应序列化
+    fast_json_response: bool = False  # 使用 orjson 序列化响应，大列表接口跳过响应模型的二次校验（需安装 orjson）
+
+    # 统计
+    contractor_project_counter: bool = False  # /contractors/ 的项目数读取触发器维护的计数表，不再 GROUP BY（需已执行 migrate_contractor_project_counts.sql）
+    dashboard_reconcile_interval: float = 600  # 仪表盘计数与原表对账的间隔（秒），0 表示不运行（需已执行 migrate_dashboard_stats.sql）
+
+    # 员工批量导入
+    staff_import_max_rows: int = 2000  # 单个导入文件最多行数
+    staff_import_max_bytes: int = 5 * 1024 * 1024  # 导入文件大小上限（字节）
+    password_hash_workers: int = 0  # 批量生成密码哈希的进程数，0 表示 CPU 核数
+
+    # 认证接口限流（/token、/register、/forgot-password、/reset-password）
+    rate_limit_enabled: bool = True  # 是否开启限流
+    rate_limit_backend: str = "memory"  # 令牌桶存储：memory（每个进程各自计数）/ postgres（多 worker 共享，需已执行 migrate_rate_limit.sql）
+    rate_limit_ip_capacity: int = 30  # 每个 IP 每个接口允许的突发次数
+    rate_limit_ip_per_minute: float = 10  # 每个 IP 每分钟恢复的次数
+    rate_limit_username_capacity: int = 5  # 每个用户名每个接口允许的突发次数
+    rate_limit_username_per_minute: float = 1  # 每个用户名每分钟恢复的次数
+    rate_limit_trust_forwarded: bool = False  # 部署在反向代理之后时按 X-Forwarded-For 识别客户端 IP
+    rate_limit_max_keys: int = 100000  # 进程内最多保存的令牌桶数
+    rate_limit_prune_interval: float = 300  # postgres 存储清理闲置令牌桶的间隔（秒）
+
+    # 搜索
+    search_pinyin_refresh_interval: float = 60  # 后台补齐名称拼音的间隔（秒），0 表示不运行（需安装 pypinyin）
 
     @property
     def access_token_expire_minutes(self):
@@ -22,4 +90,3 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
-print(settings.access_token_expire_minutes)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+进程内缓存
+In-process TTL cache
+
+- 每个 worker 进程一份，单线程事件循环内使用，不加锁
+- 条目超过 ttl 后视为不存在；写操作后应调用 invalidate 主动失效，ttl 只是兜底
+- 条目数达到 max_size 时先清理过期条目，仍然满则淘汰最早写入的条目
+- 需要跨 worker 同步失效的缓存通过 register_invalidation_handler 注册名字，
+  由 db.notify 的 LISTEN/NOTIFY 消息触发 invalidate_local
+"""
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+# 缓存未命中的标记（缓存值本身可能是 None 或空列表）
+MISSING = object()
+
+
+class TTLCache:
+    """带过期时间的字典缓存"""
+
+    def __init__(self, ttl_seconds: float, max_size: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}  # {key: (过期时间(monotonic), value)}
+
+    def get(self, key: Hashable) -> Any:
+        """获取缓存值，未命中或已过期时返回 MISSING"""
+        entry = self._data.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return MISSING
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        now = time.monotonic()
+        if key not in self._data and len(self._data) >= self.max_size:
+            self._evict(now)
+        self._data[key] = (now + self.ttl_seconds, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self, now: float) -> None:
+        self._data = {k: v for k, v in self._data.items() if v[0] > now}
+        if len(self._data) >= self.max_size:
+            # dict 保持插入顺序，第一个即最早写入的条目
+            del self._data[next(iter(self._data))]
+
+
+# {缓存名: 失效回调(key)}，key 为 None 时清空整个缓存
+_invalidation_handlers: Dict[str, Callable[[Any], None]] = {}
+
+
+def register_invalidation_handler(cache_name: str, handler: Callable[[Any], None]) -> None:
+    """注册可按名字失效的缓存"""
+    _invalidation_handlers[cache_name] = handler
+
+
+def invalidate_local(cache_name: str, key: Any = None) -> bool:
+    """在当前进程内失效缓存条目，缓存名未注册时返回 False"""
+    handler = _invalidation_handlers.get(cache_name)
+    if handler is None:
+        return False
+    handler(key)
+    return True
+
+
+def invalidate_all_local() -> None:
+    """清空所有已注册的缓存（如失效通知连接断开期间可能丢失消息时）"""
+    for handler in _invalidation_handlers.values():
+        handler(None)
@@ -0,0 +1,117 @@
+"""
+实时事件分发
+In-process event fan-out for server-sent events
+
+- 每个 worker 进程一个 EVENT_HUB，SSE 连接按主题订阅，得到一个有界队列
+- 事件通过 PostgreSQL NOTIFY 广播到所有 worker（db.notify.publish_event），
+  每个进程只用 PgListener 的一条 LISTEN 连接接收，再按主题分发到本进程的订阅者
+- 空闲连接只占一个等待中的协程和一个空队列；队列满时丢弃事件并标记 overflow，
+  由 SSE 接口通知客户端重新拉取数据
+
+主题：
+- user:<user_id>                 某个用户（申请审核结果、账号状态变化）
+- enterprise_admins:<企业ID>      企业管理员（员工绑定申请、承包商合作申请）
+- contractor_admins:<承包商ID>    承包商管理员（员工绑定申请、合作申请审批结果）
+- system_admins                  系统管理员（待审核人员变化）
+"""
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set
+
+from api.model import User
+
+
+def user_topic(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def enterprise_admins_topic(enterprise_id: int) -> str:
+    return f"enterprise_admins:{enterprise_id}"
+
+
+def contractor_admins_topic(contractor_id: int) -> str:
+    return f"contractor_admins:{contractor_id}"
+
+
+SYSTEM_ADMINS_TOPIC = "system_admins"
+
+
+def topics_for_user(user: User) -> List[str]:
+    """用户可以订阅的主题：自己，以及作为管理员所管理范围的主题"""
+    topics = [user_topic(user.user_id)]
+    if user.user_status != 1:
+        return topics
+    if user.role_level == 0:
+        topics.append(SYSTEM_ADMINS_TOPIC)
+    elif user.role_level == 1 and user.enterprise_staff_id:
+        topics.append(enterprise_admins_topic(user.enterprise_staff_id))
+    elif user.role_level == 3 and user.contractor_staff_id:
+        topics.append(contractor_admins_topic(user.contractor_staff_id))
+    return topics
+
+
+class Subscription:
+    """一个 SSE 连接的订阅"""
+
+    def __init__(self, topics: Iterable[str], queue_size: int):
+        self.topics = tuple(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflow = False  # 有事件因队列满被丢弃
+
+    def put(self, message: dict) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflow = True
+
+
+class EventHub:
+    """按主题把事件分发给本进程的订阅者"""
+
+    def __init__(self):
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def subscribe(self, topics: Iterable[str], queue_size: int = 100) -> Subscription:
+        subscription = Subscription(topics, queue_size)
+        for topic in subscription.topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[topic]
+        self._count -= 1
+
+    def dispatch(self, topics: Iterable[str], message: dict) -> int:
+        """把事件放入订阅了任一主题的订阅者队列（同一订阅者只放一次），返回投递的订阅者数"""
+        targets: Set[Subscription] = set()
+        for topic in topics:
+            targets.update(self._topics.get(topic, ()))
+        for subscription in targets:
+            subscription.put(message)
+        return len(targets)
+
+    def broadcast(self, message: dict) -> None:
+        """发给所有订阅者（如 LISTEN 重连后提示客户端重新拉取）"""
+        targets: Set[Subscription] = set()
+        for subscribers in self._topics.values():
+            targets.update(subscribers)
+        for subscription in targets:
+            subscription.put(message)
+
+
+EVENT_HUB = EventHub()
+
+
+def resync_all(hub: Optional[EventHub] = None) -> None:
+    """LISTEN 连接断开期间的事件已丢失，通知所有客户端重新拉取"""
+    (hub or EVENT_HUB).broadcast({"event": "resync", "data": {}})
@@ -0,0 +1,229 @@
+"""
+Prometheus 指标采集
+Prometheus-style metrics collection
+
+采集内容：
+1. 按路由统计的请求数、状态码、请求延迟直方图（ASGI 中间件）
+2. SQLAlchemy 连接池的取连接等待时间、连接占用时长、已占用连接数、溢出连接数
+
+设计要点：
+- 每个 worker 进程内单线程事件循环，计数器为普通整数自增，不加锁
+- 路由统计对象在首次命中时创建并常驻，之后每个请求只做两次字典查找，不再分配标签字典
+- 标签字符串在渲染 /metrics 时才拼接
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+# 请求延迟直方图的桶（秒）
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 连接池等待时间直方图的桶（秒）
+POOL_WAIT_BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# 未匹配到任何路由的请求（404等）统一归入该标签，避免路径基数爆炸
+UNMATCHED_ROUTE = "__unmatched__"
+
+
+class Histogram:
+    """非累积存储的直方图，渲染时再转换为 Prometheus 的累积桶"""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一个为 +Inf 桶
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteStats:
+    """单个 (路由, 方法) 的统计"""
+    __slots__ = ("statuses", "latency")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+
+
+class MetricsRegistry:
+    """进程内指标注册表"""
+
+    def __init__(self):
+        # {route_path: {method: RouteStats}}
+        self._routes: Dict[str, Dict[str, RouteStats]] = {}
+        # {pool_name: engine}
+        self._pools: Dict[str, object] = {}
+        self.pool_wait = Histogram(POOL_WAIT_BUCKETS)
+        # 单次取出到归还的连接占用时长
+        self.conn_hold = Histogram(LATENCY_BUCKETS)
+        # 单个请求累计占用连接的时长（只统计用到数据库的请求）
+        self.request_conn_hold = Histogram(LATENCY_BUCKETS)
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float) -> None:
+        """记录一次请求"""
+        by_method = self._routes.get(route)
+        if by_method is None:
+            by_method = self._routes[route] = {}
+        stats = by_method.get(method)
+        if stats is None:
+            stats = by_method[method] = RouteStats()
+        statuses = stats.statuses
+        statuses[status_code] = statuses.get(status_code, 0) + 1
+        stats.latency.observe(duration)
+
+    def register_pool(self, name: str, engine) -> None:
+        """注册需要暴露连接池状态的 engine（AsyncEngine 或同步 Engine 均可）"""
+        self._pools[name] = engine
+
+    def unregister_pool(self, name: str) -> None:
+        self._pools.pop(name, None)
+
+    def render(self) -> str:
+        """渲染为 Prometheus 文本格式"""
+        lines = []
+
+        lines.append("# HELP ehs_http_requests_total 按路由、方法和状态码统计的请求总数")
+        lines.append("# TYPE ehs_http_requests_total counter")
+        for route, by_method in self._routes.items():
+            route_label = _escape(route)
+            for method, stats in by_method.items():
+                for status_code, count in stats.statuses.items():
+                    lines.append(
+                        f'ehs_http_requests_total{{method="{method}",route="{route_label}",status="{status_code}"}} {count}'
+                    )
+
+        lines.append("# HELP ehs_http_request_duration_seconds 按路由和方法统计的请求延迟")
+        lines.append("# TYPE ehs_http_request_duration_seconds histogram")
+        for route, by_method in self._routes.items():
+            route_label = _escape(route)
+            for method, stats in by_method.items():
+                _render_histogram(
+                    lines, "ehs_http_request_duration_seconds",
+                    f'method="{method}",route="{route_label}"', stats.latency
+                )
+
+        lines.append("# HELP ehs_db_pool_checkout_wait_seconds 从连接池获取连接的等待时间（含新建连接）")
+        lines.append("# TYPE ehs_db_pool_checkout_wait_seconds histogram")
+        _render_histogram(lines, "ehs_db_pool_checkout_wait_seconds", "", self.pool_wait)
+
+        lines.append("# HELP ehs_db_connection_hold_seconds 单次从连接池取出到归还的连接占用时长")
+        lines.append("# TYPE ehs_db_connection_hold_seconds histogram")
+        _render_histogram(lines, "ehs_db_connection_hold_seconds", "", self.conn_hold)
+
+        lines.append("# HELP ehs_db_request_connection_hold_seconds 单个请求累计占用数据库连接的时长")
+        lines.append("# TYPE ehs_db_request_connection_hold_seconds histogram")
+        _render_histogram(lines, "ehs_db_request_connection_hold_seconds", "", self.request_conn_hold)
+
+        pool_gauges = (
+            ("ehs_db_pool_size", "连接池常驻连接数上限"),
+            ("ehs_db_pool_checked_out", "当前已被占用的连接数"),
+            ("ehs_db_pool_overflow", "当前正在使用的溢出连接数"),
+            ("ehs_db_pool_idle", "当前空闲的常驻连接数"),
+        )
+        pool_values = {name: _pool_snapshot(engine) for name, engine in self._pools.items()}
+        for index, (metric, help_text) in enumerate(pool_gauges):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for name, snapshot in pool_values.items():
+                if snapshot is not None:
+                    lines.append(f'{metric}{{pool="{_escape(name)}"}} {snapshot[index]}')
+
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    """转义 Prometheus 标签值"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def _render_histogram(lines: list, metric: str, labels: str, histogram: Histogram) -> None:
+    prefix = f"{labels}," if labels else ""
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{prefix}le="{_format_bound(bound)}"}} {cumulative}')
+    cumulative += histogram.counts[-1]
+    lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+    label_part = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{label_part} {histogram.sum}")
+    lines.append(f"{metric}_count{label_part} {histogram.count}")
+
+
+def _pool_snapshot(engine) -> Optional[Tuple[int, int, int, int]]:
+    """读取连接池状态：(size, checked_out, overflow_in_use, idle)"""
+    pool = getattr(engine, "pool", None)
+    if pool is None or not hasattr(pool, "checkedout"):
+        return None
+    try:
+        size = pool.size()
+        checked_out = pool.checkedout()
+        # QueuePool.overflow() 从 -pool_size 起算，只有大于0的部分才是正在使用的溢出连接
+        overflow_in_use = max(0, pool.overflow())
+        idle = pool.checkedin()
+    except Exception:
+        return None
+    return size, checked_out, overflow_in_use, idle
+
+
+# 全局注册表（每个 worker 进程一份）
+REGISTRY = MetricsRegistry()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """记录取连接等待时间的连接池，供 create_engine 使用"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            REGISTRY.pool_wait.observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    请求指标中间件（纯 ASGI 实现，避免 BaseHTTPMiddleware 的额外开销）
+
+    路由标签使用 FastAPI 在路由匹配时写入 scope["route"] 的路径模板，
+    例如 /admin/users/{user_id}/approve/，而不是实际请求路径。
+    """
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or REGISTRY
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            self.registry.observe_request(
+                scope["method"], route_path, status_code, time.perf_counter() - start
+            )
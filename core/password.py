@@ -1,3 +1,8 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
 import bcrypt
 
 def get_password_hash(password: str) -> str:
@@ -17,5 +22,49 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+# 批量生成哈希（批量导入账号）使用的进程池，首次使用时创建，应用关闭时释放
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_workers = 1
+
+
+def _hash_batch(passwords: List[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool, _hash_workers
+    if _hash_pool is None:
+        from config import settings
+        _hash_workers = settings.password_hash_workers or os.cpu_count() or 1
+        _hash_pool = ProcessPoolExecutor(max_workers=_hash_workers)
+    return _hash_pool
+
+
+async def get_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    批量生成密码哈希，按顺序返回
+
+    bcrypt 每个哈希约几十毫秒 CPU，几百个账号同步计算会长时间阻塞事件循环；
+    这里分块交给进程池在所有 CPU 核上并行计算
+    """
+    if not passwords:
+        return []
+    pool = _get_hash_pool()
+    chunk_size = max(1, -(-len(passwords) // (_hash_workers * 4)))  # 每个进程约 4 块，减少进程间传输次数
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(*(
+        loop.run_in_executor(pool, _hash_batch, passwords[start:start + chunk_size])
+        for start in range(0, len(passwords), chunk_size)
+    ))
+    return [hashed for chunk in chunks for hashed in chunk]
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
 if __name__ == "__main__":
     print(get_password_hash("admin123"))
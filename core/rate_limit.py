@@ -0,0 +1,303 @@
+"""
+认证接口限流
+Token-bucket rate limiting for login, registration and password recovery
+
+/token、/register、/forgot-password、/reset-password 按客户端 IP 和用户名各一个令牌桶限流，
+撞库时被拒绝的请求在 RateLimitMiddleware 中直接返回 429，不进入路由，不查库，也不做 bcrypt 校验。
+
+两种存储：
+- memory: 每个 worker 进程各自计数（单进程部署或开发环境）
+- postgres: 令牌桶保存在 rate_limit_buckets（UNLOGGED，见 db/migrate_rate_limit.sql），多个 worker 共享；
+  一次请求的 IP 桶和用户名桶在一条语句中处理。令牌不足的键在本进程内记住到可重试时间，
+  重复的拒绝不再访问数据库；数据库不可用时退回进程内计数，不影响登录
+
+一次请求涉及的所有桶都有令牌时才各扣减一个，任一桶不足时整个请求被拒绝、所有桶都不扣减：
+被限流的 IP 不断提交某个用户名，不会消耗该用户的令牌、把该用户锁在外面。
+
+限流器在 lifespan 中创建并保存在 app.state.rate_limiter，未创建时中间件直接放行。
+"""
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+from sqlalchemy import text
+
+
+# 限流的接口（POST）及其在键中的名称
+RATE_LIMITED_PATHS: Dict[str, str] = {
+    "/token": "login",
+    "/register": "register",
+    "/forgot-password": "forgot_password",
+    "/reset-password": "reset_password",
+}
+
+# 读取请求体提取用户名的上限，超过时只按 IP 限流
+MAX_BODY_BYTES = 64 * 1024
+
+# 被拒绝的键在进程内记住的最大数量
+_MAX_BLOCKED_KEYS = 10000
+
+_TAKE_SQL = text("""
+    SELECT bucket_key, retry_after FROM rate_limit_take(
+        CAST(:keys AS varchar[]), CAST(:capacities AS float8[]), CAST(:rates AS float8[])
+    )
+""")
+
+_PRUNE_SQL = text("DELETE FROM rate_limit_buckets WHERE updated_at < now() - make_interval(secs => :seconds)")
+
+
+class BucketLimit(NamedTuple):
+    """令牌桶参数：容量（允许的突发次数）与每秒补充的令牌数"""
+    capacity: float
+    refill_per_second: float
+
+
+class InMemoryBackend:
+    """进程内令牌桶，超过 max_keys 时淘汰最久未访问的键"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # {key: (令牌数, 更新时间)}
+
+    def _available(self, key: str, limit: BucketLimit, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (limit.capacity, now))
+        return min(limit.capacity, tokens + (now - updated) * limit.refill_per_second)
+
+    async def take(self, items: Sequence[Tuple[str, BucketLimit]]) -> float:
+        """所有桶都有令牌时各取一个，返回需要等待的秒数，0 表示放行"""
+        now = time.monotonic()
+        available = [self._available(key, limit, now) for key, limit in items]
+        retry_after = max(
+            ((1 - tokens) / limit.refill_per_second for (_, limit), tokens in zip(items, available) if tokens < 1),
+            default=0.0,
+        )
+        if retry_after > 0:
+            return retry_after
+        for (key, _), tokens in zip(items, available):
+            self._buckets.pop(key, None)
+            self._buckets[key] = (tokens - 1, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return 0.0
+
+    async def prune(self, idle_seconds: float) -> int:
+        return 0
+
+
+class PostgresBackend:
+    """rate_limit_buckets 表中的共享令牌桶"""
+
+    def __init__(self, engine, fallback: Optional[InMemoryBackend] = None):
+        self.engine = engine
+        self.fallback = fallback or InMemoryBackend()
+        self._blocked_until: Dict[str, float] = {}
+
+    def _locally_blocked(self, items: Sequence[Tuple[str, BucketLimit]], now: float) -> float:
+        retry_after = 0.0
+        for key, _ in items:
+            until = self._blocked_until.get(key)
+            if until is None:
+                continue
+            if until <= now:
+                del self._blocked_until[key]
+            else:
+                retry_after = max(retry_after, until - now)
+        return retry_after
+
+    def _remember_block(self, blocked: Sequence[Tuple[str, float]], now: float) -> None:
+        """记住令牌不足的键及其可重试时间"""
+        if len(self._blocked_until) >= _MAX_BLOCKED_KEYS:
+            self._blocked_until = {key: value for key, value in self._blocked_until.items() if value > now}
+            if len(self._blocked_until) >= _MAX_BLOCKED_KEYS:
+                self._blocked_until.clear()
+        for key, retry_after in blocked:
+            self._blocked_until[key] = max(now + retry_after, self._blocked_until.get(key, 0.0))
+
+    async def take(self, items: Sequence[Tuple[str, BucketLimit]]) -> float:
+        now = time.monotonic()
+        retry_after = self._locally_blocked(items, now)
+        if retry_after > 0:
+            return retry_after
+
+        # 固定顺序加行锁，并发请求共享同一个键时不会互相死锁
+        items = sorted(items)
+        try:
+            async with self.engine.begin() as conn:
+                result = await conn.execute(_TAKE_SQL, {
+                    "keys": [key for key, _ in items],
+                    "capacities": [float(limit.capacity) for _, limit in items],
+                    "rates": [float(limit.refill_per_second) for _, limit in items],
+                })
+                blocked = [(key, float(retry_after)) for key, retry_after in result.all()]
+        except Exception as e:
+            print(f"⚠️ 限流存储不可用，改用进程内计数: {e}")
+            return await self.fallback.take(items)
+
+        if not blocked:
+            return 0.0
+        # 只记住令牌不足的键（同一请求中仍有令牌的键不受影响）；桶实际恢复前其他 worker 的请求仍会照常检查
+        self._remember_block(blocked, now)
+        return max(retry_after for _, retry_after in blocked)
+
+    async def prune(self, idle_seconds: float) -> int:
+        """删除长时间未访问的桶（闲置足够久的桶已补满，与不存在等价）"""
+        async with self.engine.begin() as conn:
+            result = await conn.execute(_PRUNE_SQL, {"seconds": idle_seconds})
+            return result.rowcount
+
+
+class RateLimiter:
+    """按接口、IP、用户名组织令牌桶"""
+
+    def __init__(self, backend, ip_limit: BucketLimit, username_limit: BucketLimit):
+        self.backend = backend
+        self.ip_limit = ip_limit
+        self.username_limit = username_limit
+
+    @property
+    def idle_seconds(self) -> float:
+        """桶从空到补满所需的最长时间"""
+        return max(
+            limit.capacity / limit.refill_per_second for limit in (self.ip_limit, self.username_limit)
+        )
+
+    async def check(self, endpoint: str, client_ip: Optional[str], username: Optional[str]) -> float:
+        items: List[Tuple[str, BucketLimit]] = []
+        if client_ip:
+            items.append((f"{endpoint}:ip:{client_ip}", self.ip_limit))
+        if username:
+            items.append((f"{endpoint}:user:{username}", self.username_limit))
+        if not items:
+            return 0.0
+        return await self.backend.take(items)
+
+
+def create_rate_limiter(settings, engine) -> Optional[RateLimiter]:
+    """按配置创建限流器，未开启时返回 None"""
+    if not settings.rate_limit_enabled:
+        return None
+    if settings.rate_limit_backend == "postgres":
+        backend = PostgresBackend(engine, InMemoryBackend(settings.rate_limit_max_keys))
+    elif settings.rate_limit_backend == "memory":
+        backend = InMemoryBackend(settings.rate_limit_max_keys)
+    else:
+        raise ValueError(f"不支持的限流存储: {settings.rate_limit_backend}")
+    return RateLimiter(
+        backend,
+        ip_limit=BucketLimit(settings.rate_limit_ip_capacity, settings.rate_limit_ip_per_minute / 60),
+        username_limit=BucketLimit(settings.rate_limit_username_capacity, settings.rate_limit_username_per_minute / 60),
+    )
+
+
+async def run_rate_limit_pruner(limiter: RateLimiter, interval: float) -> None:
+    """后台定期清理闲置的令牌桶"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            count = await limiter.backend.prune(limiter.idle_seconds)
+            if count:
+                print(f"🧹 已清理 {count} 个闲置的限流令牌桶")
+        except Exception as e:
+            print(f"⚠️ 清理限流令牌桶失败: {e}")
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def get_client_ip(scope, trust_forwarded: bool = False) -> Optional[str]:
+    """客户端 IP；部署在反向代理之后时取 X-Forwarded-For 中由代理追加的最后一项"""
+    if trust_forwarded:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return forwarded.rsplit(",", 1)[-1].strip() or None
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def extract_username(content_type: Optional[str], body: bytes) -> Optional[str]:
+    """从表单（/token）或 JSON 请求体中取 username，统一去空白并转小写"""
+    if not body:
+        return None
+    username = None
+    try:
+        if content_type and content_type.startswith("application/x-www-form-urlencoded"):
+            values = parse_qs(body.decode("utf-8"), max_num_fields=20).get("username")
+            username = values[0] if values else None
+        elif content_type and content_type.startswith("application/json"):
+            data = json.loads(body)
+            username = data.get("username") if isinstance(data, dict) else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(username, str):
+        return None
+    return username.strip().lower()[:150] or None
+
+
+class RateLimitMiddleware:
+    """
+    认证接口限流中间件（纯 ASGI 实现）
+
+    读取并缓存请求体以取出用户名，再原样交给后续处理；被拒绝时直接返回 429 和 Retry-After
+    """
+
+    def __init__(self, app, trust_forwarded: bool = False):
+        self.app = app
+        self.trust_forwarded = trust_forwarded
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        endpoint = RATE_LIMITED_PATHS.get(scope["path"].rstrip("/") or "/")
+        limiter = getattr(getattr(scope.get("app"), "state", None), "rate_limiter", None)
+        if endpoint is None or limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        body, messages, disconnected = b"", [], False
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] == "http.disconnect":
+                disconnected = True
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False) or len(body) > MAX_BODY_BYTES:
+                break
+
+        username = None
+        if not disconnected and len(body) <= MAX_BODY_BYTES:
+            username = extract_username(_header(scope, b"content-type"), body)
+        retry_after = await limiter.check(endpoint, get_client_ip(scope, self.trust_forwarded), username)
+        if retry_after > 0:
+            await self._reject(send, retry_after)
+            return
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        await self.app(scope, replay_receive, send)
+
+    @staticmethod
+    async def _reject(send, retry_after: float) -> None:
+        payload = json.dumps({"detail": "请求过于频繁，请稍后再试"}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
@@ -0,0 +1,62 @@
+"""
+快速 JSON 响应
+Fast JSON response serialization
+
+开启 settings.fast_json_response 且安装了 orjson 时：
+1. 应用默认响应类改为 FastJSONResponse（orjson 序列化，datetime/date/UUID/Enum 原生支持）
+2. 大列表接口通过 trusted_response 直接返回响应对象，跳过 FastAPI 按返回类型
+   对每一行重新校验、再 jsonable_encoder 的过程（行对象本身已是接口内构造的模型）
+
+未开启或未安装 orjson 时 trusted_response 原样返回内容，行为与原来完全一致
+"""
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """orjson 不支持的类型"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 orjson 序列化的 JSON 响应，内容中可以直接包含 Pydantic 模型"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def fast_json_enabled() -> bool:
+    return settings.fast_json_response and orjson is not None
+
+
+def default_response_class():
+    """FastAPI 应用的默认响应类"""
+    return FastJSONResponse if fast_json_enabled() else JSONResponse
+
+
+def trusted_response(content: Any) -> Any:
+    """
+    返回接口内部构造的可信内容（模型列表、字典等）
+
+    快速路径开启时直接返回 FastJSONResponse，不再经过响应模型校验；
+    否则原样返回，由 FastAPI 按接口返回类型校验和序列化
+    """
+    if fast_json_enabled():
+        return FastJSONResponse(content)
+    return content
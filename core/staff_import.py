@@ -0,0 +1,200 @@
+"""
+员工批量导入文件解析
+Staff import file parsing and validation
+
+支持 CSV（UTF-8 或 GBK）和 XLSX（需安装 openpyxl），第一行为表头：
+    姓名, 手机号, 邮箱（可选）, 工种（可选）
+表头也可以使用英文 name, phone, email, work_type；其他列忽略，
+所以错误报告（多了 行号、错误原因 两列）改正后可以直接重新导入。
+
+- 文件逐行读取，不整体读入内存，超过行数上限时停止并报错
+- validate_rows 只做格式校验和文件内去重，与数据库已有账号的冲突由 db.staff_import 一次查询检查
+"""
+import codecs
+import csv
+import io
+import re
+from typing import IO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import openpyxl
+except ImportError:  # 未安装时只支持 CSV
+    openpyxl = None
+
+
+class ImportFileError(ValueError):
+    """导入文件无法解析（格式、表头、行数等），整个文件拒绝"""
+
+
+class ImportRow(NamedTuple):
+    """导入文件中的一行"""
+    row_no: int  # 文件中的行号（表头为第 1 行）
+    name: str
+    phone: str
+    email: Optional[str]
+    work_type: str
+
+
+# 字段 -> 可接受的表头
+HEADER_ALIASES = {
+    "name": ("姓名", "name"),
+    "phone": ("手机号", "手机", "phone"),
+    "email": ("邮箱", "email"),
+    "work_type": ("工种", "work_type"),
+}
+REQUIRED_FIELDS = ("name", "phone")
+REPORT_HEADER = ["姓名", "手机号", "邮箱", "工种", "行号", "错误原因"]
+
+PHONE_PATTERN = re.compile(r"^1[3-9]\d{9}$")
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+NAME_MAX_LENGTH = 100  # users.name_str
+EMAIL_MAX_LENGTH = 100  # users.email
+WORK_TYPE_MAX_LENGTH = 100  # users.work_type
+
+_SNIFF_BYTES = 64 * 1024
+
+
+def _cell_text(value) -> str:
+    """单元格转字符串：Excel 中手机号常被存成数字（13800138000.0）"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _header_index(header: Iterable) -> Dict[str, int]:
+    """根据表头找到各字段所在的列"""
+    columns = [_cell_text(cell).lower() for cell in header]
+    index = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for position, column in enumerate(columns):
+            if column in aliases:
+                index[field] = position
+                break
+    missing = [HEADER_ALIASES[field][0] for field in REQUIRED_FIELDS if field not in index]
+    if missing:
+        raise ImportFileError(f"表头缺少列: {', '.join(missing)}")
+    return index
+
+
+def _detect_encoding(file: IO[bytes]) -> str:
+    """根据文件开头判断编码：能按 UTF-8 解码则为 UTF-8，否则按 GBK（Excel 另存为 CSV 的默认编码）"""
+    prefix = file.read(_SNIFF_BYTES)
+    file.seek(0)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+
+def _iter_csv(file: IO[bytes]) -> Iterator[list]:
+    text = io.TextIOWrapper(file, encoding=_detect_encoding(file), newline="")
+    try:
+        yield from csv.reader(text)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFileError(f"CSV 文件解析失败: {e}")
+    finally:
+        text.detach()  # 不关闭上传文件本身
+
+
+def _iter_xlsx(file: IO[bytes]) -> Iterator[tuple]:
+    if openpyxl is None:
+        raise ImportFileError("服务器未安装 openpyxl，暂不支持 XLSX，请另存为 CSV 后导入")
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f"XLSX 文件解析失败: {e}")
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_import_file(file: IO[bytes], filename: str, max_rows: int) -> List[ImportRow]:
+    """
+    读取导入文件，返回数据行（跳过空行）
+
+    同步函数，在线程池中调用；文件格式、表头或行数不符合要求时抛出 ImportFileError
+    """
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        lines = _iter_csv(file)
+    elif extension == "xlsx":
+        lines = _iter_xlsx(file)
+    else:
+        raise ImportFileError("仅支持 .csv 和 .xlsx 文件")
+
+    header = next(lines, None)
+    if header is None:
+        raise ImportFileError("文件为空")
+    index = _header_index(header)
+
+    rows = []
+    for row_no, line in enumerate(lines, start=2):
+        cells = [_cell_text(cell) for cell in line]
+        if not any(cells):
+            continue
+        if len(rows) >= max_rows:
+            raise ImportFileError(f"单次最多导入 {max_rows} 行，请拆分文件")
+
+        def field(name: str) -> str:
+            position = index.get(name)
+            return cells[position] if position is not None and position < len(cells) else ""
+
+        rows.append(ImportRow(
+            row_no=row_no,
+            name=field("name"),
+            phone=field("phone"),
+            email=field("email") or None,
+            work_type=field("work_type"),
+        ))
+    if not rows:
+        raise ImportFileError("文件中没有数据行")
+    return rows
+
+
+def validate_rows(rows: List[ImportRow]) -> Tuple[List[ImportRow], Dict[int, str]]:
+    """
+    格式校验和文件内去重，返回 (通过校验的行, {行号: 错误原因})
+
+    同一手机号或邮箱在文件中出现多次时，第一次出现的行保留，其余行报错
+    """
+    valid = []
+    errors: Dict[int, str] = {}
+    seen_phones: Dict[str, int] = {}
+    seen_emails: Dict[str, int] = {}
+    for row in rows:
+        if not row.name:
+            errors[row.row_no] = "姓名不能为空"
+        elif len(row.name) > NAME_MAX_LENGTH:
+            errors[row.row_no] = f"姓名不能超过 {NAME_MAX_LENGTH} 个字符"
+        elif not PHONE_PATTERN.match(row.phone):
+            errors[row.row_no] = "手机号格式不正确"
+        elif row.email and (len(row.email) > EMAIL_MAX_LENGTH or not EMAIL_PATTERN.match(row.email)):
+            errors[row.row_no] = "邮箱格式不正确"
+        elif len(row.work_type) > WORK_TYPE_MAX_LENGTH:
+            errors[row.row_no] = f"工种不能超过 {WORK_TYPE_MAX_LENGTH} 个字符"
+        elif row.phone in seen_phones:
+            errors[row.row_no] = f"手机号与第 {seen_phones[row.phone]} 行重复"
+        elif row.email and row.email.lower() in seen_emails:
+            errors[row.row_no] = f"邮箱与第 {seen_emails[row.email.lower()]} 行重复"
+        else:
+            seen_phones[row.phone] = row.row_no
+            if row.email:
+                seen_emails[row.email.lower()] = row.row_no
+            valid.append(row)
+    return valid, errors
+
+
+def build_error_report(rows: List[ImportRow], errors: Dict[int, str]) -> str:
+    """生成错误报告 CSV（带 BOM，Excel 直接打开不乱码），只包含失败的行"""
+    output = io.StringIO()
+    output.write("\ufeff")
+    writer = csv.writer(output)
+    writer.writerow(REPORT_HEADER)
+    for row in rows:
+        if row.row_no in errors:
+            writer.writerow([row.name, row.phone, row.email or "", row.work_type, row.row_no, errors[row.row_no]])
+    return output.getvalue()
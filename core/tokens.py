@@ -0,0 +1,285 @@
+"""
+访问令牌与刷新令牌
+Stateless access tokens with authorization claims, refresh tokens and version tracking
+
+访问令牌（typ=access，有效期 ACCESS_TOKEN_EXPIRE_MIN，建议 15 分钟以内）带有授权所需的全部声明：
+    sub / uid / user_type / role_level / user_status / enterprise_staff_id / contractor_staff_id / role_type
+    ver: users.token_version（撤销计数：改密码、删除、主动撤销）
+    cv:  users.claims_version（权限计数：角色、审核状态、所属企业/承包商变更）
+权限校验只读声明，不查询 users 表。刷新令牌（typ=refresh，有效期 REFRESH_TOKEN_EXPIRE_DAYS）只带 uid 和 ver，
+换取新令牌时查一次库，ver 与 users.token_version 不一致时拒绝。
+
+两个计数由 users 上的触发器维护（见 db/migrate_token_version.sql），变化时通过 NOTIFY 通知所有 worker，
+TOKEN_VERSIONS 记录每个用户最近的计数，低于它的访问令牌立即失效（声明过期的令牌由前端用刷新令牌换新）。
+记录只需保留一个访问令牌有效期：更早签发的令牌已经过期。
+
+登出时按令牌的 jti 单独撤销（见 db/migrate_revoked_tokens.sql）：revoked_tokens 表保存 jti 的哈希和令牌的过期时间。
+已撤销的访问令牌由 REVOKED_TOKENS 在每个 worker 内保存同样的哈希集合，由 NOTIFY 同步。每个请求只做一次集合查找，
+没有撤销记录时连哈希都不用计算；访问令牌有效期很短，集合只包含最近登出的令牌，过期后从内存和表中清理。
+刷新令牌不进入内存：换取新令牌（POST /token/refresh 本来就要查库）时在表中记录旧令牌已轮换，
+REFRESH_TOKEN_REUSE_GRACE_SECONDS 秒内再次使用仍然有效（多个标签页同时刷新、响应丢失后重试），之后被拒绝；
+登出时即使访问令牌已过期也能撤销刷新令牌，且不再有宽限期。
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+import jwt
+from jwt.exceptions import InvalidTokenError
+from sqlalchemy import text
+
+from config import settings
+
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+# 记录数超过该值时清理过期项
+_PRUNE_THRESHOLD = 10000
+
+
+def _encode(claims: dict, expires_delta: timedelta) -> str:
+    now = datetime.now(timezone.utc)
+    claims.update({"iat": now, "exp": now + expires_delta, "jti": uuid.uuid4().hex})
+    return jwt.encode(claims, settings.secret_key, algorithm=settings.algorithm)
+
+
+def build_access_claims(user) -> dict:
+    """从 users 表记录构建访问令牌声明"""
+    return {
+        "typ": ACCESS_TOKEN_TYPE,
+        "sub": user.username,
+        "uid": user.user_id,
+        "user_type": user.user_type,
+        "role_level": user.role_level,
+        "user_status": user.user_status,
+        "enterprise_staff_id": user.enterprise_staff_id,
+        "contractor_staff_id": user.contractor_staff_id,
+        "role_type": user.role_type,
+        "ver": user.token_version,
+        "cv": user.claims_version,
+    }
+
+
+def create_token_pair(user) -> Tuple[str, str]:
+    """为用户签发 (访问令牌, 刷新令牌)"""
+    access_token = _encode(build_access_claims(user), settings.access_token_expire_minutes)
+    refresh_token = _encode(
+        {"typ": REFRESH_TOKEN_TYPE, "sub": user.username, "uid": user.user_id, "ver": user.token_version},
+        timedelta(days=settings.refresh_token_expire_days),
+    )
+    return access_token, refresh_token
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """校验签名和有效期，无效时返回 None"""
+    try:
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except InvalidTokenError:
+        return None
+
+
+class TokenVersionRegistry:
+    """
+    每个用户最近的 (token_version, claims_version)
+
+    每个 worker 进程一份，由 NOTIFY 更新；启动和监听重连时从 users.token_changed_at 补齐
+    """
+
+    def __init__(self, retention_seconds: float):
+        self.retention_seconds = retention_seconds
+        self._versions: Dict[int, Tuple[int, int, float]] = {}  # {user_id: (token_version, claims_version, 记录时间)}
+
+    def note(self, user_id: int, token_version: int, claims_version: int) -> None:
+        current = self._versions.get(user_id)
+        if current is not None:
+            token_version = max(token_version, current[0])
+            claims_version = max(claims_version, current[1])
+        self._versions[user_id] = (token_version, claims_version, time.monotonic())
+        if len(self._versions) > _PRUNE_THRESHOLD:
+            self.prune()
+
+    def prune(self) -> None:
+        cutoff = time.monotonic() - self.retention_seconds
+        self._versions = {
+            user_id: value for user_id, value in self._versions.items() if value[2] > cutoff
+        }
+
+    def is_current(self, claims: dict) -> bool:
+        """访问令牌的计数不低于已知的最新计数"""
+        current = self._versions.get(claims.get("uid"))
+        if current is None:
+            return True
+        return claims.get("ver", -1) >= current[0] and claims.get("cv", -1) >= current[1]
+
+    async def load_recent(self, engine) -> int:
+        """读取一个访问令牌有效期内计数发生过变化的用户"""
+        async with engine.connect() as conn:
+            result = await conn.execute(text("""
+                SELECT user_id, token_version, claims_version FROM users
+                WHERE token_changed_at > now() - make_interval(secs => :seconds)
+            """), {"seconds": self.retention_seconds})
+            rows = result.all()
+        for user_id, token_version, claims_version in rows:
+            self.note(user_id, token_version, claims_version)
+        return len(rows)
+
+    def reload_in_background(self, engine) -> None:
+        """监听连接重连后补齐断线期间的变化"""
+        async def reload():
+            try:
+                await self.load_recent(engine)
+            except Exception as e:
+                print(f"⚠️ 重新加载令牌版本失败: {e}")
+
+        asyncio.create_task(reload())
+
+
+TOKEN_VERSIONS = TokenVersionRegistry(retention_seconds=settings.access_token_expire_minutes.total_seconds() + 60)
+
+
+def hash_jti(jti: str) -> bytes:
+    """令牌 jti 的哈希（16 字节），表和内存中只保存哈希"""
+    return hashlib.sha256(jti.encode()).digest()[:16]
+
+
+class RevokedTokenSet:
+    """
+    已撤销令牌的 jti 哈希集合
+
+    每个 worker 进程一份，由 NOTIFY 更新；启动和监听重连时从 revoked_tokens 重新加载
+    """
+
+    def __init__(self):
+        self._expires: Dict[bytes, float] = {}  # {jti 哈希: 令牌过期时间（Unix 时间戳）}
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def add(self, jti_hash: bytes, expires_at: float) -> None:
+        if expires_at > time.time():
+            self._expires[jti_hash] = expires_at
+
+    def is_revoked(self, claims: dict) -> bool:
+        if not self._expires:
+            return False
+        jti = claims.get("jti")
+        return jti is not None and hash_jti(jti) in self._expires
+
+    def prune(self) -> int:
+        """删除已过期令牌的记录，返回删除数量"""
+        now = time.time()
+        expired = [jti_hash for jti_hash, expires_at in self._expires.items() if expires_at <= now]
+        for jti_hash in expired:
+            del self._expires[jti_hash]
+        return len(expired)
+
+    async def load(self, engine) -> int:
+        """从 revoked_tokens 加载未过期的访问令牌记录（与已有记录合并，加载期间收到的通知不会丢失）"""
+        async with engine.connect() as conn:
+            result = await conn.execute(text("""
+                SELECT jti_hash, EXTRACT(EPOCH FROM expires_at) FROM revoked_tokens
+                WHERE NOT is_refresh AND expires_at > now()
+            """))
+            rows = result.all()
+        for jti_hash, expires_at in rows:
+            self.add(bytes(jti_hash), float(expires_at))
+        return len(rows)
+
+    def reload_in_background(self, engine) -> None:
+        """监听连接重连后补齐断线期间的撤销"""
+        async def reload():
+            try:
+                await self.load(engine)
+            except Exception as e:
+                print(f"⚠️ 重新加载已撤销令牌失败: {e}")
+
+        asyncio.create_task(reload())
+
+
+REVOKED_TOKENS = RevokedTokenSet()
+
+
+async def revoke_tokens(engine, claims_list: Iterable[dict]) -> int:
+    """
+    撤销令牌（登出）：写入 revoked_tokens，返回写入或更新的记录数
+
+    访问令牌同时加入 REVOKED_TOKENS，并在同一事务中通知所有 worker；刷新令牌只写表，已轮换的刷新令牌取消宽限期。
+    没有 jti 的旧令牌无法单独撤销，跳过
+    """
+    from db.notify import TOKEN_REVOCATION_CHANNEL
+
+    tokens = {
+        hash_jti(claims["jti"]): (float(claims["exp"]), claims.get("typ") == REFRESH_TOKEN_TYPE)
+        for claims in claims_list if claims.get("jti")
+    }
+    if not tokens:
+        return 0
+    access_tokens = [(jti_hash, expires_at) for jti_hash, (expires_at, is_refresh) in tokens.items() if not is_refresh]
+    for jti_hash, expires_at in access_tokens:
+        REVOKED_TOKENS.add(jti_hash, expires_at)
+
+    async with engine.begin() as conn:
+        result = await conn.execute(text("""
+            INSERT INTO revoked_tokens (jti_hash, expires_at, is_refresh)
+            SELECT h, to_timestamp(e), r
+            FROM unnest(CAST(:hashes AS bytea[]), CAST(:expires AS float8[]), CAST(:refresh AS boolean[])) AS t(h, e, r)
+            ON CONFLICT (jti_hash) DO UPDATE SET grace_until = NULL
+            WHERE revoked_tokens.grace_until IS NOT NULL
+        """), {
+            "hashes": list(tokens),
+            "expires": [expires_at for expires_at, _ in tokens.values()],
+            "refresh": [is_refresh for _, is_refresh in tokens.values()],
+        })
+        if access_tokens:
+            await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {
+                "channel": TOKEN_REVOCATION_CHANNEL,
+                "payload": json.dumps({"tokens": [[jti_hash.hex(), expires_at] for jti_hash, expires_at in access_tokens]}),
+            })
+        return result.rowcount
+
+
+async def use_refresh_token(engine, claims: dict) -> bool:
+    """
+    换取新令牌时登记刷新令牌已轮换，返回该刷新令牌是否仍可使用
+
+    第一次使用时写入 revoked_tokens（带宽限期）；再次使用时只在宽限期内有效，登出撤销的记录没有宽限期。
+    插入与查询分两条语句：READ COMMITTED 下第二条语句能看到并发请求刚提交的记录
+    """
+    if not claims.get("jti"):
+        return True
+    params = {
+        "hash": hash_jti(claims["jti"]),
+        "expires": float(claims["exp"]),
+        "grace": settings.refresh_token_reuse_grace_seconds,
+    }
+    async with engine.begin() as conn:
+        result = await conn.execute(text("""
+            INSERT INTO revoked_tokens (jti_hash, expires_at, is_refresh, grace_until)
+            VALUES (:hash, to_timestamp(:expires), TRUE, now() + make_interval(secs => :grace))
+            ON CONFLICT (jti_hash) DO NOTHING
+        """), params)
+        if result.rowcount:
+            return True
+        result = await conn.execute(text(
+            "SELECT grace_until > now() FROM revoked_tokens WHERE jti_hash = :hash"
+        ), {"hash": params["hash"]})
+        return bool(result.scalar())
+
+
+async def run_revoked_token_gc(engine, interval: float) -> None:
+    """后台定期清理已过期令牌的撤销记录（内存和 revoked_tokens 表）"""
+    while True:
+        await asyncio.sleep(interval)
+        REVOKED_TOKENS.prune()
+        try:
+            async with engine.begin() as conn:
+                result = await conn.execute(text("DELETE FROM revoked_tokens WHERE expires_at <= now()"))
+            if result.rowcount:
+                print(f"🧹 已清理 {result.rowcount} 条过期的令牌撤销记录")
+        except Exception as e:
+            print(f"⚠️ 清理令牌撤销记录失败: {e}")
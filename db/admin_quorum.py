@@ -0,0 +1,58 @@
+"""
+管理员数量下限检查
+Admin quorum check under advisory locks
+
+降级或变更管理员状态前需要确认"其他通过审核的管理员"数量不少于下限。
+原来的做法是把其他管理员整行查出来在 Python 里 len()，并且两个并发请求
+可能同时通过检查、同时降级，最终管理员数量低于下限。
+
+这里在检查前先取事务级 advisory lock（同一企业/承包商/系统管理员范围一把锁），
+持有到事务提交，然后 SELECT count(*)：
+- 同一范围内的降级请求串行执行，后一个请求在前一个提交后才计数（READ COMMITTED 每条语句新快照）
+- 不同企业、承包商之间互不阻塞
+调用方必须在同一个会话事务内完成 检查 -> 更新 -> 提交。
+"""
+from sqlalchemy import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.models import User as UserDB
+
+
+# advisory lock 的第一个键，区分管理员范围；第二个键为企业/承包商ID（系统管理员为 0）
+_LOCK_CLASS = {
+    "system": 43001,
+    "enterprise": 43002,
+    "contractor": 43003,
+}
+
+
+def _approved_admin_conditions(scope: str, company_id: int):
+    if scope == "system":
+        return [UserDB.user_type == "admin", UserDB.user_status == 1]
+    if scope == "enterprise":
+        return [UserDB.enterprise_staff_id == company_id, UserDB.role_level == 1, UserDB.user_status == 1]
+    if scope == "contractor":
+        return [UserDB.contractor_staff_id == company_id, UserDB.role_level == 3, UserDB.user_status == 1]
+    raise ValueError(f"未知的管理员范围: {scope}")
+
+
+async def lock_admin_scope(session: AsyncSession, scope: str, company_id: int = 0) -> None:
+    """获取管理员范围的事务级 advisory lock，事务提交或回滚时自动释放"""
+    await session.exec(select(func.pg_advisory_xact_lock(_LOCK_CLASS[scope], company_id or 0)))
+
+
+async def count_other_approved_admins(
+    session: AsyncSession, scope: str, company_id: int, exclude_user_id: int
+) -> int:
+    """
+    加锁后统计范围内除 exclude_user_id 以外通过审核的管理员数量
+
+    scope: system（系统管理员）/ enterprise（企业管理员）/ contractor（承包商管理员）
+    """
+    await lock_admin_scope(session, scope, company_id)
+    query = select(func.count()).select_from(UserDB).where(
+        *_approved_admin_conditions(scope, company_id),
+        UserDB.user_id != exclude_user_id,
+    )
+    result = await session.exec(query)
+    return result.scalar_one()
@@ -1,24 +1,101 @@
+import asyncio
 from typing import Any, AsyncGenerator
 
 from sqlmodel.ext.asyncio.session import AsyncSession
 from contextlib import asynccontextmanager
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from fastapi import HTTPException
 from config import settings
+from core.metrics import InstrumentedAsyncQueuePool
+from db.instrumentation import install_query_hooks
 
 
-def create_engine() ->AsyncEngine:
+def create_engine(database_url: str = None) ->AsyncEngine:
+    """
+    创建数据库引擎
+
+    连接池大小和 asyncpg 连接参数均来自 Settings，可通过环境变量调整
+    """
     engine = create_async_engine(
-        settings.database_url,
+        database_url or settings.database_url,
         echo=settings.debug,  # 显示SQL语句
-        pool_size=10,
-        max_overflow=20,
-        pool_timeout=30,
-        pool_recycle=1800,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        poolclass=InstrumentedAsyncQueuePool,  # 记录取连接等待时间
+        connect_args=get_asyncpg_connect_args(),
     )
+    install_query_hooks(engine)  # 慢查询日志和请求级查询统计
 
     return engine
 
+
+def get_asyncpg_connect_args() -> dict:
+    """asyncpg 连接参数（语句缓存、超时、服务端会话参数）"""
+    server_settings = {
+        "application_name": settings.db_application_name,
+        "jit": "on" if settings.db_jit else "off",
+    }
+    if settings.db_statement_timeout_ms > 0:
+        server_settings["statement_timeout"] = str(settings.db_statement_timeout_ms)
+
+    return {
+        "statement_cache_size": settings.db_statement_cache_size,
+        # SQLAlchemy asyncpg 方言自身的预编译语句缓存，与 asyncpg 保持一致
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+        "command_timeout": settings.db_command_timeout,
+        "timeout": settings.db_connect_timeout,
+        "server_settings": server_settings,
+    }
+
+
+async def warm_up_pool(engine: AsyncEngine, size: int) -> int:
+    """
+    预热连接池：并发建立 size 个连接后全部归还
+
+    在 lifespan 启动阶段调用，避免部署后的第一批请求承担建连耗时。
+    返回成功建立的连接数。
+    """
+    size = min(size, settings.db_pool_size)
+    if size <= 0:
+        return 0
+
+    async def _open_one():
+        conn = await engine.connect()
+        try:
+            await conn.execute(text("SELECT 1"))
+        except Exception:
+            await conn.close()
+            raise
+        return conn
+
+    results = await asyncio.gather(*[_open_one() for _ in range(size)], return_exceptions=True)
+    opened = 0
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"⚠️ 连接池预热失败: {result}")
+            continue
+        await result.close()  # 归还到连接池
+        opened += 1
+    return opened
+
+
+@asynccontextmanager
+async def autocommit_connection(engine: AsyncEngine) -> AsyncGenerator[Any, Any]:
+    """
+    自动提交连接，用于单条写入语句
+
+    单条语句本身是原子的，不需要显式事务，省去 BEGIN / COMMIT 两次往返；
+    隔离级别在连接归还连接池时由 SQLAlchemy 自动恢复
+    """
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        yield conn
+
+
 class SessionCreatError(Exception):
     def __init__(self, message: str = "Session creation failed") -> None:
         self.message = f"Session creation failed: {message}"
@@ -36,3 +113,29 @@ async def get_session(engine) -> AsyncGenerator[AsyncSession, Any]:
         except Exception as e:
             await session.rollback()
             raise SessionCreatError(str(e))
+
+
+@asynccontextmanager
+async def session_scope(bind) -> AsyncGenerator[AsyncSession, Any]:
+    """
+    兼容 engine 和请求级 session 的会话上下文
+
+    - 传入 AsyncSession（来自 routes.dependencies.get_db_session）时直接复用，不负责关闭和回滚
+    - 传入 engine 时与 get_session 相同，新建会话并在退出时关闭
+    """
+    if isinstance(bind, AsyncSession):
+        yield bind
+        return
+    async with get_session(bind) as session:
+        yield session
+
+
+async def release_connection(session: AsyncSession) -> None:
+    """
+    提交当前事务并把连接归还连接池
+
+    请求级会话使用 expire_on_commit=False，提交后已加载的对象仍可读取；
+    下一次查询时会话会重新从连接池取连接。在耗时的非数据库操作（如 bcrypt）之前调用。
+    """
+    if session.in_transaction():
+        await session.commit()
@@ -0,0 +1,44 @@
+"""
+数据库唯一约束
+Unique constraint names and IntegrityError helpers
+
+注册、入驻等接口不再逐个 SELECT 检查重复，而是直接 INSERT，
+由唯一索引保证并发安全；违反约束时根据约束名映射回原来的提示信息。
+约束定义见 db/create_tables.sql 和 db/migrate_registration_uniqueness.sql
+"""
+import re
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+
+# users 表
+USERS_USERNAME = "users_username_key"  # 建表时 username 的 UNIQUE 约束
+USERS_PHONE = "uq_users_phone_active"  # 未删除用户的手机号唯一
+USERS_EMAIL = "uq_users_email_active"  # 未删除用户的邮箱唯一
+
+# enterprise_info 表（未删除且未注销的企业）
+ENTERPRISE_COMPANY_NAME = "uq_enterprise_company_name_active"
+ENTERPRISE_LICENSE_NUMBER = "uq_enterprise_license_number_active"
+
+# contractor_info 表（未删除且未注销的承包商）
+CONTRACTOR_COMPANY_NAME = "uq_contractor_info_company_name_active"
+CONTRACTOR_LICENSE_NUMBER = "uq_contractor_info_license_number_active"
+
+_CONSTRAINT_IN_MESSAGE = re.compile(r'unique constraint "([^"]+)"')
+
+
+def violated_constraint(exc: IntegrityError) -> Optional[str]:
+    """
+    获取违反的约束名
+
+    asyncpg 的异常带有 constraint_name 属性，SQLAlchemy 将其包装在 exc.orig.__cause__ 中；
+    取不到时从错误信息中解析
+    """
+    orig = getattr(exc, "orig", None)
+    for candidate in (orig, getattr(orig, "__cause__", None)):
+        name = getattr(candidate, "constraint_name", None)
+        if name:
+            return name
+    match = _CONSTRAINT_IN_MESSAGE.search(str(exc))
+    return match.group(1) if match else None
@@ -13,6 +13,9 @@
 -- 连接到数据库
 \c ehs;
 
+-- 三元组模糊搜索（公司名称、用户名等的 GIN 索引）
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ============================================
 -- 用户相关表
 -- ============================================
@@ -37,7 +40,11 @@ CREATE TABLE IF NOT EXISTS users (
     role_level INTEGER,
     user_status INTEGER,
     work_type VARCHAR(100) NOT NULL DEFAULT '',
+    name_pinyin TEXT,
     is_deleted BOOLEAN NOT NULL DEFAULT false,
+    token_version INTEGER NOT NULL DEFAULT 0,
+    claims_version INTEGER NOT NULL DEFAULT 0,
+    token_changed_at TIMESTAMPTZ,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
@@ -77,6 +84,7 @@ CREATE TABLE IF NOT EXISTS enterprise_info (
     candidate_contractor_ids JSONB NOT NULL DEFAULT '[]'::jsonb,
     contractor_detail_info JSONB NOT NULL DEFAULT '{}'::jsonb,
     modification_log JSONB NOT NULL DEFAULT '[]'::jsonb,
+    name_pinyin TEXT,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_parent_enterprise FOREIGN KEY (parent_enterprise_id) REFERENCES enterprise_info(enterprise_id) ON DELETE SET NULL
@@ -107,6 +115,7 @@ CREATE TABLE IF NOT EXISTS contractor_info (
     active_enterprise_detail JSONB NOT NULL DEFAULT '{}'::jsonb,
     cooperation_detail_log JSONB NOT NULL DEFAULT '[]'::jsonb,
     modification_log JSONB NOT NULL DEFAULT '[]'::jsonb,
+    name_pinyin TEXT,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
@@ -135,6 +144,23 @@ CREATE TABLE IF NOT EXISTS contractor_project (
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 企业与承包商之间的项目数（触发器维护）
+CREATE TABLE IF NOT EXISTS contractor_project_stats (
+    enterprise_id INTEGER NOT NULL,
+    contractor_id INTEGER NOT NULL,
+    project_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (enterprise_id, contractor_id)
+);
+
+-- 仪表盘计数（触发器维护，应用定期对账，见 db/dashboard.py）
+CREATE TABLE IF NOT EXISTS dashboard_stats (
+    metric VARCHAR(50) NOT NULL,
+    dimension VARCHAR(50) NOT NULL DEFAULT '',
+    enterprise_id INTEGER NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (enterprise_id, metric, dimension)
+);
+
 -- ============================================
 -- 作业票表
 -- ============================================
@@ -159,6 +185,7 @@ CREATE TABLE IF NOT EXISTS ticket (
     temp_power_id INTEGER,
     cross_work_group_id VARCHAR(50),
     signature VARCHAR(255),
+    stats_enterprise_id INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_ticket_applicant FOREIGN KEY (applicant) REFERENCES users(user_id) ON DELETE CASCADE,
@@ -166,6 +193,33 @@ CREATE TABLE IF NOT EXISTS ticket (
     CONSTRAINT fk_ticket_custodian FOREIGN KEY (custodians) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
+-- 作业票日统计（触发器维护，见 db/ticket_rollup.py）
+CREATE TABLE IF NOT EXISTS ticket_daily_stats (
+    enterprise_id INTEGER NOT NULL DEFAULT 0,
+    day DATE NOT NULL,
+    area_id INTEGER NOT NULL DEFAULT 0,
+    hot_work INTEGER NOT NULL,
+    work_height_level INTEGER NOT NULL,
+    ticket_count INTEGER NOT NULL DEFAULT 0,
+    danger_counts INTEGER[] NOT NULL DEFAULT array_fill(0, ARRAY[32]),
+    PRIMARY KEY (enterprise_id, day, area_id, hot_work, work_height_level)
+);
+
+-- 已撤销（登出、轮换）的令牌，过期后由应用删除（见 core/tokens.py）
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti_hash BYTEA PRIMARY KEY,
+    expires_at TIMESTAMPTZ NOT NULL,
+    is_refresh BOOLEAN NOT NULL DEFAULT FALSE,
+    grace_until TIMESTAMPTZ
+);
+
+-- 认证接口限流令牌桶（UNLOGGED，崩溃后清空，见 core/rate_limit.py）
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    key VARCHAR(255) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
 -- ============================================
 -- 外键约束
 -- ============================================
@@ -177,6 +231,20 @@ CREATE TABLE IF NOT EXISTS ticket (
 -- 用户表索引
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_user_type ON users(user_type);
+-- 企业/承包商管理员（列表页批量查询管理员）
+CREATE INDEX IF NOT EXISTS idx_users_enterprise_staff_admin ON users(enterprise_staff_id, user_type, role_level);
+CREATE INDEX IF NOT EXISTS idx_users_contractor_staff_admin ON users(contractor_staff_id, user_type, role_level);
+-- 未删除用户的手机号、邮箱唯一（注册时由唯一索引检查重复，见 db/constraints.py）
+CREATE UNIQUE INDEX IF NOT EXISTS uq_users_phone_active ON users(phone) WHERE is_deleted = false AND phone <> '';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_users_email_active ON users(email) WHERE is_deleted = false AND email <> '';
+-- 用户名、姓名模糊搜索（见 db/search.py）
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm ON users USING GIN (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_name_str_trgm ON users USING GIN (name_str gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_relay_name_trgm ON users USING GIN (relay_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_name_pinyin_trgm ON users USING GIN (name_pinyin gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_name_pinyin_pending ON users(user_id) WHERE name_pinyin IS NULL AND name_str IS NOT NULL;
+-- 启动时加载近期的令牌计数变化
+CREATE INDEX IF NOT EXISTS idx_users_token_changed_at ON users(token_changed_at) WHERE token_changed_at IS NOT NULL;
 
 -- 企业信息表索引
 CREATE INDEX IF NOT EXISTS idx_enterprise_company_name ON enterprise_info(company_name);
@@ -187,6 +255,19 @@ CREATE INDEX IF NOT EXISTS idx_enterprise_subsidiary_ids ON enterprise_info USIN
 CREATE INDEX IF NOT EXISTS idx_enterprise_allowed_contractor_ids ON enterprise_info USING GIN(allowed_contractor_ids);
 CREATE INDEX IF NOT EXISTS idx_enterprise_candidate_contractor_ids ON enterprise_info USING GIN(candidate_contractor_ids);
 CREATE INDEX IF NOT EXISTS idx_enterprise_contractor_detail_info ON enterprise_info USING GIN(contractor_detail_info);
+-- 未删除且未注销的企业名称、营业执照编号唯一
+CREATE UNIQUE INDEX IF NOT EXISTS uq_enterprise_company_name_active ON enterprise_info(company_name) WHERE is_deleted = false AND business_status <> '已注销';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_enterprise_license_number_active ON enterprise_info(license_number) WHERE is_deleted = false AND business_status <> '已注销';
+-- 企业名称、营业执照编号模糊搜索
+CREATE INDEX IF NOT EXISTS idx_enterprise_company_name_trgm ON enterprise_info USING GIN (company_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_enterprise_license_number_trgm ON enterprise_info USING GIN (license_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_enterprise_name_pinyin_trgm ON enterprise_info USING GIN (name_pinyin gin_trgm_ops);
+-- 输入提示按 <<-> 距离有序取候选行（KNN），GIN 索引不支持有序扫描
+CREATE INDEX IF NOT EXISTS idx_enterprise_company_name_gist ON enterprise_info USING GIST (company_name gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_enterprise_name_pinyin_gist ON enterprise_info USING GIST (name_pinyin gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_enterprise_name_pinyin_pending ON enterprise_info(enterprise_id) WHERE name_pinyin IS NULL;
+-- 企业选择器（按名称分页的续存企业）
+CREATE INDEX IF NOT EXISTS idx_enterprise_picker ON enterprise_info(company_name, enterprise_id) WHERE is_deleted = false AND business_status = '续存';
 
 -- 承包商信息表索引
 CREATE INDEX IF NOT EXISTS idx_contractor_info_company_name ON contractor_info(company_name);
@@ -196,25 +277,94 @@ CREATE INDEX IF NOT EXISTS idx_contractor_info_active_enterprise_ids ON contract
 CREATE INDEX IF NOT EXISTS idx_contractor_info_inactive_enterprise_ids ON contractor_info USING GIN(inactive_enterprise_ids);
 CREATE INDEX IF NOT EXISTS idx_contractor_info_pending_allowed_ids ON contractor_info USING GIN(pending_allowed_ids);
 CREATE INDEX IF NOT EXISTS idx_contractor_info_active_enterprise_detail ON contractor_info USING GIN(active_enterprise_detail);
+-- 未删除且未注销的承包商公司名称、营业执照编号唯一
+CREATE UNIQUE INDEX IF NOT EXISTS uq_contractor_info_company_name_active ON contractor_info(company_name) WHERE is_deleted = false AND business_status <> '已注销';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_contractor_info_license_number_active ON contractor_info(license_number) WHERE is_deleted = false AND business_status <> '已注销';
+-- 承包商名称、营业执照编号模糊搜索
+CREATE INDEX IF NOT EXISTS idx_contractor_info_company_name_trgm ON contractor_info USING GIN (company_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_contractor_info_license_number_trgm ON contractor_info USING GIN (license_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_contractor_info_name_pinyin_trgm ON contractor_info USING GIN (name_pinyin gin_trgm_ops);
+-- 输入提示按 <<-> 距离有序取候选行（KNN），GIN 索引不支持有序扫描
+CREATE INDEX IF NOT EXISTS idx_contractor_info_company_name_gist ON contractor_info USING GIST (company_name gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_contractor_info_name_pinyin_gist ON contractor_info USING GIST (name_pinyin gist_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_contractor_info_name_pinyin_pending ON contractor_info(contractor_id) WHERE name_pinyin IS NULL;
 
 
 -- 项目表索引
 CREATE INDEX IF NOT EXISTS idx_contractor_project_contractor_id ON contractor_project(contractor_id);
-CREATE INDEX IF NOT EXISTS idx_contractor_project_enterprise_id ON contractor_project(enterprise_id);
+-- 按企业统计各承包商的项目数（GROUP BY contractor_id 只扫描索引）
+CREATE INDEX IF NOT EXISTS idx_contractor_project_enterprise_contractor ON contractor_project(enterprise_id, contractor_id);
 
 -- 作业票表索引
 CREATE INDEX IF NOT EXISTS idx_ticket_apply_date ON ticket(apply_date);
 CREATE INDEX IF NOT EXISTS idx_ticket_applicant ON ticket(applicant);
 CREATE INDEX IF NOT EXISTS idx_ticket_worker ON ticket(worker);
+-- 作业票日统计：系统管理员不按企业筛选时按日期范围查询
+CREATE INDEX IF NOT EXISTS idx_ticket_daily_stats_day ON ticket_daily_stats(day);
+-- 已撤销令牌：加载未过期的记录、清理过期记录
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+-- 限流令牌桶：清理闲置的桶
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_updated_at ON rate_limit_buckets(updated_at);
 
 -- ============================================
 -- 触发器
 -- ============================================
 
+-- 用户表插入时自动填充 sys_only_id（未指定时取 user_id）
+CREATE OR REPLACE FUNCTION set_users_sys_only_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.sys_only_id = COALESCE(NEW.sys_only_id, NEW.user_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_set_users_sys_only_id
+    BEFORE INSERT ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION set_users_sys_only_id();
+
+-- 用户表更新时维护令牌计数，变化时通知所有 worker（见 core/tokens.py）
+CREATE OR REPLACE FUNCTION bump_users_token_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.password_hash IS DISTINCT FROM OLD.password_hash
+        OR NEW.is_deleted IS DISTINCT FROM OLD.is_deleted
+        OR NEW.username IS DISTINCT FROM OLD.username
+        OR NEW.user_type IS DISTINCT FROM OLD.user_type THEN
+        NEW.token_version := GREATEST(NEW.token_version, OLD.token_version + 1);
+    END IF;
+    IF NEW.role_level IS DISTINCT FROM OLD.role_level
+        OR NEW.user_status IS DISTINCT FROM OLD.user_status
+        OR NEW.role_type IS DISTINCT FROM OLD.role_type
+        OR NEW.enterprise_staff_id IS DISTINCT FROM OLD.enterprise_staff_id
+        OR NEW.contractor_staff_id IS DISTINCT FROM OLD.contractor_staff_id THEN
+        NEW.claims_version := GREATEST(NEW.claims_version, OLD.claims_version + 1);
+    END IF;
+    IF NEW.token_version <> OLD.token_version OR NEW.claims_version <> OLD.claims_version THEN
+        NEW.token_changed_at := clock_timestamp();
+        PERFORM pg_notify('ehs_token_versions', json_build_object(
+            'user_id', NEW.user_id, 'token_version', NEW.token_version, 'claims_version', NEW.claims_version
+        )::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_bump_users_token_version
+    BEFORE UPDATE ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_users_token_version();
+
 -- 企业信息表更新时间触发器
 CREATE OR REPLACE FUNCTION update_enterprise_info_updated_at()
 RETURNS TRIGGER AS $$
 BEGIN
+    -- 只有 name_pinyin 变化（后台生成拼音）时保留原更新时间
+    IF NEW.name_pinyin IS DISTINCT FROM OLD.name_pinyin
+        AND (to_jsonb(NEW) - 'name_pinyin'::text) = (to_jsonb(OLD) - 'name_pinyin'::text) THEN
+        RETURN NEW;
+    END IF;
     NEW.updated_at = CURRENT_TIMESTAMP;
     RETURN NEW;
 END;
@@ -229,6 +379,11 @@ CREATE TRIGGER trigger_update_enterprise_info_updated_at
 CREATE OR REPLACE FUNCTION update_contractor_info_updated_at()
 RETURNS TRIGGER AS $$
 BEGIN
+    -- 只有 name_pinyin 变化（后台生成拼音）时保留原更新时间
+    IF NEW.name_pinyin IS DISTINCT FROM OLD.name_pinyin
+        AND (to_jsonb(NEW) - 'name_pinyin'::text) = (to_jsonb(OLD) - 'name_pinyin'::text) THEN
+        RETURN NEW;
+    END IF;
     NEW.updated_at = CURRENT_TIMESTAMP;
     RETURN NEW;
 END;
@@ -239,6 +394,368 @@ CREATE TRIGGER trigger_update_contractor_info_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_contractor_info_updated_at();
 
+-- 名称修改时清空拼音，由应用重新生成（见 db/search.py）
+CREATE OR REPLACE FUNCTION reset_company_name_pinyin()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.company_name IS DISTINCT FROM OLD.company_name THEN
+        NEW.name_pinyin = NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reset_users_name_pinyin()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.name_str IS DISTINCT FROM OLD.name_str THEN
+        NEW.name_pinyin = NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_reset_enterprise_name_pinyin
+    BEFORE UPDATE OF company_name ON enterprise_info
+    FOR EACH ROW
+    EXECUTE FUNCTION reset_company_name_pinyin();
+
+CREATE TRIGGER trigger_reset_contractor_name_pinyin
+    BEFORE UPDATE OF company_name ON contractor_info
+    FOR EACH ROW
+    EXECUTE FUNCTION reset_company_name_pinyin();
+
+CREATE TRIGGER trigger_reset_users_name_pinyin
+    BEFORE UPDATE OF name_str ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION reset_users_name_pinyin();
+
+-- 项目增删改时维护 contractor_project_stats
+CREATE OR REPLACE FUNCTION maintain_contractor_project_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE contractor_project_stats SET project_count = project_count - 1
+        WHERE enterprise_id = OLD.enterprise_id AND contractor_id = OLD.contractor_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO contractor_project_stats (enterprise_id, contractor_id, project_count)
+        VALUES (NEW.enterprise_id, NEW.contractor_id, 1)
+        ON CONFLICT (enterprise_id, contractor_id)
+        DO UPDATE SET project_count = contractor_project_stats.project_count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_maintain_contractor_project_stats
+    AFTER INSERT OR DELETE OR UPDATE OF enterprise_id, contractor_id ON contractor_project
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_contractor_project_stats();
+
+-- 仪表盘计数：users、enterprise_info、contractor_info、ticket 写入时增量维护 dashboard_stats
+CREATE OR REPLACE FUNCTION bump_dashboard_stat(p_metric VARCHAR, p_dimension VARCHAR, p_enterprise_id INTEGER, p_delta BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO dashboard_stats (metric, dimension, enterprise_id, value)
+    VALUES (p_metric, COALESCE(p_dimension, ''), p_enterprise_id, p_delta)
+    ON CONFLICT (enterprise_id, metric, dimension)
+    DO UPDATE SET value = dashboard_stats.value + EXCLUDED.value;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 待审核人员
+CREATE OR REPLACE FUNCTION maintain_dashboard_users()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.user_status IS NOT DISTINCT FROM NEW.user_status
+        AND OLD.user_type = NEW.user_type
+        AND OLD.enterprise_staff_id IS NOT DISTINCT FROM NEW.enterprise_staff_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.user_status = 2 THEN
+        PERFORM bump_dashboard_stat('pending_users', OLD.user_type, 0, -1);
+        IF OLD.user_type = 'enterprise' AND OLD.enterprise_staff_id IS NOT NULL THEN
+            PERFORM bump_dashboard_stat('pending_users', OLD.user_type, OLD.enterprise_staff_id, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.user_status = 2 THEN
+        PERFORM bump_dashboard_stat('pending_users', NEW.user_type, 0, 1);
+        IF NEW.user_type = 'enterprise' AND NEW.enterprise_staff_id IS NOT NULL THEN
+            PERFORM bump_dashboard_stat('pending_users', NEW.user_type, NEW.enterprise_staff_id, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 企业经营状态、合作承包商数
+CREATE OR REPLACE FUNCTION maintain_dashboard_enterprises()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_cooperations BIGINT := 0;
+    new_cooperations BIGINT := 0;
+    old_counted BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_deleted;
+    new_counted BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_deleted;
+BEGIN
+    IF old_counted THEN
+        old_cooperations := jsonb_array_length(OLD.allowed_contractor_ids);
+    END IF;
+    IF new_counted THEN
+        new_cooperations := jsonb_array_length(NEW.allowed_contractor_ids);
+    END IF;
+
+    IF NOT (old_counted AND new_counted AND OLD.business_status = NEW.business_status) THEN
+        IF old_counted THEN
+            PERFORM bump_dashboard_stat('enterprises', OLD.business_status, 0, -1);
+        END IF;
+        IF new_counted THEN
+            PERFORM bump_dashboard_stat('enterprises', NEW.business_status, 0, 1);
+        END IF;
+    END IF;
+
+    IF new_cooperations <> old_cooperations THEN
+        PERFORM bump_dashboard_stat('active_cooperations', '', 0, new_cooperations - old_cooperations);
+        PERFORM bump_dashboard_stat(
+            'active_cooperations', '', COALESCE(NEW.enterprise_id, OLD.enterprise_id), new_cooperations - old_cooperations
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 承包商经营状态
+CREATE OR REPLACE FUNCTION maintain_dashboard_contractors()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_counted BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_deleted;
+    new_counted BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_deleted;
+BEGIN
+    IF old_counted AND new_counted AND OLD.business_status = NEW.business_status THEN
+        RETURN NULL;
+    END IF;
+    IF old_counted THEN
+        PERFORM bump_dashboard_stat('contractors', OLD.business_status, 0, -1);
+    END IF;
+    IF new_counted THEN
+        PERFORM bump_dashboard_stat('contractors', NEW.business_status, 0, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 作业票动火等级（按申请人当前所属企业计数，申请人换企业造成的偏差由对账修正）
+CREATE OR REPLACE FUNCTION maintain_dashboard_tickets()
+RETURNS TRIGGER AS $$
+DECLARE
+    applicant_enterprise_id INTEGER;
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.hot_work = NEW.hot_work AND OLD.applicant = NEW.applicant THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_dashboard_stat('tickets', OLD.hot_work::VARCHAR, 0, -1);
+        SELECT enterprise_staff_id INTO applicant_enterprise_id FROM users WHERE user_id = OLD.applicant;
+        IF applicant_enterprise_id IS NOT NULL THEN
+            PERFORM bump_dashboard_stat('tickets', OLD.hot_work::VARCHAR, applicant_enterprise_id, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_dashboard_stat('tickets', NEW.hot_work::VARCHAR, 0, 1);
+        SELECT enterprise_staff_id INTO applicant_enterprise_id FROM users WHERE user_id = NEW.applicant;
+        IF applicant_enterprise_id IS NOT NULL THEN
+            PERFORM bump_dashboard_stat('tickets', NEW.hot_work::VARCHAR, applicant_enterprise_id, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_maintain_dashboard_users
+    AFTER INSERT OR DELETE OR UPDATE OF user_status, user_type, enterprise_staff_id ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_dashboard_users();
+
+CREATE TRIGGER trigger_maintain_dashboard_enterprises
+    AFTER INSERT OR DELETE OR UPDATE OF business_status, is_deleted, allowed_contractor_ids ON enterprise_info
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_dashboard_enterprises();
+
+CREATE TRIGGER trigger_maintain_dashboard_contractors
+    AFTER INSERT OR DELETE OR UPDATE OF business_status, is_deleted ON contractor_info
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_dashboard_contractors();
+
+CREATE TRIGGER trigger_maintain_dashboard_tickets
+    AFTER INSERT OR DELETE OR UPDATE OF hot_work, applicant ON ticket
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_dashboard_tickets();
+
+-- 作业票增删改时维护 ticket_daily_stats
+-- danger 位掩码展开为 32 个计数（每位为 1 时计 p_sign）
+CREATE OR REPLACE FUNCTION ticket_danger_bits(p_danger INTEGER, p_sign INTEGER)
+RETURNS INTEGER[] AS $$
+    SELECT array_agg(CASE WHEN (p_danger >> (i - 1)) & 1 = 1 THEN p_sign ELSE 0 END ORDER BY i)
+    FROM generate_series(1, 32) AS i
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 两个计数数组逐位相加
+CREATE OR REPLACE FUNCTION add_int_arrays(a INTEGER[], b INTEGER[])
+RETURNS INTEGER[] AS $$
+    SELECT array_agg(COALESCE(x, 0) + COALESCE(y, 0) ORDER BY n)
+    FROM unnest(a, b) WITH ORDINALITY AS t(x, y, n)
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 作业票统计归属的企业：申请（或更换申请人）时申请人所属的企业，保存在 ticket.stats_enterprise_id；
+-- 之后申请人更换企业不改变归属，删改作业票时从原来的统计行中减去
+CREATE OR REPLACE FUNCTION set_ticket_stats_enterprise()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.applicant IS DISTINCT FROM OLD.applicant THEN
+        NEW.stats_enterprise_id := COALESCE(
+            (SELECT enterprise_staff_id FROM users WHERE user_id = NEW.applicant), 0
+        );
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_ticket_daily_stats(
+    p_enterprise_id INTEGER, p_day DATE, p_area_id INTEGER, p_hot_work INTEGER, p_work_height_level INTEGER,
+    p_danger INTEGER, p_sign INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO ticket_daily_stats (
+        enterprise_id, day, area_id, hot_work, work_height_level, ticket_count, danger_counts
+    )
+    VALUES (
+        p_enterprise_id, p_day, COALESCE(p_area_id, 0), p_hot_work, p_work_height_level,
+        p_sign, ticket_danger_bits(p_danger, p_sign)
+    )
+    ON CONFLICT (enterprise_id, day, area_id, hot_work, work_height_level)
+    DO UPDATE SET
+        ticket_count = ticket_daily_stats.ticket_count + EXCLUDED.ticket_count,
+        danger_counts = add_int_arrays(ticket_daily_stats.danger_counts, EXCLUDED.danger_counts);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_ticket_daily_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.stats_enterprise_id = NEW.stats_enterprise_id
+        AND OLD.apply_date = NEW.apply_date
+        AND OLD.area_id IS NOT DISTINCT FROM NEW.area_id
+        AND OLD.hot_work = NEW.hot_work
+        AND OLD.work_height_level = NEW.work_height_level
+        AND OLD.danger = NEW.danger THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_ticket_daily_stats(
+            OLD.stats_enterprise_id, OLD.apply_date, OLD.area_id, OLD.hot_work, OLD.work_height_level, OLD.danger, -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_ticket_daily_stats(
+            NEW.stats_enterprise_id, NEW.apply_date, NEW.area_id, NEW.hot_work, NEW.work_height_level, NEW.danger, 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_set_ticket_stats_enterprise
+    BEFORE INSERT OR UPDATE OF applicant ON ticket
+    FOR EACH ROW
+    EXECUTE FUNCTION set_ticket_stats_enterprise();
+
+-- 列触发器不会因 BEFORE 触发器改写 stats_enterprise_id 而触发，更换申请人时靠 applicant 列触发
+CREATE TRIGGER trigger_maintain_ticket_daily_stats
+    AFTER INSERT OR DELETE OR UPDATE OF applicant, stats_enterprise_id, apply_date, area_id, hot_work, work_height_level, danger ON ticket
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_ticket_daily_stats();
+
+-- 限流：补充一次请求涉及的所有桶，全部有令牌时各取一个；否则都不扣减，返回令牌不足的桶及需要等待的秒数
+CREATE OR REPLACE FUNCTION rate_limit_take(
+    p_keys VARCHAR[], p_capacities DOUBLE PRECISION[], p_refill_rates DOUBLE PRECISION[]
+) RETURNS TABLE (bucket_key VARCHAR, retry_after DOUBLE PRECISION) AS $$
+DECLARE
+    now_ts TIMESTAMPTZ := clock_timestamp();
+    blocked BOOLEAN := FALSE;
+    bucket RECORD;
+BEGIN
+    -- 新的桶按满容量创建；按键的顺序插入和加行锁，并发请求共享同一个键时不会互相死锁
+    INSERT INTO rate_limit_buckets (key, tokens, updated_at)
+    SELECT t.k, t.c, now_ts FROM unnest(p_keys, p_capacities) AS t(k, c) ORDER BY t.k
+    ON CONFLICT (key) DO NOTHING;
+
+    FOR bucket IN
+        SELECT b.key AS k, t.r AS rate,
+               LEAST(t.c, b.tokens + GREATEST(EXTRACT(EPOCH FROM now_ts - b.updated_at), 0) * t.r) AS available
+        FROM rate_limit_buckets b
+        JOIN unnest(p_keys, p_capacities, p_refill_rates) AS t(k, c, r) ON t.k = b.key
+        ORDER BY b.key
+        FOR UPDATE OF b
+    LOOP
+        IF bucket.available < 1 THEN
+            blocked := TRUE;
+            bucket_key := bucket.k;
+            retry_after := (1 - bucket.available) / bucket.rate;
+            RETURN NEXT;
+        END IF;
+    END LOOP;
+
+    -- 任一桶令牌不足时整个请求被拒绝，所有桶都不扣减
+    IF NOT blocked THEN
+        UPDATE rate_limit_buckets b SET
+            tokens = LEAST(t.c, b.tokens + GREATEST(EXTRACT(EPOCH FROM now_ts - b.updated_at), 0) * t.r) - 1,
+            updated_at = now_ts
+        FROM unnest(p_keys, p_capacities, p_refill_rates) AS t(k, c, r)
+        WHERE b.key = t.k;
+    END IF;
+    RETURN;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 仪表盘计数的实时统计（回填、对账用）
+CREATE OR REPLACE VIEW dashboard_stats_actual AS
+SELECT 'pending_users'::VARCHAR AS metric, user_type::VARCHAR AS dimension, 0 AS enterprise_id, count(*) AS value
+FROM users WHERE user_status = 2
+GROUP BY user_type
+UNION ALL
+SELECT 'pending_users', 'enterprise', enterprise_staff_id, count(*)
+FROM users WHERE user_status = 2 AND user_type = 'enterprise' AND enterprise_staff_id IS NOT NULL
+GROUP BY enterprise_staff_id
+UNION ALL
+SELECT 'enterprises', business_status, 0, count(*)
+FROM enterprise_info WHERE is_deleted = false
+GROUP BY business_status
+UNION ALL
+SELECT 'contractors', business_status, 0, count(*)
+FROM contractor_info WHERE is_deleted = false
+GROUP BY business_status
+UNION ALL
+SELECT 'active_cooperations', '', 0, COALESCE(sum(jsonb_array_length(allowed_contractor_ids)), 0)
+FROM enterprise_info WHERE is_deleted = false
+UNION ALL
+SELECT 'active_cooperations', '', enterprise_id, jsonb_array_length(allowed_contractor_ids)
+FROM enterprise_info WHERE is_deleted = false AND jsonb_array_length(allowed_contractor_ids) > 0
+UNION ALL
+SELECT 'tickets', hot_work::VARCHAR, 0, count(*)
+FROM ticket
+GROUP BY hot_work
+UNION ALL
+SELECT 'tickets', t.hot_work::VARCHAR, u.enterprise_staff_id, count(*)
+FROM ticket t JOIN users u ON u.user_id = t.applicant
+WHERE u.enterprise_staff_id IS NOT NULL
+GROUP BY t.hot_work, u.enterprise_staff_id;
+
 -- ============================================
 -- 表注释和字段注释
 -- ============================================
@@ -257,13 +774,16 @@ COMMENT ON COLUMN users.user_level IS '用户等级：-1未通过审核，0系
 COMMENT ON COLUMN users.audit_status IS '审核状态：1还未提交审核，2审核通过，3待审核，4审核不通过';
 COMMENT ON COLUMN users.temp_token IS '临时令牌';
 COMMENT ON COLUMN users.relay_name IS '中继名称';
-COMMENT ON COLUMN users.sys_only_id IS '系统唯一ID，唯一，不可重复';
+COMMENT ON COLUMN users.sys_only_id IS '系统唯一ID，唯一，不可重复，插入时未指定则由触发器设置为user_id';
 COMMENT ON COLUMN users.name_str IS '姓名';
 COMMENT ON COLUMN users.role_type IS '角色类型';
 COMMENT ON COLUMN users.role_level IS '角色等级';
 COMMENT ON COLUMN users.user_status IS '用户状态';
 COMMENT ON COLUMN users.work_type IS '工种，默认空字符串';
 COMMENT ON COLUMN users.is_deleted IS '假删除标记，false表示未删除，true表示已删除，默认false';
+COMMENT ON COLUMN users.token_version IS '令牌撤销计数，改密码、删除等变化时加一，刷新令牌和访问令牌随之失效';
+COMMENT ON COLUMN users.claims_version IS '令牌权限计数，角色、审核状态、所属企业/承包商变化时加一，访问令牌随之失效';
+COMMENT ON COLUMN users.token_changed_at IS '令牌计数最近一次变化的时间';
 COMMENT ON COLUMN users.created_at IS '创建时间，默认当前时间';
 COMMENT ON COLUMN users.updated_at IS '更新时间，默认当前时间';
 
@@ -324,6 +844,17 @@ COMMENT ON COLUMN contractor_project.leader_phone IS '负责人电话，不可
 COMMENT ON COLUMN contractor_project.created_at IS '创建时间，默认当前时间';
 COMMENT ON COLUMN contractor_project.updated_at IS '更新时间，默认当前时间';
 
+-- 承包商项目数表注释
+COMMENT ON TABLE contractor_project_stats IS '企业与承包商之间的项目数，由 contractor_project 上的触发器维护';
+COMMENT ON COLUMN contractor_project_stats.project_count IS '项目数';
+
+-- 仪表盘计数表注释
+COMMENT ON TABLE dashboard_stats IS '仪表盘计数，由触发器增量维护，应用定期按 dashboard_stats_actual 对账';
+COMMENT ON COLUMN dashboard_stats.metric IS '指标：pending_users、enterprises、contractors、active_cooperations、tickets';
+COMMENT ON COLUMN dashboard_stats.dimension IS '维度：用户类型、经营状态、动火等级，没有维度时为空字符串';
+COMMENT ON COLUMN dashboard_stats.enterprise_id IS '企业ID，0 表示全局';
+COMMENT ON COLUMN dashboard_stats.value IS '计数';
+
 -- 作业票表注释
 COMMENT ON TABLE ticket IS '作业票表';
 COMMENT ON COLUMN ticket.ticket_id IS '作业票ID，主键，自增';
@@ -344,9 +875,33 @@ COMMENT ON COLUMN ticket.confined_space_id IS '受限空间ID';
 COMMENT ON COLUMN ticket.temp_power_id IS '临时用电ID';
 COMMENT ON COLUMN ticket.cross_work_group_id IS '交叉作业组ID，字符串类型';
 COMMENT ON COLUMN ticket.signature IS '签名，字符串类型';
+COMMENT ON COLUMN ticket.stats_enterprise_id IS '统计归属企业ID：申请时申请人所属的企业，0 表示无企业，由触发器填写';
 COMMENT ON COLUMN ticket.created_at IS '创建时间，默认当前时间';
 COMMENT ON COLUMN ticket.updated_at IS '更新时间，默认当前时间';
 
+-- 作业票日统计表注释
+COMMENT ON TABLE ticket_daily_stats IS '作业票日统计，由 ticket 上的触发器增量维护，python -m db.ticket_rollup backfill 回填';
+COMMENT ON COLUMN ticket_daily_stats.enterprise_id IS '作业票统计归属企业ID（ticket.stats_enterprise_id），0 表示无企业';
+COMMENT ON COLUMN ticket_daily_stats.day IS '申请日期（ticket.apply_date）';
+COMMENT ON COLUMN ticket_daily_stats.area_id IS '区域ID，0 表示未指定';
+COMMENT ON COLUMN ticket_daily_stats.hot_work IS '动火等级';
+COMMENT ON COLUMN ticket_daily_stats.work_height_level IS '作业高度等级';
+COMMENT ON COLUMN ticket_daily_stats.ticket_count IS '作业票数';
+COMMENT ON COLUMN ticket_daily_stats.danger_counts IS '危险识别各位的作业票数，下标 n 对应 danger 第 n-1 位';
+
+-- 已撤销令牌表注释
+COMMENT ON TABLE revoked_tokens IS '已撤销（登出）的令牌，过期后由应用删除，见 core/tokens.py';
+COMMENT ON COLUMN revoked_tokens.jti_hash IS '令牌 jti 的 SHA-256 前 16 字节';
+COMMENT ON COLUMN revoked_tokens.expires_at IS '令牌的过期时间';
+COMMENT ON COLUMN revoked_tokens.is_refresh IS '是否为刷新令牌（刷新令牌不加载到内存，只在换取新令牌时查询）';
+COMMENT ON COLUMN revoked_tokens.grace_until IS '刷新令牌轮换后仍可再次使用的截止时间，登出撤销时为空';
+
+-- 限流令牌桶表注释
+COMMENT ON TABLE rate_limit_buckets IS '认证接口限流令牌桶（UNLOGGED），见 core/rate_limit.py';
+COMMENT ON COLUMN rate_limit_buckets.key IS '接口:ip:<IP> 或 接口:user:<用户名>';
+COMMENT ON COLUMN rate_limit_buckets.tokens IS '上次访问后剩余的令牌数';
+COMMENT ON COLUMN rate_limit_buckets.updated_at IS '上次访问时间';
+
 -- ============================================
 -- 完成
 -- ============================================
@@ -1,17 +1,18 @@
 from datetime import datetime
-from typing import List
-from sqlalchemy import select, func
+from typing import Dict, List
+from sqlalchemy import select, func, Integer
 # selectinload 已不再使用，因为enterprise_user和contractor_user表已删除
 
 from db.models import *
-from db.connection import get_session
+from db.connection import get_session, session_scope
 from api import model as api
 
 
 async def get_user(engine, username, user_type: str=None) -> User|None:
+    # engine 也可以传入请求级 AsyncSession，此时复用其连接
     # 不再加载已删除的enterprise_user和contractor_user关系
     statement = select(User).where(User.username == username)
-    async with get_session(engine) as session:
+    async with session_scope(engine) as session:
         try:
             result = await session.exec(statement)
             # 对于 SQLModel，使用 first() 获取第一个结果
@@ -155,6 +156,91 @@ async def create_project(engine, project: api.Project):
         await session.refresh(project_db)
     return project_db
 
+
+async def get_contractors_for_enterprise(engine, enterprise_id: int) -> List[ContractorInfo]:
+    """获取与企业合作的承包商（enterprise_info.allowed_contractor_ids 中未删除的承包商）"""
+    allowed_ids = select(
+        func.jsonb_array_elements_text(EnterpriseInfo.allowed_contractor_ids).cast(Integer)
+    ).where(EnterpriseInfo.enterprise_id == enterprise_id).scalar_subquery()
+    statement = select(ContractorInfo).where(
+        ContractorInfo.contractor_id.in_(allowed_ids),
+        ContractorInfo.is_deleted == False,
+    ).order_by(ContractorInfo.contractor_id)
+    async with session_scope(engine) as session:
+        result = await session.exec(statement)
+        return list(result.scalars().all())
+
+
+async def get_contractor_project_counts(
+    engine, enterprise_id: int, contractor_ids: List[int], use_counter: bool = False
+) -> Dict[int, int]:
+    """
+    批量获取企业与各承包商之间的项目数，返回 {承包商ID: 项目数}（没有项目的承包商不在结果中）
+
+    默认一次 GROUP BY 统计（走 contractor_project(enterprise_id, contractor_id) 索引）；
+    use_counter=True 时读取触发器维护的 contractor_project_stats
+    """
+    if not contractor_ids:
+        return {}
+    if use_counter:
+        statement = select(ContractorProjectStats.contractor_id, ContractorProjectStats.project_count).where(
+            ContractorProjectStats.enterprise_id == enterprise_id,
+            ContractorProjectStats.contractor_id.in_(contractor_ids),
+        )
+    else:
+        statement = select(ContractorProject.contractor_id, func.count()).where(
+            ContractorProject.enterprise_id == enterprise_id,
+            ContractorProject.contractor_id.in_(contractor_ids),
+        ).group_by(ContractorProject.contractor_id)
+    async with session_scope(engine) as session:
+        result = await session.exec(statement)
+        return {contractor_id: count for contractor_id, count in result.all()}
+
+
+# 管理员角色等级（兼容旧数据：role_level=0 也视为该公司的管理员）
+_COMPANY_ADMIN_ROLE_LEVELS = {"enterprise": (1, 0), "contractor": (3, 0)}
+
+
+async def get_company_admins(engine, company_type: str, company_ids: List[int]) -> Dict[int, List[dict]]:
+    """
+    批量获取企业/承包商的管理员，返回 {公司ID: [管理员]}（没有管理员的公司不在结果中）
+
+    一次 IN 查询取出整页公司的管理员，走 users(enterprise_staff_id/contractor_staff_id, user_type, role_level) 索引；
+    engine 也可以传入请求级 AsyncSession，此时复用其连接
+    """
+    if not company_ids:
+        return {}
+    company_column = User.enterprise_staff_id if company_type == "enterprise" else User.contractor_staff_id
+    statement = select(
+        company_column.label("company_id"),
+        User.user_id,
+        User.username,
+        User.name_str,
+        User.relay_name,
+        User.phone,
+        User.email,
+        User.user_status,
+    ).where(
+        company_column.in_(company_ids),
+        User.user_type == company_type,
+        User.role_level.in_(_COMPANY_ADMIN_ROLE_LEVELS[company_type]),
+    ).order_by(company_column, User.user_id)
+
+    admins: Dict[int, List[dict]] = {}
+    async with session_scope(engine) as session:
+        result = await session.exec(statement)
+        for row in result.all():
+            admins.setdefault(row.company_id, []).append({
+                "user_id": row.user_id,
+                "username": row.username,
+                "name": row.name_str or row.relay_name or row.username,
+                "phone": row.phone,
+                "email": row.email,
+                "user_status": row.user_status,
+            })
+    return admins
+
+
 # 使用示例
 async def main():
     from sqlalchemy.ext.asyncio import create_async_engine
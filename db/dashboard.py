@@ -0,0 +1,96 @@
+"""
+仪表盘统计
+Dashboard summary counters
+
+计数保存在 dashboard_stats 表（见 db/migrate_dashboard_stats.sql），由触发器在写入时增量维护，
+/dashboard/summary 只需按企业读取几十行：
+
+    stats = await get_dashboard_stats(engine, enterprise_id)  # 0 为全局
+    stats[("pending_users", "enterprise")]  # 计数
+
+触发器与业务写入在同一事务中，正常情况下计数准确；后台对账任务定期按 dashboard_stats_actual
+视图重新统计，以增量方式修正偏差（手工改库、申请人更换企业等触发器无法覆盖的情况），对账不锁表。
+"""
+import asyncio
+from typing import Dict, Tuple
+
+from sqlalchemy import text
+from sqlmodel import select
+
+from db.connection import session_scope
+from db.models import DashboardStat
+
+
+# 对账任务的 advisory lock 键，多个 worker 同一时间只有一个执行对账
+_RECONCILE_LOCK_KEY = 46001
+
+
+async def get_dashboard_stats(engine, enterprise_id: int = 0) -> Dict[Tuple[str, str], int]:
+    """读取某个企业（0 为全局）的所有计数，返回 {(指标, 维度): 计数}；engine 也可以传入请求级 AsyncSession"""
+    async with session_scope(engine) as session:
+        query = select(DashboardStat.metric, DashboardStat.dimension, DashboardStat.value).where(
+            DashboardStat.enterprise_id == enterprise_id
+        )
+        result = await session.exec(query)
+        return {(metric, dimension): value for metric, dimension, value in result.all()}
+
+
+async def reconcile_dashboard_stats(engine) -> int:
+    """
+    按原表重新统计并修正 dashboard_stats，返回修正的行数；其他 worker 正在对账时直接返回 0
+
+    不锁表：第一条语句在同一快照中比较 dashboard_stats_actual 与 dashboard_stats，得到每行的偏差
+    （实际值 - 计数）。触发器与业务写入在同一事务中，同一快照里两者只相差真正的偏差，
+    之后提交的写入由触发器照常累加。随后只把偏差加到有偏差的行上（value = value + 偏差），
+    不会覆盖对账期间其他事务的增量；只在这些行上短暂持有行锁，触发器写入不会因全表统计而等待
+    """
+    async with engine.begin() as conn:
+        locked = await conn.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _RECONCILE_LOCK_KEY})
+        if not locked:
+            return 0
+        drift = (await conn.execute(text("""
+            SELECT COALESCE(a.metric, s.metric), COALESCE(a.dimension, s.dimension),
+                   COALESCE(a.enterprise_id, s.enterprise_id), COALESCE(a.value, 0) - COALESCE(s.value, 0)
+            FROM dashboard_stats_actual a
+            FULL JOIN dashboard_stats s
+                ON s.enterprise_id = a.enterprise_id AND s.metric = a.metric AND s.dimension = a.dimension
+            WHERE COALESCE(a.value, 0) <> COALESCE(s.value, 0)
+        """))).all()
+        if not drift:
+            return 0
+
+        params = dict(zip(("metrics", "dimensions", "enterprise_ids", "deltas"), (list(c) for c in zip(*drift))))
+        drift_rows = """
+            SELECT * FROM unnest(
+                CAST(:metrics AS VARCHAR[]), CAST(:dimensions AS VARCHAR[]),
+                CAST(:enterprise_ids AS INTEGER[]), CAST(:deltas AS BIGINT[])
+            ) AS d(metric, dimension, enterprise_id, delta)
+        """
+        await conn.execute(text(f"""
+            INSERT INTO dashboard_stats (metric, dimension, enterprise_id, value)
+            SELECT metric, dimension, enterprise_id, delta FROM ({drift_rows}) d
+            ORDER BY enterprise_id, metric, dimension
+            ON CONFLICT (enterprise_id, metric, dimension)
+            DO UPDATE SET value = dashboard_stats.value + EXCLUDED.value
+        """), params)
+        # 修正后为 0 的行删除（与原表统计一致：没有数据的分组不保存）；
+        # 并发事务又改了这一行时，删除条件按最新值重新判断，不会删掉非 0 的计数
+        await conn.execute(text(f"""
+            DELETE FROM dashboard_stats s
+            USING ({drift_rows}) d
+            WHERE s.enterprise_id = d.enterprise_id AND s.metric = d.metric AND s.dimension = d.dimension
+                AND s.value = 0
+        """), params)
+        return len(drift)
+
+
+async def run_dashboard_reconciler(engine, interval: float) -> None:
+    """后台定期对账仪表盘计数"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            count = await reconcile_dashboard_stats(engine)
+            if count:
+                print(f"📊 仪表盘计数对账修正了 {count} 行")
+        except Exception as e:
+            print(f"⚠️ 仪表盘计数对账失败: {e}")
@@ -0,0 +1,170 @@
+"""
+数据库查询监控
+Database query instrumentation
+
+1. 通过 SQLAlchemy 的 before_cursor_execute / after_cursor_execute 钩子，
+   把每个请求的查询次数和累计数据库耗时记录到 contextvar 中
+2. 超过阈值的慢查询打印日志，参数只输出类型，不输出值（脱敏）
+3. 通过连接池 checkout / checkin 事件记录每个请求取连接的次数和累计占用连接的时间
+4. QueryStatsMiddleware 在响应头中写入 Server-Timing，
+   单个请求查询次数过多时打印告警，便于在生产环境发现 N+1 查询
+"""
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from config import settings
+from core.metrics import REGISTRY
+
+
+class RequestQueryStats:
+    """单个请求的数据库统计"""
+    __slots__ = ("query_count", "db_time", "conn_checkouts", "conn_hold_time")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0  # 秒
+        self.conn_checkouts = 0  # 从连接池取连接的次数
+        self.conn_hold_time = 0.0  # 累计占用连接的时间（秒）
+
+
+# 当前请求的统计对象；不在请求上下文中（如启动时初始化管理员）时为 None
+_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("ehs_request_query_stats", default=None)
+
+# conn.info 中保存查询开始时间的键
+_QUERY_START_KEY = "ehs_query_start"
+
+# connection_record.info 中保存 (取出时间, 请求统计对象) 的键
+_CHECKOUT_KEY = "ehs_checkout"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    """获取当前请求的数据库统计"""
+    return _request_stats.get()
+
+
+def redact_parameters(parameters):
+    """参数脱敏：只保留参数名和类型"""
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        # executemany 时为参数列表，只描述第一组和总数
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return [redact_parameters(parameters[0]), f"... 共{len(parameters)}组"]
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return f"<{type(parameters).__name__}>"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_QUERY_START_KEY)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += elapsed
+
+    if elapsed * 1000 >= settings.slow_query_threshold_ms:
+        sql = _WHITESPACE.sub(" ", statement).strip()
+        if len(sql) > 1000:
+            sql = sql[:1000] + "..."
+        print(f"🐢 慢查询 {elapsed * 1000:.1f}ms: {sql} | 参数: {redact_parameters(parameters)}")
+
+
+def _handle_error(exception_context):
+    # 执行出错时 after_cursor_execute 不会触发，这里弹出开始时间，避免堆积
+    conn = exception_context.connection
+    if conn is not None:
+        starts = conn.info.get(_QUERY_START_KEY)
+        if starts:
+            starts.pop()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    # 在取连接的请求上下文中记录统计对象，归还时即使上下文已变化也能记到同一个请求上
+    connection_record.info[_CHECKOUT_KEY] = (time.perf_counter(), _request_stats.get())
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    checkout = connection_record.info.pop(_CHECKOUT_KEY, None)
+    if checkout is None:
+        return
+    start, stats = checkout
+    held = time.perf_counter() - start
+    REGISTRY.conn_hold.observe(held)
+    if stats is not None:
+        stats.conn_checkouts += 1
+        stats.conn_hold_time += held
+
+
+def install_query_hooks(engine) -> None:
+    """为 engine 安装查询监控钩子（AsyncEngine 需要挂在 sync_engine 上）"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    event.listen(sync_engine, "checkout", _on_checkout)
+    event.listen(sync_engine, "checkin", _on_checkin)
+
+
+class QueryStatsMiddleware:
+    """
+    请求级数据库统计中间件
+
+    响应头示例：
+    Server-Timing: db;dur=12.34;desc="5 queries", conn;dur=15.02;desc="1 checkouts", app;dur=20.10
+
+    conn 为本请求累计占用数据库连接的时间，只统计响应头发出前已归还的连接
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.server_timing_enabled:
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.query_count} queries", '
+                    f'conn;dur={stats.conn_hold_time * 1000:.2f};desc="{stats.conn_checkouts} checkouts", '
+                    f"app;dur={total_ms:.2f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            if stats.conn_checkouts:
+                REGISTRY.request_conn_hold.observe(stats.conn_hold_time)
+            if stats.query_count >= settings.request_query_warn_count:
+                route = scope.get("route")
+                route_path = getattr(route, "path", None) or scope.get("path")
+                print(
+                    f"⚠️ 单个请求查询次数过多（可能存在N+1查询）: {scope['method']} {route_path} "
+                    f"查询{stats.query_count}次，数据库耗时{stats.db_time * 1000:.1f}ms"
+                )
@@ -0,0 +1,20 @@
+-- ============================================
+-- 企业/承包商管理员索引迁移
+-- 数据库名: ehs
+-- ============================================
+-- 系统后台企业、承包商列表按页批量查询管理员：
+--   WHERE enterprise_staff_id IN (...) AND user_type = 'enterprise' AND role_level IN (1, 0)
+-- 三列组合索引使该查询只需扫描目标公司的管理员行
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_company_admin_index.sql
+-- ============================================
+
+\c ehs;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_enterprise_staff_admin
+    ON users(enterprise_staff_id, user_type, role_level);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_contractor_staff_admin
+    ON users(contractor_staff_id, user_type, role_level);
+
+ANALYZE users;
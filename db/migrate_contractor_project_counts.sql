@@ -0,0 +1,68 @@
+-- ============================================
+-- 承包商项目数统计迁移
+-- 数据库名: ehs
+-- ============================================
+-- 1. contractor_project(enterprise_id, contractor_id) 组合索引：
+--    /contractors/ 一次 GROUP BY 统计本企业所有承包商的项目数，可以只扫描索引
+--    （替代原 enterprise_id 单列索引）
+-- 2. contractor_project_stats 计数表：按 (企业, 承包商) 保存项目数，由触发器在项目增删改时维护；
+--    合作承包商上千的企业可开启 contractor_project_counter 配置直接读取计数
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_contractor_project_counts.sql
+-- ============================================
+
+\c ehs;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contractor_project_enterprise_contractor
+    ON contractor_project(enterprise_id, contractor_id);
+DROP INDEX CONCURRENTLY IF EXISTS idx_contractor_project_enterprise_id;
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS contractor_project_stats (
+    enterprise_id INTEGER NOT NULL,
+    contractor_id INTEGER NOT NULL,
+    project_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (enterprise_id, contractor_id)
+);
+
+COMMENT ON TABLE contractor_project_stats IS '企业与承包商之间的项目数，由 contractor_project 上的触发器维护';
+COMMENT ON COLUMN contractor_project_stats.project_count IS '项目数';
+
+CREATE OR REPLACE FUNCTION maintain_contractor_project_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE contractor_project_stats SET project_count = project_count - 1
+        WHERE enterprise_id = OLD.enterprise_id AND contractor_id = OLD.contractor_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO contractor_project_stats (enterprise_id, contractor_id, project_count)
+        VALUES (NEW.enterprise_id, NEW.contractor_id, 1)
+        ON CONFLICT (enterprise_id, contractor_id)
+        DO UPDATE SET project_count = contractor_project_stats.project_count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_maintain_contractor_project_stats ON contractor_project;
+CREATE TRIGGER trigger_maintain_contractor_project_stats
+    AFTER INSERT OR DELETE OR UPDATE OF enterprise_id, contractor_id ON contractor_project
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_contractor_project_stats();
+
+-- 回填已有项目（触发器与回填在同一事务中，期间新增的项目会等待本事务提交）
+LOCK TABLE contractor_project IN SHARE MODE;
+INSERT INTO contractor_project_stats (enterprise_id, contractor_id, project_count)
+SELECT enterprise_id, contractor_id, count(*)
+FROM contractor_project
+GROUP BY enterprise_id, contractor_id
+ON CONFLICT (enterprise_id, contractor_id)
+DO UPDATE SET project_count = EXCLUDED.project_count;
+
+COMMIT;
+
+ANALYZE contractor_project;
+ANALYZE contractor_project_stats;
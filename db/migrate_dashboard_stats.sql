@@ -0,0 +1,222 @@
+-- ============================================
+-- 仪表盘统计迁移
+-- 数据库名: ehs
+-- ============================================
+-- /dashboard/summary 从 dashboard_stats 汇总表读取计数，不再翻页统计：
+-- 1. dashboard_stats(metric, dimension, enterprise_id, value)：enterprise_id = 0 为全局计数，
+--    其余为该企业的计数
+--    - pending_users / 用户类型：待审核人员（企业员工另按企业计数）
+--    - enterprises / 经营状态、contractors / 经营状态：未删除的企业、承包商
+--    - active_cooperations：企业允许合作的承包商数（全局和按企业）
+--    - tickets / 动火等级：作业票（全局，以及按申请人所属企业）
+-- 2. users、enterprise_info、contractor_info、ticket 上的触发器在写入时增量更新计数
+-- 3. dashboard_stats_actual 视图按原表实时统计，用于回填和应用的定期对账（db/dashboard.py）
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_dashboard_stats.sql
+-- ============================================
+
+\c ehs;
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS dashboard_stats (
+    metric VARCHAR(50) NOT NULL,
+    dimension VARCHAR(50) NOT NULL DEFAULT '',
+    enterprise_id INTEGER NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (enterprise_id, metric, dimension)
+);
+
+COMMENT ON TABLE dashboard_stats IS '仪表盘计数，由触发器增量维护，应用定期按 dashboard_stats_actual 对账';
+COMMENT ON COLUMN dashboard_stats.metric IS '指标：pending_users、enterprises、contractors、active_cooperations、tickets';
+COMMENT ON COLUMN dashboard_stats.dimension IS '维度：用户类型、经营状态、动火等级，没有维度时为空字符串';
+COMMENT ON COLUMN dashboard_stats.enterprise_id IS '企业ID，0 表示全局';
+COMMENT ON COLUMN dashboard_stats.value IS '计数';
+
+CREATE OR REPLACE VIEW dashboard_stats_actual AS
+SELECT 'pending_users'::VARCHAR AS metric, user_type::VARCHAR AS dimension, 0 AS enterprise_id, count(*) AS value
+FROM users WHERE user_status = 2
+GROUP BY user_type
+UNION ALL
+SELECT 'pending_users', 'enterprise', enterprise_staff_id, count(*)
+FROM users WHERE user_status = 2 AND user_type = 'enterprise' AND enterprise_staff_id IS NOT NULL
+GROUP BY enterprise_staff_id
+UNION ALL
+SELECT 'enterprises', business_status, 0, count(*)
+FROM enterprise_info WHERE is_deleted = false
+GROUP BY business_status
+UNION ALL
+SELECT 'contractors', business_status, 0, count(*)
+FROM contractor_info WHERE is_deleted = false
+GROUP BY business_status
+UNION ALL
+SELECT 'active_cooperations', '', 0, COALESCE(sum(jsonb_array_length(allowed_contractor_ids)), 0)
+FROM enterprise_info WHERE is_deleted = false
+UNION ALL
+SELECT 'active_cooperations', '', enterprise_id, jsonb_array_length(allowed_contractor_ids)
+FROM enterprise_info WHERE is_deleted = false AND jsonb_array_length(allowed_contractor_ids) > 0
+UNION ALL
+SELECT 'tickets', hot_work::VARCHAR, 0, count(*)
+FROM ticket
+GROUP BY hot_work
+UNION ALL
+SELECT 'tickets', t.hot_work::VARCHAR, u.enterprise_staff_id, count(*)
+FROM ticket t JOIN users u ON u.user_id = t.applicant
+WHERE u.enterprise_staff_id IS NOT NULL
+GROUP BY t.hot_work, u.enterprise_staff_id;
+
+CREATE OR REPLACE FUNCTION bump_dashboard_stat(p_metric VARCHAR, p_dimension VARCHAR, p_enterprise_id INTEGER, p_delta BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO dashboard_stats (metric, dimension, enterprise_id, value)
+    VALUES (p_metric, COALESCE(p_dimension, ''), p_enterprise_id, p_delta)
+    ON CONFLICT (enterprise_id, metric, dimension)
+    DO UPDATE SET value = dashboard_stats.value + EXCLUDED.value;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 待审核人员
+CREATE OR REPLACE FUNCTION maintain_dashboard_users()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.user_status IS NOT DISTINCT FROM NEW.user_status
+        AND OLD.user_type = NEW.user_type
+        AND OLD.enterprise_staff_id IS NOT DISTINCT FROM NEW.enterprise_staff_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.user_status = 2 THEN
+        PERFORM bump_dashboard_stat('pending_users', OLD.user_type, 0, -1);
+        IF OLD.user_type = 'enterprise' AND OLD.enterprise_staff_id IS NOT NULL THEN
+            PERFORM bump_dashboard_stat('pending_users', OLD.user_type, OLD.enterprise_staff_id, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.user_status = 2 THEN
+        PERFORM bump_dashboard_stat('pending_users', NEW.user_type, 0, 1);
+        IF NEW.user_type = 'enterprise' AND NEW.enterprise_staff_id IS NOT NULL THEN
+            PERFORM bump_dashboard_stat('pending_users', NEW.user_type, NEW.enterprise_staff_id, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 企业经营状态、合作承包商数
+CREATE OR REPLACE FUNCTION maintain_dashboard_enterprises()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_cooperations BIGINT := 0;
+    new_cooperations BIGINT := 0;
+    old_counted BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_deleted;
+    new_counted BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_deleted;
+BEGIN
+    IF old_counted THEN
+        old_cooperations := jsonb_array_length(OLD.allowed_contractor_ids);
+    END IF;
+    IF new_counted THEN
+        new_cooperations := jsonb_array_length(NEW.allowed_contractor_ids);
+    END IF;
+
+    IF NOT (old_counted AND new_counted AND OLD.business_status = NEW.business_status) THEN
+        IF old_counted THEN
+            PERFORM bump_dashboard_stat('enterprises', OLD.business_status, 0, -1);
+        END IF;
+        IF new_counted THEN
+            PERFORM bump_dashboard_stat('enterprises', NEW.business_status, 0, 1);
+        END IF;
+    END IF;
+
+    IF new_cooperations <> old_cooperations THEN
+        PERFORM bump_dashboard_stat('active_cooperations', '', 0, new_cooperations - old_cooperations);
+        PERFORM bump_dashboard_stat(
+            'active_cooperations', '', COALESCE(NEW.enterprise_id, OLD.enterprise_id), new_cooperations - old_cooperations
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 承包商经营状态
+CREATE OR REPLACE FUNCTION maintain_dashboard_contractors()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_counted BOOLEAN := TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.is_deleted;
+    new_counted BOOLEAN := TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.is_deleted;
+BEGIN
+    IF old_counted AND new_counted AND OLD.business_status = NEW.business_status THEN
+        RETURN NULL;
+    END IF;
+    IF old_counted THEN
+        PERFORM bump_dashboard_stat('contractors', OLD.business_status, 0, -1);
+    END IF;
+    IF new_counted THEN
+        PERFORM bump_dashboard_stat('contractors', NEW.business_status, 0, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 作业票动火等级（按申请人当前所属企业计数，申请人换企业造成的偏差由对账修正）
+CREATE OR REPLACE FUNCTION maintain_dashboard_tickets()
+RETURNS TRIGGER AS $$
+DECLARE
+    applicant_enterprise_id INTEGER;
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.hot_work = NEW.hot_work AND OLD.applicant = NEW.applicant THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_dashboard_stat('tickets', OLD.hot_work::VARCHAR, 0, -1);
+        SELECT enterprise_staff_id INTO applicant_enterprise_id FROM users WHERE user_id = OLD.applicant;
+        IF applicant_enterprise_id IS NOT NULL THEN
+            PERFORM bump_dashboard_stat('tickets', OLD.hot_work::VARCHAR, applicant_enterprise_id, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_dashboard_stat('tickets', NEW.hot_work::VARCHAR, 0, 1);
+        SELECT enterprise_staff_id INTO applicant_enterprise_id FROM users WHERE user_id = NEW.applicant;
+        IF applicant_enterprise_id IS NOT NULL THEN
+            PERFORM bump_dashboard_stat('tickets', NEW.hot_work::VARCHAR, applicant_enterprise_id, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_maintain_dashboard_users ON users;
+CREATE TRIGGER trigger_maintain_dashboard_users
+    AFTER INSERT OR DELETE OR UPDATE OF user_status, user_type, enterprise_staff_id ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_dashboard_users();
+
+DROP TRIGGER IF EXISTS trigger_maintain_dashboard_enterprises ON enterprise_info;
+CREATE TRIGGER trigger_maintain_dashboard_enterprises
+    AFTER INSERT OR DELETE OR UPDATE OF business_status, is_deleted, allowed_contractor_ids ON enterprise_info
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_dashboard_enterprises();
+
+DROP TRIGGER IF EXISTS trigger_maintain_dashboard_contractors ON contractor_info;
+CREATE TRIGGER trigger_maintain_dashboard_contractors
+    AFTER INSERT OR DELETE OR UPDATE OF business_status, is_deleted ON contractor_info
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_dashboard_contractors();
+
+DROP TRIGGER IF EXISTS trigger_maintain_dashboard_tickets ON ticket;
+CREATE TRIGGER trigger_maintain_dashboard_tickets
+    AFTER INSERT OR DELETE OR UPDATE OF hot_work, applicant ON ticket
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_dashboard_tickets();
+
+-- 回填（触发器与回填在同一事务中，期间的写入会等待本事务提交）
+LOCK TABLE users, enterprise_info, contractor_info, ticket IN SHARE MODE;
+DELETE FROM dashboard_stats;
+INSERT INTO dashboard_stats (metric, dimension, enterprise_id, value)
+SELECT metric, dimension, enterprise_id, value FROM dashboard_stats_actual;
+
+COMMIT;
+
+ANALYZE dashboard_stats;
@@ -0,0 +1,18 @@
+-- ============================================
+-- 企业选择器索引迁移
+-- 数据库名: ehs
+-- ============================================
+-- 承包商申请合作、企业用户绑定企业时的企业选择器按 (company_name, enterprise_id) 游标分页，
+-- 只列出未删除的续存企业，部分索引使每页查询只需按顺序读取 limit 行
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_enterprise_picker.sql
+-- ============================================
+
+\c ehs;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enterprise_picker
+    ON enterprise_info(company_name, enterprise_id)
+    WHERE is_deleted = false AND business_status = '续存';
+
+ANALYZE enterprise_info;
@@ -0,0 +1,83 @@
+-- ============================================
+-- 认证接口限流迁移
+-- 数据库名: ehs
+-- ============================================
+-- rate_limit_buckets 保存 /token、/register、/forgot-password、/reset-password 的令牌桶，
+-- 多个 worker 共享同一份计数（配置 RATE_LIMIT_BACKEND=postgres 时使用，见 core/rate_limit.py）：
+-- - key: 接口:ip:<IP> 或 接口:user:<用户名>
+-- - tokens: 上次访问后剩余的令牌数，updated_at 之后按补充速率恢复
+-- 表为 UNLOGGED：不写 WAL、写入更快，数据库崩溃后清空（限流状态丢失可以接受），也不会复制到只读副本。
+-- rate_limit_take 在一条语句内处理一次请求涉及的所有桶：全部有令牌时各扣减一个，
+-- 否则都不扣减（被拒绝的请求不消耗其他桶），返回令牌不足的桶及需要等待的秒数；
+-- 闲置的桶由应用定期删除。
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_rate_limit.sql
+-- ============================================
+
+\c ehs;
+
+BEGIN;
+
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    key VARCHAR(255) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+-- 清理闲置的桶
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_updated_at ON rate_limit_buckets(updated_at);
+
+COMMENT ON TABLE rate_limit_buckets IS '认证接口限流令牌桶（UNLOGGED），见 core/rate_limit.py';
+COMMENT ON COLUMN rate_limit_buckets.key IS '接口:ip:<IP> 或 接口:user:<用户名>';
+COMMENT ON COLUMN rate_limit_buckets.tokens IS '上次访问后剩余的令牌数';
+COMMENT ON COLUMN rate_limit_buckets.updated_at IS '上次访问时间';
+
+-- 旧版本的单键函数（被拒绝的请求仍会扣减其他桶）
+DROP FUNCTION IF EXISTS rate_limit_take(VARCHAR, DOUBLE PRECISION, DOUBLE PRECISION);
+
+-- 补充一次请求涉及的所有桶，全部有令牌时各取一个；否则都不扣减，返回令牌不足的桶及需要等待的秒数
+CREATE OR REPLACE FUNCTION rate_limit_take(
+    p_keys VARCHAR[], p_capacities DOUBLE PRECISION[], p_refill_rates DOUBLE PRECISION[]
+) RETURNS TABLE (bucket_key VARCHAR, retry_after DOUBLE PRECISION) AS $$
+DECLARE
+    now_ts TIMESTAMPTZ := clock_timestamp();
+    blocked BOOLEAN := FALSE;
+    bucket RECORD;
+BEGIN
+    -- 新的桶按满容量创建；按键的顺序插入和加行锁，并发请求共享同一个键时不会互相死锁
+    INSERT INTO rate_limit_buckets (key, tokens, updated_at)
+    SELECT t.k, t.c, now_ts FROM unnest(p_keys, p_capacities) AS t(k, c) ORDER BY t.k
+    ON CONFLICT (key) DO NOTHING;
+
+    FOR bucket IN
+        SELECT b.key AS k, t.r AS rate,
+               LEAST(t.c, b.tokens + GREATEST(EXTRACT(EPOCH FROM now_ts - b.updated_at), 0) * t.r) AS available
+        FROM rate_limit_buckets b
+        JOIN unnest(p_keys, p_capacities, p_refill_rates) AS t(k, c, r) ON t.k = b.key
+        ORDER BY b.key
+        FOR UPDATE OF b
+    LOOP
+        IF bucket.available < 1 THEN
+            blocked := TRUE;
+            bucket_key := bucket.k;
+            retry_after := (1 - bucket.available) / bucket.rate;
+            RETURN NEXT;
+        END IF;
+    END LOOP;
+
+    -- 任一桶令牌不足时整个请求被拒绝，所有桶都不扣减
+    IF NOT blocked THEN
+        UPDATE rate_limit_buckets b SET
+            tokens = LEAST(t.c, b.tokens + GREATEST(EXTRACT(EPOCH FROM now_ts - b.updated_at), 0) * t.r) - 1,
+            updated_at = now_ts
+        FROM unnest(p_keys, p_capacities, p_refill_rates) AS t(k, c, r)
+        WHERE b.key = t.k;
+    END IF;
+    RETURN;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
+
+ANALYZE rate_limit_buckets;
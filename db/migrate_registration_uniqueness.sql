@@ -0,0 +1,73 @@
+-- ============================================
+-- 注册/入驻唯一性约束迁移
+-- 数据库名: ehs
+-- ============================================
+-- 1. 用部分唯一索引替代注册、入驻接口中逐个 SELECT 的重复检查
+-- 2. 插入用户时由触发器自动填充 sys_only_id，不再需要 INSERT 之后再 UPDATE
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_registration_uniqueness.sql
+--
+-- 如果已有重复数据，创建唯一索引会失败，可先用下面的查询检查：
+--   SELECT phone, count(*) FROM users
+--   WHERE is_deleted = false AND phone <> '' GROUP BY phone HAVING count(*) > 1;
+--   SELECT email, count(*) FROM users
+--   WHERE is_deleted = false AND email <> '' GROUP BY email HAVING count(*) > 1;
+--   SELECT company_name, count(*) FROM enterprise_info
+--   WHERE is_deleted = false AND business_status <> '已注销' GROUP BY company_name HAVING count(*) > 1;
+--   SELECT license_number, count(*) FROM enterprise_info
+--   WHERE is_deleted = false AND business_status <> '已注销' GROUP BY license_number HAVING count(*) > 1;
+--   （contractor_info 同理）
+-- ============================================
+
+\c ehs;
+
+BEGIN;
+
+-- ============================================
+-- 唯一索引
+-- ============================================
+
+-- 用户表：未删除用户的手机号、邮箱唯一（空字符串不参与检查）
+-- username 建表时已有 UNIQUE 约束（users_username_key），无需重复创建
+CREATE UNIQUE INDEX IF NOT EXISTS uq_users_phone_active
+    ON users(phone) WHERE is_deleted = false AND phone <> '';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_users_email_active
+    ON users(email) WHERE is_deleted = false AND email <> '';
+
+-- 企业信息表：未删除且未注销的企业名称、营业执照编号唯一
+CREATE UNIQUE INDEX IF NOT EXISTS uq_enterprise_company_name_active
+    ON enterprise_info(company_name) WHERE is_deleted = false AND business_status <> '已注销';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_enterprise_license_number_active
+    ON enterprise_info(license_number) WHERE is_deleted = false AND business_status <> '已注销';
+
+-- 承包商信息表：未删除且未注销的公司名称、营业执照编号唯一
+CREATE UNIQUE INDEX IF NOT EXISTS uq_contractor_info_company_name_active
+    ON contractor_info(company_name) WHERE is_deleted = false AND business_status <> '已注销';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_contractor_info_license_number_active
+    ON contractor_info(license_number) WHERE is_deleted = false AND business_status <> '已注销';
+
+-- ============================================
+-- sys_only_id 自动填充
+-- ============================================
+-- 列 DEFAULT 不能引用同一行的 user_id；生成列又会拒绝 ORM 显式写入的 NULL，
+-- 因此使用 BEFORE INSERT 触发器：未指定 sys_only_id 时取 user_id
+
+CREATE OR REPLACE FUNCTION set_users_sys_only_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.sys_only_id = COALESCE(NEW.sys_only_id, NEW.user_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_set_users_sys_only_id ON users;
+CREATE TRIGGER trigger_set_users_sys_only_id
+    BEFORE INSERT ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION set_users_sys_only_id();
+
+-- 补齐历史数据
+UPDATE users SET sys_only_id = user_id WHERE sys_only_id IS NULL;
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- ============================================
+-- 令牌撤销（登出）迁移
+-- 数据库名: ehs
+-- ============================================
+-- POST /logout 撤销当前的访问令牌（以及请求体中的刷新令牌），令牌在过期前不能再使用（见 core/tokens.py）：
+-- - jti_hash: 令牌 jti 的 SHA-256 前 16 字节，不保存令牌本身
+-- - expires_at: 令牌的过期时间，之后记录没有意义，由应用定期删除
+-- - is_refresh: 是否为刷新令牌
+-- - grace_until: 刷新令牌换新（轮换）时记录，此前再次使用仍然有效（多个标签页同时刷新、响应丢失后重试）；
+--   登出撤销的记录为 NULL
+-- 已撤销的访问令牌：每个 worker 在内存中保存同样的哈希集合，启动时从本表加载，之后通过 NOTIFY ehs_token_revocations 同步，
+-- 请求鉴权时不查询本表。刷新令牌只在 POST /token/refresh 时查询本表，不进入内存。
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_revoked_tokens.sql
+-- ============================================
+
+\c ehs;
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti_hash BYTEA PRIMARY KEY,
+    expires_at TIMESTAMPTZ NOT NULL,
+    is_refresh BOOLEAN NOT NULL DEFAULT FALSE,
+    grace_until TIMESTAMPTZ
+);
+
+-- 早期版本的表没有以下两列；已有记录中过期时间在一天以后的只能是刷新令牌（访问令牌的有效期以分钟计）
+ALTER TABLE revoked_tokens ADD COLUMN IF NOT EXISTS is_refresh BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE revoked_tokens ADD COLUMN IF NOT EXISTS grace_until TIMESTAMPTZ;
+UPDATE revoked_tokens SET is_refresh = TRUE WHERE NOT is_refresh AND expires_at > now() + interval '1 day';
+
+-- 加载未过期的记录、清理过期记录
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+
+COMMENT ON TABLE revoked_tokens IS '已撤销（登出）的令牌，过期后由应用删除，见 core/tokens.py';
+COMMENT ON COLUMN revoked_tokens.jti_hash IS '令牌 jti 的 SHA-256 前 16 字节';
+COMMENT ON COLUMN revoked_tokens.expires_at IS '令牌的过期时间';
+COMMENT ON COLUMN revoked_tokens.is_refresh IS '是否为刷新令牌（刷新令牌不加载到内存，只在换取新令牌时查询）';
+COMMENT ON COLUMN revoked_tokens.grace_until IS '刷新令牌轮换后仍可再次使用的截止时间，登出撤销时为空';
+
+COMMIT;
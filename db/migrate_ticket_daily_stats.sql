@@ -0,0 +1,147 @@
+-- ============================================
+-- 作业票日统计迁移
+-- 数据库名: ehs
+-- ============================================
+-- ticket_daily_stats 按 (企业, 日期, 区域, 动火等级, 作业高度等级) 汇总作业票数，
+-- 并按危险识别（ticket.danger 位掩码）的每一位计数，安全报表按日期范围汇总查询，不再逐行解码：
+-- - enterprise_id: 申请时申请人所属的企业，保存在 ticket.stats_enterprise_id（插入或更换申请人时由触发器填写），
+--   没有企业时为 0。之后申请人更换企业不改变归属，删改作业票时从同一统计行中减去，统计不会漂移
+-- - area_id: 区域，未指定时为 0
+-- - danger_counts[n]: danger 第 n-1 位（从最低位数起）为 1 的作业票数，共 32 位
+--   （位与选项的对应关系见 db/encode_data.py 的 DANGER_OPTIONS 和 db/ticket_rollup.py）
+-- ticket 增删改时由触发器增量维护；建表后（以及从按申请人当前企业计数的旧版本升级后）执行回填:
+--   python -m db.ticket_rollup backfill
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_ticket_daily_stats.sql
+-- ============================================
+
+\c ehs;
+
+BEGIN;
+
+ALTER TABLE ticket ADD COLUMN IF NOT EXISTS stats_enterprise_id INTEGER NOT NULL DEFAULT 0;
+COMMENT ON COLUMN ticket.stats_enterprise_id IS '统计归属企业ID：申请时申请人所属的企业，0 表示无企业，由触发器填写';
+
+CREATE TABLE IF NOT EXISTS ticket_daily_stats (
+    enterprise_id INTEGER NOT NULL DEFAULT 0,
+    day DATE NOT NULL,
+    area_id INTEGER NOT NULL DEFAULT 0,
+    hot_work INTEGER NOT NULL,
+    work_height_level INTEGER NOT NULL,
+    ticket_count INTEGER NOT NULL DEFAULT 0,
+    danger_counts INTEGER[] NOT NULL DEFAULT array_fill(0, ARRAY[32]),
+    PRIMARY KEY (enterprise_id, day, area_id, hot_work, work_height_level)
+);
+
+-- 系统管理员不按企业筛选时按日期范围查询
+CREATE INDEX IF NOT EXISTS idx_ticket_daily_stats_day ON ticket_daily_stats(day);
+
+COMMENT ON TABLE ticket_daily_stats IS '作业票日统计，由 ticket 上的触发器增量维护，python -m db.ticket_rollup backfill 回填';
+COMMENT ON COLUMN ticket_daily_stats.enterprise_id IS '作业票统计归属企业ID（ticket.stats_enterprise_id），0 表示无企业';
+COMMENT ON COLUMN ticket_daily_stats.day IS '申请日期（ticket.apply_date）';
+COMMENT ON COLUMN ticket_daily_stats.area_id IS '区域ID，0 表示未指定';
+COMMENT ON COLUMN ticket_daily_stats.hot_work IS '动火等级';
+COMMENT ON COLUMN ticket_daily_stats.work_height_level IS '作业高度等级';
+COMMENT ON COLUMN ticket_daily_stats.ticket_count IS '作业票数';
+COMMENT ON COLUMN ticket_daily_stats.danger_counts IS '危险识别各位的作业票数，下标 n 对应 danger 第 n-1 位';
+
+-- danger 位掩码展开为 32 个计数（每位为 1 时计 p_sign）
+CREATE OR REPLACE FUNCTION ticket_danger_bits(p_danger INTEGER, p_sign INTEGER)
+RETURNS INTEGER[] AS $$
+    SELECT array_agg(CASE WHEN (p_danger >> (i - 1)) & 1 = 1 THEN p_sign ELSE 0 END ORDER BY i)
+    FROM generate_series(1, 32) AS i
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 两个计数数组逐位相加
+CREATE OR REPLACE FUNCTION add_int_arrays(a INTEGER[], b INTEGER[])
+RETURNS INTEGER[] AS $$
+    SELECT array_agg(COALESCE(x, 0) + COALESCE(y, 0) ORDER BY n)
+    FROM unnest(a, b) WITH ORDINALITY AS t(x, y, n)
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 作业票统计归属的企业：申请（或更换申请人）时申请人所属的企业，保存在 ticket.stats_enterprise_id；
+-- 之后申请人更换企业不改变归属，删改作业票时从原来的统计行中减去
+CREATE OR REPLACE FUNCTION set_ticket_stats_enterprise()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.applicant IS DISTINCT FROM OLD.applicant THEN
+        NEW.stats_enterprise_id := COALESCE(
+            (SELECT enterprise_staff_id FROM users WHERE user_id = NEW.applicant), 0
+        );
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 旧版本第一个参数为申请人ID，参数名不同不能 CREATE OR REPLACE
+DROP FUNCTION IF EXISTS bump_ticket_daily_stats(INTEGER, DATE, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER);
+CREATE OR REPLACE FUNCTION bump_ticket_daily_stats(
+    p_enterprise_id INTEGER, p_day DATE, p_area_id INTEGER, p_hot_work INTEGER, p_work_height_level INTEGER,
+    p_danger INTEGER, p_sign INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO ticket_daily_stats (
+        enterprise_id, day, area_id, hot_work, work_height_level, ticket_count, danger_counts
+    )
+    VALUES (
+        p_enterprise_id, p_day, COALESCE(p_area_id, 0), p_hot_work, p_work_height_level,
+        p_sign, ticket_danger_bits(p_danger, p_sign)
+    )
+    ON CONFLICT (enterprise_id, day, area_id, hot_work, work_height_level)
+    DO UPDATE SET
+        ticket_count = ticket_daily_stats.ticket_count + EXCLUDED.ticket_count,
+        danger_counts = add_int_arrays(ticket_daily_stats.danger_counts, EXCLUDED.danger_counts);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_ticket_daily_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.stats_enterprise_id = NEW.stats_enterprise_id
+        AND OLD.apply_date = NEW.apply_date
+        AND OLD.area_id IS NOT DISTINCT FROM NEW.area_id
+        AND OLD.hot_work = NEW.hot_work
+        AND OLD.work_height_level = NEW.work_height_level
+        AND OLD.danger = NEW.danger THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_ticket_daily_stats(
+            OLD.stats_enterprise_id, OLD.apply_date, OLD.area_id, OLD.hot_work, OLD.work_height_level, OLD.danger, -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_ticket_daily_stats(
+            NEW.stats_enterprise_id, NEW.apply_date, NEW.area_id, NEW.hot_work, NEW.work_height_level, NEW.danger, 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_maintain_ticket_daily_stats ON ticket;
+DROP TRIGGER IF EXISTS trigger_set_ticket_stats_enterprise ON ticket;
+
+-- 已有作业票按申请人当前所属企业填写归属（统计触发器已删除，这里的更新不改动统计；之后执行回填）
+UPDATE ticket t
+SET stats_enterprise_id = u.enterprise_staff_id
+FROM users u
+WHERE u.user_id = t.applicant AND u.enterprise_staff_id IS NOT NULL AND t.stats_enterprise_id = 0;
+
+CREATE TRIGGER trigger_set_ticket_stats_enterprise
+    BEFORE INSERT OR UPDATE OF applicant ON ticket
+    FOR EACH ROW
+    EXECUTE FUNCTION set_ticket_stats_enterprise();
+
+-- 列触发器不会因 BEFORE 触发器改写 stats_enterprise_id 而触发，更换申请人时靠 applicant 列触发
+CREATE TRIGGER trigger_maintain_ticket_daily_stats
+    AFTER INSERT OR DELETE OR UPDATE OF applicant, stats_enterprise_id, apply_date, area_id, hot_work, work_height_level, danger ON ticket
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_ticket_daily_stats();
+
+COMMIT;
+
+ANALYZE ticket_daily_stats;
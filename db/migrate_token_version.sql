@@ -0,0 +1,63 @@
+-- ============================================
+-- 令牌版本迁移
+-- 数据库名: ehs
+-- ============================================
+-- 访问令牌带有 role_level、user_status 等授权声明，权限校验不再查询 users 表（见 core/tokens.py）。
+-- users 新增两个计数，由触发器在相关字段变化时加一，旧计数的令牌随之失效：
+-- - token_version（撤销计数）：改密码、删除/恢复、修改用户名或用户类型；访问令牌和刷新令牌都失效，需要重新登录
+--   （也可以直接 SET token_version = token_version + 1 主动撤销）
+-- - claims_version（权限计数）：角色、审核状态、所属企业/承包商变化；只有访问令牌失效，前端用刷新令牌换新
+-- - token_changed_at：最近一次计数变化的时间，应用启动时据此加载仍在访问令牌有效期内的变化
+-- 计数变化时通过 NOTIFY ehs_token_versions 通知所有 worker（随事务提交投递）。
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_token_version.sql
+-- ============================================
+
+\c ehs;
+
+BEGIN;
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS claims_version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_changed_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_users_token_changed_at ON users(token_changed_at) WHERE token_changed_at IS NOT NULL;
+
+COMMENT ON COLUMN users.token_version IS '令牌撤销计数，改密码、删除等变化时加一，刷新令牌和访问令牌随之失效';
+COMMENT ON COLUMN users.claims_version IS '令牌权限计数，角色、审核状态、所属企业/承包商变化时加一，访问令牌随之失效';
+COMMENT ON COLUMN users.token_changed_at IS '令牌计数最近一次变化的时间';
+
+CREATE OR REPLACE FUNCTION bump_users_token_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.password_hash IS DISTINCT FROM OLD.password_hash
+        OR NEW.is_deleted IS DISTINCT FROM OLD.is_deleted
+        OR NEW.username IS DISTINCT FROM OLD.username
+        OR NEW.user_type IS DISTINCT FROM OLD.user_type THEN
+        NEW.token_version := GREATEST(NEW.token_version, OLD.token_version + 1);
+    END IF;
+    IF NEW.role_level IS DISTINCT FROM OLD.role_level
+        OR NEW.user_status IS DISTINCT FROM OLD.user_status
+        OR NEW.role_type IS DISTINCT FROM OLD.role_type
+        OR NEW.enterprise_staff_id IS DISTINCT FROM OLD.enterprise_staff_id
+        OR NEW.contractor_staff_id IS DISTINCT FROM OLD.contractor_staff_id THEN
+        NEW.claims_version := GREATEST(NEW.claims_version, OLD.claims_version + 1);
+    END IF;
+    IF NEW.token_version <> OLD.token_version OR NEW.claims_version <> OLD.claims_version THEN
+        NEW.token_changed_at := clock_timestamp();
+        PERFORM pg_notify('ehs_token_versions', json_build_object(
+            'user_id', NEW.user_id, 'token_version', NEW.token_version, 'claims_version', NEW.claims_version
+        )::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_bump_users_token_version ON users;
+CREATE TRIGGER trigger_bump_users_token_version
+    BEFORE UPDATE ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_users_token_version();
+
+COMMIT;
@@ -0,0 +1,153 @@
+-- ============================================
+-- 模糊搜索（pg_trgm）迁移
+-- 数据库名: ehs
+-- ============================================
+-- 1. 启用 pg_trgm 扩展，为公司名称、营业执照编号、用户名、姓名创建三元组 GIN 索引，
+--    关键词搜索（ILIKE '%kw%'）和相似度排序（<% / word_similarity）可以走索引；
+--    公司名称和拼音另建 GiST 索引，输入提示按 <<-> 距离有序取出固定数量的候选行（KNN），不扫描全部匹配行
+-- 2. 新增 name_pinyin 列保存名称的全拼和首字母（如 "beijingkeji bjkj"），支持拼音搜索；
+--    由应用（db/search.py，需安装 pypinyin）填充，名称修改时触发器将其置空等待重新生成。
+--    企业、承包商的 updated_at 触发器忽略只修改 name_pinyin 的更新，后台生成拼音不会改写更新时间
+--
+-- 执行方式:
+--   psql -h 127.0.0.1 -U postgres -d ehs -f db/migrate_trigram_search.sql
+--
+-- 注意：pg_trgm 按数据库的 LC_CTYPE 判断字符是否为字母数字。
+-- 数据库使用 C 排序规则时中文字符不会生成三元组，中文关键词只能退化为全索引扫描，
+-- 建库时请使用 zh_CN.UTF-8 / en_US.UTF-8 等 UTF-8 locale
+-- ============================================
+
+\c ehs;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+BEGIN;
+
+-- ============================================
+-- 拼音列
+-- ============================================
+
+ALTER TABLE enterprise_info ADD COLUMN IF NOT EXISTS name_pinyin TEXT;
+ALTER TABLE contractor_info ADD COLUMN IF NOT EXISTS name_pinyin TEXT;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS name_pinyin TEXT;
+
+COMMENT ON COLUMN enterprise_info.name_pinyin IS '公司名称的全拼和首字母（空格分隔），用于拼音搜索，名称修改后置空由应用重新生成';
+COMMENT ON COLUMN contractor_info.name_pinyin IS '公司名称的全拼和首字母（空格分隔），用于拼音搜索，名称修改后置空由应用重新生成';
+COMMENT ON COLUMN users.name_pinyin IS '姓名的全拼和首字母（空格分隔），用于拼音搜索，姓名修改后置空由应用重新生成';
+
+-- 名称修改时清空拼音
+CREATE OR REPLACE FUNCTION reset_company_name_pinyin()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.company_name IS DISTINCT FROM OLD.company_name THEN
+        NEW.name_pinyin = NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reset_users_name_pinyin()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.name_str IS DISTINCT FROM OLD.name_str THEN
+        NEW.name_pinyin = NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_reset_enterprise_name_pinyin ON enterprise_info;
+CREATE TRIGGER trigger_reset_enterprise_name_pinyin
+    BEFORE UPDATE OF company_name ON enterprise_info
+    FOR EACH ROW
+    EXECUTE FUNCTION reset_company_name_pinyin();
+
+DROP TRIGGER IF EXISTS trigger_reset_contractor_name_pinyin ON contractor_info;
+CREATE TRIGGER trigger_reset_contractor_name_pinyin
+    BEFORE UPDATE OF company_name ON contractor_info
+    FOR EACH ROW
+    EXECUTE FUNCTION reset_company_name_pinyin();
+
+DROP TRIGGER IF EXISTS trigger_reset_users_name_pinyin ON users;
+CREATE TRIGGER trigger_reset_users_name_pinyin
+    BEFORE UPDATE OF name_str ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION reset_users_name_pinyin();
+
+-- 企业信息表更新时间触发器
+CREATE OR REPLACE FUNCTION update_enterprise_info_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- 只有 name_pinyin 变化（后台生成拼音）时保留原更新时间
+    IF NEW.name_pinyin IS DISTINCT FROM OLD.name_pinyin
+        AND (to_jsonb(NEW) - 'name_pinyin'::text) = (to_jsonb(OLD) - 'name_pinyin'::text) THEN
+        RETURN NEW;
+    END IF;
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 承包商信息表更新时间触发器
+CREATE OR REPLACE FUNCTION update_contractor_info_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- 只有 name_pinyin 变化（后台生成拼音）时保留原更新时间
+    IF NEW.name_pinyin IS DISTINCT FROM OLD.name_pinyin
+        AND (to_jsonb(NEW) - 'name_pinyin'::text) = (to_jsonb(OLD) - 'name_pinyin'::text) THEN
+        RETURN NEW;
+    END IF;
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 待生成拼音的行（应用按批查询 name_pinyin IS NULL）
+CREATE INDEX IF NOT EXISTS idx_enterprise_name_pinyin_pending
+    ON enterprise_info(enterprise_id) WHERE name_pinyin IS NULL;
+CREATE INDEX IF NOT EXISTS idx_contractor_info_name_pinyin_pending
+    ON contractor_info(contractor_id) WHERE name_pinyin IS NULL;
+CREATE INDEX IF NOT EXISTS idx_users_name_pinyin_pending
+    ON users(user_id) WHERE name_pinyin IS NULL AND name_str IS NOT NULL;
+
+COMMIT;
+
+-- ============================================
+-- 三元组索引
+-- ============================================
+-- 在线建索引（不阻塞写入），CREATE INDEX CONCURRENTLY 不能放在事务中
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enterprise_company_name_trgm
+    ON enterprise_info USING GIN (company_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enterprise_license_number_trgm
+    ON enterprise_info USING GIN (license_number gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enterprise_name_pinyin_trgm
+    ON enterprise_info USING GIN (name_pinyin gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enterprise_company_name_gist
+    ON enterprise_info USING GIST (company_name gist_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_enterprise_name_pinyin_gist
+    ON enterprise_info USING GIST (name_pinyin gist_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contractor_info_company_name_trgm
+    ON contractor_info USING GIN (company_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contractor_info_license_number_trgm
+    ON contractor_info USING GIN (license_number gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contractor_info_name_pinyin_trgm
+    ON contractor_info USING GIN (name_pinyin gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contractor_info_company_name_gist
+    ON contractor_info USING GIST (company_name gist_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_contractor_info_name_pinyin_gist
+    ON contractor_info USING GIST (name_pinyin gist_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_username_trgm
+    ON users USING GIN (username gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_name_str_trgm
+    ON users USING GIN (name_str gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_relay_name_trgm
+    ON users USING GIN (relay_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_name_pinyin_trgm
+    ON users USING GIN (name_pinyin gin_trgm_ops);
+
+ANALYZE enterprise_info;
+ANALYZE contractor_info;
+ANALYZE users;
@@ -27,7 +27,12 @@ class User(SQLModel, table=True):
     role_level: Optional[int] = Field(default=None, nullable=True)  # 角色等级
     user_status: Optional[int] = Field(default=None, nullable=True)  # 用户状态
     work_type: Optional[str] = Field(max_length=100, default='', nullable=False)  # 工种
+    name_pinyin: Optional[str] = Field(default=None, nullable=True)  # 姓名全拼和首字母（拼音搜索，见 db/search.py）
     is_deleted: bool = Field(default=False, nullable=False)  # 假删除标记
+    # 令牌计数，由触发器维护（见 core/tokens.py、db/migrate_token_version.sql）
+    token_version: int = Field(default=0, nullable=False)  # 撤销计数：改密码、删除、主动撤销时加一
+    claims_version: int = Field(default=0, nullable=False)  # 权限计数：角色、审核状态、所属企业/承包商变更时加一
+    token_changed_at: Optional[datetime] = Field(default=None, nullable=True)  # 最近一次计数变化的时间
 
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -54,6 +59,7 @@ class EnterpriseInfo(SQLModel, table=True):
     candidate_contractor_ids: Any = Field(default_factory=list, sa_column=Column(JSONB))
     contractor_detail_info: Any = Field(default_factory=dict, sa_column=Column(JSONB))
     modification_log: Any = Field(default_factory=list, sa_column=Column(JSONB))
+    name_pinyin: Optional[str] = Field(default=None, nullable=True)  # 公司名称全拼和首字母（拼音搜索，见 db/search.py）
     
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -80,6 +86,7 @@ class ContractorInfo(SQLModel, table=True):
     active_enterprise_detail: Any = Field(default_factory=dict, sa_column=Column(JSONB))
     cooperation_detail_log: Any = Field(default_factory=list, sa_column=Column(JSONB))
     modification_log: Any = Field(default_factory=list, sa_column=Column(JSONB))
+    name_pinyin: Optional[str] = Field(default=None, nullable=True)  # 公司名称全拼和首字母（拼音搜索，见 db/search.py）
 
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -101,6 +108,23 @@ class ContractorProject(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.now)
 
 
+class ContractorProjectStats(SQLModel, table=True):
+    """企业与承包商之间的项目数（由 contractor_project 上的触发器维护）"""
+    __tablename__ = 'contractor_project_stats'
+    enterprise_id: int = Field(primary_key=True)
+    contractor_id: int = Field(primary_key=True)
+    project_count: int = Field(default=0, nullable=False)
+
+
+class DashboardStat(SQLModel, table=True):
+    """仪表盘计数（触发器增量维护，见 db/migrate_dashboard_stats.sql 和 db/dashboard.py）"""
+    __tablename__ = 'dashboard_stats'
+    enterprise_id: int = Field(default=0, primary_key=True)  # 0 表示全局
+    metric: str = Field(max_length=50, primary_key=True)
+    dimension: str = Field(max_length=50, default='', primary_key=True)
+    value: int = Field(default=0, nullable=False)
+
+
 # 注意：ContractorUser和EnterpriseUser表已删除，模型定义保留用于兼容性
 # 但不再使用table=True，避免SQLAlchemy尝试创建表
 class ContractorUser(SQLModel):
@@ -165,6 +189,7 @@ class Ticket(SQLModel, table=True):
     cross_work_group_id: Optional[str] = Field(max_length=50, default=None, nullable=True)
     
     signature: Optional[str] = Field(max_length=255, default=None, nullable=True)
+    stats_enterprise_id: int = Field(default=0, nullable=False)  # 统计归属企业（申请时申请人所属企业，由触发器填写，见 db/ticket_rollup.py）
     
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,231 @@
+"""
+PostgreSQL LISTEN/NOTIFY
+PostgreSQL LISTEN/NOTIFY helpers
+
+- PgListener 使用一条独立的 asyncpg 连接（不占用 SQLAlchemy 连接池）监听频道，
+  按频道把消息分发给订阅的回调；连接断开后自动重连
+- notify 通过 pg_notify 发送消息，必须使用主库 engine（只读副本不能 NOTIFY）
+- publish_cache_invalidation 先失效本进程缓存，再通知其他 worker 进程
+- publish_event / publish_events 广播实时事件，各 worker 收到后分发给本进程的 SSE 连接（core.events）
+- 用户的令牌版本变化由 users 上的触发器直接 NOTIFY，各 worker 收到后更新 core.tokens.TOKEN_VERSIONS；
+  登出撤销的令牌同样广播，各 worker 收到后加入 core.tokens.REVOKED_TOKENS
+"""
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+from core.cache import invalidate_local
+from core.events import EVENT_HUB
+
+
+# 缓存失效频道，消息格式 {"cache": 缓存名, "key": 键}
+CACHE_INVALIDATION_CHANNEL = "ehs_cache_invalidation"
+# 实时事件频道，消息格式 {"topics": [主题], "event": 事件名, "data": {...}}
+EVENT_CHANNEL = "ehs_events"
+# 令牌版本频道（触发器发送），消息格式 {"user_id": 用户ID, "token_version": 撤销计数, "claims_version": 权限计数}
+TOKEN_VERSION_CHANNEL = "ehs_token_versions"
+# 令牌撤销频道（登出），消息格式 {"tokens": [[jti 哈希的十六进制, 过期时间戳], ...]}
+TOKEN_REVOCATION_CHANNEL = "ehs_token_revocations"
+
+
+def to_asyncpg_dsn(database_url: str) -> str:
+    """把 SQLAlchemy 连接地址（postgresql+asyncpg://）转换为 asyncpg 可用的 DSN"""
+    url = make_url(database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+class PgListener:
+    """独立连接上的 LISTEN 监听器"""
+
+    def __init__(
+        self,
+        dsn: str,
+        on_reconnect: Optional[Callable[[], None]] = None,
+        reconnect_delay: float = 5.0,
+        keepalive_interval: float = 30.0,
+    ):
+        self.dsn = dsn
+        self.on_reconnect = on_reconnect  # 重连成功后调用（断线期间的消息已丢失）
+        self.reconnect_delay = reconnect_delay
+        self.keepalive_interval = keepalive_interval
+        self._callbacks: Dict[str, List[Callable[[str], Any]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[asyncpg.Connection] = None
+
+    def subscribe(self, channel: str, callback: Callable[[str], Any]) -> None:
+        """订阅频道，需要在 start 之前调用；callback 接收消息内容字符串"""
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+
+    def _dispatch(self, connection, pid, channel, payload) -> None:
+        for callback in self._callbacks.get(channel, ()):
+            try:
+                result = callback(payload)
+                if asyncio.iscoroutine(result):
+                    asyncio.create_task(result)
+            except Exception as e:
+                print(f"⚠️ 处理 {channel} 消息失败: {e}")
+
+    async def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.is_closed():
+            try:
+                await conn.close(timeout=5)
+            except Exception:
+                conn.terminate()
+
+    async def _run(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                self._conn = await asyncpg.connect(
+                    self.dsn,
+                    timeout=settings.db_connect_timeout,
+                    server_settings={"application_name": f"{settings.db_application_name}_listener"},
+                )
+                lost = asyncio.Event()
+                self._conn.add_termination_listener(lambda _conn: lost.set())
+                for channel in self._callbacks:
+                    await self._conn.add_listener(channel, self._dispatch)
+                print(f"📡 已开始监听数据库通知: {', '.join(self._callbacks)}")
+
+                if connected_before and self.on_reconnect is not None:
+                    self.on_reconnect()
+                connected_before = True
+
+                # 定期执行一次查询，及时发现静默断开的连接
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=self.keepalive_interval)
+                    except asyncio.TimeoutError:
+                        await self._conn.fetchval("SELECT 1")
+                print("⚠️ 数据库通知监听连接已断开，准备重连")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ 数据库通知监听失败，{self.reconnect_delay}秒后重连: {e}")
+            finally:
+                await self._close()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+async def notify(engine: AsyncEngine, channel: str, payload: str) -> None:
+    """发送 NOTIFY 消息（自动提交，立即投递）"""
+    from db.connection import autocommit_connection
+
+    async with autocommit_connection(engine) as conn:
+        await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {
+            "channel": channel,
+            "payload": payload,
+        })
+
+
+async def publish_cache_invalidation(engine: AsyncEngine, cache_name: str, key: Any = None) -> None:
+    """
+    失效缓存条目：本进程立即失效，其他 worker 通过 LISTEN 收到通知后失效
+
+    通知发送失败只打印告警，其他进程的缓存会在 ttl 到期后自然失效
+    """
+    invalidate_local(cache_name, key)
+    try:
+        await notify(engine, CACHE_INVALIDATION_CHANNEL, json.dumps({"cache": cache_name, "key": key}))
+    except Exception as e:
+        print(f"⚠️ 缓存失效通知发送失败: cache={cache_name}, key={key}, {e}")
+
+
+def handle_cache_invalidation(payload: str) -> None:
+    """CACHE_INVALIDATION_CHANNEL 的消息处理（本进程发出的消息也会收到，重复失效无副作用）"""
+    try:
+        message = json.loads(payload)
+        invalidate_local(message["cache"], message.get("key"))
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"⚠️ 无法解析缓存失效通知: {payload!r}, {e}")
+
+
+async def publish_event(engine: AsyncEngine, topics: List[str], event: str, data: Optional[dict] = None) -> None:
+    """
+    发布实时事件（需在写操作的事务提交之后调用，客户端收到后重新拉取的是已提交的数据）
+
+    NOTIFY 消息不能超过 8000 字节，data 只放 id、状态等少量字段；发送失败只打印告警，
+    不影响接口本身的结果
+    """
+    try:
+        await notify(engine, EVENT_CHANNEL, json.dumps(
+            {"topics": topics, "event": event, "data": data or {}}, ensure_ascii=False, default=str
+        ))
+    except Exception as e:
+        print(f"⚠️ 实时事件发送失败: event={event}, topics={topics}, {e}")
+
+
+async def publish_events(engine: AsyncEngine, events: Sequence[Tuple[List[str], str, Optional[dict]]]) -> None:
+    """
+    批量发布实时事件：events 为 [(主题列表, 事件名, data)]
+
+    每个事件仍是一条独立的 NOTIFY 消息（格式与 publish_event 相同），所有消息在一条语句中发出
+    """
+    from db.connection import autocommit_connection
+
+    if not events:
+        return
+    payloads = [
+        json.dumps({"topics": topics, "event": event, "data": data or {}}, ensure_ascii=False, default=str)
+        for topics, event, data in events
+    ]
+    try:
+        async with autocommit_connection(engine) as conn:
+            await conn.execute(text(
+                "SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS t(payload)"
+            ), {"channel": EVENT_CHANNEL, "payloads": payloads})
+    except Exception as e:
+        print(f"⚠️ 实时事件发送失败: {len(events)} 条事件, {e}")
+
+
+def handle_event_notification(payload: str) -> None:
+    """EVENT_CHANNEL 的消息处理：分发给本进程订阅了对应主题的 SSE 连接"""
+    try:
+        message = json.loads(payload)
+        EVENT_HUB.dispatch(message["topics"], {"event": message["event"], "data": message.get("data") or {}})
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"⚠️ 无法解析实时事件通知: {payload!r}, {e}")
+
+
+def handle_token_version_notification(payload: str) -> None:
+    """TOKEN_VERSION_CHANNEL 的消息处理：旧计数的访问令牌在本进程内立即失效"""
+    from core.tokens import TOKEN_VERSIONS
+
+    try:
+        message = json.loads(payload)
+        TOKEN_VERSIONS.note(message["user_id"], message["token_version"], message["claims_version"])
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"⚠️ 无法解析令牌版本通知: {payload!r}, {e}")
+
+
+def handle_token_revocation_notification(payload: str) -> None:
+    """TOKEN_REVOCATION_CHANNEL 的消息处理：登出的令牌在本进程内立即失效"""
+    from core.tokens import REVOKED_TOKENS
+
+    try:
+        message = json.loads(payload)
+        for jti_hash, expires_at in message["tokens"]:
+            REVOKED_TOKENS.add(bytes.fromhex(jti_hash), float(expires_at))
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"⚠️ 无法解析令牌撤销通知: {payload!r}, {e}")
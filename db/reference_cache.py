@@ -0,0 +1,93 @@
+"""
+企业/承包商基础信息缓存
+Company reference-data cache
+
+列表接口补充企业名称、营业执照编号时使用，避免逐行查询 enterprise_info / contractor_info：
+
+    refs = await ENTERPRISE_REFS.get_many(engine, [u.enterprise_staff_id for u in users])
+    ref = refs.get(user.enterprise_staff_id)  # CompanyRef 或 None
+
+- 缓存 id -> (company_name, license_number, business_status)，条目数有上限
+- get_many 对未命中的 id 只发一条 IN 查询
+- 修改公司名称、营业执照编号、营业状态的接口提交后调用
+  db.notify.publish_cache_invalidation(engine, ENTERPRISE_REFS.name, enterprise_id)
+"""
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlmodel import select
+
+from config import settings
+from core.cache import TTLCache, MISSING, register_invalidation_handler
+from db.connection import session_scope
+from db.models import EnterpriseInfo, ContractorInfo
+
+
+class CompanyRef(NamedTuple):
+    """企业/承包商基础信息"""
+    company_name: str
+    license_number: Optional[str]
+    business_status: Optional[str]
+
+
+class CompanyReferenceCache:
+    """按 id 缓存企业或承包商基础信息"""
+
+    def __init__(self, name: str, model, id_column):
+        self.name = name
+        self._model = model
+        self._id_column = id_column
+        self._cache = TTLCache(
+            ttl_seconds=settings.reference_cache_ttl_seconds,
+            max_size=settings.reference_cache_max_size,
+        )
+        register_invalidation_handler(name, self.invalidate_local)
+
+    async def get_many(self, engine, ids: Iterable[Optional[int]]) -> Dict[int, CompanyRef]:
+        """
+        批量获取基础信息，返回 {id: CompanyRef}
+
+        ids 中的 None/0 会被忽略；不存在的 id 不会出现在结果中。
+        engine 也可以传入请求级 AsyncSession
+        """
+        found: Dict[int, CompanyRef] = {}
+        misses = []
+        for company_id in set(ids):
+            if not company_id:
+                continue
+            cached = self._cache.get(company_id)
+            if cached is MISSING:
+                misses.append(company_id)
+            else:
+                found[company_id] = cached
+
+        if misses:
+            model = self._model
+            query = select(
+                self._id_column, model.company_name, model.license_number, model.business_status
+            ).where(self._id_column.in_(misses))
+            async with session_scope(engine) as session:
+                result = await session.exec(query)
+                rows = result.all()
+            for company_id, company_name, license_number, business_status in rows:
+                ref = CompanyRef(company_name, license_number, business_status)
+                self._cache.set(company_id, ref)
+                found[company_id] = ref
+
+        return found
+
+    async def get(self, engine, company_id: Optional[int]) -> Optional[CompanyRef]:
+        """获取单个 id 的基础信息"""
+        if not company_id:
+            return None
+        return (await self.get_many(engine, [company_id])).get(company_id)
+
+    def invalidate_local(self, company_id: Optional[int] = None) -> None:
+        """失效本进程缓存，company_id 为 None 时清空"""
+        if company_id is None:
+            self._cache.clear()
+        else:
+            self._cache.invalidate(company_id)
+
+
+ENTERPRISE_REFS = CompanyReferenceCache("enterprise_ref", EnterpriseInfo, EnterpriseInfo.enterprise_id)
+CONTRACTOR_REFS = CompanyReferenceCache("contractor_ref", ContractorInfo, ContractorInfo.contractor_id)
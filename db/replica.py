@@ -0,0 +1,123 @@
+"""
+读写分离路由
+Read-replica routing
+
+- 主库 engine 仍保存在 app.state.engine，只读副本 engine 由 ReplicaRouter 管理
+- 只读接口通过 routes.dependencies.get_read_engine 获取 engine
+- 同一登录会话发生写请求后的短时间内，只读请求仍走主库（读己之写）
+- 后台任务定期通过 pg_last_xact_replay_timestamp() 测量副本延迟，超过阈值时回退到主库
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+# 副本延迟（秒）；不在恢复模式（副本地址实际指向主库）或 WAL 已全部回放时视为 0
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+# 会修改数据的 HTTP 方法
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+# 读己之写记录超过该数量时清理过期项
+_STICKY_PRUNE_THRESHOLD = 10000
+
+
+class ReplicaRouter:
+    """主库 / 只读副本选择器"""
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replica: AsyncEngine,
+        max_lag_seconds: float,
+        sticky_seconds: float,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self.lag_seconds: Optional[float] = None  # None 表示未知（尚未测量或测量失败），此时走主库
+        self._recent_writers: Dict[str, float] = {}  # {会话键: 粘滞到期时间(monotonic)}
+
+    def mark_write(self, key: Optional[str]) -> None:
+        """记录某个会话刚刚发生了写操作"""
+        if not key:
+            return
+        now = time.monotonic()
+        if len(self._recent_writers) >= _STICKY_PRUNE_THRESHOLD:
+            self._recent_writers = {k: v for k, v in self._recent_writers.items() if v > now}
+        self._recent_writers[key] = now + self.sticky_seconds
+
+    def replica_available(self) -> bool:
+        """副本延迟在阈值内时可用"""
+        return self.lag_seconds is not None and self.lag_seconds <= self.max_lag_seconds
+
+    def choose(self, key: Optional[str]) -> AsyncEngine:
+        """为只读请求选择 engine"""
+        if not self.replica_available():
+            return self.primary
+        if key:
+            expires_at = self._recent_writers.get(key)
+            if expires_at is not None:
+                if expires_at > time.monotonic():
+                    return self.primary
+                del self._recent_writers[key]
+        return self.replica
+
+    async def check_lag(self) -> Optional[float]:
+        """测量一次副本延迟"""
+        try:
+            async with self.replica.connect() as conn:
+                result = await conn.execute(REPLICA_LAG_SQL)
+                lag = result.scalar()
+            self.lag_seconds = float(lag) if lag is not None else None
+        except Exception as e:
+            print(f"⚠️ 只读副本延迟检测失败，暂时回退到主库: {e}")
+            self.lag_seconds = None
+        return self.lag_seconds
+
+    async def run_lag_monitor(self, interval_seconds: float) -> None:
+        """后台循环检测副本延迟，在 lifespan 中以 task 方式启动"""
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(interval_seconds)
+
+
+def get_session_key(headers) -> Optional[str]:
+    """
+    读己之写的会话键：使用 Authorization 头中的 token 原文，无需解码 JWT
+
+    headers 为 ASGI scope 中的 [(name, value)] 列表或 Starlette 的 Headers 对象
+    """
+    if hasattr(headers, "get"):
+        value = headers.get("authorization")
+        return value or None
+    for name, value in headers:
+        if name == b"authorization":
+            return value.decode("latin-1")
+    return None
+
+
+class ReadYourWritesMiddleware:
+    """写请求发生后，记录该会话在短时间内的只读请求需要走主库"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in WRITE_METHODS:
+            app = scope.get("app")
+            router = getattr(getattr(app, "state", None), "replica_router", None)
+            if router is not None:
+                # 在处理前记录，保证写请求执行期间并发发出的读请求也走主库
+                router.mark_write(get_session_key(scope["headers"]))
+        await self.app(scope, receive, send)
@@ -0,0 +1,302 @@
+"""
+模糊搜索
+Trigram fuzzy search for companies and users
+
+依赖 pg_trgm 三元组索引（db/migrate_trigram_search.sql）：
+- keyword_filter: 列表接口的关键词过滤，ILIKE '%kw%' 可以走三元组 GIN 索引，不再顺序扫描
+- search_companies: 输入提示（typeahead），从三元组 GiST 索引按距离取出候选行，再按相似度排序返回前几条
+- pick_enterprises: 企业选择器，按 (公司名称, 企业ID) 游标分页，排除已合作/申请中的企业
+- 拼音：name_pinyin 列保存名称的全拼和首字母（"beijingkeji bjkj"），
+  纯字母关键词同时匹配该列；由 run_pinyin_refresher 在后台填充（需安装 pypinyin，未安装时跳过拼音搜索）
+"""
+import asyncio
+import base64
+import json
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, literal, not_, or_, select, text, tuple_, union
+
+from db.models import EnterpriseInfo, ContractorInfo
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # pypinyin 为可选依赖
+    lazy_pinyin = None
+
+# 输入提示的候选行数：按名称、拼音与关键词的距离（<<->，1 - word_similarity）从 GiST 索引中有序取出，
+# 取够即停；包含关键词的名称距离为 0，排在最前。排序只在候选行中进行
+SEARCH_CANDIDATE_LIMIT = 50
+# 关键词至少这么长时才匹配营业执照编号（编号 18 位，短片段会匹配大量行）
+LICENSE_MIN_KEYWORD_LENGTH = 6
+
+# 需要生成拼音的表：(表名, 主键列, 名称列)
+PINYIN_TARGETS = (
+    ("enterprise_info", "enterprise_id", "company_name"),
+    ("contractor_info", "contractor_id", "company_name"),
+    ("users", "user_id", "name_str"),
+)
+
+COMPANY_MODELS = {
+    "enterprise": (EnterpriseInfo, EnterpriseInfo.enterprise_id),
+    "contractor": (ContractorInfo, ContractorInfo.contractor_id),
+}
+
+
+def pinyin_available() -> bool:
+    return lazy_pinyin is not None
+
+
+def to_pinyin(name: Optional[str]) -> Optional[str]:
+    """名称 -> "全拼 首字母"（小写，无空格），未安装 pypinyin 时返回 None"""
+    if lazy_pinyin is None or not name:
+        return None
+    full = "".join(lazy_pinyin(name)).replace(" ", "").lower()
+    initials = "".join(lazy_pinyin(name, style=Style.FIRST_LETTER)).replace(" ", "").lower()
+    return full if full == initials else f"{full} {initials}"
+
+
+def _pinyin_keyword(keyword: str) -> Optional[str]:
+    """纯字母关键词按拼音匹配（"bei jing" -> "beijing"），否则返回 None"""
+    compact = keyword.replace(" ", "").lower()
+    if compact and compact.isascii() and compact.isalpha():
+        return compact
+    return None
+
+
+def keyword_filter(keyword: str, *columns, pinyin_column=None):
+    """
+    关键词模糊匹配条件：任一列包含关键词（不区分大小写）
+
+    pinyin_column 为 name_pinyin 列时，纯字母关键词还会匹配拼音（全拼或首字母）
+    """
+    keyword = keyword.strip()
+    # ILIKE '%kw%'，autoescape 转义关键词中的 % 和 _
+    conditions = [column.icontains(keyword, autoescape=True) for column in columns]
+    pinyin_keyword = _pinyin_keyword(keyword)
+    if pinyin_column is not None and pinyin_keyword:
+        conditions.append(pinyin_column.contains(pinyin_keyword))
+    return or_(*conditions)
+
+
+def company_search_query(
+    company_type: str,
+    keyword: str,
+    limit: int = 10,
+    company_ids: Optional[Sequence[int]] = None,
+    business_status: Optional[str] = None,
+):
+    """
+    输入提示查询，没有可搜索的内容时返回 None
+
+    候选行取自（UNION 去重）：
+    - 名称与关键词距离最近的 SEARCH_CANDIDATE_LIMIT 行（GiST 索引有序扫描，取够即停）
+    - 纯字母关键词：拼音与关键词距离最近的 SEARCH_CANDIDATE_LIMIT 行
+    - 关键词不短于 LICENSE_MIN_KEYWORD_LENGTH 时：营业执照编号包含关键词的行
+    "公司"、"有限" 这类几乎每行都包含的关键词也只取出固定数量的候选行，不会扫描和排序整张表
+    """
+    model, id_column = COMPANY_MODELS[company_type]
+    keyword = keyword.strip()
+    if not keyword or (company_ids is not None and not company_ids):
+        return None
+
+    scope = [model.is_deleted == False]
+    if company_ids is not None:
+        scope.append(id_column.in_(company_ids))
+    if business_status:
+        scope.append(model.business_status == business_status)
+
+    def nearest(column, value):
+        return select(id_column.label("company_id")).where(*scope, column.isnot(None)).order_by(
+            literal(value).op("<<->")(column)
+        ).limit(SEARCH_CANDIDATE_LIMIT).subquery()
+
+    pinyin_keyword = _pinyin_keyword(keyword)
+    sources = [nearest(model.company_name, keyword)]
+    if pinyin_keyword:
+        sources.append(nearest(model.name_pinyin, pinyin_keyword))
+    if len(keyword) >= LICENSE_MIN_KEYWORD_LENGTH:
+        sources.append(select(id_column.label("company_id")).where(
+            *scope, model.license_number.icontains(keyword, autoescape=True)
+        ).limit(SEARCH_CANDIDATE_LIMIT).subquery())
+    candidates = union(*(select(source.c.company_id) for source in sources)).subquery()
+
+    # 候选行中只返回真正匹配的行（最近的行不一定相似）
+    match = or_(
+        keyword_filter(keyword, model.company_name, model.license_number, pinyin_column=model.name_pinyin),
+        literal(keyword).op("<%")(model.company_name),  # word_similarity 超过阈值（错别字、漏字）
+    )
+    score = func.word_similarity(keyword, model.company_name)
+    if pinyin_keyword:
+        score = func.greatest(score, func.word_similarity(pinyin_keyword, func.coalesce(model.name_pinyin, "")))
+    prefix = case((model.company_name.istartswith(keyword, autoescape=True), 1), else_=0)
+    return select(
+        id_column.label("company_id"),
+        model.company_name,
+        model.license_number,
+        model.business_status,
+        score.label("score"),
+    ).where(
+        id_column.in_(select(candidates.c.company_id)), match
+    ).order_by(prefix.desc(), score.desc(), model.company_name).limit(limit)
+
+
+async def search_companies(
+    engine,
+    company_type: str,
+    keyword: str,
+    limit: int = 10,
+    company_ids: Optional[Sequence[int]] = None,
+    business_status: Optional[str] = None,
+) -> List[dict]:
+    """
+    企业/承包商输入提示
+
+    匹配公司名称、营业执照编号、拼音，以及与关键词相似的名称（容错输入），
+    按 名称前缀匹配 > 相似度 排序。company_ids 不为 None 时只在这些 id 中搜索（见 company_search_query）
+    """
+    from db.connection import get_session
+
+    query = company_search_query(company_type, keyword, limit, company_ids, business_status)
+    if query is None:
+        return []
+
+    async with get_session(engine) as session:
+        result = await session.exec(query)
+        rows = result.all()
+    return [
+        {
+            "company_id": row.company_id,
+            "company_name": row.company_name,
+            "license_number": row.license_number,
+            "business_status": row.business_status,
+            "score": round(float(row.score or 0), 3),
+        }
+        for row in rows
+    ]
+
+
+def encode_cursor(*values) -> str:
+    """游标：上一页最后一行的排序键，base64url 编码的 JSON"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """解析游标，格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("无效的分页游标") from e
+    if not isinstance(values, list):
+        raise ValueError("无效的分页游标")
+    return values
+
+
+async def pick_enterprises(
+    engine,
+    keyword: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    exclude_contractor_id: Optional[int] = None,
+) -> Tuple[list, Optional[str]]:
+    """
+    企业选择器：未删除的续存企业，按公司名称排序，游标分页
+
+    - keyword: 匹配公司名称、营业执照编号、拼音
+    - exclude_contractor_id: 排除已与该承包商合作（allowed_contractor_ids）
+      或该承包商申请中（candidate_contractor_ids）的企业，在 SQL 中过滤
+    返回 (items, next_cursor)，没有下一页时 next_cursor 为 None；游标无效时抛出 ValueError
+    """
+    from db.connection import get_session
+
+    conditions = [EnterpriseInfo.is_deleted == False, EnterpriseInfo.business_status == "续存"]
+    if keyword and keyword.strip():
+        conditions.append(keyword_filter(
+            keyword, EnterpriseInfo.company_name, EnterpriseInfo.license_number,
+            pinyin_column=EnterpriseInfo.name_pinyin,
+        ))
+    if exclude_contractor_id is not None:
+        conditions.append(not_(or_(
+            EnterpriseInfo.allowed_contractor_ids.contains([exclude_contractor_id]),
+            EnterpriseInfo.candidate_contractor_ids.contains([exclude_contractor_id]),
+        )))
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int):
+            raise ValueError("无效的分页游标")
+        last_name, last_id = values
+        # 行比较可以直接作为 idx_enterprise_picker 的范围扫描条件
+        conditions.append(tuple_(EnterpriseInfo.company_name, EnterpriseInfo.enterprise_id) > tuple_(last_name, last_id))
+
+    # 多取一行判断是否还有下一页
+    query = select(
+        EnterpriseInfo.enterprise_id,
+        EnterpriseInfo.company_name,
+        EnterpriseInfo.license_number,
+    ).where(*conditions).order_by(
+        EnterpriseInfo.company_name, EnterpriseInfo.enterprise_id
+    ).limit(limit + 1)
+
+    async with get_session(engine) as session:
+        result = await session.exec(query)
+        rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].company_name, rows[-1].enterprise_id)
+    items = [
+        {"id": row.enterprise_id, "name": row.company_name, "license_number": row.license_number}
+        for row in rows
+    ]
+    return items, next_cursor
+
+
+async def refresh_pinyin(engine, batch_size: int = 500) -> int:
+    """
+    为 name_pinyin 为空的行生成拼音，返回处理的行数；多个 worker 同时执行时互不阻塞
+
+    企业、承包商表的 updated_at 触发器忽略只修改 name_pinyin 的更新（见 db/migrate_trigram_search.sql），
+    这里的批量更新不会改写更新时间
+    """
+    if not pinyin_available():
+        return 0
+    total = 0
+    for table, id_column, name_column in PINYIN_TARGETS:
+        while True:
+            async with engine.begin() as conn:
+                result = await conn.execute(text(f"""
+                    SELECT {id_column}, {name_column} FROM {table}
+                    WHERE name_pinyin IS NULL AND {name_column} IS NOT NULL
+                    ORDER BY {id_column}
+                    LIMIT :batch_size
+                    FOR UPDATE SKIP LOCKED
+                """), {"batch_size": batch_size})
+                rows = result.all()
+                if not rows:
+                    break
+                await conn.execute(text(f"""
+                    UPDATE {table} AS t SET name_pinyin = v.name_pinyin
+                    FROM unnest(CAST(:ids AS integer[]), CAST(:values AS text[])) AS v(id, name_pinyin)
+                    WHERE t.{id_column} = v.id
+                """), {
+                    "ids": [row[0] for row in rows],
+                    "values": [to_pinyin(row[1]) or "" for row in rows],
+                })
+            total += len(rows)
+            if len(rows) < batch_size:
+                break
+    return total
+
+
+async def run_pinyin_refresher(engine, interval: float) -> None:
+    """后台定期补齐拼音（新增或改名的企业、承包商、用户）"""
+    while True:
+        try:
+            count = await refresh_pinyin(engine)
+            if count:
+                print(f"🔤 已生成 {count} 条名称拼音")
+        except Exception as e:
+            print(f"⚠️ 生成名称拼音失败: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,102 @@
+"""
+员工批量导入写库
+Bulk staff account insertion via COPY
+
+- find_taken_accounts 用一条查询找出文件中已被占用的用户名（手机号）、手机号、邮箱
+- insert_staff_accounts 用 COPY 把账号写入临时表，再 INSERT ... SELECT ... ON CONFLICT DO NOTHING
+  写入 users：检查之后其他请求并发注册了同一手机号时，该行跳过而不是整批失败
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.staff_import import ImportRow
+
+
+_STAGING_COLUMNS = ("row_no", "username", "password_hash", "phone", "email", "name_str", "work_type")
+
+
+async def find_taken_accounts(engine: AsyncEngine, rows: List[ImportRow]) -> Tuple[Set[str], Set[str]]:
+    """返回 (已被占用的手机号, 已被占用的邮箱)；手机号同时作为用户名，两者都要检查"""
+    phones = [row.phone for row in rows]
+    emails = [row.email for row in rows if row.email]
+    async with engine.connect() as conn:
+        result = await conn.execute(text("""
+            SELECT username, phone, email FROM users
+            WHERE username = ANY(CAST(:phones AS text[]))
+               OR (is_deleted = false AND phone = ANY(CAST(:phones AS text[])))
+               OR (is_deleted = false AND email = ANY(CAST(:emails AS text[])))
+        """), {"phones": phones, "emails": emails})
+        taken_phones: Set[str] = set()
+        taken_emails: Set[str] = set()
+        phone_set, email_set = set(phones), set(emails)
+        for username, phone, email in result.all():
+            taken_phones.update(value for value in (username, phone) if value in phone_set)
+            if email in email_set:
+                taken_emails.add(email)
+    return taken_phones, taken_emails
+
+
+async def insert_staff_accounts(
+    engine: AsyncEngine,
+    rows: List[ImportRow],
+    password_hashes: List[str],
+    user_type: str,
+    role_type: str,
+    role_level: int,
+    enterprise_staff_id: Optional[int] = None,
+    contractor_staff_id: Optional[int] = None,
+) -> Dict[int, int]:
+    """
+    写入员工账号（已通过审核），返回 {行号: user_id}
+
+    未出现在结果中的行因唯一约束冲突被跳过（检查之后被并发占用）
+    """
+    now = datetime.now()
+    records = [
+        (row.row_no, row.phone, password_hash, row.phone, row.email, row.name, row.work_type)
+        for row, password_hash in zip(rows, password_hashes)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            CREATE TEMP TABLE staff_import (
+                row_no INTEGER,
+                username VARCHAR(50),
+                password_hash VARCHAR(255),
+                phone VARCHAR(20),
+                email VARCHAR(100),
+                name_str VARCHAR(100),
+                work_type VARCHAR(100)
+            ) ON COMMIT DROP
+        """))
+        # COPY 走 asyncpg 原生连接，与上面的语句在同一个事务中
+        raw_connection = await conn.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "staff_import", records=records, columns=_STAGING_COLUMNS
+        )
+        result = await conn.execute(text("""
+            INSERT INTO users (
+                username, password_hash, user_type, enterprise_staff_id, contractor_staff_id,
+                phone, email, name_str, role_type, role_level, user_status, work_type,
+                created_at, updated_at
+            )
+            SELECT
+                username, password_hash, :user_type, :enterprise_staff_id, :contractor_staff_id,
+                phone, email, name_str, :role_type, :role_level, 1, work_type,
+                :now, :now
+            FROM staff_import
+            ORDER BY row_no
+            ON CONFLICT DO NOTHING
+            RETURNING user_id, username
+        """), {
+            "user_type": user_type,
+            "enterprise_staff_id": enterprise_staff_id,
+            "contractor_staff_id": contractor_staff_id,
+            "role_type": role_type,
+            "role_level": role_level,
+            "now": now,
+        })
+        user_ids = {username: user_id for user_id, username in result.all()}
+    return {row.row_no: user_ids[row.phone] for row in rows if row.phone in user_ids}
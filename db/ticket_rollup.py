@@ -0,0 +1,200 @@
+"""
+作业票日统计
+Daily ticket rollups by area, hazard and hot-work level
+
+ticket_daily_stats（见 db/migrate_ticket_daily_stats.sql）按 (企业, 日期, 区域, 动火等级, 作业高度等级)
+保存作业票数和危险识别各位的计数，由 ticket 上的触发器增量维护。报表按任意日期范围汇总这张表，
+不再读取 ticket 原始行并在 Python 中解码 danger 位掩码。
+
+企业为作业票申请时申请人所属的企业（ticket.stats_enterprise_id，由触发器在插入或更换申请人时填写），
+申请人之后更换企业不会把已有作业票移到新企业，删改作业票时也从原来的统计行中减去，统计不会漂移。
+
+回填（建表后、或手工修改 ticket 数据后执行）:
+    python -m db.ticket_rollup backfill [--start 2026-01-01] [--end 2026-03-31]
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from db.encode_data import (
+    DANGER_OPTIONS,
+    get_hot_work_level_name,
+    get_work_height_level_name,
+)
+
+
+# danger_counts 数组长度（INTEGER 位掩码的位数）
+DANGER_BITS = 32
+
+# 报表时间粒度（date_trunc 的单位）
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+
+def hazard_name(bit: int) -> str:
+    """danger 第 bit 位（从最低位数起）对应的危险识别选项；encode_options 把第一个选项编码在最高位"""
+    index = len(DANGER_OPTIONS) - 1 - bit
+    return DANGER_OPTIONS[index] if 0 <= index < len(DANGER_OPTIONS) else f"未知({bit})"
+
+
+def _danger_sums(column: str) -> str:
+    return ", ".join(f"sum(({column} >> {bit}) & 1)::INTEGER" for bit in range(DANGER_BITS))
+
+
+async def backfill_ticket_rollup(
+    engine, start: Optional[date] = None, end: Optional[date] = None, chunk_days: int = 31
+) -> int:
+    """
+    按 ticket 原始数据重新计算日期范围内的统计，返回写入的统计行数
+
+    不指定范围时为 ticket 中最早到最晚的申请日期。按 chunk_days 分段，每段一个事务，
+    事务内以 SHARE 模式锁住 ticket：回填期间该段的统计不会被并发写入打乱，作业票写入只阻塞一段的时间
+    """
+    if start is None or end is None:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT min(apply_date), max(apply_date) FROM ticket"))
+            first_day, last_day = result.one()
+        if first_day is None:
+            return 0
+        start = start or first_day
+        end = end or last_day
+
+    total = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        async with engine.begin() as conn:
+            await conn.execute(text("LOCK TABLE ticket IN SHARE MODE"))
+            params = {"start": chunk_start, "end": chunk_end}
+            await conn.execute(text("DELETE FROM ticket_daily_stats WHERE day BETWEEN :start AND :end"), params)
+            result = await conn.execute(text(f"""
+                INSERT INTO ticket_daily_stats (
+                    enterprise_id, day, area_id, hot_work, work_height_level, ticket_count, danger_counts
+                )
+                SELECT
+                    t.stats_enterprise_id, t.apply_date, COALESCE(t.area_id, 0),
+                    t.hot_work, t.work_height_level, count(*), ARRAY[{_danger_sums("t.danger")}]
+                FROM ticket t
+                WHERE t.apply_date BETWEEN :start AND :end
+                GROUP BY 1, 2, 3, 4, 5
+            """), params)
+            total += result.rowcount
+        print(f"📈 作业票日统计已回填 {chunk_start} ~ {chunk_end}")
+        chunk_start = chunk_end + timedelta(days=1)
+    return total
+
+
+async def query_ticket_stats(
+    engine,
+    start: date,
+    end: date,
+    granularity: str = "day",
+    enterprise_id: Optional[int] = None,
+    area_id: Optional[int] = None,
+    hot_work: Optional[int] = None,
+    work_height_level: Optional[int] = None,
+) -> dict:
+    """
+    汇总日期范围内的作业票统计
+
+    返回总数、按时间粒度的趋势、按区域/动火等级/作业高度等级的分布，以及危险识别出现次数（降序）
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"不支持的时间粒度: {granularity}")
+
+    conditions = ["day BETWEEN :start AND :end"]
+    params = {"start": start, "end": end, "granularity": granularity}
+    for column, value in (
+        ("enterprise_id", enterprise_id),
+        ("area_id", area_id),
+        ("hot_work", hot_work),
+        ("work_height_level", work_height_level),
+    ):
+        if value is not None:
+            conditions.append(f"{column} = :{column}")
+            params[column] = value
+    where = " AND ".join(conditions)
+
+    async with engine.connect() as conn:
+        # 一次 GROUPING SETS 得到趋势和三个维度的分布；GROUPING() 为 0 的位表示按该列分组
+        result = await conn.execute(text(f"""
+            WITH filtered AS (
+                SELECT date_trunc(:granularity, day)::DATE AS period, area_id, hot_work, work_height_level, ticket_count
+                FROM ticket_daily_stats
+                WHERE {where}
+            )
+            SELECT GROUPING(period, area_id, hot_work, work_height_level) AS grouping_id,
+                   period, area_id, hot_work, work_height_level, sum(ticket_count) AS ticket_count
+            FROM filtered
+            GROUP BY GROUPING SETS ((period), (area_id), (hot_work), (work_height_level))
+        """), params)
+        grouped_rows = result.all()
+
+        result = await conn.execute(text(f"""
+            SELECT d.bit_position - 1 AS bit_index, sum(d.bit_count) AS bit_count
+            FROM ticket_daily_stats, unnest(danger_counts) WITH ORDINALITY AS d(bit_count, bit_position)
+            WHERE {where}
+            GROUP BY d.bit_position
+            HAVING sum(d.bit_count) > 0
+        """), params)
+        hazard_rows = result.all()
+
+    series, by_area, by_hot_work, by_height = [], [], [], []
+    for grouping_id, period, row_area_id, row_hot_work, row_height, count in grouped_rows:
+        count = int(count)
+        if not count:
+            continue
+        if grouping_id == 0b0111:
+            series.append({"period": period.isoformat(), "count": count})
+        elif grouping_id == 0b1011:
+            by_area.append({"area_id": row_area_id or None, "count": count})
+        elif grouping_id == 0b1101:
+            by_hot_work.append({"hot_work": row_hot_work, "name": get_hot_work_level_name(row_hot_work), "count": count})
+        elif grouping_id == 0b1110:
+            by_height.append({
+                "work_height_level": row_height, "name": get_work_height_level_name(row_height), "count": count,
+            })
+
+    series.sort(key=lambda item: item["period"])
+    by_area.sort(key=lambda item: -item["count"])
+    by_hot_work.sort(key=lambda item: item["hot_work"])
+    by_height.sort(key=lambda item: item["work_height_level"])
+    hazards = sorted(
+        ({"hazard": hazard_name(bit), "count": int(count)} for bit, count in hazard_rows),
+        key=lambda item: -item["count"],
+    )
+    return {
+        "total": sum(item["count"] for item in series),
+        "series": series,
+        "by_area": by_area,
+        "by_hot_work": by_hot_work,
+        "by_work_height_level": by_height,
+        "hazards": hazards,
+    }
+
+
+def _parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="作业票日统计")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser("backfill", help="按 ticket 原始数据回填统计")
+    backfill.add_argument("--start", type=date.fromisoformat, default=None, help="开始日期（默认最早的申请日期）")
+    backfill.add_argument("--end", type=date.fromisoformat, default=None, help="结束日期（默认最晚的申请日期）")
+    backfill.add_argument("--chunk-days", type=int, default=31, help="每个事务回填的天数")
+    return parser.parse_args(argv)
+
+
+async def _main(args) -> None:
+    from db.connection import create_engine
+
+    engine = create_engine()
+    try:
+        count = await backfill_ticket_rollup(engine, args.start, args.end, args.chunk_days)
+        print(f"✅ 作业票日统计回填完成，共 {count} 行")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(_parse_args()))
@@ -0,0 +1,126 @@
+"""
+管理员数量下限并发测试
+Parallel admin demotion stress test
+
+企业必须至少保留 3 个通过审核的企业管理员（降级时"其他管理员"不少于 3 个）。
+本脚本取压测数据中的一个企业，把若干员工提升为通过审核的企业管理员（共 --admins 个），
+然后以该企业的主管理员身份并发请求把其余管理员全部降级为员工：
+    PUT /enterprise-backend/user-management/users/{user_id}/status/?role_level=2
+检查通过后该企业应恰好剩下 3 个通过审核的管理员；没有加锁时多个请求会同时通过检查，剩余数量低于 3。
+
+运行方式（服务需已启动，需已生成压测数据）:
+    python local_test/admin_quorum_stress.py --admins 10 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncpg
+import httpx
+
+from config import settings
+from db.notify import to_asyncpg_dsn
+
+LOCAL_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(LOCAL_TEST_DIR, "bench_dataset.json")
+MIN_ADMINS = 3
+
+
+async def prepare_admins(conn: asyncpg.Connection, main_admin: str, total: int):
+    """把主管理员所在企业的员工提升为管理员，使通过审核的管理员共 total 个，返回 (企业ID, 待降级的用户ID)"""
+    enterprise_id = await conn.fetchval("SELECT enterprise_staff_id FROM users WHERE username = $1", main_admin)
+    if enterprise_id is None:
+        raise SystemExit(f"❌ 找不到管理员 {main_admin}，请先生成压测数据")
+    async with conn.transaction():
+        # 先把除主管理员外的管理员降为员工，再按 user_id 提升 total - 1 个员工
+        await conn.execute("""
+            UPDATE users SET role_level = 2
+            WHERE enterprise_staff_id = $1 AND role_level = 1 AND username <> $2
+        """, enterprise_id, main_admin)
+        rows = await conn.fetch("""
+            UPDATE users SET role_level = 1, user_status = 1
+            WHERE user_id IN (
+                SELECT user_id FROM users
+                WHERE enterprise_staff_id = $1 AND user_type = 'enterprise' AND username <> $2
+                ORDER BY user_id LIMIT $3
+            )
+            RETURNING user_id
+        """, enterprise_id, main_admin, total - 1)
+    if len(rows) < total - 1:
+        raise SystemExit(f"❌ 企业 {enterprise_id} 的员工不足 {total - 1} 个")
+    return enterprise_id, [row["user_id"] for row in rows]
+
+
+async def count_admins(conn: asyncpg.Connection, enterprise_id: int) -> int:
+    return await conn.fetchval("""
+        SELECT count(*) FROM users
+        WHERE enterprise_staff_id = $1 AND role_level = 1 AND user_status = 1
+    """, enterprise_id)
+
+
+async def run_round(client: httpx.AsyncClient, conn: asyncpg.Connection, token: str, main_admin: str, total: int) -> bool:
+    enterprise_id, targets = await prepare_admins(conn, main_admin, total)
+    headers = {"Authorization": f"Bearer {token}"}
+    barrier = asyncio.Event()
+
+    async def demote(user_id: int) -> int:
+        await barrier.wait()
+        response = await client.put(
+            f"/enterprise-backend/user-management/users/{user_id}/status/",
+            params={"role_level": 2}, headers=headers,
+        )
+        return response.status_code
+
+    tasks = [asyncio.create_task(demote(user_id)) for user_id in targets]
+    await asyncio.sleep(0.1)
+    barrier.set()
+    statuses = await asyncio.gather(*tasks)
+
+    remaining = await count_admins(conn, enterprise_id)
+    succeeded = statuses.count(200)
+    expected_success = total - MIN_ADMINS
+    ok = remaining == MIN_ADMINS and succeeded == expected_success
+    print(f"{'✅' if ok else '❌'} 企业 {enterprise_id}: {len(targets)} 个并发降级，成功 {succeeded}"
+          f"（预期 {expected_success}），剩余管理员 {remaining}（预期 {MIN_ADMINS}），"
+          f"其他状态码 {sorted(set(s for s in statuses if s != 200))}")
+    return ok
+
+
+async def main_async(args) -> None:
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+    main_admin = manifest["enterprise_admins"][0]
+
+    conn = await asyncpg.connect(to_asyncpg_dsn(settings.database_url))
+    limits = httpx.Limits(max_connections=args.admins + 5)
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+            response = await client.post("/token", data={"username": main_admin, "password": manifest["password"]})
+            response.raise_for_status()
+            token = response.json()["access_token"]
+            results = [await run_round(client, conn, token, main_admin, args.admins) for _ in range(args.rounds)]
+    finally:
+        await conn.close()
+
+    sys.exit(0 if all(results) else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="管理员数量下限并发测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="generate_dataset.py 写出的压测清单")
+    parser.add_argument("--admins", type=int, default=10, help="每轮开始时通过审核的管理员数（含主管理员）")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+    if args.admins <= MIN_ADMINS:
+        parser.error(f"--admins 必须大于 {MIN_ADMINS}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+仪表盘统计耗时与计数准确性测试
+Dashboard summary latency and drift check
+
+1. 对账一次：触发器维护正确时修正行数应为 0（首次执行前请先执行 db/migrate_dashboard_stats.sql）
+2. 统计全局和若干企业的 get_dashboard_stats 延迟（p50/p99），对比直接按原表统计（dashboard_stats_actual）的耗时
+
+运行方式（项目根目录，需已生成压测数据）:
+    python local_test/bench_dashboard.py --rounds 500 --budget-ms 10
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from db.connection import create_engine
+from db.dashboard import get_dashboard_stats, reconcile_dashboard_stats
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+async def main_async(args) -> None:
+    engine = create_engine()
+    try:
+        corrected = await reconcile_dashboard_stats(engine)
+        print(f"{'✅' if corrected == 0 else '⚠️'} 对账修正行数: {corrected}")
+
+        async with engine.connect() as conn:
+            enterprise_ids = (await conn.execute(text(
+                "SELECT enterprise_id FROM enterprise_info WHERE is_deleted = false ORDER BY enterprise_id LIMIT 1000"
+            ))).scalars().all()
+            start = time.perf_counter()
+            await conn.execute(text("SELECT count(*) FROM dashboard_stats_actual"))
+            actual_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(args.seed)
+        timings = []
+        for _ in range(args.rounds):
+            enterprise_id = 0 if not enterprise_ids or rng.random() < 0.5 else rng.choice(enterprise_ids)
+            start = time.perf_counter()
+            await get_dashboard_stats(engine, enterprise_id)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p50, p99 = percentile(timings, 50), percentile(timings, 99)
+        print(f"📊 汇总表读取 {args.rounds} 次: p50={p50:.2f}ms p99={p99:.2f}ms；按原表实时统计一次: {actual_ms:.1f}ms")
+        print(f"{'✅' if p99 <= args.budget_ms else '❌'} p99 {'未超过' if p99 <= args.budget_ms else '超过'} {args.budget_ms}ms")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="仪表盘统计耗时与计数准确性测试")
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--budget-ms", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+输入提示搜索耗时测试
+Typeahead search latency benchmark
+
+直接调用 db.search.search_companies（不经过 HTTP），统计不同类型关键词的 p50/p95/p99 延迟，
+并输出一条查询的执行计划，确认候选行由三元组 GiST 索引按距离有序取出（Index Scan ... Order By），
+没有对全部匹配行排序。"common" 类关键词（"公司"、"有限" 等）几乎匹配每一行，用来确认耗时不随匹配行数增长。
+
+准备数据（项目根目录，需已执行 db/migrate_trigram_search.sql）:
+    python local_test/generate_dataset.py --replace --enterprises 100 --contractors 100000 \
+        --staff-per-company 0 --unassigned-users 0 --tickets 0
+运行:
+    python local_test/bench_search.py --rounds 200 --budget-ms 10
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from db.connection import create_engine
+from db.search import company_search_query, pinyin_available, refresh_pinyin, search_companies, to_pinyin
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def build_keywords(rng: random.Random, names, use_pinyin: bool):
+    """按类型生成关键词：名称前缀、名称片段、错一个字、几乎每行都包含的词、拼音首字母"""
+    keywords = {"prefix": [], "substring": [], "typo": [], "common": ["公司", "有限", "有限公司", "科技"]}
+    if use_pinyin:
+        keywords["pinyin"] = []
+    for name in rng.sample(names, min(len(names), 50)):
+        keywords["prefix"].append(name[:max(2, len(name) // 2)])
+        start = rng.randint(1, max(1, len(name) - 4))
+        keywords["substring"].append(name[start:start + 4])
+        position = rng.randrange(len(name))
+        keywords["typo"].append(name[:position] + "某" + name[position + 1:])
+        if use_pinyin:
+            keywords["pinyin"].append(to_pinyin(name).split(" ")[-1][:4])
+    return keywords
+
+
+async def main_async(args) -> None:
+    engine = create_engine()
+    try:
+        if pinyin_available():
+            count = await refresh_pinyin(engine)
+            print(f"🔤 已生成 {count} 条名称拼音")
+        else:
+            print("未安装 pypinyin，跳过拼音关键词")
+
+        async with engine.connect() as conn:
+            table = "enterprise_info" if args.company_type == "enterprise" else "contractor_info"
+            total = (await conn.execute(text(f"SELECT count(*) FROM {table} WHERE is_deleted = false"))).scalar()
+            names = [row[0] for row in await conn.execute(
+                text(f"SELECT company_name FROM {table} WHERE is_deleted = false ORDER BY random() LIMIT 1000")
+            )]
+        if not names:
+            raise SystemExit(f"❌ {table} 中没有数据，请先生成压测数据")
+        print(f"📊 {table}: {total} 行")
+
+        rng = random.Random(args.seed)
+        keywords = build_keywords(rng, names, pinyin_available())
+
+        # 预热连接和执行计划缓存
+        for keyword in keywords["prefix"][:10]:
+            await search_companies(engine, args.company_type, keyword, limit=args.limit)
+
+        ok = True
+        print(f"{'关键词类型':<12}{'次数':>8}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'平均结果数':>10}")
+        for kind, values in keywords.items():
+            latencies = []
+            results = 0
+            for _ in range(args.rounds):
+                keyword = rng.choice(values)
+                start = time.perf_counter()
+                items = await search_companies(engine, args.company_type, keyword, limit=args.limit)
+                latencies.append(time.perf_counter() - start)
+                results += len(items)
+            latencies.sort()
+            p95 = percentile(latencies, 95) * 1000
+            print(f"{kind:<12}{len(latencies):>8}{percentile(latencies, 50) * 1000:>9.2f}"
+                  f"{p95:>9.2f}{percentile(latencies, 99) * 1000:>9.2f}{results / len(latencies):>10.1f}")
+            if p95 > args.budget_ms:
+                ok = False
+
+        if args.explain:
+            for keyword in (keywords["substring"][0], keywords["common"][0]):
+                query = company_search_query(args.company_type, keyword, limit=args.limit).compile(
+                    dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+                )
+                async with engine.connect() as conn:
+                    plan = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {query}")
+                    print(f"\n执行计划（关键词 {keyword!r}）:")
+                    for row in plan:
+                        print(f"  {row[0]}")
+    finally:
+        await engine.dispose()
+
+    if ok:
+        print(f"✅ 各类关键词 p95 均在 {args.budget_ms}ms 以内")
+    else:
+        print(f"❌ 存在 p95 超过 {args.budget_ms}ms 的关键词类型")
+    sys.exit(0 if ok else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="输入提示搜索耗时测试")
+    parser.add_argument("--company-type", choices=("enterprise", "contractor"), default="contractor")
+    parser.add_argument("--rounds", type=int, default=200, help="每类关键词的查询次数")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=10, help="p95 延迟预算（毫秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-explain", dest="explain", action="store_false", help="不输出执行计划")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+员工批量导入耗时测试
+Bulk staff import benchmark
+
+生成一个 N 行的员工 CSV（随机手机号，含少量故意写错的行），以企业管理员身份调用
+POST /enterprise-backend/user-management/users/import/，输出耗时、导入结果，
+并把错误报告保存到 local_test/staff_import_errors.csv。
+导入期间并发请求 /openapi.json（不访问数据库）测量事件循环是否被阻塞（密码哈希在进程池中计算，延迟应保持在毫秒级）。
+
+运行方式（服务需已启动，需已生成压测数据）:
+    python local_test/bench_staff_import.py --rows 500
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+LOCAL_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(LOCAL_TEST_DIR, "bench_dataset.json")
+IMPORT_PATH = "/enterprise-backend/user-management/users/import/"
+
+
+def build_csv(rows: int, bad_ratio: float, seed: int) -> bytes:
+    rng = random.Random(seed)
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["姓名", "手机号", "邮箱", "工种"])
+    for i in range(rows):
+        phone = f"19{rng.randrange(10 ** 9):09d}"
+        if rng.random() < bad_ratio:
+            phone = phone[:7]  # 格式错误的行
+        writer.writerow([f"导入员工{i:05d}", phone, "", rng.choice(["电工", "焊工", "架子工", ""])])
+    return output.getvalue().encode("utf-8-sig")
+
+
+async def probe_latency(client: httpx.AsyncClient, stop: asyncio.Event, samples: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/openapi.json")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def main_async(args) -> None:
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+    content = build_csv(args.rows, args.bad_ratio, args.seed)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        response = await client.post("/token", data={
+            "username": manifest["enterprise_admins"][0], "password": manifest["password"],
+        })
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        stop = asyncio.Event()
+        samples: list = []
+        probe = asyncio.create_task(probe_latency(client, stop, samples))
+        start = time.perf_counter()
+        response = await client.post(
+            IMPORT_PATH, params={"report_format": "csv"}, headers=headers,
+            files={"file": ("staff.csv", content, "text/csv")},
+        )
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+
+    response.raise_for_status()
+    report_path = os.path.join(LOCAL_TEST_DIR, "staff_import_errors.csv")
+    with open(report_path, "wb") as f:
+        f.write(response.content)
+    samples.sort()
+    print(f"✅ 导入 {args.rows} 行耗时 {elapsed:.2f}s: 成功 {response.headers.get('X-Import-Created')}，"
+          f"失败 {response.headers.get('X-Import-Failed')}，错误报告: {report_path}")
+    if samples:
+        print(f"📊 导入期间 /openapi.json 延迟: p50={samples[len(samples) // 2]:.1f}ms max={samples[-1]:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="员工批量导入耗时测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="generate_dataset.py 写出的压测清单")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--bad-ratio", type=float, default=0.02, help="故意写错手机号的行比例")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=300)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
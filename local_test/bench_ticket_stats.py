@@ -0,0 +1,80 @@
+"""
+作业票统计耗时测试
+Ticket rollup query benchmark
+
+对比两种方式统计最近一个季度的作业票（按动火等级分布和危险识别出现次数）：
+1. 读取 ticket 原始行，在 Python 中用 decode_danger 解码（原来的做法）
+2. db.ticket_rollup.query_ticket_stats 汇总日统计表
+并检查两者结果一致（需已执行 db/migrate_ticket_daily_stats.sql 和 python -m db.ticket_rollup backfill）。
+
+运行方式（项目根目录，需已生成压测数据）:
+    python local_test/bench_ticket_stats.py --days 90
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from db.connection import create_engine
+from db.encode_data import decode_danger
+from db.ticket_rollup import query_ticket_stats
+
+
+async def raw_stats(engine, start, end):
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            "SELECT hot_work, danger FROM ticket WHERE apply_date BETWEEN :start AND :end"
+        ), {"start": start, "end": end})
+        rows = result.all()
+    by_hot_work = Counter(hot_work for hot_work, _ in rows)
+    hazards = Counter(hazard for _, danger in rows for hazard in decode_danger(danger))
+    return len(rows), by_hot_work, hazards
+
+
+async def main_async(args) -> None:
+    engine = create_engine()
+    try:
+        async with engine.connect() as conn:
+            end = (await conn.execute(text("SELECT max(apply_date) FROM ticket"))).scalar()
+        if end is None:
+            print("❌ ticket 表没有数据，请先生成压测数据")
+            return
+        start = end - timedelta(days=args.days - 1)
+
+        begin = time.perf_counter()
+        raw_total, raw_by_hot_work, raw_hazards = await raw_stats(engine, start, end)
+        raw_ms = (time.perf_counter() - begin) * 1000
+
+        begin = time.perf_counter()
+        stats = await query_ticket_stats(engine, start, end, args.granularity)
+        rollup_ms = (time.perf_counter() - begin) * 1000
+
+        same = (
+            stats["total"] == raw_total
+            and {item["hot_work"]: item["count"] for item in stats["by_hot_work"]} == dict(raw_by_hot_work)
+            and {item["hazard"]: item["count"] for item in stats["hazards"]} == dict(raw_hazards)
+        )
+        print(f"📊 {start} ~ {end}: {raw_total} 张作业票")
+        print(f"   原始行 + Python 解码: {raw_ms:.1f}ms")
+        print(f"   日统计表汇总: {rollup_ms:.1f}ms")
+        print(f"{'✅' if same else '❌'} 两种方式结果{'一致' if same else '不一致，请执行 python -m db.ticket_rollup backfill'}")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="作业票统计耗时测试")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--granularity", default="week", choices=["day", "week", "month", "quarter", "year"])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
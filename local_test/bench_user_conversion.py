@@ -0,0 +1,121 @@
+"""
+用户模型转换微基准测试
+User conversion microbenchmark
+
+对比 api.model_trans.convert_user_db_to_response（构建一次的转换函数 + 免校验构造）
+与原实现（逐字段 hasattr + Pydantic 校验构造）每次调用的耗时，并检查两者结果一致。
+不连接数据库。
+
+运行方式（项目根目录）:
+    python local_test/bench_user_conversion.py
+    python local_test/bench_user_conversion.py --number 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.model import User, UserType, EnterpriseUser, ContractorUser, ApprovalLevel
+from api.model_trans import convert_user_db_to_response
+from db import models as db_models
+
+
+def legacy_convert(user_db: db_models.User) -> User:
+    """原实现（逐字段 hasattr + Pydantic 校验构造），作为基准和结果对照"""
+    # 处理企业用户（从users表的新字段构建）
+    enterprise_user = None
+    if user_db.user_type == "enterprise":
+        # 从users表的新字段构建EnterpriseUser对象
+        # enterprise_staff_id 直接存储了 enterprise_id（根据之前的修改）
+        enterprise_id = user_db.enterprise_staff_id if hasattr(user_db, 'enterprise_staff_id') and user_db.enterprise_staff_id is not None else 0
+        name = user_db.name_str if hasattr(user_db, 'name_str') and user_db.name_str else (user_db.relay_name if hasattr(user_db, 'relay_name') and user_db.relay_name else user_db.username)
+        
+        # 只有在有足够数据时才创建 EnterpriseUser 对象
+        # 如果 enterprise_id 为 0 或 None，说明用户还没有绑定企业，不创建 enterprise_user
+        if enterprise_id and enterprise_id > 0:
+            enterprise_user = EnterpriseUser(
+                user_id=user_db.user_id,
+                enterprise_id=enterprise_id,  # enterprise_staff_id 就是 enterprise_id
+                department_id=None,  # 需要从其他地方获取
+                name=name or user_db.username,  # 确保 name 不为空
+                phone=user_db.phone if hasattr(user_db, 'phone') and user_db.phone else None,
+                email=user_db.email if hasattr(user_db, 'email') and user_db.email else None,
+                position=None,  # users表中没有position字段
+                role_type=user_db.role_type if hasattr(user_db, 'role_type') and user_db.role_type else "normal",
+                approval_level=user_db.role_level if hasattr(user_db, 'role_level') and user_db.role_level is not None else ApprovalLevel.level_1,
+                status=user_db.user_status if hasattr(user_db, 'user_status') and user_db.user_status is not None else 1
+            )
+
+    # 处理承包商用户（从users表的新字段构建）
+    contractor_user = None
+    if user_db.user_type == "contractor":
+        # 从users表的新字段构建ContractorUser对象
+        # contractor_staff_id 可能存储了 contractor_id，但需要确认
+        contractor_id = user_db.contractor_staff_id if hasattr(user_db, 'contractor_staff_id') and user_db.contractor_staff_id is not None else 0
+        name = user_db.name_str if hasattr(user_db, 'name_str') and user_db.name_str else (user_db.relay_name if hasattr(user_db, 'relay_name') and user_db.relay_name else user_db.username)
+        
+        # 只有在有足够数据时才创建 ContractorUser 对象
+        # 如果 contractor_id 为 0 或 None，说明用户还没有绑定承包商，不创建 contractor_user
+        if contractor_id and contractor_id > 0:
+            contractor_user = ContractorUser(
+                user_id=user_db.user_id,
+                contractor_id=contractor_id,
+                name=name or user_db.username,  # 确保 name 不为空
+                phone=user_db.phone if hasattr(user_db, 'phone') and user_db.phone else "",
+                id_number="",  # users表中没有id_number字段，使用空字符串
+                work_type=user_db.work_type if hasattr(user_db, 'work_type') and user_db.work_type else "",
+                personal_photo="",  # users表中没有personal_photo字段，使用空字符串
+                role_type=user_db.role_type if hasattr(user_db, 'role_type') and user_db.role_type else "normal",
+                status=user_db.user_status if hasattr(user_db, 'user_status') and user_db.user_status is not None else 1
+            )
+
+    return User(
+        user_id=user_db.user_id,
+        user_type=UserType(user_db.user_type),
+        username=user_db.username,
+        enterprise_staff_id=user_db.enterprise_staff_id if hasattr(user_db, 'enterprise_staff_id') and user_db.enterprise_staff_id is not None else None,
+        contractor_staff_id=user_db.contractor_staff_id if hasattr(user_db, 'contractor_staff_id') and user_db.contractor_staff_id is not None else None,
+        phone=user_db.phone if hasattr(user_db, 'phone') else None,
+        email=user_db.email if hasattr(user_db, 'email') else None,
+        user_level=user_db.user_level if hasattr(user_db, 'user_level') else None,
+        audit_status=user_db.audit_status if hasattr(user_db, 'audit_status') else None,
+        user_status=user_db.user_status if hasattr(user_db, 'user_status') and user_db.user_status is not None else None,
+        role_level=user_db.role_level if hasattr(user_db, 'role_level') and user_db.role_level is not None else None,
+        is_deleted=user_db.is_deleted if hasattr(user_db, 'is_deleted') else False,
+        enterprise_user=enterprise_user,
+        contractor_user=contractor_user
+    )
+
+
+def make_users():
+    common = dict(password_hash="x", phone="13800000000", email="user@example.com", name_str="张三",
+                  role_type="normal", role_level=2, user_status=1, work_type="焊工")
+    return {
+        "enterprise": db_models.User(user_id=1, username="enterprise_user", user_type="enterprise",
+                                     enterprise_staff_id=10, **common),
+        "contractor": db_models.User(user_id=2, username="contractor_user", user_type="contractor",
+                                     contractor_staff_id=20, **common),
+        "admin": db_models.User(user_id=3, username="admin", user_type="admin", **common),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户模型转换微基准测试")
+    parser.add_argument("--number", type=int, default=50000, help="每种用户的调用次数")
+    args = parser.parse_args()
+
+    print(f"{'用户类型':<12}{'原实现 us':>12}{'转换函数 us':>14}{'提升':>8}")
+    for user_type, user_db in make_users().items():
+        legacy = legacy_convert(user_db)
+        fast = convert_user_db_to_response(user_db)
+        assert legacy == fast and legacy.model_dump_json() == fast.model_dump_json(), user_type
+
+        legacy_us = timeit.timeit(lambda: legacy_convert(user_db), number=args.number) / args.number * 1e6
+        fast_us = timeit.timeit(lambda: convert_user_db_to_response(user_db), number=args.number) / args.number * 1e6
+        print(f"{user_type:<12}{legacy_us:>12.2f}{fast_us:>14.2f}{legacy_us / fast_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+权限校验查询次数检查
+Per-request query counts for claim-based authorization
+
+以系统管理员和一个企业管理员登录，逐个请求常用的只读接口，从 Server-Timing 响应头读取本次请求的查询次数，
+与只做鉴权、不查业务数据的 /users/me/（get_current_user，查一次 users 表）对比。
+访问令牌携带权限声明后，列表接口的查询次数中不再包含读取当前用户的那一次。
+随后用刷新令牌换取新令牌，确认刷新流程可用。
+
+运行方式（服务需已启动，需已生成压测数据，SERVER_TIMING_ENABLED=true）:
+    python local_test/check_auth_queries.py --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+import httpx
+
+LOCAL_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(LOCAL_TEST_DIR, "bench_dataset.json")
+
+ADMIN_ENDPOINTS = (
+    "/users/me/",
+    "/dashboard/summary",
+    "/admin/users/pending/?page=1&page_size=50",
+    "/admin/enterprises/",
+    "/admin/contractors/",
+)
+
+ENTERPRISE_ENDPOINTS = (
+    "/users/me/",
+    "/dashboard/summary",
+    "/enterprise-backend/user-management/users/",
+)
+
+QUERY_COUNT = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await client.post("/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()
+
+
+async def measure(client: httpx.AsyncClient, token: str, url: str, rounds: int) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    counts, timings, status_code = [], [], None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        status_code = response.status_code
+        match = QUERY_COUNT.search(response.headers.get("server-timing", ""))
+        if match:
+            counts.append(int(match.group(1)))
+    timings.sort()
+    queries = f"{min(counts)}~{max(counts)}" if counts else "?"
+    print(f"   {url:<50} HTTP {status_code}  查询 {queries} 次  p50={timings[len(timings) // 2]:.1f}ms")
+
+
+async def main_async(args) -> None:
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        accounts = (
+            (manifest["system_admin"], ADMIN_ENDPOINTS),
+            (manifest["enterprise_admins"][0], ENTERPRISE_ENDPOINTS),
+        )
+        for username, endpoints in accounts:
+            tokens = await login(client, username, manifest["password"])
+            print(f"👤 {username}")
+            for url in endpoints:
+                await measure(client, tokens["access_token"], url, args.rounds)
+
+            response = await client.post("/token/refresh", json={"refresh_token": tokens.get("refresh_token", "")})
+            print(f"{'✅' if response.status_code == 200 else '❌'} 刷新令牌: HTTP {response.status_code}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="权限校验查询次数检查")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="服务地址")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="压测数据清单（generate_dataset.py 生成）")
+    parser.add_argument("--rounds", type=int, default=20, help="每个接口请求次数")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(parse_args()))
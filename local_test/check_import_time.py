@@ -0,0 +1,106 @@
+"""
+应用导入耗时检查
+App import-time budget check
+
+worker 启动（扩容）时先要导入 main，这里在新进程中用 python -X importtime 导入 main，检查：
+1. 导入总耗时不超过预算（默认 1500ms，可用 --budget-ms 调整）
+2. 导入时没有输出（模块顶层不应 print）
+3. routes/ 下没有 from main import（engine 等通过 request.app.state / 依赖项获取）
+
+超出预算或检查失败时以非 0 状态码退出，可以直接放进部署前的检查脚本。
+
+运行方式（项目根目录）:
+    python local_test/check_import_time.py
+    python local_test/check_import_time.py --budget-ms 800 --top 20
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import time:  self [us] | cumulative | imported package
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import(module: str = "main", runs: int = 3):
+    """多次在新进程中导入，返回耗时最短一次的 (总耗时us, [(self_us, cumulative_us, 模块名)], stdout)"""
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(proc.stderr)
+            raise SystemExit(f"❌ 导入 {module} 失败")
+
+        modules = []
+        total = 0
+        for line in proc.stderr.splitlines():
+            match = _IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((int(self_us), int(cumulative_us), name))
+            if len(indent) == 1:  # 顶层导入
+                total += int(cumulative_us)
+        if best is None or total < best[0]:
+            best = (total, modules, proc.stdout)
+    return best
+
+
+def find_main_imports():
+    """查找 routes/ 下的 from main import"""
+    found = []
+    for root, _, files in os.walk(os.path.join(PROJECT_ROOT, "routes")):
+        for file_name in files:
+            if not file_name.endswith(".py"):
+                continue
+            path = os.path.join(root, file_name)
+            with open(path, encoding="utf-8") as f:
+                for lineno, line in enumerate(f, 1):
+                    if re.match(r"\s*(from main import|import main\b)", line):
+                        found.append(f"{os.path.relpath(path, PROJECT_ROOT)}:{lineno}: {line.strip()}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="应用导入耗时检查")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="导入 main 的耗时预算（毫秒）")
+    parser.add_argument("--top", type=int, default=15, help="列出自身耗时最多的模块数")
+    parser.add_argument("--runs", type=int, default=3, help="测量次数，取最短一次")
+    args = parser.parse_args()
+
+    ok = True
+    total_us, modules, stdout = measure_import(runs=args.runs)
+
+    print(f"自身耗时最多的 {args.top} 个模块:")
+    for self_us, cumulative_us, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:>8.1f}ms  (累计 {cumulative_us / 1000:>8.1f}ms)  {name}")
+
+    total_ms = total_us / 1000
+    if total_ms > args.budget_ms:
+        ok = False
+        print(f"❌ 导入 main 耗时 {total_ms:.0f}ms，超出预算 {args.budget_ms:.0f}ms")
+    else:
+        print(f"✅ 导入 main 耗时 {total_ms:.0f}ms（预算 {args.budget_ms:.0f}ms）")
+
+    if stdout.strip():
+        ok = False
+        print(f"❌ 导入时有输出（模块顶层不应 print）:\n{stdout}")
+
+    main_imports = find_main_imports()
+    if main_imports:
+        ok = False
+        print("❌ routes/ 中不应 from main import，请改用 request.app.state 或依赖项:")
+        for item in main_imports:
+            print(f"  {item}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+压测数据生成
+Synthetic EHS dataset generator
+
+按固定随机种子生成可复现的数据，使用 COPY 批量写入：
+- N 个企业、M 个承包商（license_file 以 bench/ 开头，便于清理）
+- 合作关系：承包商已合作的企业（allowed/active）、待审批的企业（candidate/pending）及合作项目
+- 用户（用户名以 bench_ 开头）：系统管理员，以及每个企业/承包商的管理员和员工，
+  员工覆盖 role_level -1/2/4 和 user_status 0/1/2/3
+- 作业票：tools/danger/protection 位掩码按位独立抽样（防护措施与危险因素相关），
+  动火等级、高处作业等级按实际比例分布，申请日期分布在最近一年
+
+所有生成用户的密码相同（--password），生成完成后写出清单文件供 load_test.py 使用。
+
+运行方式（项目根目录，连接 .env 中的 DATABASE_URL，需已执行 db/create_tables.sql）:
+    python local_test/generate_dataset.py --enterprises 50 --contractors 200 --tickets 100000
+    python local_test/generate_dataset.py --clean        # 只删除之前生成的数据
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncpg
+
+from config import settings
+from core import password as pwd
+from db.notify import to_asyncpg_dsn
+
+USERNAME_PREFIX = "bench_"
+LICENSE_FILE_PREFIX = "bench/"
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_dataset.json")
+COPY_BATCH_SIZE = 50000
+
+# 员工状态分布：1通过审核，2待审核，3审核不通过，0未通过审核
+STAFF_STATUS_WEIGHTS = {1: 0.70, 2: 0.15, 3: 0.10, 0: 0.05}
+# 动火等级：-1未动火, 0特级, 1一级, 2二级
+HOT_WORK_WEIGHTS = {-1: 0.60, 2: 0.25, 1: 0.12, 0: 0.03}
+# 高处作业等级 0-4
+WORK_HEIGHT_WEIGHTS = {0: 0.70, 1: 0.15, 2: 0.08, 3: 0.05, 4: 0.02}
+# 位掩码各位被选中的概率（低位为常见项）
+TOOLS_BIT_PROBABILITIES = (0.6, 0.4, 0.3, 0.2, 0.15, 0.1, 0.05, 0.05)
+DANGER_BIT_PROBABILITIES = (0.5, 0.35, 0.25, 0.2, 0.15, 0.1, 0.08, 0.05, 0.05, 0.03, 0.02, 0.01)
+PROTECTION_GIVEN_DANGER = 0.9  # 存在某项危险时对应防护措施被勾选的概率
+PROTECTION_WITHOUT_DANGER = 0.05
+
+WORKING_CONTENTS = ("管道动火焊接", "储罐清洗", "高处设备检修", "电气线路改造", "阀门更换", "脚手架搭设", "受限空间检测")
+WORK_TYPES = ("焊工", "电工", "架子工", "起重工", "管工", "普工")
+
+
+def weighted_choice(rng: random.Random, weights: dict):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def random_bitmask(rng: random.Random, probabilities) -> int:
+    mask = 0
+    for bit, probability in enumerate(probabilities):
+        if rng.random() < probability:
+            mask |= 1 << bit
+    return mask
+
+
+async def reserve_ids(conn: asyncpg.Connection, table: str, column: str, count: int):
+    """从表的序列中预留 count 个 id（与并发写入互不冲突）"""
+    if count <= 0:
+        return []
+    rows = await conn.fetch(
+        "SELECT nextval(pg_get_serial_sequence($1, $2)) FROM generate_series(1, $3)",
+        table, column, count,
+    )
+    return [row[0] for row in rows]
+
+
+async def copy_in_batches(conn: asyncpg.Connection, table: str, columns, records) -> int:
+    """分批 COPY，records 可以是生成器"""
+    total = 0
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= COPY_BATCH_SIZE:
+            await conn.copy_records_to_table(table, records=batch, columns=columns)
+            total += len(batch)
+            batch = []
+    if batch:
+        await conn.copy_records_to_table(table, records=batch, columns=columns)
+        total += len(batch)
+    return total
+
+
+async def clean(conn: asyncpg.Connection) -> None:
+    """删除之前生成的数据"""
+    like = USERNAME_PREFIX.replace("_", r"\_") + "%"
+    async with conn.transaction():
+        await conn.execute(
+            "DELETE FROM ticket WHERE applicant IN (SELECT user_id FROM users WHERE username LIKE $1)", like
+        )
+        await conn.execute("DELETE FROM users WHERE username LIKE $1", like)
+        await conn.execute(
+            "DELETE FROM contractor_project WHERE enterprise_id IN "
+            "(SELECT enterprise_id FROM enterprise_info WHERE license_file LIKE $1)",
+            LICENSE_FILE_PREFIX + "%",
+        )
+        await conn.execute("DELETE FROM enterprise_info WHERE license_file LIKE $1", LICENSE_FILE_PREFIX + "%")
+        await conn.execute("DELETE FROM contractor_info WHERE license_file LIKE $1", LICENSE_FILE_PREFIX + "%")
+    print("🧹 已删除之前生成的压测数据")
+
+
+async def generate(conn: asyncpg.Connection, args) -> dict:
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    password_hash = pwd.get_password_hash(args.password)
+
+    enterprise_ids = await reserve_ids(conn, "enterprise_info", "enterprise_id", args.enterprises)
+    contractor_ids = await reserve_ids(conn, "contractor_info", "contractor_id", args.contractors)
+
+    # 合作关系：每个承包商与若干企业已合作，另有少量待审批
+    allowed = {eid: [] for eid in enterprise_ids}
+    candidate = {eid: [] for eid in enterprise_ids}
+    active = {cid: [] for cid in contractor_ids}
+    pending = {cid: [] for cid in contractor_ids}
+    for cid in contractor_ids:
+        partners = rng.sample(enterprise_ids, min(len(enterprise_ids), rng.randint(1, args.partners_per_contractor)))
+        for index, eid in enumerate(partners):
+            if index > 0 and rng.random() < 0.2:
+                candidate[eid].append(cid)
+                pending[cid].append(eid)
+            else:
+                allowed[eid].append(cid)
+                active[cid].append(eid)
+
+    def cooperation_detail(company_name: str, license_number: str) -> dict:
+        start = date.today() - timedelta(days=rng.randint(0, 720))
+        return {
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(days=365 * 3)).isoformat(),
+            "company_name": company_name,
+            "license_number": license_number,
+        }
+
+    enterprise_names = {eid: f"压测企业{eid:06d}" for eid in enterprise_ids}
+    contractor_names = {cid: f"压测承包商{cid:06d}" for cid in contractor_ids}
+
+    enterprise_count = await copy_in_batches(
+        conn, "enterprise_info",
+        ("enterprise_id", "license_file", "license_number", "company_name", "company_address",
+         "business_status", "allowed_contractor_ids", "candidate_contractor_ids", "contractor_detail_info",
+         "created_at", "updated_at"),
+        (
+            (eid, f"{LICENSE_FILE_PREFIX}enterprise_{eid}.pdf", f"BENCH-E{eid:010d}", enterprise_names[eid],
+             "压测地址", "续存", json.dumps(allowed[eid]), json.dumps(candidate[eid]),
+             json.dumps({str(cid): cooperation_detail(contractor_names[cid], f"BENCH-C{cid:010d}")
+                         for cid in allowed[eid]}, ensure_ascii=False),
+             now, now)
+            for eid in enterprise_ids
+        ),
+    )
+    contractor_count = await copy_in_batches(
+        conn, "contractor_info",
+        ("contractor_id", "license_file", "license_number", "company_name", "company_address",
+         "business_status", "active_enterprise_ids", "pending_allowed_ids", "active_enterprise_detail",
+         "created_at", "updated_at"),
+        (
+            (cid, f"{LICENSE_FILE_PREFIX}contractor_{cid}.pdf", f"BENCH-C{cid:010d}", contractor_names[cid],
+             "压测地址", "续存", json.dumps(active[cid]), json.dumps(pending[cid]),
+             json.dumps({str(eid): cooperation_detail(enterprise_names[eid], f"BENCH-E{eid:010d}")
+                         for eid in active[cid]}, ensure_ascii=False),
+             now, now)
+            for cid in contractor_ids
+        ),
+    )
+    project_count = await copy_in_batches(
+        conn, "contractor_project",
+        ("contractor_id", "enterprise_id", "project_name", "leader_name_str", "leader_phone", "created_at", "updated_at"),
+        (
+            (cid, eid, f"bench_项目_{cid}_{eid}_{n}", "项目负责人", "13900000000", now, now)
+            for cid in contractor_ids for eid in active[cid]
+            for n in range(rng.randint(1, args.projects_per_cooperation))
+        ),
+    )
+
+    # 用户：(username, user_type, enterprise_staff_id, contractor_staff_id, role_level, user_status, role_type, work_type)
+    user_specs = [(f"{USERNAME_PREFIX}admin", "admin", None, None, 0, 1, "admin", "")]
+    for eid in enterprise_ids:
+        user_specs.append((f"{USERNAME_PREFIX}e{eid}_admin", "enterprise", eid, None, 1, 1, "approver", ""))
+        for n in range(args.staff_per_company):
+            user_specs.append((f"{USERNAME_PREFIX}e{eid}_u{n}", "enterprise", eid, None, 2,
+                               weighted_choice(rng, STAFF_STATUS_WEIGHTS), "normal", ""))
+    for cid in contractor_ids:
+        user_specs.append((f"{USERNAME_PREFIX}c{cid}_admin", "contractor", None, cid, 3, 1, "approver", ""))
+        for n in range(args.staff_per_company):
+            user_specs.append((f"{USERNAME_PREFIX}c{cid}_u{n}", "contractor", None, cid, 4,
+                               weighted_choice(rng, STAFF_STATUS_WEIGHTS), "normal", rng.choice(WORK_TYPES)))
+    # 已注册但还未选择角色、未绑定企业的用户
+    for n in range(args.unassigned_users):
+        user_type = rng.choice(("enterprise", "contractor"))
+        user_specs.append((f"{USERNAME_PREFIX}new_{n}", user_type, None, None, -1, 2, None, ""))
+
+    user_ids = await reserve_ids(conn, "users", "user_id", len(user_specs))
+    users = list(zip(user_ids, user_specs))
+    user_count = await copy_in_batches(
+        conn, "users",
+        ("user_id", "username", "password_hash", "user_type", "enterprise_staff_id", "contractor_staff_id",
+         "phone", "email", "sys_only_id", "name_str", "role_type", "role_level", "user_status", "work_type",
+         "is_deleted", "created_at", "updated_at"),
+        (
+            (uid, username, password_hash, user_type, eid, cid,
+             f"19{uid:09d}", f"{username}@bench.example.com", uid, f"压测用户{uid}",
+             role_type, role_level, user_status, work_type, False,
+             now - timedelta(days=rng.randint(0, 365)), now)
+            for uid, (username, user_type, eid, cid, role_level, user_status, role_type, work_type) in users
+        ),
+    )
+
+    # 作业票：申请人、监护人为企业已审核员工，作业人为合作承包商的员工
+    enterprise_staff = {eid: [] for eid in enterprise_ids}
+    contractor_staff = {cid: [] for cid in contractor_ids}
+    for uid, (_, user_type, eid, cid, role_level, user_status, _, _) in users:
+        if user_status != 1:
+            continue
+        if user_type == "enterprise" and eid:
+            enterprise_staff[eid].append(uid)
+        elif user_type == "contractor" and cid:
+            contractor_staff[cid].append(uid)
+    ticket_enterprises = [eid for eid in enterprise_ids if enterprise_staff[eid] and allowed[eid]]
+
+    def ticket_records():
+        if not ticket_enterprises:
+            return
+        for _ in range(args.tickets):
+            eid = rng.choice(ticket_enterprises)
+            cid = rng.choice(allowed[eid])
+            workers = contractor_staff[cid] or enterprise_staff[eid]
+            apply_date = date.today() - timedelta(days=int(rng.triangular(0, 365, 0)))
+            pre_st = datetime.combine(apply_date, datetime.min.time()) + timedelta(hours=rng.randint(7, 16))
+            danger = random_bitmask(rng, DANGER_BIT_PROBABILITIES)
+            protection = 0
+            for bit in range(len(DANGER_BIT_PROBABILITIES)):
+                probability = PROTECTION_GIVEN_DANGER if danger >> bit & 1 else PROTECTION_WITHOUT_DANGER
+                if rng.random() < probability:
+                    protection |= 1 << bit
+            yield (
+                apply_date, rng.choice(enterprise_staff[eid]), rng.choice(WORKING_CONTENTS),
+                pre_st, pre_st + timedelta(hours=rng.randint(1, 8)),
+                random_bitmask(rng, TOOLS_BIT_PROBABILITIES), rng.choice(workers), rng.choice(enterprise_staff[eid]),
+                danger, protection, weighted_choice(rng, HOT_WORK_WEIGHTS), weighted_choice(rng, WORK_HEIGHT_WEIGHTS),
+                pre_st - timedelta(days=1), pre_st - timedelta(days=1),
+            )
+
+    ticket_count = await copy_in_batches(
+        conn, "ticket",
+        ("apply_date", "applicant", "working_content", "pre_st", "pre_et", "tools", "worker", "custodians",
+         "danger", "protection", "hot_work", "work_height_level", "created_at", "updated_at"),
+        ticket_records(),
+    )
+
+    print(f"✅ 企业 {enterprise_count}，承包商 {contractor_count}，项目 {project_count}，"
+          f"用户 {user_count}，作业票 {ticket_count}")
+
+    # 压测清单：各角色的登录账号与待审批用户
+    sample = rng.sample(enterprise_ids, min(len(enterprise_ids), 20))
+    return {
+        "seed": args.seed,
+        "password": args.password,
+        "generated_at": now.isoformat(),
+        "counts": {
+            "enterprises": enterprise_count, "contractors": contractor_count, "projects": project_count,
+            "users": user_count, "tickets": ticket_count,
+        },
+        "system_admin": f"{USERNAME_PREFIX}admin",
+        "enterprise_admins": [f"{USERNAME_PREFIX}e{eid}_admin" for eid in sample],
+        "contractor_admins": [f"{USERNAME_PREFIX}c{cid}_admin"
+                              for cid in rng.sample(contractor_ids, min(len(contractor_ids), 20))],
+        "pending_user_ids": [uid for uid, spec in users if spec[5] == 2 and spec[4] in (2, 4)],
+    }
+
+
+async def main_async(args) -> None:
+    conn = await asyncpg.connect(args.dsn or to_asyncpg_dsn(settings.database_url))
+    try:
+        if args.clean or args.replace:
+            await clean(conn)
+        if args.clean:
+            return
+        start = time.perf_counter()
+        async with conn.transaction():
+            manifest = await generate(conn, args)
+        await conn.execute("ANALYZE users; ANALYZE enterprise_info; ANALYZE contractor_info; ANALYZE ticket;")
+        print(f"⏱️ 用时 {time.perf_counter() - start:.1f}s")
+    finally:
+        await conn.close()
+
+    with open(args.manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"📄 压测清单已写入 {args.manifest}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="生成压测数据")
+    parser.add_argument("--dsn", default=None, help="数据库连接（默认使用 .env 中的 DATABASE_URL）")
+    parser.add_argument("--enterprises", type=int, default=50)
+    parser.add_argument("--contractors", type=int, default=200)
+    parser.add_argument("--staff-per-company", type=int, default=20, help="每个企业/承包商的员工数")
+    parser.add_argument("--unassigned-users", type=int, default=200, help="未选择角色的用户数")
+    parser.add_argument("--partners-per-contractor", type=int, default=5, help="每个承包商最多合作的企业数")
+    parser.add_argument("--projects-per-cooperation", type=int, default=3)
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=20240101, help="随机种子，在空库上相同参数和种子生成相同数据")
+    parser.add_argument("--password", default="bench123456", help="所有生成用户的登录密码")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="压测清单输出路径")
+    parser.add_argument("--replace", action="store_true", help="先删除之前生成的数据再生成")
+    parser.add_argument("--clean", action="store_true", help="只删除之前生成的数据")
+    return parser
+
+
+def main(argv=None):
+    asyncio.run(main_async(build_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
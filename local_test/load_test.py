@@ -0,0 +1,271 @@
+"""
+接口压测
+Async HTTP load driver
+
+使用 httpx 异步客户端并发请求本地服务，按接口统计吞吐量、错误数、被限流（429）次数和 p50/p95/p99 延迟。
+账号来自 generate_dataset.py 写出的压测清单（local_test/bench_dataset.json）。
+
+压测请求都来自同一个 IP，认证接口限流（core/rate_limit.py）会让 login 场景几乎全部返回 429，
+后续场景也无法登录取得 token。压测时请以 RATE_LIMIT_ENABLED=false 启动服务。
+
+场景：
+- login:    POST /token（bcrypt 校验密码，CPU 密集）
+- list:     系统管理员、企业管理员常用的列表接口
+- approval: 系统管理员逐个审批待审核员工（会修改数据，需要重新生成数据才能再次运行）
+
+一条命令生成数据并压测（服务需已启动，如 RATE_LIMIT_ENABLED=false uvicorn main:app --workers 4）:
+    python local_test/load_test.py --generate --concurrency 50 --duration 30
+只压测、并与上一版本的结果对比:
+    python local_test/load_test.py --scenarios login,list --output results/v2.json --compare results/v1.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+LOCAL_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(LOCAL_TEST_DIR, "bench_dataset.json")
+
+# 系统管理员可访问的列表接口
+ADMIN_LIST_ENDPOINTS = (
+    "/admin/users/all/?page=1&page_size=50",
+    "/admin/users/pending/?page=1&page_size=50",
+    "/admin/enterprises/",
+    "/admin/contractors/",
+)
+# 企业管理员可访问的列表接口
+ENTERPRISE_LIST_ENDPOINTS = (
+    "/enterprise-backend/user-management/users/",
+    "/enterprise-backend/contractor-approval/contractors",
+    "/admin/users/pending/?page=1&page_size=50",
+)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Recorder:
+    """按接口记录每个请求的延迟和状态"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.limited: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, name: str, elapsed: float, status_code: Optional[int]) -> None:
+        """status_code 为 None 表示请求未得到响应（连接错误、超时）"""
+        self.latencies[name].append(elapsed)
+        if status_code == 429:
+            self.limited[name] += 1
+        elif status_code is None or status_code >= 400:
+            self.errors[name] += 1
+
+    def summary(self) -> Dict[str, dict]:
+        duration = (self.finished or time.perf_counter()) - self.started
+        result = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            result[name] = {
+                "requests": len(values),
+                "errors": self.errors[name],
+                "limited": self.limited[name],
+                "rps": len(values) / duration if duration > 0 else 0.0,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+        return result
+
+
+async def timed_request(client: httpx.AsyncClient, recorder: Recorder, name: str, method: str, url: str, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        response = None
+    recorder.record(name, time.perf_counter() - start, response.status_code if response is not None else None)
+    return response
+
+
+async def login(client: httpx.AsyncClient, recorder: Recorder, username: str, password: str) -> Optional[httpx.Response]:
+    return await timed_request(
+        client, recorder, "POST /token", "POST", "/token",
+        data={"username": username, "password": password},
+    )
+
+
+async def login_tokens(client: httpx.AsyncClient, manifest: dict, usernames: List[str]) -> Dict[str, str]:
+    """压测前先登录，取得各账号的 token（不计入统计）"""
+    recorder = Recorder()
+    tokens = {}
+    for username in usernames:
+        response = await login(client, recorder, username, manifest["password"])
+        if response is not None and response.status_code == 429:
+            raise SystemExit(f"❌ 账号 {username} 登录被限流，请以 RATE_LIMIT_ENABLED=false 启动服务后再压测")
+        if response is None or response.status_code != 200:
+            raise SystemExit(f"❌ 账号 {username} 登录失败，请确认服务已启动且已生成压测数据")
+        tokens[username] = response.json()["access_token"]
+    return tokens
+
+
+async def run_workers(concurrency: int, duration: float, job) -> None:
+    """concurrency 个协程循环执行 job，直到 duration 秒后停止"""
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(worker_id)
+        while time.perf_counter() < deadline:
+            if await job(rng) is False:
+                return
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+
+async def scenario_login(client, recorder, manifest, args):
+    usernames = [manifest["system_admin"], *manifest["enterprise_admins"], *manifest["contractor_admins"]]
+
+    async def job(rng):
+        await login(client, recorder, rng.choice(usernames), manifest["password"])
+
+    await run_workers(args.concurrency, args.duration, job)
+
+
+async def scenario_list(client, recorder, manifest, args):
+    admin = manifest["system_admin"]
+    tokens = await login_tokens(client, manifest, [admin, *manifest["enterprise_admins"]])
+    plans = [(tokens[admin], url) for url in ADMIN_LIST_ENDPOINTS]
+    plans += [
+        (tokens[username], url)
+        for username in manifest["enterprise_admins"] for url in ENTERPRISE_LIST_ENDPOINTS
+    ]
+    recorder.started = time.perf_counter()  # 登录耗时不计入吞吐量
+
+    async def job(rng):
+        token, url = rng.choice(plans)
+        name = f"GET {url.split('?')[0]}"
+        await timed_request(client, recorder, name, "GET", url, headers={"Authorization": f"Bearer {token}"})
+
+    await run_workers(args.concurrency, args.duration, job)
+
+
+async def scenario_approval(client, recorder, manifest, args):
+    admin = manifest["system_admin"]
+    token = (await login_tokens(client, manifest, [admin]))[admin]
+    headers = {"Authorization": f"Bearer {token}"}
+    pending = list(manifest["pending_user_ids"])
+    random.Random(manifest["seed"]).shuffle(pending)
+    recorder.started = time.perf_counter()
+
+    async def job(rng):
+        if not pending:
+            return False
+        user_id = pending.pop()
+        await timed_request(
+            client, recorder, "POST /admin/users/{id}/approve/", "POST",
+            f"/admin/users/{user_id}/approve/", params={"approved": "true"}, headers=headers,
+        )
+
+    await run_workers(args.concurrency, args.duration, job)
+
+
+SCENARIOS = {
+    "login": scenario_login,
+    "list": scenario_list,
+    "approval": scenario_approval,
+}
+
+
+def print_summary(summary: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None) -> None:
+    header = f"{'接口':<52}{'请求数':>8}{'错误':>6}{'限流':>6}{'RPS':>9}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}"
+    if baseline:
+        header += f"{'RPS变化':>10}{'p95变化':>10}"
+    print(header)
+    for name, stats in summary.items():
+        line = (f"{name:<52}{stats['requests']:>8}{stats['errors']:>6}{stats.get('limited', 0):>6}{stats['rps']:>9.1f}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+        old = (baseline or {}).get(name)
+        if old and old["rps"] and old["p95_ms"]:
+            line += f"{(stats['rps'] / old['rps'] - 1) * 100:>+9.1f}%{(stats['p95_ms'] / old['p95_ms'] - 1) * 100:>+9.1f}%"
+        print(line)
+
+
+async def main_async(args) -> None:
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        for scenario in args.scenarios.split(","):
+            recorder = Recorder()
+            print(f"▶️ 场景 {scenario}: 并发 {args.concurrency}，持续 {args.duration}s")
+            await SCENARIOS[scenario](client, recorder, manifest, args)
+            recorder.finished = time.perf_counter()
+            results[scenario] = recorder.summary()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    for scenario, summary in results.items():
+        print(f"\n=== {scenario} ===")
+        print_summary(summary, (baseline or {}).get(scenario))
+        if any(stats["limited"] for stats in summary.values()):
+            print("⚠️ 有请求被限流（429），结果不代表接口本身的性能，请以 RATE_LIMIT_ENABLED=false 启动服务后重新压测")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "base_url": args.base_url,
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "dataset": manifest["counts"],
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 结果已写入 {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口压测")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default="login,list,approval", help=f"逗号分隔: {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20, help="每个场景的持续时间（秒）")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="generate_dataset.py 写出的压测清单")
+    parser.add_argument("--output", default=None, help="结果保存路径（JSON），用于不同版本对比")
+    parser.add_argument("--compare", default=None, help="与之前保存的结果对比")
+    parser.add_argument("--generate", action="store_true",
+                        help="压测前先重新生成数据（等同 generate_dataset.py --replace，其余参数取默认值）")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+
+    if args.generate:
+        sys.path.insert(0, LOCAL_TEST_DIR)
+        import generate_dataset
+        generate_dataset.main(["--replace", "--manifest", args.manifest])
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
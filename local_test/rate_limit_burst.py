@@ -0,0 +1,70 @@
+"""
+认证接口限流突发测试
+Credential-stuffing burst against /token
+
+对同一个用户名并发发出 --requests 次错误密码的登录请求，统计放行（401）与被限流（429）的次数，
+以及两类响应的延迟：被限流的请求不查库、不做 bcrypt 校验，延迟应远低于放行的请求。
+多 worker 部署时放行次数应接近 RATE_LIMIT_USERNAME_CAPACITY（RATE_LIMIT_BACKEND=postgres），
+memory 存储下最多为 worker 数 × 容量。
+
+运行方式（服务需已启动）:
+    python local_test/rate_limit_burst.py --username bench_user --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import math
+import time
+from collections import Counter
+
+import httpx
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+async def main_async(args) -> None:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    statuses = Counter()
+    timings = {}
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        async def attempt(i: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/token", data={
+                    "username": args.username, "password": f"wrong-password-{i}",
+                })
+                elapsed = (time.perf_counter() - start) * 1000
+            statuses[response.status_code] += 1
+            timings.setdefault(response.status_code, []).append(elapsed)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(attempt(i) for i in range(args.requests)))
+        total = time.perf_counter() - start
+
+    print(f"📊 {args.requests} 次登录请求，耗时 {total:.2f}s")
+    for status_code in sorted(statuses):
+        values = sorted(timings[status_code])
+        print(
+            f"   HTTP {status_code}: {statuses[status_code]} 次，"
+            f"p50={percentile(values, 50):.1f}ms p99={percentile(values, 99):.1f}ms"
+        )
+    limited = statuses.get(429, 0)
+    print(f"{'✅' if limited else '❌'} 被限流 {limited} 次，放行 {args.requests - limited} 次")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="认证接口限流突发测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="服务地址")
+    parser.add_argument("--username", default="bench_user", help="登录用户名")
+    parser.add_argument("--requests", type=int, default=200, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发数")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(parse_args()))
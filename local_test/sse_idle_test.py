@@ -0,0 +1,109 @@
+"""
+SSE 空闲连接测试
+Idle SSE connection fan-out test
+
+以同一个账号打开 N 个 /events/stream 连接并保持空闲，然后直接在数据库上执行
+pg_notify 发送一条事件，统计所有连接收到事件的耗时；超出 events_max_connections 的连接会被拒绝（503）。
+
+运行方式（服务需已启动，账号为任意已审核用户）:
+    python local_test/sse_idle_test.py --username bench_sysadmin --password bench123456 --connections 2000
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncpg
+import httpx
+
+from config import settings
+from db.notify import EVENT_CHANNEL, to_asyncpg_dsn
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+async def open_stream(client: httpx.AsyncClient, token: str, target: int, ready: asyncio.Event,
+                      opened: list, received: list, sent_at: dict):
+    async with client.stream("GET", "/events/stream", params={"access_token": token}) as response:
+        if response.status_code != 200:
+            opened.append(False)
+            return
+        opened.append(True)
+        async for line in response.aiter_lines():
+            if line.startswith("event: ready"):
+                if sum(opened) >= target:
+                    ready.set()
+            elif line.startswith("event: bench_ping"):
+                received.append(time.perf_counter() - sent_at["t"])
+                return
+
+
+async def main_async(args) -> None:
+    limits = httpx.Limits(max_connections=args.connections + 10, max_keepalive_connections=0)
+    timeout = httpx.Timeout(args.timeout, read=None)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        response = await client.post("/token", data={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        me = (await client.get("/users/me/", headers={"Authorization": f"Bearer {token}"})).json()
+
+        ready = asyncio.Event()
+        opened, received, sent_at = [], [], {}
+        start = time.perf_counter()
+        tasks = [
+            asyncio.create_task(open_stream(client, token, args.connections, ready, opened, received, sent_at))
+            for _ in range(args.connections)
+        ]
+        try:
+            await asyncio.wait_for(ready.wait(), timeout=args.timeout)
+        except asyncio.TimeoutError:
+            pass
+        print(f"🔌 已建立 {sum(opened)}/{args.connections} 个连接，用时 {time.perf_counter() - start:.1f}s，"
+              f"被拒绝 {opened.count(False)} 个")
+
+        print(f"💤 保持空闲 {args.idle}s")
+        await asyncio.sleep(args.idle)
+
+        conn = await asyncpg.connect(to_asyncpg_dsn(settings.database_url))
+        try:
+            sent_at["t"] = time.perf_counter()
+            await conn.execute("SELECT pg_notify($1, $2)", EVENT_CHANNEL, json.dumps(
+                {"topics": [f"user:{me['user_id']}"], "event": "bench_ping", "data": {}}
+            ))
+        finally:
+            await conn.close()
+
+        done, pending = await asyncio.wait(tasks, timeout=args.timeout)
+        for task in pending:
+            task.cancel()
+
+    latencies = sorted(received)
+    print(f"📨 收到事件 {len(latencies)}/{sum(opened)}")
+    if latencies:
+        print(f"   p50 {percentile(latencies, 50) * 1000:.1f}ms  p95 {percentile(latencies, 95) * 1000:.1f}ms  "
+              f"最慢 {latencies[-1] * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE 空闲连接测试")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--idle", type=float, default=30, help="发送事件前保持空闲的秒数（应超过心跳间隔）")
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
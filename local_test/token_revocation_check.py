@@ -0,0 +1,94 @@
+"""
+登出撤销检查
+Logout revocation across workers and in-process check cost
+
+1. 测量 REVOKED_TOKENS.is_revoked 的耗时：没有撤销记录时、以及已有 --revoked 条记录时（每个请求都会执行一次）
+2. 对运行中的服务（多 worker）登录，用同一个刷新令牌连续换取两次新令牌（模拟两个标签页同时刷新，宽限期内都应成功），
+   然后登出，再多次请求 /dashboard/summary：请求会分散到各个 worker，全部应返回 401；刷新令牌也应失效
+
+运行方式（项目根目录；第 2 步需服务已启动、已生成压测数据，并已执行 db/migrate_revoked_tokens.sql）:
+    python local_test/token_revocation_check.py --revoked 100000 --requests 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from core.tokens import RevokedTokenSet, hash_jti
+
+LOCAL_TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(LOCAL_TEST_DIR, "bench_dataset.json")
+
+
+def measure_check(revoked: int, number: int = 200000) -> None:
+    tokens = RevokedTokenSet()
+    claims = {"jti": uuid.uuid4().hex}
+    empty_ns = timeit.timeit(lambda: tokens.is_revoked(claims), number=number) / number * 1e9
+
+    expires_at = time.time() + 3600
+    for _ in range(revoked):
+        tokens.add(hash_jti(uuid.uuid4().hex), expires_at)
+    filled_ns = timeit.timeit(lambda: tokens.is_revoked(claims), number=number) / number * 1e9
+    print(f"📊 撤销检查: 无记录 {empty_ns:.0f}ns，{revoked} 条记录 {filled_ns:.0f}ns")
+
+
+async def check_logout(args) -> None:
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        response = await client.post("/token", data={
+            "username": manifest["system_admin"], "password": manifest["password"],
+        })
+        response.raise_for_status()
+        refresh_token = response.json()["refresh_token"]
+
+        statuses = []
+        for _ in range(2):
+            response = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+            statuses.append(response.status_code)
+        print(f"{'✅' if statuses == [200, 200] else '❌'} 同一刷新令牌连续刷新两次: HTTP {statuses}")
+        response.raise_for_status()
+        tokens = response.json()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+        before = (await client.get("/dashboard/summary", headers=headers)).status_code
+        response = await client.post("/logout", headers=headers, json={"refresh_token": tokens.get("refresh_token")})
+        print(f"{'✅' if before == 200 else '❌'} 登出前 HTTP {before}，登出 HTTP {response.status_code}")
+
+        # 留出 NOTIFY 投递到其他 worker 的时间
+        await asyncio.sleep(args.delay)
+        statuses = await asyncio.gather(*(
+            client.get("/dashboard/summary", headers=headers) for _ in range(args.requests)
+        ))
+        accepted = sum(1 for response in statuses if response.status_code != 401)
+        print(f"{'✅' if accepted == 0 else '❌'} 登出后 {args.requests} 次请求中 {accepted} 次未被拒绝")
+
+        response = await client.post("/token/refresh", json={"refresh_token": tokens.get("refresh_token", "")})
+        print(f"{'✅' if response.status_code == 401 else '❌'} 登出后刷新令牌: HTTP {response.status_code}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="登出撤销检查")
+    parser.add_argument("--revoked", type=int, default=100000, help="耗时测量时的撤销记录数")
+    parser.add_argument("--skip-server", action="store_true", help="只测量撤销检查耗时，不请求服务")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="服务地址")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="压测数据清单（generate_dataset.py 生成）")
+    parser.add_argument("--requests", type=int, default=50, help="登出后的请求次数")
+    parser.add_argument("--delay", type=float, default=0.2, help="登出后等待通知投递的秒数")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    measure_check(args.revoked)
+    if not args.skip_server:
+        asyncio.run(check_logout(args))
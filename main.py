@@ -15,6 +15,8 @@ FastAPI 应用主文件
 """
 from datetime import timedelta, datetime, timezone
 from typing import AsyncIterator, Union, Annotated
+import asyncio
+import os
 
 from fastapi import FastAPI, Depends, HTTPException, status, Query
 from fastapi.security import OAuth2PasswordRequestForm
@@ -24,10 +26,23 @@ from contextlib import asynccontextmanager
 import jwt
 from jwt.exceptions import InvalidTokenError
 
-from db.connection import create_engine
+from db.connection import create_engine, warm_up_pool
 from db import crud
 from core.init_admin import init_admin_user
 from core import password as pwd
+from core.metrics import REGISTRY as metrics_registry, MetricsMiddleware
+from core.rate_limit import RateLimitMiddleware, create_rate_limiter, run_rate_limit_pruner
+from core.responses import default_response_class
+from db.instrumentation import QueryStatsMiddleware
+from db.replica import ReplicaRouter, ReadYourWritesMiddleware
+from db.notify import (
+    PgListener, CACHE_INVALIDATION_CHANNEL, EVENT_CHANNEL, TOKEN_VERSION_CHANNEL, TOKEN_REVOCATION_CHANNEL,
+    handle_cache_invalidation, handle_event_notification, handle_token_version_notification,
+    handle_token_revocation_notification, to_asyncpg_dsn,
+)
+from core.cache import invalidate_all_local
+from core.events import resync_all
+from core.tokens import REVOKED_TOKENS, TOKEN_VERSIONS, run_revoked_token_gc
 from config import settings
 from api.model import *
 from api.model_trans import convert_user_db_to_response
@@ -35,17 +50,135 @@ from api.model_trans import convert_user_db_to_response
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncIterator[None]:
     # Startup
+    # 创建上传目录（不在模块导入时创建，避免导入产生副作用）
+    from routes.enterprise_backend.permission_apply import UPLOAD_DIR as ENTERPRISE_UPLOAD_DIR
+    from routes.contractor_backend.permission_apply import UPLOAD_DIR as CONTRACTOR_UPLOAD_DIR
+    for upload_dir in (ENTERPRISE_UPLOAD_DIR, CONTRACTOR_UPLOAD_DIR):
+        os.makedirs(upload_dir, exist_ok=True)
+
     # 创建数据库连接engine
     engine = create_engine()
     app.state.engine = engine
+    metrics_registry.register_pool("primary", engine)
+    # 预热连接池，避免部署后的首批请求承担建连耗时
+    warmed = await warm_up_pool(engine, settings.db_pool_warmup_size)
+    print(f"数据库连接池已预热: {warmed} 个连接")
+
+    # 认证接口限流
+    app.state.rate_limiter = create_rate_limiter(settings, engine)
+    rate_limit_pruner = None
+    if app.state.rate_limiter is not None and settings.rate_limit_backend == "postgres":
+        rate_limit_pruner = asyncio.create_task(
+            run_rate_limit_pruner(app.state.rate_limiter, settings.rate_limit_prune_interval)
+        )
+
+    # 只读副本（可选）
+    replica_engine = None
+    lag_monitor = None
+    app.state.replica_router = None
+    if settings.database_replica_url:
+        replica_engine = create_engine(settings.database_replica_url)
+        metrics_registry.register_pool("replica", replica_engine)
+        replica_router = ReplicaRouter(
+            engine, replica_engine,
+            max_lag_seconds=settings.replica_max_lag_seconds,
+            sticky_seconds=settings.replica_sticky_seconds,
+        )
+        # 首次检测完成前副本延迟未知，只读请求走主库
+        lag = await replica_router.check_lag()
+        print(f"只读副本已启用，当前延迟: {lag}")
+        lag_monitor = asyncio.create_task(
+            replica_router.run_lag_monitor(settings.replica_lag_check_interval)
+        )
+        app.state.replica_router = replica_router
+
+    # 加载访问令牌有效期内发生过的权限变更、撤销，之后由 NOTIFY 增量同步
+    try:
+        count = await TOKEN_VERSIONS.load_recent(engine)
+        print(f"已加载 {count} 个用户的令牌版本")
+    except Exception as e:
+        print(f"⚠️ 加载令牌版本失败（是否已执行 migrate_token_version.sql？）: {e}")
+    try:
+        count = await REVOKED_TOKENS.load(engine)
+        print(f"已加载 {count} 个已撤销的令牌")
+    except Exception as e:
+        print(f"⚠️ 加载已撤销令牌失败（是否已执行 migrate_revoked_tokens.sql？）: {e}")
+
+    # 监听缓存失效通知、实时事件和令牌版本，每个 worker 进程只用一条 LISTEN 连接
+    pg_listener = None
+    if settings.cache_invalidation_listen or settings.events_enabled or settings.token_version_listen:
+        def on_listener_reconnect():
+            # 断线期间可能丢失通知，重连后清空全部缓存，并提示 SSE 客户端重新拉取
+            invalidate_all_local()
+            resync_all()
+            if settings.token_version_listen:
+                TOKEN_VERSIONS.reload_in_background(engine)
+                REVOKED_TOKENS.reload_in_background(engine)
+
+        pg_listener = PgListener(to_asyncpg_dsn(settings.database_url), on_reconnect=on_listener_reconnect)
+        if settings.cache_invalidation_listen:
+            pg_listener.subscribe(CACHE_INVALIDATION_CHANNEL, handle_cache_invalidation)
+        if settings.events_enabled:
+            pg_listener.subscribe(EVENT_CHANNEL, handle_event_notification)
+        if settings.token_version_listen:
+            pg_listener.subscribe(TOKEN_VERSION_CHANNEL, handle_token_version_notification)
+            pg_listener.subscribe(TOKEN_REVOCATION_CHANNEL, handle_token_revocation_notification)
+        await pg_listener.start()
+    app.state.pg_listener = pg_listener
+
+    # 后台补齐企业、承包商、用户名称的拼音（拼音搜索）
+    pinyin_refresher = None
+    if settings.search_pinyin_refresh_interval > 0:
+        from db.search import pinyin_available, run_pinyin_refresher
+        if pinyin_available():
+            pinyin_refresher = asyncio.create_task(
+                run_pinyin_refresher(engine, settings.search_pinyin_refresh_interval)
+            )
+        else:
+            print("未安装 pypinyin，拼音搜索不可用")
+
+    # 后台定期清理过期令牌的撤销记录
+    revoked_token_gc = None
+    if settings.revoked_token_gc_interval > 0:
+        revoked_token_gc = asyncio.create_task(
+            run_revoked_token_gc(engine, settings.revoked_token_gc_interval)
+        )
+
+    # 后台定期对账仪表盘计数
+    dashboard_reconciler = None
+    if settings.dashboard_reconcile_interval > 0:
+        from db.dashboard import run_dashboard_reconciler
+        dashboard_reconciler = asyncio.create_task(
+            run_dashboard_reconciler(engine, settings.dashboard_reconcile_interval)
+        )
+
     await init_admin_user(app)
     yield
 
     # Shutdown
+    if pinyin_refresher is not None:
+        pinyin_refresher.cancel()
+    if dashboard_reconciler is not None:
+        dashboard_reconciler.cancel()
+    if rate_limit_pruner is not None:
+        rate_limit_pruner.cancel()
+    if revoked_token_gc is not None:
+        revoked_token_gc.cancel()
+    pwd.shutdown_hash_pool()
+    if pg_listener is not None:
+        await pg_listener.stop()
+    if lag_monitor is not None:
+        lag_monitor.cancel()
+    if replica_engine is not None:
+        metrics_registry.unregister_pool("replica")
+        await replica_engine.dispose()
     await engine.dispose()
     print("数据库连接已关闭")
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=default_response_class())
+
+# 认证接口限流：位于 CORS 之内，429 响应也带跨域头，前端能读到 Retry-After
+app.add_middleware(RateLimitMiddleware, trust_forwarded=settings.rate_limit_trust_forwarded)
 
 # 添加 CORS 中间件
 app.add_middleware(
@@ -60,15 +193,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# 记录写请求，保证同一会话随后的只读请求走主库（读己之写）
+app.add_middleware(ReadYourWritesMiddleware)
+
+# 添加请求级数据库统计中间件（Server-Timing）
+app.add_middleware(QueryStatsMiddleware)
+
+# 添加请求指标中间件（/metrics），最后添加的中间件位于最外层
+app.add_middleware(MetricsMiddleware)
+
 # 注册路由
 from routes import main_router
 app.include_router(main_router)
 
 # 导入共享依赖项（认证相关函数已迁移到 routes/dependencies.py）
 from routes.dependencies import (
-    get_current_user,
+    get_token_user,
+    get_user_enterprise_id,
     authenticate_enterprise_level,
 )
 
@@ -82,19 +226,22 @@ async def add_project(project: Project):
 
 
 @app.get("/contractors/")
-async def get_contractors(user: User = Depends(get_current_user)) -> List[ContractorListItem]:
+async def get_contractors(user: User = Depends(get_token_user)) -> List[ContractorListItem]:
     """获取与当前企业有合作的承包商列表（保证数据隔离）"""
     if user.user_type != UserType.enterprise:
         raise HTTPException(status_code=403, detail="只有企业用户可以查看承包商列表")
     
-    enterprise_id = user.enterprise_user.enterprise_id
+    enterprise_id = get_user_enterprise_id(user)
     contractors = await crud.get_contractors_for_enterprise(app.state.engine, enterprise_id)
+    # 一次查询统计所有承包商的项目数
+    project_counts = await crud.get_contractor_project_counts(
+        app.state.engine, enterprise_id, [contractor.contractor_id for contractor in contractors],
+        use_counter=settings.contractor_project_counter,
+    )
     
     result = []
     for contractor in contractors:
-        project_count = await crud.get_contractor_project_count(
-            app.state.engine, contractor.contractor_id, enterprise_id
-        )
+        project_count = project_counts.get(contractor.contractor_id, 0)
         contractor_item = ContractorListItem(
             contractor_id=contractor.contractor_id,
             company_name=contractor.company_name,
@@ -113,7 +260,7 @@ async def create_contractor_project(
     user: User = Depends(authenticate_enterprise_level)
 ) -> ContractorProjectResponse:
     """与承包商创建合作项目（支持新承包商和已有承包商）"""
-    enterprise_id = user.enterprise_user.enterprise_id
+    enterprise_id = get_user_enterprise_id(user)
     
     try:
         contractor, project = await crud.create_contractor_with_project(
@@ -9,6 +9,10 @@ Routes module initialization
 4. ticket - 工单管理
 5. workflow - 工单流程管理
 6. auth - 认证相关（登录、登出等）
+7. metrics - 监控指标（Prometheus）
+8. search - 搜索（企业/承包商输入提示）
+9. events - 实时通知（SSE）
+10. dashboard - 仪表盘统计
 """
 from fastapi import APIRouter
 
@@ -19,6 +23,10 @@ from .contractor_backend import router as contractor_backend_router
 from .ticket import router as ticket_router
 from .workflow import router as workflow_router
 from .auth import router as auth_router
+from .metrics import router as metrics_router
+from .search import router as search_router
+from .events import router as events_router
+from .dashboard import router as dashboard_router
 
 # 创建主路由
 main_router = APIRouter()
@@ -27,6 +35,9 @@ main_router = APIRouter()
 # 认证路由（无前缀，直接挂载到根路径）
 main_router.include_router(auth_router, tags=["认证管理"])
 
+# 监控指标（无前缀，/metrics）
+main_router.include_router(metrics_router, tags=["监控"])
+
 # 系统账户后台管理
 main_router.include_router(admin_router, prefix="/admin", tags=["系统账户后台"])
 
@@ -42,4 +53,13 @@ main_router.include_router(ticket_router, prefix="/tickets", tags=["工单管理
 # 工单流程管理
 main_router.include_router(workflow_router, prefix="/workflow", tags=["工单流程管理"])
 
+# 搜索
+main_router.include_router(search_router, prefix="/search", tags=["搜索"])
+
+# 实时通知
+main_router.include_router(events_router, prefix="/events", tags=["实时通知"])
+
+# 仪表盘
+main_router.include_router(dashboard_router, prefix="/dashboard", tags=["仪表盘"])
+
 __all__ = ["main_router"]
@@ -20,13 +20,16 @@ from api.model import (
 from core import password as pwd
 from db import crud
 from db.models import ContractorInfo as ContractorDB, ContractorUser as ContractorUserDB
-from routes.dependencies import get_current_user, get_engine
+from routes.dependencies import get_token_user, get_engine, get_read_engine, CONTRACTOR_SCOPE_CACHE
+from db.notify import publish_cache_invalidation
+from db.reference_cache import CONTRACTOR_REFS
 from db.connection import get_session
+from db.search import keyword_filter
 
 router = APIRouter()
 
 
-def verify_admin(user: User = Depends(get_current_user)):
+def verify_admin(user: User = Depends(get_token_user)):
     """
     验证系统管理员权限
     
@@ -41,7 +44,7 @@ def verify_admin(user: User = Depends(get_current_user)):
     return user
 
 
-def verify_contractor_or_admin_access(user: User = Depends(get_current_user)):
+def verify_contractor_or_admin_access(user: User = Depends(get_token_user)):
     """
     验证企业管理员或系统管理员权限（用于承包商管理）
     
@@ -61,16 +64,14 @@ def verify_contractor_or_admin_access(user: User = Depends(get_current_user)):
 
 
 @router.post("/", dependencies=[Depends(verify_admin)])
-async def create_contractor(contractor: ContractorInfo):
+async def create_contractor(contractor: ContractorInfo, engine = Depends(get_engine)):
     """
     创建承包商
     
     系统管理员创建新承包商，承包商初始状态为待审批
     """
-    from main import app
-    
     try:
-        contractor_db = await crud.create_contractor_info(app.state.engine, contractor)
+        contractor_db = await crud.create_contractor_info(engine, contractor)
         return {
             "message": "承包商创建成功",
             "contractor_id": contractor_db.contractor_id
@@ -87,7 +88,7 @@ async def get_contractors(
     page: int = Query(default=1, ge=1, description="页码"),
     page_size: int = Query(default=20, ge=1, le=100, description="每页数量"),
     user: User = Depends(verify_contractor_or_admin_access),
-    engine = Depends(get_engine)
+    engine = Depends(get_read_engine)
 ) -> dict:
     """
     获取承包商列表
@@ -125,7 +126,7 @@ async def get_contractors(
             if company_type:
                 conditions.append(ContractorDB.company_type == company_type)
             if keyword:
-                conditions.append(ContractorDB.company_name.contains(keyword))
+                conditions.append(keyword_filter(keyword, ContractorDB.company_name, pinyin_column=ContractorDB.name_pinyin))
             
             # 计算总数
             from sqlalchemy import func
@@ -140,47 +141,18 @@ async def get_contractors(
             result = await session.exec(query)
             contractors = result.all()
             
+            # 处理 Row 对象
+            contractors = [
+                row[0] if hasattr(row, '__getitem__') and not isinstance(row, ContractorDB) else row
+                for row in contractors
+            ]
+            
+            # 一次查询取出本页所有供应商的管理员
+            admins = await crud.get_company_admins(session, "contractor", [contractor.contractor_id for contractor in contractors])
+            
             # 转换为响应格式
             items = []
             for contractor in contractors:
-                # 处理 Row 对象
-                if hasattr(contractor, '__getitem__') and not isinstance(contractor, ContractorDB):
-                    contractor = contractor[0] if len(contractor) > 0 else None
-                    if contractor is None:
-                        continue
-                
-                # 查询供应商管理员（user_type='contractor' 且 role_level=3 或 0）
-                # 兼容旧数据：role_level=0 也视为供应商管理员
-                from db.models import User as UserDB
-                from sqlmodel import or_
-                admin_query = select(UserDB).where(
-                    and_(
-                        UserDB.contractor_staff_id == contractor.contractor_id,
-                        UserDB.user_type == "contractor",
-                        or_(UserDB.role_level == 3, UserDB.role_level == 0)
-                    )
-                )
-                admin_result = await session.exec(admin_query)
-                admins = admin_result.all()
-                
-                # 处理管理员数据
-                admin_list = []
-                for admin in admins:
-                    # 处理 Row 对象
-                    if hasattr(admin, '__getitem__') and not isinstance(admin, UserDB):
-                        admin = admin[0] if len(admin) > 0 else None
-                        if admin is None:
-                            continue
-                    
-                    admin_list.append({
-                        "user_id": admin.user_id,
-                        "username": admin.username,
-                        "name": admin.name_str or admin.relay_name or admin.username,
-                        "phone": admin.phone,
-                        "email": admin.email,
-                        "user_status": admin.user_status,
-                    })
-                
                 items.append({
                     "contractor_id": contractor.contractor_id,
                     "license_file": contractor.license_file,
@@ -195,7 +167,7 @@ async def get_contractors(
                     "business_status": contractor.business_status,
                     "created_at": contractor.created_at.isoformat() if contractor.created_at else None,
                     "updated_at": contractor.updated_at.isoformat() if contractor.updated_at else None,
-                    "admins": admin_list,  # 添加管理员列表
+                    "admins": admins.get(contractor.contractor_id, []),  # 管理员列表
                 })
             
             return {
@@ -213,7 +185,7 @@ async def get_contractors(
 async def get_contractor_detail(
     contractor_id: int,
     user: User = Depends(verify_admin),
-    engine = Depends(get_engine)
+    engine = Depends(get_read_engine)
 ) -> ContractorInfo:
     """
     获取承包商详情
@@ -267,16 +239,14 @@ async def get_contractor_detail(
 
 
 @router.put("/{contractor_id}/", dependencies=[Depends(verify_admin)])
-async def update_contractor(contractor_id: int, contractor_data: ContractorInfo):
+async def update_contractor(contractor_id: int, contractor_data: ContractorInfo, engine = Depends(get_engine)):
     """
     更新承包商信息
     
     系统管理员可以修改承包商的基本信息
     """
-    from main import app
-    
     try:
-        async with app.state.engine.begin() as conn:
+        async with engine.begin() as conn:
             # 查询承包商
             query = select(ContractorDB).where(ContractorDB.contractor_id == contractor_id)
             result = await conn.execute(query)
@@ -296,6 +266,10 @@ async def update_contractor(contractor_id: int, contractor_data: ContractorInfo)
             
             await conn.commit()
             
+            # 名称、状态、active_enterprise_ids 可能被修改，失效相关缓存（同步到其他 worker）
+            await publish_cache_invalidation(engine, CONTRACTOR_REFS.name, contractor_id)
+            await publish_cache_invalidation(engine, CONTRACTOR_SCOPE_CACHE, contractor_id)
+            
             return {"message": "承包商信息更新成功"}
     except HTTPException:
         raise
@@ -304,17 +278,15 @@ async def update_contractor(contractor_id: int, contractor_data: ContractorInfo)
 
 
 @router.delete("/{contractor_id}/", dependencies=[Depends(verify_admin)])
-async def delete_contractor(contractor_id: int):
+async def delete_contractor(contractor_id: int, engine = Depends(get_engine)):
     """
     删除承包商
     
     软删除承包商，将状态设置为 deleted
     注意：删除前需要确保承包商下没有活跃的员工和项目
     """
-    from main import app
-    
     try:
-        async with app.state.engine.begin() as conn:
+        async with engine.begin() as conn:
             # 查询承包商
             query = select(ContractorDB).where(ContractorDB.contractor_id == contractor_id)
             result = await conn.execute(query)
@@ -364,6 +336,8 @@ async def delete_contractor(contractor_id: int):
             
             await conn.commit()
             
+            await publish_cache_invalidation(engine, CONTRACTOR_REFS.name, contractor_id)
+            
             return {"message": "承包商删除成功"}
     except HTTPException:
         raise
@@ -525,6 +499,9 @@ async def approve_contractor(
             await session.commit()
             await session.refresh(contractor)
             
+            # 营业状态已变化，失效基础信息缓存
+            await publish_cache_invalidation(engine, CONTRACTOR_REFS.name, contractor_id)
+            
             return {
                 "message": f"承包商注册已{status_text}",
                 "contractor_id": contractor.contractor_id,
@@ -540,18 +517,17 @@ async def approve_contractor(
 @router.post("/{contractor_id}/admin/", dependencies=[Depends(verify_admin)])
 async def create_contractor_admin(
     contractor_id: int,
-    admin_data: ContractorUser
+    admin_data: ContractorUser,
+    engine = Depends(get_engine)
 ):
     """
     为承包商创建超级管理员
     
     系统管理员为新批准的承包商创建第一个管理员账户
     """
-    from main import app
-    
     try:
         # 验证承包商存在
-        async with app.state.engine.begin() as conn:
+        async with engine.begin() as conn:
             query = select(ContractorDB).where(ContractorDB.contractor_id == contractor_id)
             result = await conn.execute(query)
             contractor = result.scalar_one_or_none()
@@ -572,7 +548,7 @@ async def create_contractor_admin(
         )
         
         contractor_user_db = await crud.create_contractor_user(
-            app.state.engine, admin_data, user
+            engine, admin_data, user
         )
         
         return {
@@ -590,17 +566,16 @@ async def create_contractor_admin(
 @router.get("/{contractor_id}/admins/")
 async def get_contractor_admins(
     contractor_id: int,
-    user: User = Depends(verify_admin)
+    user: User = Depends(verify_admin),
+    engine = Depends(get_read_engine)
 ) -> List[dict]:
     """
     获取承包商管理员列表
     
     查看指定承包商的所有管理员账户
     """
-    from main import app
-    
     try:
-        async with app.state.engine.begin() as conn:
+        async with engine.begin() as conn:
             # 查询承包商管理员
             query = select(ContractorUserDB).where(
                 and_(
@@ -17,14 +17,18 @@ from api.model import (
     EnterpriseInfoCreate,
     EnterpriseInfoUpdate
 )
+from db import crud
 from db.models import EnterpriseInfo as EnterpriseDB
-from routes.dependencies import get_current_user, get_engine
+from routes.dependencies import get_token_user, get_engine, get_read_engine
+from db.notify import publish_cache_invalidation
+from db.reference_cache import ENTERPRISE_REFS
 from db.connection import get_session
+from db.search import keyword_filter
 
 router = APIRouter()
 
 
-def verify_admin(user: User = Depends(get_current_user)):
+def verify_admin(user: User = Depends(get_token_user)):
     """
     验证系统管理员权限
     
@@ -39,7 +43,7 @@ def verify_admin(user: User = Depends(get_current_user)):
     return user
 
 
-def verify_enterprise_or_admin_access(user: User = Depends(get_current_user)):
+def verify_enterprise_or_admin_access(user: User = Depends(get_token_user)):
     """
     验证企业管理员或系统管理员权限
     
@@ -72,7 +76,7 @@ async def get_enterprises(
     page: int = Query(default=1, ge=1, description="页码"),
     page_size: int = Query(default=20, ge=1, le=100, description="每页数量"),
     user: User = Depends(verify_enterprise_or_admin_access),
-    engine = Depends(get_engine)
+    engine = Depends(get_read_engine)
 ) -> dict:
     """
     获取企业列表
@@ -111,7 +115,7 @@ async def get_enterprises(
             if company_type:
                 conditions.append(EnterpriseDB.company_type == company_type)
             if keyword:
-                conditions.append(EnterpriseDB.company_name.contains(keyword))
+                conditions.append(keyword_filter(keyword, EnterpriseDB.company_name, pinyin_column=EnterpriseDB.name_pinyin))
             
             # 计算总数
             from sqlalchemy import func
@@ -126,47 +130,18 @@ async def get_enterprises(
             result = await session.exec(query)
             enterprises = result.all()
             
+            # 处理 Row 对象
+            enterprises = [
+                row[0] if hasattr(row, '__getitem__') and not isinstance(row, EnterpriseDB) else row
+                for row in enterprises
+            ]
+            
+            # 一次查询取出本页所有企业的管理员
+            admins = await crud.get_company_admins(session, "enterprise", [enterprise.enterprise_id for enterprise in enterprises])
+            
             # 转换为响应格式
             items = []
             for enterprise in enterprises:
-                # 处理 Row 对象
-                if hasattr(enterprise, '__getitem__') and not isinstance(enterprise, EnterpriseDB):
-                    enterprise = enterprise[0] if len(enterprise) > 0 else None
-                    if enterprise is None:
-                        continue
-                
-                # 查询企业管理员（user_type='enterprise' 且 role_level=1 或 0）
-                # 兼容旧数据：role_level=0 也视为企业管理员
-                from db.models import User as UserDB
-                from sqlmodel import or_
-                admin_query = select(UserDB).where(
-                    and_(
-                        UserDB.enterprise_staff_id == enterprise.enterprise_id,
-                        UserDB.user_type == "enterprise",
-                        or_(UserDB.role_level == 1, UserDB.role_level == 0)
-                    )
-                )
-                admin_result = await session.exec(admin_query)
-                admins = admin_result.all()
-                
-                # 处理管理员数据
-                admin_list = []
-                for admin in admins:
-                    # 处理 Row 对象
-                    if hasattr(admin, '__getitem__') and not isinstance(admin, UserDB):
-                        admin = admin[0] if len(admin) > 0 else None
-                        if admin is None:
-                            continue
-                    
-                    admin_list.append({
-                        "user_id": admin.user_id,
-                        "username": admin.username,
-                        "name": admin.name_str or admin.relay_name or admin.username,
-                        "phone": admin.phone,
-                        "email": admin.email,
-                        "user_status": admin.user_status,
-                    })
-                
                 items.append({
                     "enterprise_id": enterprise.enterprise_id,
                     "license_file": enterprise.license_file,
@@ -182,7 +157,7 @@ async def get_enterprises(
                     "parent_enterprise_id": enterprise.parent_enterprise_id,
                     "created_at": enterprise.created_at.isoformat() if enterprise.created_at else None,
                     "updated_at": enterprise.updated_at.isoformat() if enterprise.updated_at else None,
-                    "admins": admin_list,  # 添加管理员列表
+                    "admins": admins.get(enterprise.enterprise_id, []),  # 管理员列表
                 })
             
             return {
@@ -200,7 +175,7 @@ async def get_enterprises(
 async def get_enterprise(
     enterprise_id: int,
     user: User = Depends(verify_admin),
-    engine = Depends(get_engine)
+    engine = Depends(get_read_engine)
 ) -> EnterpriseInfo:
     """
     获取企业详情
@@ -407,6 +382,9 @@ async def approve_enterprise(
             await session.commit()
             await session.refresh(enterprise)
             
+            # 营业状态已变化，失效基础信息缓存
+            await publish_cache_invalidation(engine, ENTERPRISE_REFS.name, enterprise_id)
+            
             return {
                 "message": f"企业注册已{status_text}",
                 "enterprise_id": enterprise.enterprise_id,
@@ -7,17 +7,26 @@ from datetime import datetime
 import json
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import select, and_, or_
+from pydantic import BaseModel, Field
+from sqlalchemy import text
+from sqlmodel import select, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from api.model import User, UserType
 from core import password as pwd
-from routes.dependencies import get_current_user, get_engine
-from db.connection import get_session
+from routes.dependencies import get_token_user, get_engine, get_read_engine, get_db_session
+from db.connection import get_session, release_connection
+from db.search import keyword_filter
+from db.reference_cache import ENTERPRISE_REFS, CONTRACTOR_REFS
+from core.responses import trusted_response
+from core.events import user_topic
+from db.notify import publish_event, publish_events
+from db.admin_quorum import count_other_approved_admins
 
 router = APIRouter()
 
 
-def verify_admin(user: User = Depends(get_current_user)):
+def verify_admin(user: User = Depends(get_token_user)):
     """
     验证系统管理员权限
     
@@ -36,48 +45,48 @@ def verify_admin(user: User = Depends(get_current_user)):
 async def create_admin_user(
     username: str = Query(description="用户名"),
     password: str = Query(description="密码"),
-    email: Optional[str] = Query(default=None, description="邮箱")
+    email: Optional[str] = Query(default=None, description="邮箱"),
+    session: AsyncSession = Depends(get_db_session)
 ):
     """
     创建系统管理员账户
     
     只有系统管理员可以创建新的管理员账户
     """
-    from main import app
     from db import crud
+    from db.models import User as UserDB
     
     try:
         # 检查用户名是否已存在
-        existing_user = await crud.get_user(app.state.engine, username)
+        existing_user = await crud.get_user(session, username)
         if existing_user:
             raise HTTPException(status_code=400, detail="用户名已存在")
         
+        # 计算密码哈希前先归还连接，bcrypt 耗时期间不占用连接
+        await release_connection(session)
+        password_hash = pwd.get_password_hash(password)
+        
         # 创建管理员账户
-        from db.models import User as UserDB
-        from sqlmodel import select
+        new_user = UserDB(
+            user_type=UserType.admin,
+            username=username,
+            password_hash=password_hash,
+            created_at=datetime.now(),
+            updated_at=datetime.now()
+        )
         
-        async with app.state.engine.begin() as conn:
-            new_user = UserDB(
-                user_type=UserType.admin,
-                username=username,
-                password_hash=pwd.get_password_hash(password),
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            )
-            
-            # 如果有 email 字段，设置它
-            if hasattr(new_user, 'email') and email:
-                new_user.email = email
-            
-            conn.add(new_user)
-            await conn.commit()
-            await conn.refresh(new_user)
-            
-            return {
-                "message": "管理员账户创建成功",
-                "user_id": new_user.user_id,
-                "username": username
-            }
+        # 如果有 email 字段，设置它
+        if hasattr(new_user, 'email') and email:
+            new_user.email = email
+        
+        session.add(new_user)
+        await session.commit()
+        
+        return {
+            "message": "管理员账户创建成功",
+            "user_id": new_user.user_id,
+            "username": username
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -88,19 +97,18 @@ async def create_admin_user(
 async def get_admin_users(
     page: int = Query(default=1, ge=1, description="页码"),
     page_size: int = Query(default=20, ge=1, le=100, description="每页数量"),
-    user: User = Depends(verify_admin)
+    user: User = Depends(verify_admin),
+    engine = Depends(get_read_engine)
 ) -> dict:
     """
     获取系统管理员列表
     
     查看所有系统管理员账户
     """
-    from main import app
     from db.models import User as UserDB
-    from sqlmodel import select
     
     try:
-        async with app.state.engine.begin() as conn:
+        async with engine.connect() as conn:
             # 查询管理员用户
             query = select(UserDB).where(UserDB.user_type == UserType.admin)
             
@@ -134,38 +142,37 @@ async def get_admin_users(
 
 
 @router.delete("/{user_id}/", dependencies=[Depends(verify_admin)])
-async def delete_admin_user(user_id: int, current_user: User = Depends(verify_admin)):
+async def delete_admin_user(
+    user_id: int,
+    current_user: User = Depends(verify_admin),
+    session: AsyncSession = Depends(get_db_session)
+):
     """
     删除系统管理员账户
     
     注意：不能删除自己的账户
     """
-    from main import app
     from db.models import User as UserDB
-    from sqlmodel import select
     
     try:
         # 不能删除自己
         if current_user.user_id == user_id:
             raise HTTPException(status_code=400, detail="不能删除自己的账户")
         
-        async with app.state.engine.begin() as conn:
-            # 查询用户
-            query = select(UserDB).where(UserDB.user_id == user_id)
-            result = await conn.execute(query)
-            user = result.scalar_one_or_none()
-            
-            if not user:
-                raise HTTPException(status_code=404, detail="用户不存在")
-            
-            if user.user_type != UserType.admin:
-                raise HTTPException(status_code=400, detail="该用户不是系统管理员")
-            
-            # 删除用户
-            await conn.delete(user)
-            await conn.commit()
-            
-            return {"message": "管理员账户删除成功"}
+        # 查询用户
+        user = await session.get(UserDB, user_id)
+        
+        if not user:
+            raise HTTPException(status_code=404, detail="用户不存在")
+        
+        if user.user_type != UserType.admin:
+            raise HTTPException(status_code=400, detail="该用户不是系统管理员")
+        
+        # 删除用户
+        await session.delete(user)
+        await session.commit()
+        
+        return {"message": "管理员账户删除成功"}
     except HTTPException:
         raise
     except Exception as e:
@@ -175,45 +182,45 @@ async def delete_admin_user(user_id: int, current_user: User = Depends(verify_ad
 @router.post("/{user_id}/reset-password/", dependencies=[Depends(verify_admin)])
 async def reset_admin_password(
     user_id: int,
-    new_password: str = Query(description="新密码")
+    new_password: str = Query(description="新密码"),
+    session: AsyncSession = Depends(get_db_session)
 ):
     """
     重置管理员密码
     
     系统管理员可以重置其他管理员的密码
     """
-    from main import app
     from db.models import User as UserDB
-    from sqlmodel import select
     
     try:
-        async with app.state.engine.begin() as conn:
-            # 查询用户
-            query = select(UserDB).where(UserDB.user_id == user_id)
-            result = await conn.execute(query)
-            user = result.scalar_one_or_none()
-            
-            if not user:
-                raise HTTPException(status_code=404, detail="用户不存在")
-            
-            if user.user_type != UserType.admin:
-                raise HTTPException(status_code=400, detail="该用户不是系统管理员")
-            
-            # 更新密码
-            user.password_hash = pwd.get_password_hash(new_password)
-            if hasattr(user, 'updated_at'):
-                user.updated_at = datetime.now()
-            
-            await conn.commit()
-            
-            return {"message": "密码重置成功"}
+        # 查询用户
+        user = await session.get(UserDB, user_id)
+        
+        if not user:
+            raise HTTPException(status_code=404, detail="用户不存在")
+        
+        if user.user_type != UserType.admin:
+            raise HTTPException(status_code=400, detail="该用户不是系统管理员")
+        
+        # 计算密码哈希前先归还连接，bcrypt 耗时期间不占用连接
+        await release_connection(session)
+        
+        # 更新密码
+        user.password_hash = pwd.get_password_hash(new_password)
+        if hasattr(user, 'updated_at'):
+            user.updated_at = datetime.now()
+        
+        session.add(user)
+        await session.commit()
+        
+        return {"message": "密码重置成功"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"重置密码失败: {str(e)}")
 
 
-def verify_approval_access(user: User = Depends(get_current_user)):
+def verify_approval_access(user: User = Depends(get_token_user)):
     """
     验证审批权限
     
@@ -256,7 +263,7 @@ async def get_pending_staff(
     page: int = Query(default=1, ge=1, description="页码"),
     page_size: int = Query(default=20, ge=1, le=100, description="每页数量"),
     user: User = Depends(verify_approval_access),
-    engine = Depends(get_engine)
+    engine = Depends(get_read_engine)
 ) -> dict:
     """
     获取待审批人员列表
@@ -297,18 +304,11 @@ async def get_pending_staff(
                 conditions.append(UserDB.user_type == user_type)
             
             if keyword:
-                # 搜索用户名或姓名
-                keyword_conditions = [UserDB.username.contains(keyword)]
-                # 添加 name_str 和 relay_name 的搜索条件（如果字段存在）
-                try:
-                    keyword_conditions.append(UserDB.name_str.contains(keyword))
-                except:
-                    pass
-                try:
-                    keyword_conditions.append(UserDB.relay_name.contains(keyword))
-                except:
-                    pass
-                conditions.append(or_(*keyword_conditions))
+                # 搜索用户名、姓名或拼音（三元组索引）
+                conditions.append(keyword_filter(
+                    keyword, UserDB.username, UserDB.name_str, UserDB.relay_name,
+                    pinyin_column=UserDB.name_pinyin,
+                ))
             
             # 计算总数
             count_query = select(func.count(UserDB.user_id)).where(and_(*conditions))
@@ -322,38 +322,31 @@ async def get_pending_staff(
             result = await session.exec(query)
             users = result.all()
             
-            # 转换为响应格式
-            items = []
+            # 处理 Row 对象
+            user_objs = []
             for user_obj in users:
-                # 处理 Row 对象
                 if hasattr(user_obj, '__getitem__') and not isinstance(user_obj, UserDB):
                     user_obj = user_obj[0] if len(user_obj) > 0 else None
                     if user_obj is None:
                         continue
-                
-                # 获取关联的企业或供应商名称
+                user_objs.append(user_obj)
+            
+            # 批量获取关联的企业或供应商名称（进程内缓存，未命中的 id 合并为一次查询）
+            enterprise_refs = await ENTERPRISE_REFS.get_many(
+                session, [u.enterprise_staff_id for u in user_objs if u.user_type == "enterprise"]
+            )
+            contractor_refs = await CONTRACTOR_REFS.get_many(
+                session, [u.contractor_staff_id for u in user_objs if u.user_type == "contractor"]
+            )
+            
+            # 转换为响应格式
+            items = []
+            for user_obj in user_objs:
                 company_name = None
-                if user_obj.user_type == "enterprise" and user_obj.enterprise_staff_id:
-                    from db.models import EnterpriseInfo as EnterpriseDB
-                    enterprise_query = select(EnterpriseDB).where(EnterpriseDB.enterprise_id == user_obj.enterprise_staff_id)
-                    enterprise_result = await session.exec(enterprise_query)
-                    enterprise = enterprise_result.first()
-                    if enterprise:
-                        if hasattr(enterprise, '__getitem__') and not isinstance(enterprise, EnterpriseDB):
-                            enterprise = enterprise[0] if len(enterprise) > 0 else None
-                        if enterprise:
-                            company_name = enterprise.company_name
-                
-                elif user_obj.user_type == "contractor" and user_obj.contractor_staff_id:
-                    from db.models import ContractorInfo as ContractorDB
-                    contractor_query = select(ContractorDB).where(ContractorDB.contractor_id == user_obj.contractor_staff_id)
-                    contractor_result = await session.exec(contractor_query)
-                    contractor = contractor_result.first()
-                    if contractor:
-                        if hasattr(contractor, '__getitem__') and not isinstance(contractor, ContractorDB):
-                            contractor = contractor[0] if len(contractor) > 0 else None
-                        if contractor:
-                            company_name = contractor.company_name
+                if user_obj.user_type == "enterprise" and user_obj.enterprise_staff_id in enterprise_refs:
+                    company_name = enterprise_refs[user_obj.enterprise_staff_id].company_name
+                elif user_obj.user_type == "contractor" and user_obj.contractor_staff_id in contractor_refs:
+                    company_name = contractor_refs[user_obj.contractor_staff_id].company_name
                 
                 items.append({
                     "user_id": user_obj.user_id,
@@ -368,17 +361,18 @@ async def get_pending_staff(
                     "enterprise_staff_id": user_obj.enterprise_staff_id,
                     "contractor_staff_id": user_obj.contractor_staff_id,
                     "company_name": company_name,
-                    "created_at": user_obj.created_at.isoformat() if user_obj.created_at else None,
-                    "updated_at": user_obj.updated_at.isoformat() if user_obj.updated_at else None,
+                    "created_at": user_obj.created_at,
+                    "updated_at": user_obj.updated_at,
                 })
             
-            return {
+            # datetime 由响应序列化统一转换为 ISO 8601 字符串
+            return trusted_response({
                 "items": items,
                 "total": total,
                 "page": page,
                 "page_size": page_size,
                 "total_pages": (total + page_size - 1) // page_size
-            }
+            })
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"获取待审批人员列表失败: {str(e)}")
 
@@ -445,6 +439,11 @@ async def approve_staff(
             await session.commit()
             await session.refresh(user_obj)
             
+            await publish_event(engine, [user_topic(user_obj.user_id)], "user_status_changed", {
+                "user_id": user_obj.user_id,
+                "user_status": user_obj.user_status,
+            })
+            
             return {
                 "message": f"人员审批已{status_text}",
                 "user_id": user_obj.user_id,
@@ -457,6 +456,98 @@ async def approve_staff(
         raise HTTPException(status_code=400, detail=f"审批人员失败: {str(e)}")
 
 
+class BatchApproveRequest(BaseModel):
+    """批量审批请求"""
+    user_ids: List[int] = Field(min_length=1, max_length=500)
+    approved: bool  # true=批准, false=拒绝
+    comment: Optional[str] = None  # 审批意见
+
+
+@router.post("/approve-batch")
+async def approve_staff_batch(
+    body: BatchApproveRequest,
+    current_user: User = Depends(verify_approval_access),
+    engine = Depends(get_engine)
+):
+    """
+    批量审批人员
+
+    权限范围与单个审批相同：
+    - 系统管理员(role_level=0): 可以审批所有人员
+    - 企业管理员(role_level=1): 只能审批自己企业的员工
+
+    一条 UPDATE ... WHERE user_id = ANY(:ids) RETURNING 更新所有有权审批且处于待审核状态的用户，
+    其余 id 再查一次说明原因。results 按提交顺序返回每个 id 的结果：
+    - approved / rejected: 审批成功
+    - not_found: 用户不存在
+    - forbidden: 无权审批此用户
+    - invalid_status: 用户不是待审核状态
+    """
+    user_ids = list(dict.fromkeys(body.user_ids))  # 去重并保持顺序
+    new_status = 1 if body.approved else 3  # 1=通过审核, 3=审核不通过
+    outcome = "approved" if body.approved else "rejected"
+
+    scope_sql = ""
+    params = {"ids": user_ids, "new_status": new_status, "now": datetime.now()}
+    if current_user.role_level == 1:
+        # 企业管理员：只能审批自己企业的员工
+        scope_sql = "AND user_type = 'enterprise' AND enterprise_staff_id = :enterprise_id"
+        params["enterprise_id"] = current_user.enterprise_staff_id
+
+    try:
+        async with engine.begin() as conn:
+            result = await conn.execute(text(f"""
+                UPDATE users SET user_status = :new_status, updated_at = :now
+                WHERE user_id = ANY(CAST(:ids AS integer[])) AND user_status = 2 {scope_sql}
+                RETURNING user_id
+            """), params)
+            updated = {row[0] for row in result.all()}
+
+            # 未更新的 id 查询原因
+            skipped = [user_id for user_id in user_ids if user_id not in updated]
+            existing = {}
+            if skipped:
+                result = await conn.execute(text("""
+                    SELECT user_id, user_type, enterprise_staff_id FROM users
+                    WHERE user_id = ANY(CAST(:ids AS integer[]))
+                """), {"ids": skipped})
+                existing = {row[0]: row for row in result.all()}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"批量审批人员失败: {str(e)}")
+
+    results = []
+    for user_id in user_ids:
+        if user_id in updated:
+            results.append({"user_id": user_id, "result": outcome, "user_status": new_status})
+            continue
+        row = existing.get(user_id)
+        if row is None:
+            reason = "not_found"
+        elif current_user.role_level == 1 and (
+            row[1] != "enterprise" or row[2] != current_user.enterprise_staff_id
+        ):
+            reason = "forbidden"
+        else:
+            reason = "invalid_status"
+        results.append({"user_id": user_id, "result": reason})
+
+    # 事务已提交，通知被审批的用户（每人一条事件，与单个审批的事件格式相同）
+    updated_ids = [user_id for user_id in user_ids if user_id in updated]
+    await publish_events(engine, [
+        ([user_topic(user_id)], "user_status_changed", {"user_id": user_id, "user_status": new_status})
+        for user_id in updated_ids
+    ])
+
+    status_text = "批准" if body.approved else "拒绝"
+    print(f"✅ 批量审批人员: {status_text} {len(updated_ids)}/{len(user_ids)} 人 (操作人: {current_user.user_id})")
+    return {
+        "message": f"已{status_text} {len(updated_ids)} 人，{len(user_ids) - len(updated_ids)} 人未处理",
+        "updated": len(updated_ids),
+        "results": results,
+        "comment": body.comment,
+    }
+
+
 @router.get("/all/")
 async def get_all_users(
     user_type: Optional[str] = Query(default=None, description="用户类型筛选: enterprise, contractor, admin"),
@@ -469,7 +560,7 @@ async def get_all_users(
     page: int = Query(default=1, ge=1, description="页码"),
     page_size: int = Query(default=20, ge=1, le=100, description="每页数量"),
     current_user: User = Depends(verify_approval_access),
-    engine = Depends(get_engine)
+    engine = Depends(get_read_engine)
 ) -> dict:
     """
     获取所有用户列表
@@ -488,7 +579,7 @@ async def get_all_users(
     - contractor_staff_id: 供应商ID筛选
     """
     try:
-        from db.models import User as UserDB, EnterpriseInfo as EnterpriseDB, ContractorInfo as ContractorDB
+        from db.models import User as UserDB
         from sqlalchemy import func
         
         async with get_session(engine) as session:
@@ -558,42 +649,28 @@ async def get_all_users(
             result = await session.exec(query)
             users = result.all()
             
-            # 转换为响应格式
-            items = []
+            # 处理 Row 对象
+            user_objs = []
             for user_obj in users:
-                # 处理 Row 对象
                 if hasattr(user_obj, '__getitem__') and not isinstance(user_obj, UserDB):
                     user_obj = user_obj[0] if len(user_obj) > 0 else None
                     if user_obj is None:
                         continue
-                
-                # 获取关联的企业信息
-                enterprise_name = None
-                enterprise_license_number = None
-                if user_obj.enterprise_staff_id:
-                    enterprise_query = select(EnterpriseDB).where(EnterpriseDB.enterprise_id == user_obj.enterprise_staff_id)
-                    enterprise_result = await session.exec(enterprise_query)
-                    enterprise = enterprise_result.first()
-                    if enterprise:
-                        if hasattr(enterprise, '__getitem__') and not isinstance(enterprise, EnterpriseDB):
-                            enterprise = enterprise[0] if len(enterprise) > 0 else None
-                        if enterprise:
-                            enterprise_name = enterprise.company_name
-                            enterprise_license_number = enterprise.license_number
-                
-                # 获取关联的供应商信息
-                contractor_name = None
-                contractor_license_number = None
-                if user_obj.contractor_staff_id:
-                    contractor_query = select(ContractorDB).where(ContractorDB.contractor_id == user_obj.contractor_staff_id)
-                    contractor_result = await session.exec(contractor_query)
-                    contractor = contractor_result.first()
-                    if contractor:
-                        if hasattr(contractor, '__getitem__') and not isinstance(contractor, ContractorDB):
-                            contractor = contractor[0] if len(contractor) > 0 else None
-                        if contractor:
-                            contractor_name = contractor.company_name
-                            contractor_license_number = contractor.license_number
+                user_objs.append(user_obj)
+            
+            # 批量获取关联的企业和供应商信息（进程内缓存，未命中的 id 合并为一次查询）
+            enterprise_refs = await ENTERPRISE_REFS.get_many(session, [u.enterprise_staff_id for u in user_objs])
+            contractor_refs = await CONTRACTOR_REFS.get_many(session, [u.contractor_staff_id for u in user_objs])
+            
+            # 转换为响应格式
+            items = []
+            for user_obj in user_objs:
+                enterprise_ref = enterprise_refs.get(user_obj.enterprise_staff_id)
+                contractor_ref = contractor_refs.get(user_obj.contractor_staff_id)
+                enterprise_name = enterprise_ref.company_name if enterprise_ref else None
+                enterprise_license_number = enterprise_ref.license_number if enterprise_ref else None
+                contractor_name = contractor_ref.company_name if contractor_ref else None
+                contractor_license_number = contractor_ref.license_number if contractor_ref else None
                 
                 items.append({
                     "user_id": user_obj.user_id,
@@ -611,17 +688,18 @@ async def get_all_users(
                     "enterprise_license_number": enterprise_license_number,
                     "contractor_name": contractor_name,
                     "contractor_license_number": contractor_license_number,
-                    "created_at": user_obj.created_at.isoformat() if user_obj.created_at else None,
-                    "updated_at": user_obj.updated_at.isoformat() if user_obj.updated_at else None,
+                    "created_at": user_obj.created_at,
+                    "updated_at": user_obj.updated_at,
                 })
             
-            return {
+            # datetime 由响应序列化统一转换为 ISO 8601 字符串
+            return trusted_response({
                 "items": items,
                 "total": total,
                 "page": page,
                 "page_size": page_size,
                 "total_pages": (total + page_size - 1) // page_size
-            }
+            })
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"获取用户列表失败: {str(e)}")
 
@@ -702,18 +780,11 @@ async def update_user_status(
                 
                 # 从1变成2时，需要验证当前企业审核通过的管理员不能少于3个
                 if user_obj.role_level == 1 and role_level == 2:
-                    admin_query = select(UserDB).where(
-                        and_(
-                            UserDB.enterprise_staff_id == current_user.enterprise_staff_id,
-                            UserDB.role_level == 1,
-                            UserDB.user_status == 1,
-                            UserDB.user_id != user_id
-                        )
+                    other_admin_count = await count_other_approved_admins(
+                        session, "enterprise", current_user.enterprise_staff_id, user_id
                     )
-                    admin_result = await session.exec(admin_query)
-                    other_admins = admin_result.all()
                     
-                    if not other_admins or len(other_admins) < 3:
+                    if other_admin_count < 3:
                         raise HTTPException(
                             status_code=400,
                             detail="不允许操作：当前企业必须至少保留3个处于'通过审核'状态的企业管理员"
@@ -740,19 +811,10 @@ async def update_user_status(
                     is_system_admin = user_obj.user_type == "admin"
                     
                     if is_system_admin:
-                        # 查找其他通过审核的系统管理员（user_type='admin' 且 user_status=1）
-                        system_admin_query = select(UserDB).where(
-                            and_(
-                                UserDB.user_type == "admin",
-                                UserDB.user_id != user_id,
-                                UserDB.user_status == 1  # 通过审核
-                            )
-                        )
-                        system_admin_result = await session.exec(system_admin_query)
-                        other_approved_system_admins = system_admin_result.all()
+                        # 其他通过审核的系统管理员（user_type='admin' 且 user_status=1）必须至少还有3个
+                        other_admin_count = await count_other_approved_admins(session, "system", 0, user_id)
                         
-                        # 必须至少还有3个通过审核的系统管理员
-                        if not other_approved_system_admins or len(other_approved_system_admins) < 3:
+                        if other_admin_count < 3:
                             raise HTTPException(
                                 status_code=400,
                                 detail="不允许操作：系统必须至少保留3个处于'通过审核'状态的系统管理员。当前系统中通过审核的系统管理员数量不足3个。"
@@ -763,39 +825,18 @@ async def update_user_status(
                     is_contractor_admin = user_obj.role_level == 3
                     
                     if is_enterprise_admin or is_contractor_admin:
-                        # 构建查询条件：查找相同enterprise_staff_id或contractor_staff_id下的其他管理员
-                        admin_conditions = []
+                        # 相同enterprise_staff_id下的其他企业管理员（role_level=1）
+                        # 或相同contractor_staff_id下的其他承包商管理员（role_level=3）
+                        if is_enterprise_admin:
+                            scope, company_id = "enterprise", user_obj.enterprise_staff_id
+                        else:
+                            scope, company_id = "contractor", user_obj.contractor_staff_id
                         
-                        if is_enterprise_admin and user_obj.enterprise_staff_id:
-                            # 查找相同enterprise_staff_id下的其他企业管理员（role_level=1）
-                            admin_conditions.append(
-                                and_(
-                                    UserDB.enterprise_staff_id == user_obj.enterprise_staff_id,
-                                    UserDB.role_level == 1,
-                                    UserDB.user_id != user_id,
-                                    UserDB.user_status == 1  # 通过审核
-                                )
-                            )
-                        
-                        if is_contractor_admin and user_obj.contractor_staff_id:
-                            # 查找相同contractor_staff_id下的其他承包商管理员（role_level=3）
-                            admin_conditions.append(
-                                and_(
-                                    UserDB.contractor_staff_id == user_obj.contractor_staff_id,
-                                    UserDB.role_level == 3,
-                                    UserDB.user_id != user_id,
-                                    UserDB.user_status == 1  # 通过审核
-                                )
-                            )
-                        
-                        # 如果找到了符合条件的查询条件，执行查询
-                        if admin_conditions:
-                            admin_query = select(UserDB).where(or_(*admin_conditions))
-                            admin_result = await session.exec(admin_query)
-                            other_approved_admins = admin_result.all()
+                        if company_id:
+                            other_admin_count = await count_other_approved_admins(session, scope, company_id, user_id)
                             
                             # 如果没有其他通过审核的管理员，不允许操作
-                            if not other_approved_admins or len(other_approved_admins) == 0:
+                            if other_admin_count == 0:
                                 entity_type = "企业" if is_enterprise_admin else "供应商"
                                 raise HTTPException(
                                     status_code=400,
@@ -862,6 +903,11 @@ async def update_user_status(
             await session.commit()
             await session.refresh(user_obj)
             
+            await publish_event(engine, [user_topic(user_obj.user_id)], "user_status_changed", {
+                "user_id": user_obj.user_id,
+                "user_status": user_obj.user_status,
+            })
+            
             status_map = {0: "未通过审核", 1: "通过审核", 2: "待审核", 3: "审核不通过"}
             status_text = status_map.get(user_status, "未知状态")
             
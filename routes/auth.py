@@ -8,9 +8,10 @@ import random
 import re
 
 from fastapi import APIRouter, Depends, HTTPException, status, Form
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 from pydantic import BaseModel
 
@@ -18,16 +19,20 @@ from api.model import Token, User, RegisterRequest
 from config import settings
 from .dependencies import (
     authenticate_user,
-    create_access_token,
     get_current_user,
-    get_engine
+    get_engine,
+    get_db_session,
 )
 from db.models import User as UserDB
 from db.connection import get_session
 from core import password as pwd
+from core.tokens import REFRESH_TOKEN_TYPE, create_token_pair, decode_token, revoke_tokens, use_refresh_token
 
 router = APIRouter()
 
+# 登出时访问令牌可以缺省或已过期，只凭刷新令牌也能登出
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
 # 验证码存储（临时使用内存字典，预留Redis接口）
 # TODO: 替换为Redis存储
 verification_codes: dict[str, dict] = {}  # {username: {"code": str, "expires_at": datetime}}
@@ -39,6 +44,16 @@ class ForgotPasswordRequest(BaseModel):
     contact: str  # 手机号或邮箱
 
 
+class RefreshTokenRequest(BaseModel):
+    """刷新令牌请求"""
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    """登出请求，同时撤销刷新令牌"""
+    refresh_token: Optional[str] = None
+
+
 class ResetPasswordRequest(BaseModel):
     """重置密码请求"""
     username: str
@@ -117,10 +132,9 @@ def send_verification_code_email(email: str, code: str):
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     user_type: Optional[str] = Form(None),
+    engine: AsyncEngine = Depends(get_engine),
 ) -> Token:
     """用户登录获取访问令牌 - 包含权限验证逻辑"""
-    from main import app  # 延迟导入避免循环依赖
-    
     try:
         # 打印登录数据
         print("=" * 50)
@@ -133,7 +147,7 @@ async def login_for_access_token(
         
         # 先检查用户是否存在
         from db import crud
-        user_check = await crud.get_user(app.state.engine, form_data.username)
+        user_check = await crud.get_user(engine, form_data.username)
         if not user_check:
             print(f"❌ 登录失败: 用户不存在")
             raise HTTPException(
@@ -143,7 +157,7 @@ async def login_for_access_token(
             )
         
         # 验证用户名和密码
-        user = await authenticate_user(app.state.engine, form_data.username, form_data.password)
+        user = await authenticate_user(engine, form_data.username, form_data.password)
         if not user:
             print(f"❌ 登录失败: 用户名或密码错误")
             raise HTTPException(
@@ -195,15 +209,13 @@ async def login_for_access_token(
                 redirect_to = "/login"
                 message = "未知用户类型"
         
-        access_token_expires = settings.access_token_expire_minutes
-        access_token = create_access_token(
-            data={"sub": user.username, "user_type": user.user_type}, 
-            expires_delta=access_token_expires
-        )
+        access_token, refresh_token = create_token_pair(user)
         
         return Token(
             access_token=access_token, 
             token_type="bearer",
+            refresh_token=refresh_token,
+            expires_in=int(settings.access_token_expire_minutes.total_seconds()),
             redirect_to=redirect_to,
             message=message
         )
@@ -219,6 +231,47 @@ async def login_for_access_token(
         )
 
 
+@router.post("/token/refresh")
+async def refresh_access_token(
+    request: RefreshTokenRequest,
+    session: AsyncSession = Depends(get_db_session),
+    engine: AsyncEngine = Depends(get_engine)
+) -> Token:
+    """
+    用刷新令牌换取新的访问令牌和刷新令牌
+
+    重新读取用户的角色、审核状态等写入新的访问令牌；改密码、删除等使 token_version 变化后刷新令牌失效，需要重新登录。
+    刷新令牌换新后只在宽限期（REFRESH_TOKEN_REUSE_GRACE_SECONDS）内可以再次使用，登出后立即失效
+    """
+    payload = decode_token(request.refresh_token)
+    if payload is None or payload.get("typ") != REFRESH_TOKEN_TYPE:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="刷新令牌无效，请重新登录")
+
+    user = await session.get(UserDB, payload.get("uid"))
+    if user is None or user.is_deleted or user.token_version != payload.get("ver"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="刷新令牌已失效，请重新登录")
+
+    try:
+        usable = await use_refresh_token(engine, payload)
+    except Exception as e:
+        print(f"❌ 刷新时登记旧刷新令牌失败: {type(e).__name__}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"刷新令牌失败: {str(e)}"
+        )
+    if not usable:
+        # 已登出，或换新后超过宽限期
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="刷新令牌已失效，请重新登录")
+
+    access_token, refresh_token = create_token_pair(user)
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        refresh_token=refresh_token,
+        expires_in=int(settings.access_token_expire_minutes.total_seconds()),
+    )
+
+
 @router.get("/users/me/")
 async def read_users_me(user: User = Depends(get_current_user)) -> User:
     """获取当前登录用户信息"""
@@ -299,9 +352,42 @@ async def register_user(
 
 
 @router.post("/logout")
-async def logout():
-    """用户登出"""
-    # 由于我们使用localStorage管理token，后端不需要做任何操作
+async def logout(
+    request: Optional[LogoutRequest] = None,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    engine: AsyncEngine = Depends(get_engine)
+):
+    """
+    用户登出
+
+    撤销请求头中的访问令牌和请求体中的刷新令牌，所有 worker 立即拒绝访问令牌，刷新令牌不能再换取新令牌。
+    访问令牌已过期（闲置超过有效期）时只凭刷新令牌登出，刷新令牌同样会被撤销
+    """
+    access_payload = decode_token(token) if token else None
+    if access_payload is not None and access_payload.get("typ") == REFRESH_TOKEN_TYPE:
+        access_payload = None
+    refresh_payload = decode_token(request.refresh_token) if request and request.refresh_token else None
+    if refresh_payload is not None and refresh_payload.get("typ") != REFRESH_TOKEN_TYPE:
+        refresh_payload = None
+    # 两个令牌都有效时必须属于同一用户
+    if (
+        access_payload is not None
+        and refresh_payload is not None
+        and refresh_payload.get("uid") != access_payload.get("uid")
+    ):
+        refresh_payload = None
+
+    tokens = [claims for claims in (access_payload, refresh_payload) if claims is not None]
+    if not tokens:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    try:
+        await revoke_tokens(engine, tokens)
+    except Exception as e:
+        print(f"❌ 登出时撤销令牌失败: {type(e).__name__}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"登出失败: {str(e)}"
+        )
     return {"message": "Logged out"}
 
 
@@ -311,7 +397,6 @@ async def forgot_password(
     engine: AsyncEngine = Depends(get_engine)
 ):
     """发送密码重置验证码"""
-    from main import app
     from db import crud
     
     try:
@@ -396,8 +481,6 @@ async def reset_password(
     engine: AsyncEngine = Depends(get_engine)
 ):
     """重置密码"""
-    from main import app
-    
     try:
         print("=" * 60)
         print("【密码重置请求】")
@@ -432,6 +515,9 @@ async def reset_password(
                 detail="验证码错误，请重新输入"
             )
         
+        # 在打开会话前计算新密码哈希，bcrypt 耗时期间不占用数据库连接
+        new_password_hash = pwd.get_password_hash(request.new_password)
+        
         # 查找用户
         async with get_session(engine) as session:
             statement = select(UserDB).where(
@@ -460,7 +546,7 @@ async def reset_password(
                 )
             
             # 更新密码
-            user.password_hash = pwd.get_password_hash(request.new_password)
+            user.password_hash = new_password_hash
             user.updated_at = datetime.now()
             
             await session.commit()
@@ -11,9 +11,10 @@ from sqlmodel import select as sql_select
 from pydantic import BaseModel
 
 from api.model import User
-from routes.dependencies import get_current_user, get_engine
+from routes.dependencies import get_current_user, get_engine, get_read_engine
 from db.models import EnterpriseInfo as EnterpriseDB, ContractorInfo as ContractorDB, User as UserDB
 from db.connection import get_session, SessionCreatError
+from db.search import keyword_filter, pick_enterprises
 
 router = APIRouter()
 
@@ -37,7 +38,7 @@ class CooperationRequestSubmit(BaseModel):
 async def get_available_enterprises(
     company_name: Optional[str] = Query(default=None, description="企业名称过滤（模糊匹配）"),
     license_number: Optional[str] = Query(default=None, description="营业执照编号过滤（模糊匹配）"),
-    engine: AsyncEngine = Depends(get_engine),
+    engine: AsyncEngine = Depends(get_read_engine),
     current_user: User = Depends(get_current_user)
 ) -> List[EnterpriseListItem]:
     """
@@ -70,9 +71,9 @@ async def get_available_enterprises(
             
             # 添加过滤条件
             if company_name:
-                conditions.append(EnterpriseDB.company_name.contains(company_name))
+                conditions.append(keyword_filter(company_name, EnterpriseDB.company_name, pinyin_column=EnterpriseDB.name_pinyin))
             if license_number:
-                conditions.append(EnterpriseDB.license_number.contains(license_number))
+                conditions.append(keyword_filter(license_number, EnterpriseDB.license_number))
             
             # 查询business_status为"续存"且未删除的企业
             query = select(EnterpriseDB).where(and_(*conditions))
@@ -102,6 +103,43 @@ async def get_available_enterprises(
         )
 
 
+@router.get("/enterprises/picker")
+async def get_enterprise_picker(
+    q: Optional[str] = Query(default=None, max_length=50, description="企业名称、营业执照编号或拼音（模糊匹配）"),
+    cursor: Optional[str] = Query(default=None, description="上一页返回的 next_cursor"),
+    limit: int = Query(default=20, ge=1, le=100),
+    engine: AsyncEngine = Depends(get_read_engine),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    企业选择器（申请合作）
+
+    只返回续存企业，已合作或申请中的企业在查询中直接排除；
+    按企业名称排序、游标分页，每项只包含 id、名称和营业执照编号
+    只有承包商管理员(role_level=3, user_status=1)可以调用
+    """
+    if current_user.role_level != 3 or current_user.user_status != 1:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有承包商管理员可以查看可申请的企业列表"
+        )
+    
+    if not current_user.contractor_staff_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="当前用户未绑定承包商"
+        )
+    
+    try:
+        items, next_cursor = await pick_enterprises(
+            engine, keyword=q, cursor=cursor, limit=limit,
+            exclude_contractor_id=current_user.contractor_staff_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
 @router.post("/submit")
 async def submit_cooperation_request(
     request: CooperationRequestSubmit,
@@ -12,20 +12,22 @@ import os
 import shutil
 
 from api.model import User
-from routes.dependencies import get_current_user, get_engine
+from routes.dependencies import get_current_user, get_engine, get_read_engine
 from db.models import ContractorInfo as ContractorDB, User as UserDB
 from db.connection import get_session
+from db.notify import publish_cache_invalidation, publish_event
+from core.events import SYSTEM_ADMINS_TOPIC, contractor_admins_topic
+from db.reference_cache import CONTRACTOR_REFS
 
 router = APIRouter()
 
-# 文件上传目录
+# 文件上传目录（应用启动时在 lifespan 中创建）
 UPLOAD_DIR = "uploads/contractor_licenses"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 @router.get("/contractors")
 async def get_available_contractors(
-    engine: AsyncEngine = Depends(get_engine),
+    engine: AsyncEngine = Depends(get_read_engine),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -184,11 +186,12 @@ async def submit_permission_apply(
                     "updated_at": datetime.now()
                 })
                 
-                return {
+                result = {
                     "message": "请前往供应商入驻申请页面填写详细信息",
                     "user_id": current_user.user_id,
                     "redirect_to": "/settlement/contractor"
                 }
+                notify_topics = [SYSTEM_ADMINS_TOPIC]
                 
             elif apply_type == "bind":
                 # 绑定已有供应商
@@ -245,15 +248,23 @@ async def submit_permission_apply(
                 
                 print(f"✅ 供应商绑定申请已提交: user_id={current_user.user_id}, contractor_id={contractor_id}, role_type={role_type}")
                 
-                return {
+                result = {
                     "message": "绑定申请已提交，等待审核",
                     "user_id": current_user.user_id
                 }
+                notify_topics = [SYSTEM_ADMINS_TOPIC, contractor_admins_topic(contractor_id)]
             else:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="apply_type必须是'settlement'或'bind'"
                 )
+        
+        # 事务提交后通知审批人刷新待审核列表
+        await publish_event(engine, notify_topics, "staff_application", {
+            "user_id": current_user.user_id,
+            "apply_type": apply_type,
+        })
+        return result
                 
     except HTTPException:
         raise
@@ -528,11 +539,14 @@ async def update_contractor(
                 "user_id": current_user.user_id,
                 "updated_at": datetime.now()
             })
-            
-            return {
-                "message": "供应商信息已更新，等待重新审核",
-                "contractor_id": contractor_id
-            }
+        
+        # 事务提交后失效承包商基础信息缓存（同步到其他 worker）
+        await publish_cache_invalidation(engine, CONTRACTOR_REFS.name, contractor_id)
+        
+        return {
+            "message": "供应商信息已更新，等待重新审核",
+            "contractor_id": contractor_id
+        }
             
     except HTTPException:
         raise
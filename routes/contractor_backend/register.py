@@ -5,9 +5,13 @@ Contractor user registration handler
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 
 from api.model import RegisterRequest
 from core import password as pwd
+from db import constraints
+from db.constraints import violated_constraint
+from db.connection import autocommit_connection
 
 
 async def handle_contractor_registration(register_data: RegisterRequest, engine: AsyncEngine):
@@ -52,76 +56,47 @@ async def handle_contractor_registration(register_data: RegisterRequest, engine:
     print("🟡" * 30 + "\n")
     
     # 实际的数据库写入逻辑
-    async with engine.begin() as conn:
-        # 检查用户名是否已存在（只检查is_deleted=false的记录）
-        username_check_query = text("""
-            SELECT user_id FROM users 
-            WHERE username = :username AND is_deleted = false
-        """)
-        result = await conn.execute(username_check_query, {"username": register_data.username})
-        existing_user = result.fetchone()
-        
-        if existing_user:
+    # 用户名、手机号、邮箱的重复检查由唯一索引完成（只约束 is_deleted=false 的记录），
+    # sys_only_id 由触发器设置为 user_id，注册只需要一次数据库往返
+    insert_query = text("""
+        INSERT INTO users (
+            username, password_hash, user_type, phone, email,
+            user_level, audit_status, temp_token, created_at, updated_at
+        ) VALUES (
+            :username, :password_hash, :user_type, :phone, :email,
+            :user_level, :audit_status, :temp_token, :created_at, :updated_at
+        ) RETURNING user_id
+    """)
+    
+    try:
+        async with autocommit_connection(engine) as conn:
+            result = await conn.execute(insert_query, {
+                "username": register_data.username,
+                "password_hash": password_hash,
+                "user_type": "contractor",
+                "phone": register_data.phone,
+                "email": register_data.email,
+                "user_level": -1,
+                "audit_status": 1,
+                "temp_token": register_data.temp_token,
+                "created_at": datetime.now(),
+                "updated_at": datetime.now()
+            })
+            user_id = result.scalar_one()
+    except IntegrityError as e:
+        constraint = violated_constraint(e)
+        if constraint == constraints.USERS_USERNAME:
             print(f"❌ 注册失败: 用户名 '{register_data.username}' 已存在")
             raise ValueError(f"用户名 '{register_data.username}' 已存在")
-        
-        # 检查手机号是否已存在（只检查is_deleted=false的记录）
-        if register_data.phone:
-            phone_check_query = text("""
-                SELECT user_id FROM users 
-                WHERE phone = :phone AND is_deleted = false
-            """)
-            result = await conn.execute(phone_check_query, {"phone": register_data.phone})
-            existing_phone = result.fetchone()
-            
-            if existing_phone:
-                print(f"❌ 注册失败: 手机号 '{register_data.phone}' 已被使用")
-                raise ValueError(f"手机号 '{register_data.phone}' 已被使用")
-        
-        # 检查邮箱是否已存在（只检查is_deleted=false的记录）
-        if register_data.email:
-            email_check_query = text("""
-                SELECT user_id FROM users 
-                WHERE email = :email AND is_deleted = false
-            """)
-            result = await conn.execute(email_check_query, {"email": register_data.email})
-            existing_email = result.fetchone()
-            
-            if existing_email:
-                print(f"❌ 注册失败: 邮箱 '{register_data.email}' 已被使用")
-                raise ValueError(f"邮箱 '{register_data.email}' 已被使用")
-        
-        # 插入新用户
-        insert_query = text("""
-            INSERT INTO users (
-                username, password_hash, user_type, phone, email,
-                user_level, audit_status, temp_token, created_at, updated_at
-            ) VALUES (
-                :username, :password_hash, :user_type, :phone, :email,
-                :user_level, :audit_status, :temp_token, :created_at, :updated_at
-            ) RETURNING user_id
-        """)
-        
-        result = await conn.execute(insert_query, {
-            "username": register_data.username,
-            "password_hash": password_hash,
-            "user_type": "contractor",
-            "phone": register_data.phone,
-            "email": register_data.email,
-            "user_level": -1,
-            "audit_status": 1,
-            "temp_token": register_data.temp_token,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
-        })
-        
-        user_id = result.fetchone()[0]
-        
-        # 更新 sys_only_id 为 user_id
-        update_query = text("UPDATE users SET sys_only_id = :user_id WHERE user_id = :user_id")
-        await conn.execute(update_query, {"user_id": user_id})
-        
-        print(f"✅ 承包商用户注册成功: user_id={user_id}, username={register_data.username}")
+        if constraint == constraints.USERS_PHONE:
+            print(f"❌ 注册失败: 手机号 '{register_data.phone}' 已被使用")
+            raise ValueError(f"手机号 '{register_data.phone}' 已被使用")
+        if constraint == constraints.USERS_EMAIL:
+            print(f"❌ 注册失败: 邮箱 '{register_data.email}' 已被使用")
+            raise ValueError(f"邮箱 '{register_data.email}' 已被使用")
+        raise
+    
+    print(f"✅ 承包商用户注册成功: user_id={user_id}, username={register_data.username}")
     
     # 返回结果
     return {
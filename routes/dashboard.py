@@ -0,0 +1,64 @@
+"""
+仪表盘路由
+Dashboard summary routes
+"""
+from fastapi import APIRouter, Depends, HTTPException
+
+from api.model import User
+from db.dashboard import get_dashboard_stats
+from db.encode_data import get_hot_work_level_name
+from .dependencies import get_token_user, get_read_engine
+
+router = APIRouter()
+
+
+def _group(stats: dict, metric: str) -> dict:
+    return {dimension: value for (name, dimension), value in stats.items() if name == metric}
+
+
+@router.get("/summary")
+async def get_dashboard_summary(
+    user: User = Depends(get_token_user),
+    engine = Depends(get_read_engine)
+) -> dict:
+    """
+    仪表盘统计
+
+    - 系统管理员(role_level=0): 全局的待审核人员（按用户类型）、企业和承包商数量（按经营状态）、
+      合作关系数、作业票数（按动火等级）
+    - 企业管理员(role_level=1): 本企业的待审核员工、合作承包商数、作业票数（按动火等级，按申请人所属企业统计）
+
+    数据来自触发器维护的计数表，一次主键范围查询
+    """
+    if user.user_status != 1:
+        raise HTTPException(status_code=403, detail="权限不足")
+    if user.role_level == 0:
+        enterprise_id = 0
+    elif user.role_level == 1 and user.enterprise_staff_id:
+        enterprise_id = user.enterprise_staff_id
+    else:
+        raise HTTPException(status_code=403, detail="权限不足")
+
+    try:
+        stats = await get_dashboard_stats(engine, enterprise_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"获取仪表盘统计失败: {str(e)}")
+
+    tickets = [
+        {"hot_work": int(level), "name": get_hot_work_level_name(int(level)), "count": count}
+        for level, count in sorted(_group(stats, "tickets").items(), key=lambda item: int(item[0]))
+        if count
+    ]
+    summary = {
+        "scope": "system" if enterprise_id == 0 else "enterprise",
+        "pending_users": {user_type: count for user_type, count in _group(stats, "pending_users").items() if count},
+        "active_cooperations": stats.get(("active_cooperations", ""), 0),
+        "tickets_by_hot_work": tickets,
+        "tickets_total": sum(item["count"] for item in tickets),
+    }
+    if enterprise_id == 0:
+        summary["enterprises_by_status"] = {status: count for status, count in _group(stats, "enterprises").items() if count}
+        summary["contractors_by_status"] = {status: count for status, count in _group(stats, "contractors").items() if count}
+    else:
+        summary["enterprise_id"] = enterprise_id
+    return summary
@@ -2,18 +2,19 @@
 共享依赖项
 Shared dependencies for routes
 """
-from typing import Union, List, Optional
-from datetime import timedelta, datetime, timezone
+from typing import List, Optional, AsyncIterator
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
-import jwt
-from jwt.exceptions import InvalidTokenError
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from api.model import User, UserType, PermissionLevel
+from api.model import User, TokenUser, UserType, PermissionLevel
 from config import settings
 from db import crud
 from core import password as pwd
+from core.tokens import ACCESS_TOKEN_TYPE, REFRESH_TOKEN_TYPE, REVOKED_TOKENS, TOKEN_VERSIONS, decode_token
+from core.cache import TTLCache, MISSING, register_invalidation_handler
+from db.connection import release_connection
 
 
 # OAuth2 密码认证
@@ -52,16 +53,23 @@ async def authenticate_user(engine, username: str, password: str):
         return False
 
 
-def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
-    """创建访问令牌"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-    return encoded_jwt
+async def get_db_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    请求级数据库会话
+
+    - 同一请求内所有依赖和路由函数共享同一个会话（FastAPI 依赖缓存）
+    - 第一次执行查询时才从连接池取连接；commit/rollback 或 release_connection 后立即归还，
+      之后再查询会重新取连接，因此不会在 bcrypt 等耗时操作期间占用连接
+    - 路由函数抛出异常时回滚，请求结束时关闭会话
+    """
+    session = AsyncSession(request.app.state.engine, expire_on_commit=False)
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
 
 
 def get_token_from_header(token: str = Depends(oauth2_scheme)):
@@ -69,58 +77,111 @@ def get_token_from_header(token: str = Depends(oauth2_scheme)):
     return token
 
 
-async def get_current_user(token: str = Depends(get_token_from_header)) -> User:
-    """获取当前登录用户"""
-    from main import app  # 延迟导入避免循环依赖
-    from api.model_trans import convert_user_db_to_response
-    
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-    except InvalidTokenError:
+def get_token_claims(token: str = Depends(get_token_from_header)) -> dict:
+    """
+    校验访问令牌并返回声明
+
+    拒绝刷新令牌、已登出的令牌，以及计数低于该用户最新计数（权限变更或已撤销）的访问令牌；
+    升级前签发的旧令牌没有 typ 声明，仍然接受，由 get_token_user 按原方式查库
+    """
+    payload = decode_token(token)
+    if payload is None or payload.get("typ") == REFRESH_TOKEN_TYPE:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    username = payload.get("sub")
-    user_type = payload.get("user_type")
-    user_db = await crud.get_user(app.state.engine, username, user_type)
-    
+    if not TOKEN_VERSIONS.is_current(payload) or REVOKED_TOKENS.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token expired")
+    return payload
+
+
+async def _load_user(session_or_engine, payload: dict) -> User:
+    """按令牌中的用户名查询完整的用户资料"""
+    from api.model_trans import convert_user_db_to_response
+
+    user_db = await crud.get_user(session_or_engine, payload.get("sub"), payload.get("user_type"))
     if not user_db:
         raise HTTPException(status_code=401, detail="User not found")
-    
+
     user = convert_user_db_to_response(user_db)
-    
+
     # 确保返回完整的用户信息
     if user.user_type == UserType.contractor:
         user.contractor_user = user.contractor_user
     elif user.user_type == UserType.enterprise:
         user.enterprise_user = user.enterprise_user
-    
+
     return user
 
 
-async def authenticate_enterprise_level(user: User = Depends(get_current_user)):
-    """验证企业级别权限（企业管理员及以上）"""
+async def get_current_user(
+    payload: dict = Depends(get_token_claims),
+    session: AsyncSession = Depends(get_db_session)
+) -> User:
+    """获取当前登录用户的完整资料（查询 users 表）；只做权限判断的接口使用 get_token_user"""
+    user = await _load_user(session, payload)
+    # 只读查询结束后立即归还连接，路由函数需要时再取
+    await release_connection(session)
+    return user
+
+
+async def get_token_user(request: Request, payload: dict = Depends(get_token_claims)) -> User:
+    """
+    由访问令牌声明构建当前用户，不查询数据库
+
+    只有 user_id、username、user_type、role_level、user_status、enterprise_staff_id、contractor_staff_id、
+    role_type；需要姓名、联系方式等资料时使用 get_current_user
+    """
+    if payload.get("typ") != ACCESS_TOKEN_TYPE:
+        return await _load_user(request.app.state.engine, payload)
+    return TokenUser(
+        user_id=payload["uid"],
+        username=payload["sub"],
+        user_type=UserType(payload["user_type"]),
+        role_level=payload.get("role_level"),
+        user_status=payload.get("user_status"),
+        enterprise_staff_id=payload.get("enterprise_staff_id"),
+        contractor_staff_id=payload.get("contractor_staff_id"),
+        role_type=payload.get("role_type"),
+    )
+
+
+def _permission_level(role_type: Optional[str]) -> Optional[PermissionLevel]:
+    return getattr(PermissionLevel, role_type, None) if role_type else None
+
+
+def _user_role_type(user: User) -> Optional[str]:
+    """令牌用户直接带有 role_type，完整资料中位于 enterprise_user / contractor_user"""
+    if isinstance(user, TokenUser):
+        return user.role_type
+    profile = user.enterprise_user if user.user_type == UserType.enterprise else user.contractor_user
+    return profile.role_type if profile else None
+
+
+async def authenticate_enterprise_level(user: User = Depends(get_token_user)):
+    """验证企业级别权限（企业管理员及以上），只读令牌声明"""
     if user.user_type != UserType.admin and user.user_type != UserType.enterprise:
         raise HTTPException(
             status_code=401, 
             detail="Access to this api is not permitted! higher access level needed!"
         )
-    if user.user_type == UserType.enterprise and PermissionLevel.map(user.enterprise_user.role_type) < PermissionLevel.manager:
-        raise HTTPException(
-            status_code=401, 
-            detail="Access to this api is not permitted! higher access level needed!"
-        )
+    if user.user_type == UserType.enterprise:
+        level = _permission_level(_user_role_type(user))
+        if level is None or level < PermissionLevel.manager:
+            raise HTTPException(
+                status_code=401, 
+                detail="Access to this api is not permitted! higher access level needed!"
+            )
     return user
 
 
-async def authenticate_contractor_level(user: User = Depends(get_current_user)):
-    """验证承包商级别权限（承包商审批员及以上）"""
+async def authenticate_contractor_level(user: User = Depends(get_token_user)):
+    """验证承包商级别权限（承包商审批员及以上），只读令牌声明"""
     if user.user_type != UserType.admin:
-        if user.user_type == UserType.contractor and PermissionLevel.map(user.contractor_user.role_type) < PermissionLevel.approver:
+        level = _permission_level(_user_role_type(user))
+        if user.user_type == UserType.contractor and (level is None or level < PermissionLevel.approver):
             raise HTTPException(
                 status_code=401, 
                 detail="Access to this api is not permitted! higher access level needed!"
             )
-        if user.user_type == UserType.enterprise and PermissionLevel.map(user.enterprise_user.role_type) < PermissionLevel.site_staff:
+        if user.user_type == UserType.enterprise and (level is None or level < PermissionLevel.site_staff):
             raise HTTPException(
                 status_code=401, 
                 detail="Access to this api is not permitted! higher access level needed!"
@@ -129,19 +190,32 @@ async def authenticate_contractor_level(user: User = Depends(get_current_user)):
 
 
 def get_user_enterprise_id(user: User) -> int:
-    """获取用户的企业ID"""
-    if user.user_type == UserType.enterprise and user.enterprise_user:
-        return user.enterprise_user.enterprise_id
+    """获取用户的企业ID（企业用户的 enterprise_staff_id 即企业ID）"""
+    if user.user_type == UserType.enterprise and user.enterprise_staff_id and user.enterprise_staff_id > 0:
+        return user.enterprise_staff_id
     return 0
 
 
-async def get_engine():
-    """获取数据库引擎"""
-    from main import app  # 延迟导入避免循环依赖
-    return app.state.engine
+async def get_engine(request: Request):
+    """获取数据库引擎（主库），engine 在应用 lifespan 中创建并挂在 app.state 上"""
+    return request.app.state.engine
+
+
+async def get_read_engine(request: Request):
+    """
+    获取只读接口使用的数据库引擎
+
+    配置了只读副本且副本延迟在阈值内时返回副本 engine，否则返回主库 engine；
+    同一会话刚发生过写请求时返回主库 engine（读己之写）
+    """
+    from db.replica import get_session_key
+    replica_router = getattr(request.app.state, "replica_router", None)
+    if replica_router is None:
+        return request.app.state.engine
+    return replica_router.choose(get_session_key(request.headers))
 
 
-def verify_system_admin(user: User = Depends(get_current_user)):
+def verify_system_admin(user: User = Depends(get_token_user)):
     """
     验证系统管理员权限
     
@@ -156,6 +230,59 @@ def verify_system_admin(user: User = Depends(get_current_user)):
     return user
 
 
+# 可访问范围缓存（每个 worker 进程一份）
+# 键为 ("contractor", contractor_id) -> active_enterprise_ids，("enterprise", enterprise_id) -> allowed_contractor_ids
+# 合作关系审批、移除等修改这两个数组的接口提交后需要调用
+# db.notify.publish_cache_invalidation(engine, CONTRACTOR_SCOPE_CACHE / ENTERPRISE_SCOPE_CACHE, id)
+_scope_cache = TTLCache(ttl_seconds=settings.scope_cache_ttl_seconds)
+
+CONTRACTOR_SCOPE_CACHE = "contractor_scope"
+ENTERPRISE_SCOPE_CACHE = "enterprise_scope"
+
+
+def invalidate_contractor_scope(contractor_id: Optional[int]) -> None:
+    """失效本进程中承包商的 active_enterprise_ids 缓存，None 表示全部"""
+    if contractor_id is None:
+        _scope_cache.clear()
+    else:
+        _scope_cache.invalidate(("contractor", contractor_id))
+
+
+def invalidate_enterprise_scope(enterprise_id: Optional[int]) -> None:
+    """失效本进程中企业的 allowed_contractor_ids 缓存，None 表示全部"""
+    if enterprise_id is None:
+        _scope_cache.clear()
+    else:
+        _scope_cache.invalidate(("enterprise", enterprise_id))
+
+
+register_invalidation_handler(CONTRACTOR_SCOPE_CACHE, invalidate_contractor_scope)
+register_invalidation_handler(ENTERPRISE_SCOPE_CACHE, invalidate_enterprise_scope)
+
+
+async def _get_scope_ids(kind: str, owner_id: int, column, key_column, engine) -> List[int]:
+    """只查询 id 数组这一列，结果写入缓存"""
+    cache_key = (kind, owner_id)
+    cached = _scope_cache.get(cache_key)
+    if cached is not MISSING:
+        return list(cached)
+    
+    from sqlmodel import select
+    from db.connection import get_session
+    
+    async with get_session(engine) as session:
+        result = await session.exec(select(column).where(key_column == owner_id))
+        ids = result.first()
+    
+    # 处理 Row 对象
+    if ids is not None and not isinstance(ids, list) and hasattr(ids, '__getitem__'):
+        ids = ids[0] if len(ids) > 0 else None
+    ids = ids if isinstance(ids, list) else []
+    
+    _scope_cache.set(cache_key, tuple(ids))
+    return ids
+
+
 async def get_user_accessible_enterprise_ids(user: User, engine) -> Optional[List[int]]:
     """
     获取用户可访问的企业ID列表
@@ -181,27 +308,11 @@ async def get_user_accessible_enterprise_ids(user: User, engine) -> Optional[Lis
             return []
         
         from db.models import ContractorInfo as ContractorDB
-        from sqlmodel import select
-        from db.connection import get_session
         
-        async with get_session(engine) as session:
-            query = select(ContractorDB).where(
-                ContractorDB.contractor_id == user.contractor_staff_id
-            )
-            result = await session.exec(query)
-            contractor = result.first()
-            
-            if contractor:
-                # 处理 Row 对象
-                if hasattr(contractor, '__getitem__') and not isinstance(contractor, ContractorDB):
-                    contractor = contractor[0] if len(contractor) > 0 else None
-                
-                if contractor and hasattr(contractor, 'active_enterprise_ids'):
-                    active_ids = contractor.active_enterprise_ids
-                    if isinstance(active_ids, list):
-                        return active_ids
-                    return []
-        return []
+        return await _get_scope_ids(
+            "contractor", user.contractor_staff_id,
+            ContractorDB.active_enterprise_ids, ContractorDB.contractor_id, engine
+        )
     
     return []
 
@@ -225,27 +336,11 @@ async def get_user_accessible_contractor_ids(user: User, engine) -> Optional[Lis
             return []
         
         from db.models import EnterpriseInfo as EnterpriseDB
-        from sqlmodel import select
-        from db.connection import get_session
         
-        async with get_session(engine) as session:
-            query = select(EnterpriseDB).where(
-                EnterpriseDB.enterprise_id == user.enterprise_staff_id
-            )
-            result = await session.exec(query)
-            enterprise = result.first()
-            
-            if enterprise:
-                # 处理 Row 对象
-                if hasattr(enterprise, '__getitem__') and not isinstance(enterprise, EnterpriseDB):
-                    enterprise = enterprise[0] if len(enterprise) > 0 else None
-                
-                if enterprise and hasattr(enterprise, 'allowed_contractor_ids'):
-                    allowed_ids = enterprise.allowed_contractor_ids
-                    if isinstance(allowed_ids, list):
-                        return allowed_ids
-                    return []
-        return []
+        return await _get_scope_ids(
+            "enterprise", user.enterprise_staff_id,
+            EnterpriseDB.allowed_contractor_ids, EnterpriseDB.enterprise_id, engine
+        )
     
     if user.role_level == 3:
         # 承包商管理员：只能访问自己的承包商
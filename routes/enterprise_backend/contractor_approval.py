@@ -9,9 +9,15 @@ from sqlalchemy import select, and_
 from pydantic import BaseModel
 
 from api.model import User
-from routes.dependencies import get_current_user, get_engine
+from routes.dependencies import (
+    get_token_user, get_engine, get_read_engine,
+    ENTERPRISE_SCOPE_CACHE, CONTRACTOR_SCOPE_CACHE
+)
+from db.notify import publish_cache_invalidation, publish_event
+from core.events import contractor_admins_topic
 from db.models import EnterpriseInfo as EnterpriseDB, ContractorInfo as ContractorDB
 from db.connection import get_session
+from core.responses import trusted_response
 
 router = APIRouter()
 
@@ -44,7 +50,7 @@ class ContractorApprovalItem(BaseModel):
     detail_info: Optional[ContractorDetailInfo] = None
 
 
-def verify_enterprise_admin_or_system_admin(user: User = Depends(get_current_user)):
+def verify_enterprise_admin_or_system_admin(user: User = Depends(get_token_user)):
     """验证企业管理员或系统管理员权限"""
     if not user:
         raise HTTPException(
@@ -102,7 +108,7 @@ def verify_enterprise_admin_or_system_admin(user: User = Depends(get_current_use
 
 @router.get("/contractors")
 async def get_contractors_for_approval(
-    engine: AsyncEngine = Depends(get_engine),
+    engine: AsyncEngine = Depends(get_read_engine),
     current_user: User = Depends(verify_enterprise_admin_or_system_admin)
 ) -> List[ContractorApprovalItem]:
     """
@@ -217,7 +223,7 @@ async def get_contractors_for_approval(
                     detail_info=detail_info
                 ))
             
-            return items
+            return trusted_response(items)
     except HTTPException:
         raise
     except Exception as e:
@@ -389,6 +395,15 @@ async def approve_contractor(
             # 提交事务
             await session.commit()
             
+            # 合作关系已变化，失效可访问范围缓存（同步到其他 worker）
+            await publish_cache_invalidation(engine, ENTERPRISE_SCOPE_CACHE, enterprise_id)
+            await publish_cache_invalidation(engine, CONTRACTOR_SCOPE_CACHE, contractor_id)
+            await publish_event(engine, [contractor_admins_topic(contractor_id)], "cooperation_status_changed", {
+                "enterprise_id": enterprise_id,
+                "contractor_id": contractor_id,
+                "status": "approved" if approved else "rejected",
+            })
+            
             return {
                 "message": "审批操作成功" if approved else "拒绝申请成功",
                 "contractor_id": contractor_id,
@@ -511,6 +526,15 @@ async def remove_contractor(
             await session.flush()
             await session.commit()
             
+            # 合作关系已变化，失效可访问范围缓存（同步到其他 worker）
+            await publish_cache_invalidation(engine, ENTERPRISE_SCOPE_CACHE, enterprise_id)
+            await publish_cache_invalidation(engine, CONTRACTOR_SCOPE_CACHE, contractor_id)
+            await publish_event(engine, [contractor_admins_topic(contractor_id)], "cooperation_status_changed", {
+                "enterprise_id": enterprise_id,
+                "contractor_id": contractor_id,
+                "status": "removed",
+            })
+            
             return {
                 "message": "移除承包商成功",
                 "contractor_id": contractor_id
@@ -12,20 +12,53 @@ import os
 import shutil
 
 from api.model import User
-from routes.dependencies import get_current_user, get_engine
+from routes.dependencies import get_current_user, get_engine, get_read_engine
 from db.models import EnterpriseInfo as EnterpriseDB, User as UserDB
 from db.connection import get_session
+from db.notify import publish_cache_invalidation, publish_event
+from core.events import SYSTEM_ADMINS_TOPIC, enterprise_admins_topic
+from db.reference_cache import ENTERPRISE_REFS
+from db.search import pick_enterprises
 
 router = APIRouter()
 
-# 文件上传目录
+# 文件上传目录（应用启动时在 lifespan 中创建）
 UPLOAD_DIR = "uploads/enterprise_licenses"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+
+async def _ensure_can_bind_enterprise(session, current_user: User) -> None:
+    """检查用户是否可以绑定企业（待审核、企业管理员、已关联企业的用户不允许），不满足时抛出 403"""
+    user_query = select(UserDB).where(UserDB.user_id == current_user.user_id)
+    user_result = await session.exec(user_query)
+    user_db = user_result.first()
+    
+    if hasattr(user_db, '__getitem__') and not isinstance(user_db, UserDB):
+        user_db = user_db[0] if len(user_db) > 0 else None
+    
+    if user_db:
+        # 如果用户状态为待审核（user_status=2），不允许获取企业列表
+        if user_db.user_status == 2:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="您的申请正在审核中，请等待审核结果，不允许绑定企业"
+            )
+        
+        if user_db.role_level == 1:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="企业管理员不允许绑定其他企业"
+            )
+        
+        if user_db.enterprise_staff_id is not None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="您已关联企业，不允许绑定其他企业"
+            )
 
 
 @router.get("/enterprises")
 async def get_available_enterprises(
-    engine: AsyncEngine = Depends(get_engine),
+    engine: AsyncEngine = Depends(get_read_engine),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -41,33 +74,7 @@ async def get_available_enterprises(
     
     try:
         async with get_session(engine) as session:
-            # 检查用户是否是管理员或已有企业关联
-            user_query = select(UserDB).where(UserDB.user_id == current_user.user_id)
-            user_result = await session.exec(user_query)
-            user_db = user_result.first()
-            
-            if hasattr(user_db, '__getitem__') and not isinstance(user_db, UserDB):
-                user_db = user_db[0] if len(user_db) > 0 else None
-            
-            if user_db:
-                # 如果用户状态为待审核（user_status=2），不允许获取企业列表
-                if user_db.user_status == 2:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="您的申请正在审核中，请等待审核结果，不允许绑定企业"
-                    )
-                
-                if user_db.role_level == 1:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="企业管理员不允许绑定其他企业"
-                    )
-                
-                if user_db.enterprise_staff_id is not None:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="您已关联企业，不允许绑定其他企业"
-                    )
+            await _ensure_can_bind_enterprise(session, current_user)
             
             # 查询business_status为续存且未删除的企业
             query = select(EnterpriseDB).where(
@@ -107,6 +114,36 @@ async def get_available_enterprises(
         )
 
 
+@router.get("/enterprises/picker")
+async def get_enterprise_picker(
+    q: Optional[str] = Query(default=None, max_length=50, description="企业名称、营业执照编号或拼音（模糊匹配）"),
+    cursor: Optional[str] = Query(default=None, description="上一页返回的 next_cursor"),
+    limit: int = Query(default=20, ge=1, le=100),
+    engine: AsyncEngine = Depends(get_read_engine),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    企业选择器（绑定企业）
+
+    只返回续存企业，按企业名称排序、游标分页，每项只包含 id、名称和营业执照编号
+    调用条件同 /enterprises
+    """
+    if current_user.user_type != "enterprise":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有企业用户可以查看企业列表"
+        )
+    
+    async with get_session(engine) as session:
+        await _ensure_can_bind_enterprise(session, current_user)
+    
+    try:
+        items, next_cursor = await pick_enterprises(engine, keyword=q, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
 @router.post("/submit")
 async def submit_permission_apply(
     apply_data: dict,
@@ -184,11 +221,12 @@ async def submit_permission_apply(
                     "updated_at": datetime.now()
                 })
                 
-                return {
+                result = {
                     "message": "请前往企业入驻申请页面填写详细信息",
                     "user_id": current_user.user_id,
                     "redirect_to": "/settlement/enterprise"
                 }
+                notify_topics = [SYSTEM_ADMINS_TOPIC]
                 
             elif apply_type == "bind":
                 # 绑定已有企业
@@ -245,15 +283,23 @@ async def submit_permission_apply(
                 
                 print(f"✅ 企业绑定申请已提交: user_id={current_user.user_id}, enterprise_id={enterprise_id}, role_type={role_type}")
                 
-                return {
+                result = {
                     "message": "绑定申请已提交，等待审核",
                     "user_id": current_user.user_id
                 }
+                notify_topics = [SYSTEM_ADMINS_TOPIC, enterprise_admins_topic(enterprise_id)]
             else:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="apply_type必须是'settlement'或'bind'"
                 )
+        
+        # 事务提交后通知审批人刷新待审核列表
+        await publish_event(engine, notify_topics, "staff_application", {
+            "user_id": current_user.user_id,
+            "apply_type": apply_type,
+        })
+        return result
                 
     except HTTPException:
         raise
@@ -528,11 +574,14 @@ async def update_enterprise(
                 "user_id": current_user.user_id,
                 "updated_at": datetime.now()
             })
-            
-            return {
-                "message": "企业信息已更新，等待重新审核",
-                "enterprise_id": enterprise_id
-            }
+        
+        # 事务提交后失效企业基础信息缓存（同步到其他 worker）
+        await publish_cache_invalidation(engine, ENTERPRISE_REFS.name, enterprise_id)
+        
+        return {
+            "message": "企业信息已更新，等待重新审核",
+            "enterprise_id": enterprise_id
+        }
             
     except HTTPException:
         raise
@@ -7,13 +7,26 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 
 from api.model import User
 from routes.dependencies import get_engine
 from core import password as pwd
+from db import constraints
+from db.constraints import violated_constraint
+from db.connection import autocommit_connection
 
 router = APIRouter()
 
+# 入驻申请违反唯一约束时的提示信息
+SETTLEMENT_CONFLICT_MESSAGES = {
+    constraints.ENTERPRISE_COMPANY_NAME: "该企业名称已被使用，不允许重复注册",
+    constraints.ENTERPRISE_LICENSE_NUMBER: "该营业执照编号已被使用，不允许重复注册",
+    constraints.USERS_USERNAME: "该管理员用户名已被使用，不允许重复注册",
+    constraints.USERS_PHONE: "该管理员手机号已被使用，不允许重复注册",
+    constraints.USERS_EMAIL: "该管理员邮箱已被使用，不允许重复注册",
+}
+
 
 # 企业入驻申请
 @router.post("/settlement/enterprise")
@@ -72,130 +85,68 @@ async def submit_enterprise_settlement(
             detail="管理员用户名只能包含英文字母、数字和下划线，至少6个字符，不能以数字开头"
         )
     
-    async with engine.begin() as conn:
+    # 在写入数据库前计算密码哈希，bcrypt 耗时期间不占用数据库连接
+    password_hash = pwd.get_password_hash(adminPassword)
+    
+    # ========== 1. 处理文件上传 ==========
+    # 这里可以保存文件到服务器，暂时只保存路径
+    # 实际项目中应该保存文件并返回文件路径
+    license_file_path = f"uploads/enterprise/{datetime.now().strftime('%Y%m%d')}/{licenseFile.filename}"
+    
+    # ========== 2. 处理字段格式 ==========
+    # 处理日期格式
+    establish_date_value = None
+    if establishDate:
         try:
-            # ========== 1. 唯一性检查 ==========
-            # 检查企业名称是否已存在（排除已注销的企业）
-            check_company_name_query = text("""
-                SELECT enterprise_id FROM enterprise_info 
-                WHERE company_name = :company_name 
-                AND is_deleted = false 
-                AND business_status != '已注销'
-            """)
-            result = await conn.execute(check_company_name_query, {
-                "company_name": companyName
-            })
-            existing = result.fetchone()
-            if existing:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="该企业名称已被使用，不允许重复注册"
-                )
-            
-            # 检查营业执照编号是否已存在（排除已注销的企业）
-            check_license_number_query = text("""
-                SELECT enterprise_id FROM enterprise_info 
-                WHERE license_number = :license_number 
-                AND is_deleted = false 
-                AND business_status != '已注销'
-            """)
-            result = await conn.execute(check_license_number_query, {
-                "license_number": licenseNumber.strip()
-            })
-            existing = result.fetchone()
-            if existing:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="该营业执照编号已被使用，不允许重复注册"
-                )
-            
-            # 检查users表中的username, phone, email（排除已删除的用户）
-            # 检查用户名
-            check_username_query = text("""
-                SELECT user_id FROM users 
-                WHERE username = :username AND is_deleted = false
-            """)
-            result = await conn.execute(check_username_query, {
-                "username": adminUsername
-            })
-            existing = result.fetchone()
-            if existing:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="该管理员用户名已被使用，不允许重复注册"
-                )
-            
-            # 检查手机号
-            if adminPhone:
-                check_phone_query = text("""
-                    SELECT user_id FROM users 
-                    WHERE phone = :phone AND is_deleted = false
-                """)
-                result = await conn.execute(check_phone_query, {
-                    "phone": adminPhone
-                })
-                existing = result.fetchone()
-                if existing:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="该管理员手机号已被使用，不允许重复注册"
-                    )
-            
-            # 检查邮箱
-            if adminEmail:
-                check_email_query = text("""
-                    SELECT user_id FROM users 
-                    WHERE email = :email AND is_deleted = false
-                """)
-                result = await conn.execute(check_email_query, {
-                    "email": adminEmail
-                })
-                existing = result.fetchone()
-                if existing:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="该管理员邮箱已被使用，不允许重复注册"
-                    )
-            
-            
-            # ========== 2. 处理文件上传 ==========
-            # 这里可以保存文件到服务器，暂时只保存路径
-            # 实际项目中应该保存文件并返回文件路径
-            license_file_path = f"uploads/enterprise/{datetime.now().strftime('%Y%m%d')}/{licenseFile.filename}"
-            
-            # ========== 3. 创建enterprise_info表记录 ==========
-            # 处理日期格式
-            establish_date_value = None
-            if establishDate:
-                try:
-                    establish_date_value = datetime.strptime(establishDate, "%Y-%m-%d").date()
-                except ValueError:
-                    pass  # 如果日期格式错误，设为None
-            
-            # 处理注册资本
-            registered_capital_value = None
-            if registeredCapital:
-                try:
-                    # 前端传入的是万元，需要转换为元
-                    registered_capital_value = float(registeredCapital) * 10000
-                except ValueError:
-                    pass  # 如果转换失败，设为None
-            
-            insert_enterprise_info_query = text("""
-                INSERT INTO enterprise_info (
-                    license_file, license_number, company_name, company_address, legal_person,
-                    establish_date, registered_capital, applicant_name,
-                    business_status,
-                    created_at, updated_at
-                ) VALUES (
-                    :license_file, :license_number, :company_name, :company_address, :legal_person,
-                    :establish_date, :registered_capital, :applicant_name,
-                    :business_status,
-                    :created_at, :updated_at
-                ) RETURNING enterprise_id
-            """)
-            
-            result = await conn.execute(insert_enterprise_info_query, {
+            establish_date_value = datetime.strptime(establishDate, "%Y-%m-%d").date()
+        except ValueError:
+            pass  # 如果日期格式错误，设为None
+    
+    # 处理注册资本
+    registered_capital_value = None
+    if registeredCapital:
+        try:
+            # 前端传入的是万元，需要转换为元
+            registered_capital_value = float(registeredCapital) * 10000
+        except ValueError:
+            pass  # 如果转换失败，设为None
+    
+    # ========== 3. 一条语句创建enterprise_info和users表记录 ==========
+    # 公司名称、营业执照编号、用户名、手机号、邮箱的重复检查由唯一索引完成（见 db/constraints.py），
+    # users.sys_only_id 由触发器设置为 user_id。单条语句本身是原子的，任一约束冲突时两条记录都不会写入
+    insert_settlement_query = text("""
+        WITH new_enterprise AS (
+            INSERT INTO enterprise_info (
+                license_file, license_number, company_name, company_address, legal_person,
+                establish_date, registered_capital, applicant_name,
+                business_status,
+                created_at, updated_at
+            ) VALUES (
+                :license_file, :license_number, :company_name, :company_address, :legal_person,
+                :establish_date, :registered_capital, :applicant_name,
+                :business_status,
+                :created_at, :updated_at
+            ) RETURNING enterprise_id
+        )
+        INSERT INTO users (
+            username, password_hash, user_type, phone, email,
+            user_level, audit_status, temp_token,
+            name_str, role_type, role_level, user_status,
+            enterprise_staff_id,
+            created_at, updated_at
+        ) VALUES (
+            :username, :password_hash, :user_type, :phone, :email,
+            :user_level, :audit_status, :temp_token,
+            :name_str, :role_type, :role_level, :user_status,
+            (SELECT enterprise_id FROM new_enterprise),
+            :created_at, :updated_at
+        ) RETURNING user_id, enterprise_staff_id
+    """)
+    
+    try:
+        async with autocommit_connection(engine) as conn:
+            result = await conn.execute(insert_settlement_query, {
+                # enterprise_info
                 "license_file": license_file_path,
                 "license_number": licenseNumber.strip(),
                 "company_name": companyName,
@@ -205,32 +156,7 @@ async def submit_enterprise_settlement(
                 "registered_capital": registered_capital_value,
                 "applicant_name": applicantName,
                 "business_status": "待审核",
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            })
-            
-            enterprise_id = result.fetchone()[0]
-            
-            # ========== 4. 创建users表记录（包含企业用户信息） ==========
-            password_hash = pwd.get_password_hash(adminPassword)
-            
-            insert_user_query = text("""
-                INSERT INTO users (
-                    username, password_hash, user_type, phone, email,
-                    user_level, audit_status, temp_token,
-                    name_str, role_type, role_level, user_status,
-                    enterprise_staff_id,
-                    created_at, updated_at
-                ) VALUES (
-                    :username, :password_hash, :user_type, :phone, :email,
-                    :user_level, :audit_status, :temp_token,
-                    :name_str, :role_type, :role_level, :user_status,
-                    :enterprise_staff_id,
-                    :created_at, :updated_at
-                ) RETURNING user_id
-            """)
-            
-            result = await conn.execute(insert_user_query, {
+                # users
                 "username": adminUsername,
                 "password_hash": password_hash,
                 "user_type": "enterprise",
@@ -243,42 +169,45 @@ async def submit_enterprise_settlement(
                 "role_type": "admin",  # 管理员角色
                 "role_level": 1,  # 企业管理员（根据create_tables.sql注释：1 企业管理员）
                 "user_status": 2,  # 待审核（根据create_tables.sql注释：2 待审核）
-                "enterprise_staff_id": enterprise_id,  # 直接赋值为enterprise_info表的enterprise_id
                 "created_at": datetime.now(),
                 "updated_at": datetime.now()
             })
-            
-            user_id = result.fetchone()[0]
-            
-            # ========== 5. 更新sys_only_id ==========
-            # 更新users表的sys_only_id为user_id
-            update_user_sys_id_query = text("UPDATE users SET sys_only_id = :user_id WHERE user_id = :user_id")
-            await conn.execute(update_user_sys_id_query, {"user_id": user_id})
-            
-            print(f"✅ 企业入驻申请提交成功")
-            print(f"   企业ID: {enterprise_id}")
-            print(f"   用户ID: {user_id}")
-            print(f"   用户名: {adminUsername}")
-            print(f"   企业名称: {companyName}")
-            print(f"   审核状态: 待审核 (audit_status=3, business_status=待审核)")
-            
-            return {
-                "message": "申请提交成功，等待审核",
-                "enterprise_id": enterprise_id,
-                "user_id": user_id,
-                "application_status": "pending"
-            }
-            
-        except HTTPException:
-            raise
-        except Exception as e:
+            user_id, enterprise_id = result.one()  # enterprise_staff_id 直接赋值为enterprise_info表的enterprise_id
+    except IntegrityError as e:
+        detail = SETTLEMENT_CONFLICT_MESSAGES.get(violated_constraint(e))
+        if detail is None:
             print(f"❌ 企业入驻申请失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"提交申请失败: {str(e)}"
             )
+        print(f"❌ 企业入驻申请失败: {detail}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+    except Exception as e:
+        print(f"❌ 企业入驻申请失败: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"提交申请失败: {str(e)}"
+        )
+    
+    print(f"✅ 企业入驻申请提交成功")
+    print(f"   企业ID: {enterprise_id}")
+    print(f"   用户ID: {user_id}")
+    print(f"   用户名: {adminUsername}")
+    print(f"   企业名称: {companyName}")
+    print(f"   审核状态: 待审核 (audit_status=3, business_status=待审核)")
+    
+    return {
+        "message": "申请提交成功，等待审核",
+        "enterprise_id": enterprise_id,
+        "user_id": user_id,
+        "application_status": "pending"
+    }
 
 
 # 企业入驻信息修改
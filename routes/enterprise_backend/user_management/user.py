@@ -2,9 +2,11 @@
 企业员工管理路由
 Enterprise staff management routes
 """
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 
 from api.model import (
     EnterpriseUser,
@@ -14,16 +16,21 @@ from api.model import (
 )
 from core import password as pwd
 from db import crud
-from routes.dependencies import get_current_user, authenticate_enterprise_level, get_engine
+from routes.dependencies import get_token_user, authenticate_enterprise_level, get_engine, get_read_engine
+from core.responses import trusted_response
+from db.admin_quorum import count_other_approved_admins
+from config import settings
 
 router = APIRouter()
 
 
 @router.post("/", dependencies=[Depends(authenticate_enterprise_level)])
-async def add_enterprise_user(enterprise_user: EnterpriseUser, create_account: bool = Query(default=True)):
+async def add_enterprise_user(
+    enterprise_user: EnterpriseUser,
+    create_account: bool = Query(default=True),
+    engine = Depends(get_engine)
+):
     """添加企业用户"""
-    from main import app
-    
     try:
         if create_account:
             user = User(
@@ -32,11 +39,11 @@ async def add_enterprise_user(enterprise_user: EnterpriseUser, create_account: b
                 password_hash=pwd.get_password_hash(enterprise_user.phone[-6:])
             )
             enterprise_user_db = await crud.create_enterprise_user(
-                app.state.engine, enterprise_user, user
+                engine, enterprise_user, user
             )
         else:
             enterprise_user_db = await crud.create_enterprise_user(
-                app.state.engine, enterprise_user
+                engine, enterprise_user
             )
     except Exception as e:
         raise HTTPException(
@@ -49,13 +56,14 @@ async def add_enterprise_user(enterprise_user: EnterpriseUser, create_account: b
 @router.get("/")
 async def get_enterprise_users(
     department_id: int = Query(default=None, description="部门ID筛选"),
-    user: User = Depends(get_current_user),
-    engine = Depends(get_engine)
+    user: User = Depends(get_token_user),
+    engine = Depends(get_read_engine)
 ) -> List[EnterpriseUserListItem]:
     """获取企业用户列表"""
-    from db.models import User as UserDB, EnterpriseInfo as EnterpriseDB
+    from db.models import User as UserDB
     from sqlmodel import select, and_
     from db.connection import get_session
+    from db.reference_cache import ENTERPRISE_REFS, CONTRACTOR_REFS
     
     try:
         async with get_session(engine) as session:
@@ -93,43 +101,28 @@ async def get_enterprise_users(
             result = await session.exec(query)
             users_list = result.all()
             
-            # 转换为响应格式
-            members = []
+            # 处理 Row 对象
+            user_objs = []
             for user_obj in users_list:
-                # 处理 Row 对象
                 if hasattr(user_obj, '__getitem__') and not isinstance(user_obj, UserDB):
                     user_obj = user_obj[0] if len(user_obj) > 0 else None
                     if user_obj is None:
                         continue
-                
-                # 获取企业信息
-                company_name = None
-                enterprise_license_number = None
-                if user_obj.enterprise_staff_id:
-                    enterprise_query = select(EnterpriseDB).where(EnterpriseDB.enterprise_id == user_obj.enterprise_staff_id)
-                    enterprise_result = await session.exec(enterprise_query)
-                    enterprise = enterprise_result.first()
-                    if enterprise:
-                        if hasattr(enterprise, '__getitem__') and not isinstance(enterprise, EnterpriseDB):
-                            enterprise = enterprise[0] if len(enterprise) > 0 else None
-                        if enterprise:
-                            company_name = enterprise.company_name
-                            enterprise_license_number = enterprise.license_number
-                
-                # 获取承包商信息
-                from db.models import ContractorInfo as ContractorDB
-                contractor_name = None
-                contractor_license_number = None
-                if user_obj.contractor_staff_id:
-                    contractor_query = select(ContractorDB).where(ContractorDB.contractor_id == user_obj.contractor_staff_id)
-                    contractor_result = await session.exec(contractor_query)
-                    contractor = contractor_result.first()
-                    if contractor:
-                        if hasattr(contractor, '__getitem__') and not isinstance(contractor, ContractorDB):
-                            contractor = contractor[0] if len(contractor) > 0 else None
-                        if contractor:
-                            contractor_name = contractor.company_name
-                            contractor_license_number = contractor.license_number
+                user_objs.append(user_obj)
+            
+            # 批量获取企业和承包商信息（进程内缓存，未命中的 id 合并为一次查询）
+            enterprise_refs = await ENTERPRISE_REFS.get_many(session, [u.enterprise_staff_id for u in user_objs])
+            contractor_refs = await CONTRACTOR_REFS.get_many(session, [u.contractor_staff_id for u in user_objs])
+            
+            # 转换为响应格式
+            members = []
+            for user_obj in user_objs:
+                enterprise_ref = enterprise_refs.get(user_obj.enterprise_staff_id)
+                contractor_ref = contractor_refs.get(user_obj.contractor_staff_id)
+                company_name = enterprise_ref.company_name if enterprise_ref else None
+                enterprise_license_number = enterprise_ref.license_number if enterprise_ref else None
+                contractor_name = contractor_ref.company_name if contractor_ref else None
+                contractor_license_number = contractor_ref.license_number if contractor_ref else None
                 
                 # 返回完整信息
                 members.append(EnterpriseUserListItem(
@@ -154,7 +147,7 @@ async def get_enterprise_users(
                     status=user_obj.user_status if user_obj.user_status is not None else 1
                 ))
             
-            return members
+            return trusted_response(members)
     except HTTPException:
         raise
     except Exception as e:
@@ -166,7 +159,7 @@ async def update_enterprise_user_status(
     user_id: int,
     user_status: Optional[int] = Query(default=None, description="用户状态: 0未通过审核, 1通过审核, 2待审核, 3审核不通过"),
     role_level: Optional[int] = Query(default=None, description="角色等级: 1企业管理员, 2企业员工, 3承包商管理员, 4承包商员工"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_token_user),
     engine = Depends(get_engine)
 ):
     """
@@ -217,18 +210,11 @@ async def update_enterprise_user_status(
                     
                     # 从1变成2时，需要验证当前企业审核通过的管理员不能少于3个
                     if user_obj.role_level == 1 and role_level == 2:
-                        admin_query = select(UserDB).where(
-                            and_(
-                                UserDB.enterprise_staff_id == current_user.enterprise_staff_id,
-                                UserDB.role_level == 1,
-                                UserDB.user_status == 1,
-                                UserDB.user_id != user_id
-                            )
+                        other_admin_count = await count_other_approved_admins(
+                            session, "enterprise", current_user.enterprise_staff_id, user_id
                         )
-                        admin_result = await session.exec(admin_query)
-                        other_admins = admin_result.all()
                         
-                        if not other_admins or len(other_admins) < 3:
+                        if other_admin_count < 3:
                             raise HTTPException(
                                 status_code=400,
                                 detail="不允许操作：当前企业必须至少保留3个处于'通过审核'状态的企业管理员"
@@ -248,18 +234,11 @@ async def update_enterprise_user_status(
                     
                     # 从3变成4时，需要验证当前承包商审核通过的管理员不能少于3个
                     if user_obj.role_level == 3 and role_level == 4:
-                        admin_query = select(UserDB).where(
-                            and_(
-                                UserDB.contractor_staff_id == current_user.contractor_staff_id,
-                                UserDB.role_level == 3,
-                                UserDB.user_status == 1,
-                                UserDB.user_id != user_id
-                            )
+                        other_admin_count = await count_other_approved_admins(
+                            session, "contractor", current_user.contractor_staff_id, user_id
                         )
-                        admin_result = await session.exec(admin_query)
-                        other_admins = admin_result.all()
                         
-                        if not other_admins or len(other_admins) < 3:
+                        if other_admin_count < 3:
                             raise HTTPException(
                                 status_code=400,
                                 detail="不允许操作：当前承包商必须至少保留3个处于'通过审核'状态的承包商管理员"
@@ -271,18 +250,11 @@ async def update_enterprise_user_status(
                 if user_status is not None and user_status != user_obj.user_status:
                     # 如果被修改的是承包商管理员（role_level=3），从通过审核（1）变更为其他状态时
                     if user_obj.role_level == 3 and user_obj.user_status == 1 and user_status != 1:
-                        admin_query = select(UserDB).where(
-                            and_(
-                                UserDB.contractor_staff_id == current_user.contractor_staff_id,
-                                UserDB.role_level == 3,
-                                UserDB.user_status == 1,
-                                UserDB.user_id != user_id
-                            )
+                        other_admin_count = await count_other_approved_admins(
+                            session, "contractor", current_user.contractor_staff_id, user_id
                         )
-                        admin_result = await session.exec(admin_query)
-                        other_admins = admin_result.all()
                         
-                        if not other_admins or len(other_admins) < 3:
+                        if other_admin_count < 3:
                             raise HTTPException(
                                 status_code=400,
                                 detail="不允许操作：当前承包商必须至少保留3个处于'通过审核'状态的承包商管理员"
@@ -309,3 +281,96 @@ async def update_enterprise_user_status(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"更新用户信息失败: {str(e)}")
 
+
+
+@router.post("/import/")
+async def import_staff(
+    file: UploadFile = File(..., description="CSV 或 XLSX，表头：姓名、手机号、邮箱（可选）、工种（可选）"),
+    report_format: Literal["json", "csv"] = Query(default="json", description="json: 返回导入结果; csv: 直接下载错误报告"),
+    current_user: User = Depends(get_token_user),
+    engine = Depends(get_engine)
+):
+    """
+    批量导入员工账号
+
+    - 企业管理员(role_level=1): 导入为本企业员工（role_level=2）
+    - 承包商管理员(role_level=3): 导入为本承包商员工（role_level=4）
+
+    用户名为手机号，默认密码为手机号后6位（与单个添加员工相同），账号直接为通过审核状态。
+    格式错误、文件内重复、手机号或邮箱已被占用的行跳过，其余行照常导入；
+    report_format=csv 时返回失败行的 CSV 错误报告（改正后可直接重新导入），
+    导入数量在响应头 X-Import-Created / X-Import-Failed 中
+    """
+    from core.staff_import import ImportFileError, read_import_file, validate_rows, build_error_report
+    from db.staff_import import find_taken_accounts, insert_staff_accounts
+
+    if current_user.user_status != 1:
+        raise HTTPException(status_code=403, detail="权限不足")
+    if current_user.role_level == 1 and current_user.enterprise_staff_id:
+        target = {
+            "user_type": "enterprise", "role_type": "common_enterprise", "role_level": 2,
+            "enterprise_staff_id": current_user.enterprise_staff_id,
+        }
+    elif current_user.role_level == 3 and current_user.contractor_staff_id:
+        target = {
+            "user_type": "contractor", "role_type": "common_contractor", "role_level": 4,
+            "contractor_staff_id": current_user.contractor_staff_id,
+        }
+    else:
+        raise HTTPException(status_code=403, detail="权限不足")
+
+    if file.size is not None and file.size > settings.staff_import_max_bytes:
+        raise HTTPException(status_code=413, detail="导入文件过大")
+
+    try:
+        rows = await run_in_threadpool(read_import_file, file.file, file.filename, settings.staff_import_max_rows)
+    except ImportFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    valid_rows, errors = validate_rows(rows)
+    created = {}
+    try:
+        if valid_rows:
+            # 与数据库已有账号的冲突一次查询检查
+            taken_phones, taken_emails = await find_taken_accounts(engine, valid_rows)
+            pending = []
+            for row in valid_rows:
+                if row.phone in taken_phones:
+                    errors[row.row_no] = "手机号已被注册"
+                elif row.email and row.email in taken_emails:
+                    errors[row.row_no] = "邮箱已被注册"
+                else:
+                    pending.append(row)
+
+            if pending:
+                # 在进程池中生成密码哈希，不阻塞事件循环；默认密码为手机号后6位
+                password_hashes = await pwd.get_password_hashes([row.phone[-6:] for row in pending])
+                created = await insert_staff_accounts(engine, pending, password_hashes, **target)
+                for row in pending:
+                    if row.row_no not in created:
+                        errors[row.row_no] = "手机号或邮箱已被注册"
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"导入员工失败: {str(e)}")
+
+    print(f"✅ 员工批量导入: 成功 {len(created)} 行，失败 {len(errors)} 行 (操作人: {current_user.user_id})")
+
+    if report_format == "csv":
+        return Response(
+            content=build_error_report(rows, errors).encode("utf-8"),
+            media_type="text/csv; charset=utf-8",
+            headers={
+                "Content-Disposition": 'attachment; filename="staff_import_errors.csv"',
+                "X-Import-Created": str(len(created)),
+                "X-Import-Failed": str(len(errors)),
+            },
+        )
+    return {
+        "message": f"成功导入 {len(created)} 人，失败 {len(errors)} 人",
+        "total": len(rows),
+        "created": len(created),
+        "failed": len(errors),
+        "errors": [
+            {"row": row.row_no, "name": row.name, "phone": row.phone, "message": errors[row.row_no]}
+            for row in rows if row.row_no in errors
+        ],
+    }
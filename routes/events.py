@@ -0,0 +1,85 @@
+"""
+实时事件路由
+Server-sent events routes
+"""
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from api.model import User
+from config import settings
+from core.events import EVENT_HUB, topics_for_user
+from .dependencies import get_token_claims, get_token_user
+
+router = APIRouter()
+
+
+def get_stream_token(request: Request, access_token: Optional[str] = Query(default=None)) -> str:
+    """
+    SSE 的 token：优先取 Authorization 头，其次取 access_token 查询参数
+    （浏览器 EventSource 不能设置请求头）
+    """
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    if access_token:
+        return access_token
+    raise HTTPException(status_code=401, detail="Not authenticated")
+
+
+async def get_stream_user(request: Request, token: str = Depends(get_stream_token)) -> User:
+    return await get_token_user(request, get_token_claims(token))
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.get("/stream")
+async def event_stream(user: User = Depends(get_stream_user)):
+    """
+    实时通知（Server-Sent Events）
+
+    事件：
+    - user_status_changed: 自己的审核结果或账号状态变化
+    - staff_application: 有新的员工绑定申请（管理员）
+    - cooperation_status_changed: 合作申请被审批、合作被移除（承包商管理员）
+    - resync: 可能有事件丢失，客户端应重新拉取相关数据
+    收到事件后客户端调用原有接口（/users/me/、审批列表等）获取最新数据
+    """
+    if not settings.events_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if len(EVENT_HUB) >= settings.events_max_connections:
+        raise HTTPException(status_code=503, detail="实时通知连接数已满，请稍后重试")
+    topics = topics_for_user(user)
+
+    async def stream():
+        # 在生成器内订阅，响应未开始发送就断开时不会留下订阅
+        subscription = EVENT_HUB.subscribe(topics, settings.events_queue_size)
+        try:
+            yield format_sse("ready", {"user_id": user.user_id})
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.events_heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(message["event"], message["data"])
+                if subscription.overflow:
+                    subscription.overflow = False
+                    yield format_sse("resync", {})
+        finally:
+            # 客户端断开后 StreamingResponse 取消生成器，在这里退订
+            EVENT_HUB.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
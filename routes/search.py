@@ -0,0 +1,40 @@
+"""
+搜索路由
+Search routes
+"""
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from api.model import User
+from db.search import search_companies
+from .dependencies import (
+    get_token_user,
+    get_read_engine,
+    get_user_accessible_enterprise_ids,
+    get_user_accessible_contractor_ids,
+)
+
+router = APIRouter()
+
+
+@router.get("/companies")
+async def search_company_suggestions(
+    q: str = Query(..., min_length=1, max_length=50, description="关键词：公司名称、营业执照编号、拼音或拼音首字母"),
+    company_type: Literal["enterprise", "contractor"] = Query("enterprise", description="enterprise 企业 / contractor 承包商"),
+    limit: int = Query(10, ge=1, le=20),
+    user: User = Depends(get_token_user),
+    engine=Depends(get_read_engine),
+):
+    """
+    企业/承包商输入提示（typeahead）
+
+    只在当前用户可访问的范围内搜索，按名称前缀匹配和相似度排序
+    """
+    if company_type == "enterprise":
+        company_ids = await get_user_accessible_enterprise_ids(user, engine)
+    else:
+        company_ids = await get_user_accessible_contractor_ids(user, engine)
+
+    items = await search_companies(engine, company_type, q, limit=limit, company_ids=company_ids)
+    return {"items": items}
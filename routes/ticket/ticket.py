@@ -2,11 +2,13 @@
 工单管理路由
 Ticket management routes
 """
-from typing import List
-from datetime import datetime
+from typing import List, Literal, Optional
+from datetime import date, datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import aliased
 from sqlmodel import select, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from api.model import (
     TicketCreate,
@@ -16,17 +18,53 @@ from api.model import (
     User,
     UserType
 )
-from db.models import Ticket, EnterpriseUser, ContractorUser
-from routes.dependencies import get_current_user, authenticate_enterprise_level
+from db.models import Ticket, User as UserDB
+from routes.dependencies import (
+    get_token_user, get_user_enterprise_id, authenticate_enterprise_level, get_read_engine, get_db_session,
+)
+from core.responses import trusted_response
 
 router = APIRouter()
 
 
+def _ticket_query():
+    """
+    工单及申请人、作业人、监护人姓名
+
+    厂区表（area）和 enterprise_user/contractor_user 表已删除：姓名取自 users.name_str，
+    工单所属企业取申请人所在企业（与 ticket 上的统计触发器一致），不再返回厂区名称
+    """
+    applicant = aliased(UserDB)
+    worker = aliased(UserDB)
+    custodian = aliased(UserDB)
+    return select(
+        Ticket,
+        applicant.name_str.label("applicant_name"),
+        applicant.enterprise_staff_id.label("applicant_enterprise_id"),
+        worker.name_str.label("worker_name"),
+        custodian.name_str.label("custodian_name"),
+    ).outerjoin(
+        applicant, Ticket.applicant == applicant.user_id
+    ).outerjoin(
+        worker, Ticket.worker == worker.user_id
+    ).outerjoin(
+        custodian, Ticket.custodians == custodian.user_id
+    )
+
+
+async def _ticket_enterprise_id(session: AsyncSession, ticket: Ticket) -> Optional[int]:
+    """工单所属企业：申请人所在企业"""
+    result = await session.exec(select(UserDB.enterprise_staff_id).where(UserDB.user_id == ticket.applicant))
+    return result.first()
+
+
 @router.post("/", dependencies=[Depends(authenticate_enterprise_level)])
-async def create_ticket(ticket_data: TicketCreate, user: User = Depends(get_current_user)):
+async def create_ticket(
+    ticket_data: TicketCreate,
+    user: User = Depends(get_token_user),
+    session: AsyncSession = Depends(get_db_session)
+):
     """创建工单"""
-    from main import app
-    
     try:
         # 转换时间字符串为 datetime 对象
         pre_st = datetime.fromisoformat(ticket_data.pre_st.replace('Z', '+00:00'))
@@ -53,10 +91,8 @@ async def create_ticket(ticket_data: TicketCreate, user: User = Depends(get_curr
             signature=ticket_data.signature
         )
         
-        async with app.state.engine.begin() as conn:
-            conn.add(ticket)
-            await conn.commit()
-            await conn.refresh(ticket)
+        session.add(ticket)
+        await session.commit()
         
         return {
             "message": "工单创建成功",
@@ -72,33 +108,23 @@ async def get_tickets(
     hot_work: int = Query(default=None, description="按动火等级筛选"),
     start_date: str = Query(default=None, description="开始日期"),
     end_date: str = Query(default=None, description="结束日期"),
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_token_user),
+    engine = Depends(get_read_engine)
 ) -> List[TicketListItem]:
     """获取工单列表"""
-    from main import app
-    
     try:
-        async with app.state.engine.begin() as conn:
+        async with engine.begin() as conn:
             # 构建基础查询
-            query = select(
-                Ticket,
-                EnterpriseUser.name.label("applicant_name"),
-                Area.area_name,
-                ContractorUser.name.label("worker_name")
-            ).join(
-                EnterpriseUser, Ticket.applicant == EnterpriseUser.user_id
-            ).join(
-                Area, Ticket.area_id == Area.area_id
-            ).join(
-                ContractorUser, Ticket.worker == ContractorUser.user_id
-            )
+            query = _ticket_query()
             
             # 添加筛选条件
             filters = []
             
             # 企业用户只能看到自己企业的工单
             if user.user_type == UserType.enterprise:
-                filters.append(Area.enterprise_id == user.enterprise_user.enterprise_id)
+                filters.append(Ticket.applicant.in_(
+                    select(UserDB.user_id).where(UserDB.enterprise_staff_id == get_user_enterprise_id(user))
+                ))
             
             if area_id:
                 filters.append(Ticket.area_id == area_id)
@@ -119,67 +145,87 @@ async def get_tickets(
             result = await conn.execute(query)
             rows = result.all()
             
-            # 获取监护人信息
+            # 连接上执行时每行是工单各列和姓名列
             tickets = []
             for row in rows:
-                ticket = row[0]
-                applicant_name = row[1]
-                area_name = row[2]
-                worker_name = row[3]
-                
-                # 获取监护人姓名
-                custodian_query = select(EnterpriseUser.name).where(
-                    EnterpriseUser.user_id == ticket.custodians
-                )
-                custodian_result = await conn.execute(custodian_query)
-                custodian_name = custodian_result.scalar_one_or_none() or "未知"
-                
                 ticket_item = TicketListItem(
-                    ticket_id=ticket.ticket_id,
-                    apply_date=ticket.apply_date,
-                    applicant_name=applicant_name,
-                    area_name=area_name,
-                    working_content=ticket.working_content,
-                    pre_st=ticket.pre_st.isoformat(),
-                    pre_et=ticket.pre_et.isoformat(),
-                    worker_name=worker_name,
-                    custodian_name=custodian_name,
-                    hot_work=ticket.hot_work,
-                    work_height_level=ticket.work_height_level,
-                    created_at=ticket.created_at.isoformat()
+                    ticket_id=row.ticket_id,
+                    apply_date=row.apply_date,
+                    applicant_name=row.applicant_name or "未知",
+                    working_content=row.working_content,
+                    pre_st=row.pre_st.isoformat(),
+                    pre_et=row.pre_et.isoformat(),
+                    worker_name=row.worker_name or "未知",
+                    custodian_name=row.custodian_name or "未知",
+                    hot_work=row.hot_work,
+                    work_height_level=row.work_height_level,
+                    created_at=row.created_at.isoformat()
                 )
                 tickets.append(ticket_item)
             
-            return tickets
+            return trusted_response(tickets)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"获取工单列表失败: {str(e)}")
 
 
+@router.get("/stats/")
+async def get_ticket_stats(
+    start_date: date = Query(description="开始日期"),
+    end_date: date = Query(description="结束日期"),
+    granularity: Literal["day", "week", "month", "quarter", "year"] = Query(default="day", description="趋势的时间粒度"),
+    enterprise_id: Optional[int] = Query(default=None, description="按申请人所属企业筛选（仅系统管理员）"),
+    area_id: Optional[int] = Query(default=None, description="按厂区筛选"),
+    hot_work: Optional[int] = Query(default=None, description="按动火等级筛选"),
+    work_height_level: Optional[int] = Query(default=None, description="按作业高度等级筛选"),
+    user: User = Depends(get_token_user),
+    engine = Depends(get_read_engine)
+) -> dict:
+    """
+    作业票统计（安全报表）
+
+    按任意日期范围汇总作业票日统计表：总数、按时间粒度的趋势、按厂区/动火等级/作业高度等级的分布、
+    危险识别出现次数（降序）
+    - 系统管理员(role_level=0): 全部作业票，可按企业筛选
+    - 企业管理员(role_level=1): 申请人属于本企业的作业票
+    """
+    from db.ticket_rollup import query_ticket_stats
+
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="结束日期不能早于开始日期")
+    if user.user_status != 1:
+        raise HTTPException(status_code=403, detail="权限不足")
+    if user.role_level == 1 and user.enterprise_staff_id:
+        enterprise_id = user.enterprise_staff_id
+    elif user.role_level != 0:
+        raise HTTPException(status_code=403, detail="权限不足")
+
+    try:
+        stats = await query_ticket_stats(
+            engine, start_date, end_date, granularity,
+            enterprise_id=enterprise_id, area_id=area_id,
+            hot_work=hot_work, work_height_level=work_height_level,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"获取作业票统计失败: {str(e)}")
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "granularity": granularity,
+        **stats,
+    }
+
+
 @router.get("/{ticket_id}/")
 async def get_ticket_detail(
     ticket_id: int,
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_token_user),
+    engine = Depends(get_read_engine)
 ) -> TicketDetail:
     """获取工单详情"""
-    from main import app
-    
     try:
-        async with app.state.engine.begin() as conn:
+        async with engine.begin() as conn:
             # 查询工单及相关信息
-            query = select(
-                Ticket,
-                EnterpriseUser.name.label("applicant_name"),
-                Area.area_name,
-                ContractorUser.name.label("worker_name")
-            ).join(
-                EnterpriseUser, Ticket.applicant == EnterpriseUser.user_id
-            ).join(
-                Area, Ticket.area_id == Area.area_id
-            ).join(
-                ContractorUser, Ticket.worker == ContractorUser.user_id
-            ).where(
-                Ticket.ticket_id == ticket_id
-            )
+            query = _ticket_query().where(Ticket.ticket_id == ticket_id)
             
             result = await conn.execute(query)
             row = result.first()
@@ -187,51 +233,34 @@ async def get_ticket_detail(
             if not row:
                 raise HTTPException(status_code=404, detail="工单不存在")
             
-            ticket = row[0]
-            applicant_name = row[1]
-            area_name = row[2]
-            worker_name = row[3]
-            
             # 权限检查：企业用户只能查看自己企业的工单
-            if user.user_type == UserType.enterprise:
-                area_query = select(Area).where(Area.area_id == ticket.area_id)
-                area_result = await conn.execute(area_query)
-                area = area_result.scalar_one_or_none()
-                if area and area.enterprise_id != user.enterprise_user.enterprise_id:
-                    raise HTTPException(status_code=403, detail="无权访问该工单")
-            
-            # 获取监护人姓名
-            custodian_query = select(EnterpriseUser.name).where(
-                EnterpriseUser.user_id == ticket.custodians
-            )
-            custodian_result = await conn.execute(custodian_query)
-            custodian_name = custodian_result.scalar_one_or_none() or "未知"
+            if user.user_type == UserType.enterprise and row.applicant_enterprise_id != get_user_enterprise_id(user):
+                raise HTTPException(status_code=403, detail="无权访问该工单")
             
             return TicketDetail(
-                ticket_id=ticket.ticket_id,
-                apply_date=ticket.apply_date,
-                applicant=ticket.applicant,
-                applicant_name=applicant_name,
-                area_id=ticket.area_id,
-                area_name=area_name,
-                working_content=ticket.working_content,
-                pre_st=ticket.pre_st.isoformat(),
-                pre_et=ticket.pre_et.isoformat(),
-                tools=ticket.tools,
-                worker=ticket.worker,
-                worker_name=worker_name,
-                custodians=ticket.custodians,
-                custodian_name=custodian_name,
-                danger=ticket.danger,
-                protection=ticket.protection,
-                hot_work=ticket.hot_work,
-                work_height_level=ticket.work_height_level,
-                confined_space_id=ticket.confined_space_id,
-                temp_power_id=ticket.temp_power_id,
-                cross_work_group_id=ticket.cross_work_group_id,
-                signature=ticket.signature,
-                created_at=ticket.created_at.isoformat(),
-                updated_at=ticket.updated_at.isoformat()
+                ticket_id=row.ticket_id,
+                apply_date=row.apply_date,
+                applicant=row.applicant,
+                applicant_name=row.applicant_name or "未知",
+                area_id=row.area_id,
+                working_content=row.working_content,
+                pre_st=row.pre_st.isoformat(),
+                pre_et=row.pre_et.isoformat(),
+                tools=row.tools,
+                worker=row.worker,
+                worker_name=row.worker_name or "未知",
+                custodians=row.custodians,
+                custodian_name=row.custodian_name or "未知",
+                danger=row.danger,
+                protection=row.protection,
+                hot_work=row.hot_work,
+                work_height_level=row.work_height_level,
+                confined_space_id=row.confined_space_id,
+                temp_power_id=row.temp_power_id,
+                cross_work_group_id=row.cross_work_group_id,
+                signature=row.signature,
+                created_at=row.created_at.isoformat(),
+                updated_at=row.updated_at.isoformat()
             )
     except HTTPException:
         raise
@@ -243,50 +272,44 @@ async def get_ticket_detail(
 async def update_ticket(
     ticket_id: int,
     ticket_data: TicketUpdate,
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_token_user),
+    session: AsyncSession = Depends(get_db_session)
 ):
     """更新工单"""
-    from main import app
-    
     try:
-        async with app.state.engine.begin() as conn:
-            # 查询工单
-            query = select(Ticket).where(Ticket.ticket_id == ticket_id)
-            result = await conn.execute(query)
-            ticket = result.scalar_one_or_none()
-            
-            if not ticket:
-                raise HTTPException(status_code=404, detail="工单不存在")
-            
-            # 权限检查：企业用户只能修改自己企业的工单
-            if user.user_type == UserType.enterprise:
-                area_query = select(Area).where(Area.area_id == ticket.area_id)
-                area_result = await conn.execute(area_query)
-                area = area_result.scalar_one_or_none()
-                if area and area.enterprise_id != user.enterprise_user.enterprise_id:
-                    raise HTTPException(status_code=403, detail="无权修改该工单")
-            
-            # 更新字段
-            update_data = ticket_data.model_dump(exclude_unset=True)
-            
-            # 处理时间字段
-            if 'pre_st' in update_data and update_data['pre_st']:
-                update_data['pre_st'] = datetime.fromisoformat(
-                    update_data['pre_st'].replace('Z', '+00:00')
-                )
-            if 'pre_et' in update_data and update_data['pre_et']:
-                update_data['pre_et'] = datetime.fromisoformat(
-                    update_data['pre_et'].replace('Z', '+00:00')
-                )
-            
-            for key, value in update_data.items():
-                setattr(ticket, key, value)
-            
-            ticket.updated_at = datetime.now()
-            
-            await conn.commit()
-            
-            return {"message": "工单更新成功"}
+        # 查询工单
+        ticket = await session.get(Ticket, ticket_id)
+        
+        if not ticket:
+            raise HTTPException(status_code=404, detail="工单不存在")
+        
+        # 权限检查：企业用户只能修改自己企业的工单
+        if user.user_type == UserType.enterprise:
+            if await _ticket_enterprise_id(session, ticket) != get_user_enterprise_id(user):
+                raise HTTPException(status_code=403, detail="无权修改该工单")
+        
+        # 更新字段
+        update_data = ticket_data.model_dump(exclude_unset=True)
+        
+        # 处理时间字段
+        if 'pre_st' in update_data and update_data['pre_st']:
+            update_data['pre_st'] = datetime.fromisoformat(
+                update_data['pre_st'].replace('Z', '+00:00')
+            )
+        if 'pre_et' in update_data and update_data['pre_et']:
+            update_data['pre_et'] = datetime.fromisoformat(
+                update_data['pre_et'].replace('Z', '+00:00')
+            )
+        
+        for key, value in update_data.items():
+            setattr(ticket, key, value)
+        
+        ticket.updated_at = datetime.now()
+        
+        session.add(ticket)
+        await session.commit()
+        
+        return {"message": "工单更新成功"}
     except HTTPException:
         raise
     except Exception as e:
@@ -296,34 +319,27 @@ async def update_ticket(
 @router.delete("/{ticket_id}/", dependencies=[Depends(authenticate_enterprise_level)])
 async def delete_ticket(
     ticket_id: int,
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_token_user),
+    session: AsyncSession = Depends(get_db_session)
 ):
     """删除工单"""
-    from main import app
-    
     try:
-        async with app.state.engine.begin() as conn:
-            # 查询工单
-            query = select(Ticket).where(Ticket.ticket_id == ticket_id)
-            result = await conn.execute(query)
-            ticket = result.scalar_one_or_none()
-            
-            if not ticket:
-                raise HTTPException(status_code=404, detail="工单不存在")
-            
-            # 权限检查：企业用户只能删除自己企业的工单
-            if user.user_type == UserType.enterprise:
-                area_query = select(Area).where(Area.area_id == ticket.area_id)
-                area_result = await conn.execute(area_query)
-                area = area_result.scalar_one_or_none()
-                if area and area.enterprise_id != user.enterprise_user.enterprise_id:
-                    raise HTTPException(status_code=403, detail="无权删除该工单")
-            
-            # 删除工单
-            await conn.delete(ticket)
-            await conn.commit()
-            
-            return {"message": "工单删除成功"}
+        # 查询工单
+        ticket = await session.get(Ticket, ticket_id)
+        
+        if not ticket:
+            raise HTTPException(status_code=404, detail="工单不存在")
+        
+        # 权限检查：企业用户只能删除自己企业的工单
+        if user.user_type == UserType.enterprise:
+            if await _ticket_enterprise_id(session, ticket) != get_user_enterprise_id(user):
+                raise HTTPException(status_code=403, detail="无权删除该工单")
+        
+        # 删除工单
+        await session.delete(ticket)
+        await session.commit()
+        
+        return {"message": "工单删除成功"}
     except HTTPException:
         raise
     except Exception as e:
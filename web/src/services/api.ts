@@ -6,17 +6,26 @@ const API_BASE = 'http://localhost:8100'
 // Token管理类
 class TokenManager {
   private static readonly TOKEN_KEY = 'access_token'
+  private static readonly REFRESH_TOKEN_KEY = 'refresh_token'
 
-  static setToken(token: string): void {
+  static setToken(token: string, refreshToken?: string | null): void {
     localStorage.setItem(this.TOKEN_KEY, token)
+    if (refreshToken) {
+      localStorage.setItem(this.REFRESH_TOKEN_KEY, refreshToken)
+    }
   }
 
   static getToken(): string | null {
     return localStorage.getItem(this.TOKEN_KEY)
   }
 
+  static getRefreshToken(): string | null {
+    return localStorage.getItem(this.REFRESH_TOKEN_KEY)
+  }
+
   static removeToken(): void {
     localStorage.removeItem(this.TOKEN_KEY)
+    localStorage.removeItem(this.REFRESH_TOKEN_KEY)
   }
 
   static isTokenValid(): boolean {
@@ -103,6 +112,12 @@ export interface EnterpriseListItem {
   type: string
 }
 
+// 企业选择器分页结果
+export interface EnterprisePickerPage {
+  items: { id: number; name: string; license_number: string | null }[]
+  next_cursor: string | null
+}
+
 // 管理员信息
 export interface AdminInfo {
   user_id: number
@@ -305,10 +320,49 @@ export interface EnterpriseUserUpdate {
   status?: boolean | null
 }
 
+// 多个标签页共享 localStorage 中的令牌，刷新时用 Web Locks 互斥，同一时间只有一个标签页换取新令牌
+const REFRESH_LOCK = 'ehs-token-refresh'
+
 export class ApiService {
+  // 并发请求同时遇到 401 时只刷新一次
+  private refreshing: Promise<boolean> | null = null
+
+  // 用刷新令牌换取新的访问令牌（访问令牌过期，或角色、审核状态变化后旧令牌失效）
+  // staleToken 为被拒绝的访问令牌：其他标签页已经换了新令牌时直接使用，不再请求
+  private refreshAccessToken(staleToken: string): Promise<boolean> {
+    if (TokenManager.getToken() !== staleToken) return Promise.resolve(true)
+    if (!this.refreshing) {
+      const refresh = async (): Promise<boolean> => {
+        // 等锁期间其他标签页可能已经刷新
+        if (TokenManager.getToken() !== staleToken) return true
+        const refreshToken = TokenManager.getRefreshToken()
+        if (!refreshToken) return false
+        const response = await fetch(`${API_BASE}/token/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: refreshToken }),
+        })
+        if (!response.ok) return false
+        const result: Token = await response.json()
+        TokenManager.setToken(result.access_token, result.refresh_token)
+        return true
+      }
+      const locked = typeof navigator !== 'undefined' && navigator.locks
+        ? navigator.locks.request(REFRESH_LOCK, refresh)
+        : refresh()
+      this.refreshing = locked
+        .catch(() => false)
+        .finally(() => {
+          this.refreshing = null
+        })
+    }
+    return this.refreshing
+  }
+
   private async request<T>(
     endpoint: string,
-    options: RequestInit = {}
+    options: RequestInit = {},
+    retried = false
   ): Promise<T> {
     const url = `${API_BASE}${endpoint}`
 
@@ -349,9 +403,15 @@ export class ApiService {
 
     const response = await fetch(url, config)
 
-    // 处理401错误，自动清除token
+    // 处理401错误：先尝试刷新令牌并重试一次，失败后清除token
     if (response.status === 401) {
-      TokenManager.removeToken()
+      if (token && !retried && endpoint !== '/token' && await this.refreshAccessToken(token)) {
+        return this.request<T>(endpoint, options, true)
+      }
+      // 其他标签页已经换了新令牌（或重新登录）时不清除
+      if (TokenManager.getToken() === token) {
+        TokenManager.removeToken()
+      }
       // 不自动跳转，让路由守卫或组件自己处理
       throw new Error('未授权访问，请重新登录')
     }
@@ -381,7 +441,7 @@ export class ApiService {
     })
 
     // 登录成功后保存token
-    TokenManager.setToken(result.access_token)
+    TokenManager.setToken(result.access_token, result.refresh_token)
     return result
   }
 
@@ -419,6 +479,20 @@ export class ApiService {
 
   // 登出
   async logout(): Promise<void> {
+    // 通知后端撤销访问令牌和刷新令牌（访问令牌已过期时只凭刷新令牌）；失败时仍然清除本地令牌
+    const token = TokenManager.getToken()
+    const refreshToken = TokenManager.getRefreshToken()
+    if (token || refreshToken) {
+      const headers: Record<string, string> = { 'Content-Type': 'application/json' }
+      if (token) {
+        headers.Authorization = `Bearer ${token}`
+      }
+      await fetch(`${API_BASE}/logout`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      }).catch(() => undefined)
+    }
     TokenManager.removeToken()
   }
 
@@ -613,6 +687,80 @@ export class ApiService {
     })
   }
 
+  // 批量审批人员（管理员）
+  async approveStaffBatch(
+    userIds: number[],
+    approved: boolean,
+    comment?: string
+  ): Promise<{
+    message: string
+    updated: number
+    results: { user_id: number; result: 'approved' | 'rejected' | 'not_found' | 'forbidden' | 'invalid_status'; user_status?: number }[]
+    comment?: string
+  }> {
+    return this.request('/admin/users/approve-batch', {
+      method: 'POST',
+      body: JSON.stringify({ user_ids: userIds, approved, comment }),
+    })
+  }
+
+  // 批量导入员工（企业管理员、承包商管理员，CSV/XLSX）
+  async importStaff(file: File): Promise<{
+    message: string
+    total: number
+    created: number
+    failed: number
+    errors: { row: number; name: string; phone: string; message: string }[]
+  }> {
+    const formData = new FormData()
+    formData.append('file', file)
+    return this.request('/enterprise-backend/user-management/users/import/', {
+      method: 'POST',
+      body: formData,
+    })
+  }
+
+  // 仪表盘统计（系统管理员为全局，企业管理员为本企业）
+  async getDashboardSummary(): Promise<{
+    scope: 'system' | 'enterprise'
+    enterprise_id?: number
+    pending_users: Record<string, number>
+    active_cooperations: number
+    tickets_by_hot_work: { hot_work: number; name: string; count: number }[]
+    tickets_total: number
+    enterprises_by_status?: Record<string, number>
+    contractors_by_status?: Record<string, number>
+  }> {
+    return this.request('/dashboard/summary')
+  }
+
+  // 作业票统计（安全报表）
+  async getTicketStats(params: {
+    start_date: string
+    end_date: string
+    granularity?: 'day' | 'week' | 'month' | 'quarter' | 'year'
+    enterprise_id?: number
+    area_id?: number
+    hot_work?: number
+    work_height_level?: number
+  }): Promise<{
+    start_date: string
+    end_date: string
+    granularity: string
+    total: number
+    series: { period: string; count: number }[]
+    by_area: { area_id: number | null; count: number }[]
+    by_hot_work: { hot_work: number; name: string; count: number }[]
+    by_work_height_level: { work_height_level: number; name: string; count: number }[]
+    hazards: { hazard: string; count: number }[]
+  }> {
+    const queryParams = new URLSearchParams()
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) queryParams.append(key, String(value))
+    })
+    return this.request(`/tickets/stats/?${queryParams.toString()}`)
+  }
+
   // 获取所有用户列表（管理员，支持多种过滤条件）
   async getAllUsers(params?: {
     user_type?: string
@@ -781,6 +929,22 @@ export class ApiService {
     return this.request<EnterpriseListItem[]>(url)
   }
 
+  // 企业选择器（承包商管理员申请合作），排除已合作和申请中的企业，游标分页
+  async getEnterprisePicker(params?: {
+    q?: string
+    cursor?: string
+    limit?: number
+  }): Promise<EnterprisePickerPage> {
+    const queryParams = new URLSearchParams()
+    if (params?.q) queryParams.append('q', params.q)
+    if (params?.cursor) queryParams.append('cursor', params.cursor)
+    if (params?.limit) queryParams.append('limit', params.limit.toString())
+
+    const queryString = queryParams.toString()
+    const url = `/contractor-backend/cooperation-request/enterprises/picker${queryString ? '?' + queryString : ''}`
+    return this.request<EnterprisePickerPage>(url)
+  }
+
   // 提交合作申请（承包商管理员）
   async submitCooperationRequest(request: {
     enterprise_id: number
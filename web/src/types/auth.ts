@@ -17,6 +17,8 @@ export interface RegisterForm {
 export interface Token {
   access_token: string
   token_type: string
+  refresh_token?: string
+  expires_in?: number
   redirect_to?: string
   message?: string
 }